@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, send_file, jsonify, request, Response
+from flask import Flask, send_from_directory, jsonify, request, Response
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
@@ -232,6 +232,7 @@ def create_app():
         origins=cors_origins,
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["Content-Type", "Authorization"],
+        expose_headers=app.config.get("CORS_EXPOSE_HEADERS"),
         supports_credentials=True,
     )
 
@@ -270,6 +271,15 @@ def create_app():
     if not is_testing:
         app.logger.info("CORS origins: %s", cors_origins)
 
+    # === Адрес клиента за доверенными прокси ===
+    # request.remote_addr берётся из X-Forwarded-For только в пределах
+    # TRUSTED_PROXY_COUNT прокси; без них заголовок клиента игнорируется
+    trusted_proxies = int(app.config.get("TRUSTED_PROXY_COUNT", 0) or 0)
+    if trusted_proxies > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
+
     # === Security Headers ===
     setup_security_headers(app)
     setup_error_handlers(app)
@@ -277,12 +287,33 @@ def create_app():
     # === Rate Limiting ===
     setup_rate_limiting(app)
 
+    # Профилирование запросов по требованию администратора
+    from app.services.request_profiler import init_request_profiler
+
+    init_request_profiler(app)
+
     # Директория для исправленных файлов
     corrections_dir = os.path.join(app.root_path, "static", "corrections")
     os.makedirs(corrections_dir, exist_ok=True)
     if not is_testing:
         app.logger.info(f"Директория для исправленных файлов: {corrections_dir}")
 
+    # Инкрементальный учёт места в хранилище с периодической сверкой с диском
+    if not is_testing:
+        from app.services.storage_usage import storage_usage
+
+        storage_usage.start_background_reconcile(
+            interval=int(app.config.get("STORAGE_RECONCILE_INTERVAL", 300))
+        )
+
+    # Прогрев по запросу (WEB_WARMUP): профили, проверяющие, регулярные
+    # выражения и парсеры DOCX загружаются до первого запроса. gc.freeze()
+    # здесь не вызывается — он нужен только перед fork (gunicorn.conf.py)
+    if not is_testing and app.config.get("WEB_WARMUP"):
+        from app.services.warmup import warm_up
+
+        warm_up()
+
     # Подключаем Swagger документацию (если flasgger установлен)
     try:
         from flasgger import Swagger
@@ -367,13 +398,10 @@ def create_app():
             app.logger.error(f"Файл не найден: {file_path}")
             return "File not found", 404
 
-        # Используем send_file с правильным MIME-типом для docx
-        return send_file(
-            file_path,
-            mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            as_attachment=True,
-            download_name=filename,
-        )
+        # ETag по содержимому, условные и частичные запросы
+        from app.services.file_delivery import send_artifact
+
+        return send_artifact(file_path, os.path.basename(filename))
 
     return app
 
@@ -17,6 +17,7 @@ import logging
 
 from app.extensions import db
 from app.models import APIKey, User, APIKeyAudit
+from app.services.api_key_auth import invalidate_api_key
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,23 @@ def generate_api_key() -> tuple[str, str, str]:
     return full_key, visible_prefix, key_hash
 
 
+VALID_SCOPES = {'document:check', 'document:correct', 'document:view', 'admin:profile'}
+# Scopes that only administrators may grant to their keys
+ADMIN_SCOPES = {'admin:profile'}
+
+
+def _validate_scopes(scopes: list, user: User):
+    """Return an error response for unknown or forbidden scopes, else None."""
+    invalid_scopes = set(scopes) - VALID_SCOPES
+    if invalid_scopes:
+        return jsonify({'error': f'Invalid scopes: {", ".join(invalid_scopes)}'}), 400
+
+    admin_scopes = set(scopes) & ADMIN_SCOPES
+    if admin_scopes and not (user and user.is_admin):
+        return jsonify({'error': f'Scopes require admin role: {", ".join(sorted(admin_scopes))}'}), 403
+    return None
+
+
 def _log_api_key_event(user_id: str, api_key_id: int | None, event: str, metadata: dict | None = None) -> None:
     """Persist an immutable audit event for API key operations."""
     try:
@@ -50,7 +68,7 @@ def _log_api_key_event(user_id: str, api_key_id: int | None, event: str, metadat
             api_key_id=api_key_id,
             event=event,
             details=metadata or {},
-            ip_address=request.headers.get("X-Forwarded-For", request.remote_addr),
+            ip_address=request.remote_addr,
             user_agent=(request.headers.get("User-Agent") or "")[:512],
         )
         db.session.add(entry)
@@ -162,10 +180,9 @@ def create_api_key():
                 return jsonify({'error': 'expires_in_days must be a positive integer'}), 400
 
         # Validate scopes
-        valid_scopes = {'document:check', 'document:correct', 'document:view'}
-        invalid_scopes = set(scopes) - valid_scopes
-        if invalid_scopes:
-            return jsonify({'error': f'Invalid scopes: {", ".join(invalid_scopes)}'}), 400
+        scope_error = _validate_scopes(scopes, user)
+        if scope_error:
+            return scope_error
 
         # Generate new API key
         full_key, key_prefix, key_hash = generate_api_key()
@@ -236,8 +253,10 @@ def revoke_api_key(key_id):
             "api_key_revoked",
             {"name": api_key.name, "scopes": api_key.scopes},
         )
+        revoked_hash = api_key.key_hash
         db.session.delete(api_key)
         db.session.commit()
+        invalidate_api_key(key_hash=revoked_hash)
 
         logger.info(f"User {user_id} revoked API key: {key_id}")
 
@@ -297,10 +316,9 @@ def update_api_key(key_id):
             if not isinstance(scopes, list) or len(scopes) == 0:
                 return jsonify({'error': 'At least one scope is required'}), 400
 
-            valid_scopes = {'document:check', 'document:correct', 'document:view'}
-            invalid_scopes = set(scopes) - valid_scopes
-            if invalid_scopes:
-                return jsonify({'error': f'Invalid scopes: {", ".join(invalid_scopes)}'}), 400
+            scope_error = _validate_scopes(scopes, api_key.user)
+            if scope_error:
+                return scope_error
 
             api_key.scopes = scopes
 
@@ -327,6 +345,7 @@ def update_api_key(key_id):
         )
 
         db.session.commit()
+        invalidate_api_key(key_hash=api_key.key_hash)
 
         logger.info(f"User {user_id} updated API key: {key_id}")
 
@@ -358,6 +377,7 @@ def regenerate_api_key(key_id):
             return jsonify({'error': 'API key not found'}), 404
 
         previous_prefix = api_key.key_prefix
+        previous_hash = api_key.key_hash
 
         # Generate new key
         full_key, key_prefix, key_hash = generate_api_key()
@@ -379,6 +399,7 @@ def regenerate_api_key(key_id):
         )
 
         db.session.commit()
+        invalidate_api_key(key_hash=previous_hash)
 
         # Return the new key (only shown once!)
         response = api_key.to_dict(include_key=False)
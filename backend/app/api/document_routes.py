@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file, redirect, current_app
+from flask import Blueprint, Response, request, jsonify, redirect, current_app, send_file, stream_with_context
 import os
 import json
 import tempfile
@@ -12,21 +12,47 @@ import hashlib
 import re
 import random
 import urllib.request
-import zipfile
+from contextlib import nullcontext
 from lxml import etree
-from docx import Document as DocxDocument
 
+from app.metrics.timing import collect_timings
 from app.services.document_processor import DocumentProcessor
 from app.services.norm_control_checker import NormControlChecker
 from app.services.document_corrector import DocumentCorrector, CorrectionReport
 from app.services.workflow_service import WorkflowService
 from app.services.api_key_auth import authorize_api_key_request
+from app.services.storage_usage import storage_usage
+from app.services.preview_service import warm_preview
+from app.services.artifact_store import artifact_store
+from app.services.deadline import Deadline
+from app.services.profile_loader import load_resolved_profile
+from app.services.progress import ProgressReporter, emitter_sink
+from app.services.request_profiler import get_request_profiler, is_profiling_admin
+from app.websocket import get_progress_emitter
+from app.services.batch_service import BatchNotFound, create_batch, get_batch_status
+from app.services.file_delivery import send_artifact, resolve_path_cached, forget_path
+from app.services.report_service import (
+    REPORT_FORMATS,
+    ReportNotFound,
+    get_report_download_name,
+    get_report_file,
+    load_report_data,
+    render_json,
+)
+from app.services.upload_ingestion import (
+    UploadRejected,
+    check_request_size,
+    ingest_upload,
+    inspect_docx_archive,
+    normalize_docx_filename,
+)
 from app.config.security import (
     RATE_LIMITS,
     is_allowed_file,
     is_safe_filename,
     sanitize_filename,
     MIN_FILE_SIZE,
+    MAX_BATCH_FILES,
 )
 # ИИ функциональность удалена для упрощения приложения
 
@@ -34,6 +60,7 @@ bp = Blueprint('document', __name__, url_prefix='/api/document')
 
 ALLOWED_EXTENSIONS = {'docx'}
 # Директория для хранения постоянных корректированных файлов
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CORRECTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'corrections')
 
 # Создаем директорию, если она не существует
@@ -47,22 +74,38 @@ def _load_default_profile_data(profile_id=None):
     profile_data = None
 
     try:
-        base_dir = os.path.dirname(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        )
-        profile_filename = f"{profile_id}.json" if profile_id else 'default_gost.json'
-        profile_path = os.path.join(base_dir, 'profiles', profile_filename)
-        if not os.path.exists(profile_path):
-            profile_path = os.path.join(base_dir, 'profiles', 'default_gost.json')
-        if os.path.exists(profile_path):
-            with open(profile_path, 'r', encoding='utf-8') as file_obj:
-                profile_data = json.load(file_obj)
+        profile_data = load_resolved_profile(profile_id)
     except Exception as exc:
         current_app.logger.warning(f"Не удалось загрузить профиль ГОСТ: {exc}")
 
     return profile_data
 
 
+def _request_deadline():
+    """
+    Бюджет времени синхронной обработки: REQUEST_DEADLINE секунд на документ,
+    клиент может уменьшить его параметром deadline.
+    """
+    budget = float(current_app.config.get('REQUEST_DEADLINE', 0) or 0)
+    try:
+        requested = float(request.values.get('deadline', 0))
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        budget = min(budget, requested) if budget else requested
+    return Deadline.after(budget)
+
+
+def _request_timings():
+    """
+    Сбор замеров времени этапов, если клиент передал timings=true
+    (см. app.metrics.timing); иначе блок возвращает None.
+    """
+    if request.values.get('timings', 'false').lower() == 'true':
+        return collect_timings()
+    return nullcontext()
+
+
 def _run_multipass_correction(
     file_path,
     original_filename,
@@ -94,6 +137,8 @@ def _run_multipass_correction(
 
     if not os.path.exists(corrected_file_path):
         raise FileNotFoundError('Файл не был создан при исправлении')
+    storage_usage.record_write(corrected_file_path)
+    warm_preview(corrected_file_path)
 
     report_summary = report.get_summary()
     return {
@@ -127,6 +172,8 @@ def _preserve_original_for_preview(file_path, original_filename):
     preview_filename = f"{safe_base_name}_original_{preview_timestamp}.docx"
     preview_path = os.path.join(CORRECTIONS_DIR, preview_filename)
     shutil.copy2(file_path, preview_path)
+    storage_usage.record_write(preview_path)
+    warm_preview(preview_path)
     return preview_filename
 
 
@@ -366,7 +413,12 @@ def allowed_file(filename):
 
 
 def _validate_docx_payload(file_path):
-    """Быстрая проверка, что загруженный файл является валидным DOCX."""
+    """
+    Быстрая проверка, что сохраненный файл является валидным DOCX.
+
+    Проверяется только центральный каталог ZIP (без разбора XML);
+    для новых загрузок используйте ``ingest_upload``.
+    """
     try:
         if not os.path.exists(file_path) or os.path.getsize(file_path) <= 0:
             return False, 'Файл пустой или не был сохранен корректно'
@@ -374,16 +426,10 @@ def _validate_docx_payload(file_path):
         if os.path.getsize(file_path) < MIN_FILE_SIZE:
             return False, 'Файл слишком маленький для корректного DOCX документа'
 
-        if not zipfile.is_zipfile(file_path):
-            return False, 'Файл не является корректным DOCX архивом'
-
-        with zipfile.ZipFile(file_path, 'r') as archive:
-            if 'word/document.xml' not in archive.namelist():
-                return False, 'В DOCX отсутствует обязательная часть word/document.xml'
-
-        # Проверка, что документ действительно открывается python-docx.
-        DocxDocument(file_path)
+        inspect_docx_archive(file_path)
         return True, None
+    except UploadRejected as exc:
+        return False, exc.message
     except Exception as exc:
         return False, f'Некорректный DOCX файл: {str(exc)}'
 
@@ -506,10 +552,16 @@ def upload_document():
     """
     Загрузка документа и его проверка
     """
-    _, auth_error = authorize_api_key_request(required_scope='document:check')
+    api_key, auth_error = authorize_api_key_request(required_scope='document:check')
     if auth_error:
         return auth_error
 
+    # Отклоняем заведомо слишком большие запросы до разбора multipart
+    try:
+        check_request_size(request.content_length)
+    except UploadRejected as exc:
+        return jsonify({'error': exc.message}), exc.status_code
+
     # Проверяем, есть ли файл в запросе
     if 'file' not in request.files:
         return jsonify({'error': 'Файл не найден в запросе'}), 400
@@ -525,32 +577,58 @@ def upload_document():
         return jsonify({'error': 'Недопустимый формат файла. Разрешены только файлы DOCX.'}), 400
 
     try:
-        # Создаём временную директорию и сохраняем файл с корректным именем
-        temp_dir = tempfile.mkdtemp()
-        filename = secure_filename(file.filename)
-
-        # Убедимся, что имя файла имеет расширение .docx
-        if not filename.lower().endswith('.docx'):
-            filename = os.path.splitext(filename)[0] + '.docx'
-
-        file_path = os.path.join(temp_dir, filename)
-
-        # Сохраняем с явным закрытием файла
-        with open(file_path, 'wb') as f:
-            shutil.copyfileobj(file.stream, f)
+        # Потоково сохраняем файл с хешированием и проверкой архива
+        try:
+            upload = ingest_upload(file)
+        except UploadRejected as exc:
+            return jsonify({'error': exc.message}), exc.status_code
 
-        # Проверяем, что файл успешно сохранен и является валидным DOCX.
-        is_valid_docx, docx_error = _validate_docx_payload(file_path)
-        if not is_valid_docx:
-            return jsonify({'error': docx_error}), 400
+        file_path = upload.path
+        filename = upload.filename
 
-        current_app.logger.info(f"Файл сохранен по пути {file_path}, размер: {os.path.getsize(file_path)} байт")
+        current_app.logger.info(f"Файл сохранен по пути {file_path}, размер: {upload.size} байт")
 
         # Получаем ID профиля из запроса
         profile_id = request.form.get('profile_id')
 
+        # Асинхронный режим: обработка в фоне, клиент опрашивает статус задачи
+        if request.form.get('async', 'false').lower() == 'true':
+            try:
+                from app.tasks.dispatch import submit_document
+                task_id = submit_document(
+                    file_path, filename, profile_id, policy=_tenant_policy(api_key)
+                )
+            except Exception as e:
+                current_app.logger.error(f"Не удалось поставить {filename} в очередь: {e}")
+                return jsonify({'error': 'Очередь задач недоступна, повторите без async'}), 503
+            finally:
+                upload.cleanup()
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'status_url': f'/api/document/tasks/{task_id}',
+                'file_sha256': upload.sha256,
+            }), 202
+
+        # Прогресс в комнату WebSocket клиента, если он передал session_id
+        emitter = None
+        progress = None
+        session_id = request.form.get('session_id')
+        if session_id:
+            emitter = get_progress_emitter(session_id)
+            progress = ProgressReporter(emitter_sink(emitter))
+
         # Используем WorkflowService
-        result = workflow_service.process_document(file_path, filename, profile_id)
+        with _request_timings() as timings:
+            result = workflow_service.process_document(
+                file_path, filename, profile_id, progress=progress, deadline=_request_deadline()
+            )
+
+        if emitter is not None:
+            if result['success']:
+                emitter.complete()
+            else:
+                emitter.error('; '.join(result['errors']) or 'обработка не удалась')
 
         if not result['success']:
             return jsonify({
@@ -558,6 +636,10 @@ def upload_document():
                 'details': result['errors']
             }), 500
 
+        result['file_sha256'] = upload.sha256
+        if timings is not None:
+            result['timings'] = timings.to_dict()
+
         return jsonify(result), 200
 
     except Exception as e:
@@ -574,66 +656,234 @@ def upload_document():
 def upload_batch():
     """
     Пакетная загрузка и обработка документов
+
+    По умолчанию пакет ставится в очередь (202, статус — /batch/<batch_id>):
+    синхронная обработка держит воркер веб-сервера на всё время пакета.
+    Синхронно пакет обрабатывается при async=false или в потоковом режиме
+    (Accept: application/x-ndjson).
     """
-    _, auth_error = authorize_api_key_request(required_scope='document:check')
+    api_key, auth_error = authorize_api_key_request(required_scope='document:check')
     if auth_error:
         return auth_error
 
+    try:
+        check_request_size(request.content_length, batch=True)
+    except UploadRejected as exc:
+        return jsonify({'error': exc.message}), exc.status_code
+
     if 'files' not in request.files:
         return jsonify({'error': 'Файлы не найдены в запросе (ожидается поле "files")'}), 400
 
     files = request.files.getlist('files')
     if not files or files[0].filename == '':
         return jsonify({'error': 'Не выбраны файлы'}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({'error': f'Слишком много файлов в пакете (максимум {MAX_BATCH_FILES})'}), 400
 
     profile_id = request.form.get('profile_id')
-    results = []
 
-    temp_dir = tempfile.mkdtemp()
+    # Потоковый режим: по строке NDJSON на каждый документ по мере обработки
+    streaming = _wants_stream('application/x-ndjson')
+    run_async = request.form.get('async')
+    if run_async is None:
+        run_async = not streaming
+    else:
+        run_async = run_async.lower() == 'true'
 
-    for file in files:
-        if not allowed_file(file.filename):
-            results.append(_normalize_batch_result({
-                'filename': file.filename,
-                'success': False,
-                'error': 'Недопустимый формат файла'
-            }, file.filename))
-            continue
+    # Асинхронный режим: пакет ставится в очередь, клиент опрашивает статус
+    if run_async:
+        return _submit_batch(files, profile_id, _tenant_policy(api_key))
 
-        try:
-            filename = secure_filename(file.filename)
-            if not filename.lower().endswith('.docx'):
-                filename = os.path.splitext(filename)[0] + '.docx'
+    if streaming:
+        return _stream_response(_stream_batch(files, profile_id), 'application/x-ndjson')
 
-            file_path = os.path.join(temp_dir, filename)
-            file.save(file_path)
+    results = list(_iter_batch_results(files, profile_id))
+
+    return jsonify({
+        'success': True,
+        'results': results,
+        'total': len(files),
+        'processed': len(results)
+    }), 200
+
+
+def _iter_batch_results(files, profile_id):
+    """
+    Последовательно обрабатывает файлы пакета, отдавая результат каждого.
+
+    Временный каталог пакета удаляется и тогда, когда клиент прервал поток.
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for file in files:
+            if not allowed_file(file.filename):
+                yield _normalize_batch_result({
+                    'filename': file.filename,
+                    'success': False,
+                    'error': 'Недопустимый формат файла'
+                }, file.filename)
+                continue
 
-            is_valid_docx, docx_error = _validate_docx_payload(file_path)
-            if not is_valid_docx:
-                results.append(_normalize_batch_result({
-                    'filename': filename,
+            try:
+                filename = normalize_docx_filename(file.filename)
+
+                try:
+                    upload = ingest_upload(file, filename=filename, temp_dir=temp_dir)
+                except UploadRejected as exc:
+                    yield _normalize_batch_result({
+                        'filename': filename,
+                        'success': False,
+                        'error': exc.message,
+                    }, filename)
+                    continue
+
+                # Обработка
+                res = workflow_service.process_document(
+                    upload.path, filename, profile_id, deadline=_request_deadline()
+                )
+                # Каталог пакета удаляется после обработки: путь к загрузке не нужен клиенту
+                res.pop('temp_path', None)
+                yield _normalize_batch_result(res, filename)
+
+            except Exception as e:
+                yield _normalize_batch_result({
+                    'filename': file.filename,
                     'success': False,
-                    'error': docx_error,
-                }, filename))
+                    'error': str(e)
+                }, file.filename)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _stream_batch(files, profile_id):
+    """
+    Строки NDJSON пакетной обработки.
+
+    {"type": "result", "index": i, "result": {...}} на каждый файл и
+    завершающая {"type": "summary", ...}.
+    """
+    processed = 0
+    successful = 0
+    for index, result in enumerate(_iter_batch_results(files, profile_id)):
+        processed += 1
+        successful += 1 if result.get('success') else 0
+        yield current_app.json.dumps({'type': 'result', 'index': index, 'result': result}) + '\n'
+
+    yield current_app.json.dumps({
+        'type': 'summary',
+        'success': True,
+        'total': len(files),
+        'processed': processed,
+        'successful': successful,
+    }) + '\n'
+
+
+def _tenant_policy(api_key):
+    """
+    Параметры планирования клиента: тариф владельца API-ключа или IP.
+
+    IP берётся из request.remote_addr: за доверенными прокси его выставляет
+    ProxyFix (TRUSTED_PROXY_COUNT), а X-Forwarded-For от клиента подделывается.
+    """
+    from app.tasks.scheduling import resolve_policy
+    return resolve_policy(api_key, request.remote_addr)
+
+
+def _submit_batch(files, profile_id, policy):
+    """Принимает файлы пакета и ставит их обработку в очередь."""
+    from app.tasks.dispatch import batch_concurrency, submit_batch
+
+    max_concurrency = current_app.config.get('BATCH_MAX_CONCURRENCY', 8)
+    try:
+        concurrency = int(request.form.get('concurrency', max_concurrency))
+    except ValueError:
+        return jsonify({'error': 'Некорректное значение concurrency'}), 400
+    concurrency = batch_concurrency(max(1, min(concurrency, max_concurrency)), policy)
+
+    accepted = []
+    rejected = []
+    uploads = []
+    try:
+        for file in files:
+            if not allowed_file(file.filename):
+                rejected.append({'filename': file.filename, 'error': 'Недопустимый формат файла'})
+                continue
+            try:
+                upload = ingest_upload(file)
+            except UploadRejected as exc:
+                rejected.append({'filename': file.filename, 'error': exc.message})
                 continue
+            uploads.append(upload)
+            accepted.append({'path': upload.path, 'filename': upload.filename})
 
-            # Обработка
-            res = workflow_service.process_document(file_path, filename, profile_id)
-            results.append(_normalize_batch_result(res, filename))
+        if not accepted:
+            return jsonify({'error': 'Нет файлов, пригодных для обработки', 'rejected': rejected}), 400
 
-        except Exception as e:
-            results.append(_normalize_batch_result({
-                'filename': file.filename,
-                'success': False,
-                'error': str(e)
-            }, file.filename))
+        batch_id = create_batch(accepted, profile_id=profile_id, concurrency=concurrency)
+    finally:
+        for upload in uploads:
+            upload.cleanup()
+
+    try:
+        submit_batch(batch_id, len(accepted), concurrency, policy=policy)
+    except Exception as e:
+        current_app.logger.error(f"Не удалось поставить пакет {batch_id} в очередь: {e}")
+        artifact_store.delete_job(batch_id)
+        return jsonify({'error': 'Очередь задач недоступна, повторите с async=false'}), 503
 
     return jsonify({
         'success': True,
-        'results': results,
-        'total': len(files),
-        'processed': len(results)
-    }), 200
+        'batch_id': batch_id,
+        'status_url': f'/api/document/batch/{batch_id}',
+        'total': len(accepted),
+        'concurrency': concurrency,
+        'plan': policy.plan,
+        'rejected': rejected,
+    }), 202
+
+
+@bp.route('/batch/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """
+    Статус пакетной обработки и готовые результаты
+    """
+    _, auth_error = authorize_api_key_request(required_scope='document:view')
+    if auth_error:
+        return auth_error
+
+    include_details = request.args.get('details', 'false').lower() == 'true'
+    try:
+        status = get_batch_status(batch_id, include_details=include_details)
+    except BatchNotFound:
+        return jsonify({'error': 'Пакет не найден'}), 404
+
+    status['results'] = [
+        _normalize_batch_result(result, result.get('filename', '')) for result in status['results']
+    ]
+    return jsonify(status), 200
+
+
+@bp.route('/tasks/<task_id>', methods=['GET'])
+def get_task(task_id):
+    """
+    Статус фоновой обработки документа (Celery или локальный пул)
+    """
+    _, auth_error = authorize_api_key_request(required_scope='document:view')
+    if auth_error:
+        return auth_error
+
+    try:
+        uuid.UUID(task_id)
+    except ValueError:
+        return jsonify({'error': 'Некорректный идентификатор задачи'}), 400
+
+    from app.tasks.dispatch import get_task_status
+    try:
+        status = get_task_status(task_id)
+    except Exception as e:
+        current_app.logger.error(f"Не удалось получить статус задачи {task_id}: {e}")
+        return jsonify({'error': 'Очередь задач недоступна'}), 503
+    return jsonify(status), 200
 
 
 @bp.route('/analyze', methods=['POST'])
@@ -645,6 +895,11 @@ def analyze_document():
     if auth_error:
         return auth_error
 
+    try:
+        check_request_size(request.content_length)
+    except UploadRejected as exc:
+        return jsonify({'error': exc.message}), exc.status_code
+
     # Проверяем, есть ли файл в запросе
     if 'file' not in request.files:
         return jsonify({'error': 'Файл не найден в запросе'}), 400
@@ -660,55 +915,40 @@ def analyze_document():
         return jsonify({'error': 'Недопустимый формат файла. Разрешены только файлы DOCX.'}), 400
 
     try:
-        # Создаём временную директорию
-        temp_dir = tempfile.mkdtemp()
-        filename = secure_filename(file.filename)
-
-        if not filename.lower().endswith('.docx'):
-            filename = os.path.splitext(filename)[0] + '.docx'
-
-        file_path = os.path.join(temp_dir, filename)
+        # Потоково сохраняем файл; некорректный архив удаляется сразу
+        try:
+            upload = ingest_upload(file)
+        except UploadRejected as exc:
+            return jsonify({'error': exc.message}), exc.status_code
 
-        # Сохраняем файл
-        file.save(file_path)
-
-        is_valid_docx, docx_error = _validate_docx_payload(file_path)
-        if not is_valid_docx:
-            try:
-                os.remove(file_path)
-                os.rmdir(temp_dir)
-            except Exception:
-                pass
-            return jsonify({'error': docx_error}), 400
+        filename = upload.filename
+        file_path = upload.path
 
         # Получаем ID профиля
         profile_id = request.form.get('profile_id')
 
+        # Потоковый режим: результат каждой нормы отправляется событием SSE
+        if _wants_stream('text/event-stream'):
+            return _stream_response(
+                _stream_analysis(upload, profile_id), 'text/event-stream'
+            )
+
         # Анализируем
-        result = workflow_service.analyze_document(file_path, filename, profile_id)
+        with _request_timings() as timings:
+            result = workflow_service.analyze_document(
+                file_path, filename, profile_id, deadline=_request_deadline()
+            )
 
         if not result['success']:
-            try:
-                os.remove(file_path)
-                os.rmdir(temp_dir)
-            except Exception:
-                pass
+            _discard_upload(upload)
             return jsonify({
                 'error': 'Ошибка при анализе файла',
                 'details': result['errors']
             }), 500
 
-        document_token = workflow_service.create_document_session(
-            file_path,
-            filename,
-            profile_id,
-            temp_dir,
-            result.get('check_results'),
-        )
-        result['document_token'] = document_token
-        result.pop('temp_path', None)
-
-        return jsonify(result), 200
+        if timings is not None:
+            result['timings'] = timings.to_dict()
+        return jsonify(_open_analysis_session(result, upload, profile_id)), 200
 
     except Exception as e:
         current_app.logger.error(f"Ошибка при анализе файла: {type(e).__name__}: {str(e)}")
@@ -719,6 +959,90 @@ def analyze_document():
         }), 500
 
 
+def _wants_stream(mimetype):
+    """Клиент запросил потоковый ответ (stream=true или заголовок Accept)."""
+    if request.values.get('stream', 'false').lower() == 'true':
+        return True
+    return request.accept_mimetypes.best == mimetype
+
+
+def _stream_response(chunks, mimetype):
+    """Потоковый ответ без буферизации на стороне прокси."""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+def _discard_upload(upload):
+    try:
+        os.remove(upload.path)
+        os.rmdir(upload.temp_dir)
+    except Exception:
+        pass
+
+
+def _open_analysis_session(result, upload, profile_id):
+    """Сохраняет сессию документа для последующего автоисправления."""
+    result['document_token'] = workflow_service.create_document_session(
+        upload.path,
+        upload.filename,
+        profile_id,
+        upload.temp_dir,
+        result.get('check_results'),
+    )
+    result.pop('temp_path', None)
+    result['file_sha256'] = upload.sha256
+    return result
+
+
+def _stream_analysis(upload, profile_id):
+    """
+    События SSE анализа: start, rule (по одному на норму), complete или error.
+
+    Событие complete содержит итог без списков замечаний, уже отправленных
+    в событиях rule. Загрузка удаляется, если сессия анализа не открыта, в
+    том числе когда клиент закрыл соединение (GeneratorExit).
+    """
+    session_opened = False
+    try:
+        for event, payload in workflow_service.iter_analyze_document(
+            upload.path, upload.filename, profile_id, _request_deadline()
+        ):
+            if event != 'result':
+                yield _sse_event(event, payload)
+                continue
+
+            if not payload['success']:
+                yield _sse_event('error', {
+                    'error': 'Ошибка при анализе файла',
+                    'details': payload['errors']
+                })
+                return
+
+            result = _open_analysis_session(payload, upload, profile_id)
+            session_opened = True
+            check_results = result.pop('check_results')
+            result['total_issues_count'] = check_results['total_issues_count']
+            result['statistics'] = check_results['statistics']
+            result['profile'] = check_results['profile']
+            result['skipped_rules'] = check_results['skipped_rules']
+            yield _sse_event('complete', result)
+    except Exception as e:
+        current_app.logger.error(f"Ошибка при потоковом анализе файла: {type(e).__name__}: {str(e)}")
+        yield _sse_event('error', {
+            'error': f'Ошибка при анализе файла: {str(e)}',
+            'error_type': str(type(e).__name__)
+        })
+    finally:
+        if not session_opened:
+            _discard_upload(upload)
+
+
 @bp.route('/autocorrect', methods=['POST'])
 def autocorrect_document():
     """Исправление документа по краткоживущему токену сессии анализа."""
@@ -795,15 +1119,7 @@ def correct_document():
         correction_date = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
         # Загружаем профиль ГОСТ
-        profile_data = None
-        try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            profile_path = os.path.join(base_dir, 'profiles', 'default_gost.json')
-            if os.path.exists(profile_path):
-                with open(profile_path, 'r', encoding='utf-8') as f:
-                    profile_data = json.load(f)
-        except Exception as e:
-            current_app.logger.warning(f"Не удалось загрузить профиль ГОСТ: {e}")
+        profile_data = _load_default_profile_data()
 
         # Исправляем ошибки
         corrector = DocumentCorrector(profile_data=profile_data)
@@ -842,6 +1158,7 @@ def correct_document():
         # Проверим размер файла
         file_size = os.path.getsize(corrected_file_path)
         current_app.logger.info(f"Размер исправленного файла: {file_size} байт")
+        storage_usage.record_write(corrected_file_path, file_size)
 
         # Сохраняем только имя файла для фронтенда, чтобы оно было проще для обработки
         # Это упростит процесс скачивания
@@ -919,6 +1236,50 @@ def correct_document_multipass():
         return jsonify({'error': f'Ошибка при исправлении документа: {str(e)}'}), 500
 
 
+def _resolve_download_path(path):
+    """Разрешает путь к файлу для /download: как есть или относительно BASE_DIR."""
+    if os.path.isfile(path):
+        return path
+    if not os.path.isabs(path):
+        adjusted_path = os.path.join(BASE_DIR, path)
+        if os.path.isfile(adjusted_path):
+            return adjusted_path
+    return None
+
+
+def _resolve_corrected_path(path):
+    """
+    Перебирает возможные расположения исправленного файла.
+
+    Returns:
+        Путь к существующему файлу или None
+    """
+    # Если путь выглядит как имя файла (без слэшей), ищем только в директории исправлений
+    if '/' not in path and '\\' not in path:
+        filename = path if path.lower().endswith('.docx') else path + '.docx'
+        check_path = os.path.join(CORRECTIONS_DIR, filename)
+        return check_path if os.path.isfile(check_path) else None
+
+    candidates = [path]
+    if not path.lower().endswith('.docx'):
+        candidates.append(path + '.docx')
+
+    filename = os.path.basename(path)
+    if not filename.lower().endswith('.docx'):
+        filename += '.docx'
+    candidates.append(os.path.join(CORRECTIONS_DIR, filename))
+
+    base_path = os.path.join(BASE_DIR, path)
+    candidates.append(base_path)
+    if not path.lower().endswith('.docx'):
+        candidates.append(base_path + '.docx')
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
 @bp.route('/download', methods=['GET'])
 def download_file():
     """
@@ -938,44 +1299,22 @@ def download_file():
         return jsonify({'error': 'Не указан путь к файлу'}), 400
 
     try:
-        # Проверяем существование файла
-        if not os.path.exists(path):
+        full_path = resolve_path_cached(f'download:{path}', lambda: _resolve_download_path(path))
+        if not full_path:
             current_app.logger.error(f"Ошибка: файл не найден по пути {path}")
-
-            # Попробуем найти файл относительно директории сервера
-            # Проверим, начинается ли путь с C:\ или другого корневого пути
-            if not os.path.isabs(path):
-                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                adjusted_path = os.path.join(base_dir, path)
-                current_app.logger.info(f"Пытаемся найти файл по скорректированному пути: {adjusted_path}")
-
-                if os.path.exists(adjusted_path):
-                    path = adjusted_path
-                    current_app.logger.info(f"Файл найден по скорректированному пути")
-                else:
-                    current_app.logger.info(f"Файл не найден даже по скорректированному пути")
-                    return jsonify({'error': 'Файл не найден'}), 404
-            else:
+            if os.path.isabs(path):
                 return jsonify({'error': f'Файл не найден по пути {path}'}), 404
-
-        # Проверяем размер файла
-        file_size = os.path.getsize(path)
-        current_app.logger.info(f"Файл найден, размер: {file_size} байт")
+            return jsonify({'error': 'Файл не найден'}), 404
 
         # Определяем имя файла для скачивания
         if custom_filename:
             download_name = secure_filename(custom_filename)
         else:
-            download_name = os.path.basename(path)
+            download_name = os.path.basename(full_path)
 
         current_app.logger.info(f"Отправка файла с именем '{download_name}' пользователю")
 
-        return send_file(
-            path_or_file=path,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
+        return send_artifact(full_path, download_name)
 
     except Exception as e:
         current_app.logger.error(f"Ошибка при скачивании файла: {type(e).__name__}: {str(e)}")
@@ -1002,77 +1341,24 @@ def download_corrected_file():
         return jsonify({'error': 'Не указан путь к файлу'}), 400
 
     try:
-        # Обработка пути к файлу
-        full_path = None
+        full_path = resolve_path_cached(f'corrected:{path}', lambda: _resolve_corrected_path(path))
 
-        # Если путь выглядит как имя файла (без слэшей), то это, скорее всего, просто название файла
-        if '/' not in path and '\\' not in path:
-            current_app.logger.info(f"Получено имя файла без пути: {path}")
+        # Если передано только имя файла и его нет в директории исправлений,
+        # перенаправляем на статическую директорию
+        if not full_path and '/' not in path and '\\' not in path:
+            filename = path if path.lower().endswith('.docx') else path + '.docx'
+            redirect_url = f"/corrections/{filename}"
+            current_app.logger.info(f"Файл {filename} не найден, перенаправление на {redirect_url}")
 
-            # Убедимся, что файл имеет расширение .docx
-            if not path.lower().endswith('.docx'):
-                filename = path + '.docx'
-            else:
-                filename = path
-
-            # Проверяем в директории исправленных файлов
-            full_path = os.path.join(CORRECTIONS_DIR, filename)
-            current_app.logger.info(f"Проверяем наличие файла: {full_path}")
-
-            # Если файл не найден, но запрос был через относительный URL, перенаправляем на статическую директорию
-            if not os.path.exists(full_path):
-                redirect_url = f"/corrections/{filename}"
-                current_app.logger.info(f"Файл не найден по пути {full_path}, перенаправление на {redirect_url}")
-
-                # Перенаправляем на URL для статического файла с правильными заголовками
-                response = redirect(redirect_url)
-                response.headers['Content-Disposition'] = f'attachment; filename="{custom_filename or filename}"'
-                return response
-        else:
-            # Сначала пробуем найти файл как есть
-            if os.path.exists(path):
-                full_path = path
-                current_app.logger.info(f"Файл найден по указанному пути: {full_path}")
-            else:
-                # Проверяем с добавлением расширения .docx
-                if not path.lower().endswith('.docx'):
-                    path_with_ext = path + '.docx'
-                    if os.path.exists(path_with_ext):
-                        full_path = path_with_ext
-                        current_app.logger.info(f"Файл найден с добавлением расширения: {full_path}")
-
-                # Если не найден, проверяем в директории для исправленных файлов
-                if not full_path:
-                    filename = os.path.basename(path)
-                    if not filename.lower().endswith('.docx'):
-                        filename += '.docx'
-
-                    check_path = os.path.join(CORRECTIONS_DIR, filename)
-                    if os.path.exists(check_path):
-                        full_path = check_path
-                        current_app.logger.info(f"Файл найден в директории исправлений: {full_path}")
-
-                # Если все еще не найден, пробуем полный путь относительно базовой директории
-                if not full_path:
-                    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                    check_path = os.path.join(base_dir, path)
-                    if os.path.exists(check_path):
-                        full_path = check_path
-                        current_app.logger.info(f"Файл найден относительно базовой директории: {full_path}")
-                    elif not path.lower().endswith('.docx'):
-                        check_path_with_ext = check_path + '.docx'
-                        if os.path.exists(check_path_with_ext):
-                            full_path = check_path_with_ext
-                            current_app.logger.info(f"Файл найден с расширением относительно базовой директории: {full_path}")
+            # Перенаправляем на URL для статического файла с правильными заголовками
+            response = redirect(redirect_url)
+            response.headers['Content-Disposition'] = f'attachment; filename="{custom_filename or filename}"'
+            return response
 
         # Если файл найден, отправляем на скачивание
-        if full_path and os.path.exists(full_path):
+        if full_path:
             current_app.logger.info(f"Файл найден и будет отправлен: {full_path}")
 
-            # Проверяем размер файла
-            file_size = os.path.getsize(full_path)
-            current_app.logger.info(f"Размер файла: {file_size} байт")
-
             # Определяем имя файла для скачивания
             if custom_filename:
                 download_name = secure_filename(custom_filename)
@@ -1083,12 +1369,7 @@ def download_corrected_file():
 
             current_app.logger.info(f"Отправка файла с именем '{download_name}' пользователю")
 
-            return send_file(
-                path_or_file=full_path,
-                as_attachment=True,
-                download_name=download_name,
-                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
+            return send_artifact(full_path, download_name)
         else:
             current_app.logger.error(f"Файл не найден по всем проверенным путям")
             return jsonify({
@@ -1160,6 +1441,8 @@ def delete_correction_file(filename):
 
         # Удаляем файл
         os.remove(file_path)
+        storage_usage.record_delete(file_path)
+        forget_path(file_path)
         current_app.logger.info(f"Файл успешно удален: {file_path}")
 
         return jsonify({
@@ -1216,6 +1499,44 @@ def get_logs():
         return jsonify({'error': f'Ошибка при получении логов: {str(e)}'}), 500
 
 
+@bp.route('/admin/profiles', methods=['GET'])
+def list_request_profiles():
+    """
+    Список профилей запросов (см. app.services.request_profiler), новые первыми
+    """
+    if not is_profiling_admin():
+        return jsonify({'error': 'Недостаточно прав'}), 403
+
+    limit = request.args.get('limit', 100, type=int)
+    profiles = get_request_profiler().list_profiles(limit=max(1, limit))
+    return jsonify({'success': True, 'profiles': profiles, 'count': len(profiles)}), 200
+
+
+@bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_request_profile(profile_id):
+    """
+    Профиль запроса: файл pstats / свёрнутые стеки или текстовая сводка (format=text)
+    """
+    if not is_profiling_admin():
+        return jsonify({'error': 'Недостаточно прав'}), 403
+
+    profiler = get_request_profiler()
+    record = profiler.get_profile(profile_id)
+    if record is None or not os.path.exists(profiler.artifact_path(record)):
+        return jsonify({'error': 'Профиль не найден'}), 404
+
+    if request.args.get('format') == 'text':
+        return Response(profiler.summary(record), mimetype='text/plain')
+    if request.args.get('format') == 'json':
+        return jsonify(record), 200
+    return send_file(
+        profiler.artifact_path(record),
+        as_attachment=True,
+        download_name=record['artifact'],
+        mimetype='application/octet-stream',
+    )
+
+
 @bp.route('/admin/cleanup', methods=['POST'])
 def cleanup_old_files():
     """
@@ -1246,6 +1567,8 @@ def cleanup_old_files():
                     if file_mtime < cutoff_date:
                         try:
                             os.remove(file_path)
+                            storage_usage.record_delete(file_path)
+                            forget_path(file_path)
                             deleted_count += 1
                             deleted_files.append({
                                 'name': filename,
@@ -1338,20 +1661,13 @@ def download_report():
 
     try:
         # Формируем полный путь к файлу отчета
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        full_path = os.path.join(base_dir, path.lstrip('/'))
-
-        current_app.logger.info(f"Полный путь к отчету: {full_path}")
+        full_path = os.path.join(BASE_DIR, path.lstrip('/'))
 
         # Проверяем существование файла
-        if not os.path.exists(full_path):
+        if not os.path.isfile(full_path):
             current_app.logger.error(f"Ошибка: отчет не найден по пути {full_path}")
             return jsonify({'error': 'Отчет не найден'}), 404
 
-        # Проверяем размер файла
-        file_size = os.path.getsize(full_path)
-        current_app.logger.info(f"Отчет найден, размер: {file_size} байт")
-
         # Определяем имя файла для скачивания
         if custom_filename:
             download_name = secure_filename(custom_filename)
@@ -1360,14 +1676,50 @@ def download_report():
 
         current_app.logger.info(f"Отправка отчета с именем '{download_name}' пользователю")
 
-        return send_file(
-            path_or_file=full_path,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
+        return send_artifact(full_path, download_name)
 
     except Exception as e:
         current_app.logger.error(f"Ошибка при скачивании отчета: {type(e).__name__}: {str(e)}")
         traceback.print_exc(file=sys.stdout)
         return jsonify({'error': f'Ошибка при скачивании отчета: {str(e)}'}), 500
+
+
+@bp.route('/report/<report_id>', methods=['GET'])
+def get_report(report_id):
+    """
+    Получение отчета о проверке в формате json, html или docx
+
+    Отчет строится при первом запросе и кэшируется по хешу результатов проверки.
+    """
+    _, auth_error = authorize_api_key_request(required_scope='document:view')
+    if auth_error:
+        return auth_error
+
+    fmt = (request.args.get('format') or 'docx').lower()
+    if fmt not in REPORT_FORMATS:
+        return jsonify({'error': f'Неподдерживаемый формат отчета: {fmt}'}), 400
+
+    try:
+        report_data = load_report_data(report_id)
+
+        if fmt == 'json':
+            return jsonify(render_json(report_data)), 200
+
+        report_file = get_report_file(report_id, fmt)
+        download_name = request.args.get('filename')
+        download_name = secure_filename(download_name) if download_name else get_report_download_name(report_data, fmt)
+
+        if fmt == 'html':
+            response = send_artifact(report_file, download_name, mimetype='text/html')
+            # HTML-отчет открывается в браузере, а не скачивается
+            response.headers['Content-Disposition'] = 'inline'
+            return response
+
+        return send_artifact(report_file, download_name)
+
+    except ReportNotFound:
+        return jsonify({'error': 'Отчет не найден'}), 404
+    except Exception as e:
+        current_app.logger.error(f"Ошибка при получении отчета: {type(e).__name__}: {str(e)}")
+        traceback.print_exc(file=sys.stdout)
+        return jsonify({'error': f'Ошибка при получении отчета: {str(e)}'}), 500
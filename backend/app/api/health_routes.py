@@ -3,13 +3,18 @@ Health Check и Metrics для CURSA API.
 Предоставляет endpoints для мониторинга состояния сервиса.
 """
 
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 import os
+import re
 import time
 import datetime
 import psutil
 from typing import Dict, Any
 
+from app.metrics import metrics
+from app.services.storage_usage import storage_usage
+from app.services.warmup import get_warmup_stats
+
 try:
     import redis
 except ImportError:  # pragma: no cover - optional dependency
@@ -37,7 +42,12 @@ def increment_metric(name: str, value: int = 1) -> None:
 
 
 def get_dir_size_mb(path: str) -> float:
-    """Вычисляет размер директории в мегабайтах"""
+    """
+    Вычисляет размер директории в мегабайтах полным обходом.
+
+    Для health-эндпоинтов используется инкрементальный учёт ``storage_usage``;
+    функция оставлена для разовых вычислений.
+    """
     total_size = 0
     if os.path.exists(path):
         for dirpath, dirnames, filenames in os.walk(path):
@@ -51,7 +61,7 @@ def get_dir_size_mb(path: str) -> float:
 
 
 def get_files_count(path: str, extension: str = None) -> int:
-    """Подсчитывает количество файлов в директории"""
+    """Подсчитывает количество файлов в директории (с обращением к диску)"""
     count = 0
     if os.path.exists(path):
         for f in os.listdir(path):
@@ -60,6 +70,15 @@ def get_files_count(path: str, extension: str = None) -> int:
     return count
 
 
+def get_storage_stats(name: str, extension: str = None) -> Dict[str, Any]:
+    """Возвращает статистику каталога хранилища из инкрементального учёта"""
+    usage = storage_usage.get_usage(name, extension)
+    return {
+        "count": usage["count"],
+        "size_mb": round(usage["size_bytes"] / (1024 * 1024), 2),
+    }
+
+
 def check_component_health(name: str) -> Dict[str, Any]:
     """Проверяет здоровье компонента"""
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -136,6 +155,13 @@ def health_check():
     ), (200 if status != "unhealthy" else 503)
 
 
+def _token_revocation_stats():
+    token_manager = getattr(current_app, "token_manager", None)
+    if token_manager is None or not hasattr(token_manager, "revocation_stats"):
+        return None
+    return token_manager.revocation_stats()
+
+
 @bp.route("/health/detailed", methods=["GET"])
 def health_detailed():
     """
@@ -148,13 +174,6 @@ def health_detailed():
     - Счётчики операций
     """
     uptime = time.time() - START_TIME
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-    # Пути к директориям
-    corrections_dir = os.path.join(base_dir, "app", "static", "corrections")
-    reports_dir = os.path.join(base_dir, "app", "static", "reports")
-    profiles_dir = os.path.join(base_dir, "profiles")
-    logs_dir = os.path.join(base_dir, "app", "logs")
 
     # Системные метрики
     try:
@@ -178,21 +197,13 @@ def health_detailed():
     except Exception:
         system_metrics = {"error": "Unable to collect system metrics"}
 
-    # Статистика по файлам
+    # Статистика по файлам (из памяти, без обхода диска)
     storage_stats = {
-        "corrections": {
-            "count": get_files_count(corrections_dir, ".docx"),
-            "size_mb": get_dir_size_mb(corrections_dir),
-        },
-        "reports": {
-            "count": get_files_count(reports_dir, ".docx"),
-            "size_mb": get_dir_size_mb(reports_dir),
-        },
-        "profiles": {
-            "count": get_files_count(profiles_dir, ".json"),
-            "size_mb": get_dir_size_mb(profiles_dir),
-        },
-        "logs": {"size_mb": get_dir_size_mb(logs_dir)},
+        "corrections": get_storage_stats("corrections", ".docx"),
+        "reports": get_storage_stats("reports", ".docx"),
+        "profiles": get_storage_stats("profiles", ".json"),
+        "logs": {"size_mb": get_storage_stats("logs")["size_mb"]},
+        "accounting": storage_usage.snapshot(),
     }
 
     # Компоненты
@@ -225,6 +236,8 @@ def health_detailed():
             "system": system_metrics,
             "storage": storage_stats,
             "metrics": _metrics,
+            "warmup": get_warmup_stats(),
+            "token_revocation": _token_revocation_stats(),
         }
     ), (200 if status != "unhealthy" else 503)
 
@@ -244,14 +257,8 @@ def readiness_probe():
     Kubernetes readiness probe.
     Проверяет, готово ли приложение принимать запросы.
     """
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    profiles_dir = os.path.join(base_dir, "profiles")
-
-    # Проверяем наличие профилей
-    profiles_ok = (
-        os.path.exists(profiles_dir)
-        and len([f for f in os.listdir(profiles_dir) if f.endswith(".json")]) > 0
-    )
+    # Проверяем наличие профилей (из инкрементального учёта хранилища)
+    profiles_ok = storage_usage.get_usage("profiles", ".json")["count"] > 0
 
     if profiles_ok:
         return jsonify({"status": "ready"}), 200
@@ -265,9 +272,8 @@ def prometheus_metrics():
     Метрики в формате Prometheus.
     """
     uptime = time.time() - START_TIME
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    corrections_dir = os.path.join(base_dir, "app", "static", "corrections")
-    profiles_dir = os.path.join(base_dir, "profiles")
+    corrections_usage = storage_usage.get_usage("corrections", ".docx")
+    profiles_usage = storage_usage.get_usage("profiles", ".json")
 
     # Формируем метрики в формате Prometheus
     metrics_text = f"""# HELP cursa_uptime_seconds Time since application start
@@ -288,17 +294,40 @@ cursa_errors_total {_metrics['errors_count']}
 
 # HELP cursa_corrections_files_count Number of corrected files stored
 # TYPE cursa_corrections_files_count gauge
-cursa_corrections_files_count {get_files_count(corrections_dir, '.docx')}
+cursa_corrections_files_count {corrections_usage['count']}
 
 # HELP cursa_corrections_size_bytes Size of corrections directory
 # TYPE cursa_corrections_size_bytes gauge
-cursa_corrections_size_bytes {int(get_dir_size_mb(corrections_dir) * 1024 * 1024)}
+cursa_corrections_size_bytes {corrections_usage['size_bytes']}
 
 # HELP cursa_profiles_count Number of profiles
 # TYPE cursa_profiles_count gauge
-cursa_profiles_count {get_files_count(profiles_dir, '.json')}
+cursa_profiles_count {profiles_usage['count']}
 """
 
+    # Метрики MetricsCollector всех воркеров (имена выше не дублируются)
+    exported = re.findall(r"^# TYPE (\S+)", metrics_text, re.MULTILINE)
+
     from flask import Response
 
+    # Экземпляры гистограмм есть только в OpenMetrics
+    if "application/openmetrics-text" in request.headers.get("Accept", ""):
+        lines = [
+            re.sub(r"^# (HELP|TYPE) (\S+)_total ", r"# \1 \2 ", line)
+            for line in metrics_text.splitlines()
+            if line
+        ]
+        collected = metrics.export_prometheus(exclude=exported, openmetrics=True)
+        if collected:
+            lines.append(collected)
+        lines.append("# EOF")
+        return Response(
+            "\n".join(lines) + "\n",
+            content_type="application/openmetrics-text; version=1.0.0; charset=utf-8",
+        )
+
+    collected = metrics.export_prometheus(exclude=exported)
+    if collected:
+        metrics_text += "\n" + collected + "\n"
+
     return Response(metrics_text, mimetype="text/plain")
@@ -9,11 +9,44 @@ bp = Blueprint('preview', __name__, url_prefix='/api/preview')
 # Directory for storing corrected files (same as in document_routes)
 CORRECTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'corrections')
 
+def _resolve_preview_path(file_path):
+    """
+    Security/Path resolution logic similar to download_file.
+    """
+    full_path = None
+
+    # 1. Check if it's a simple filename in CORRECTIONS_DIR
+    if '/' not in file_path and '\\' not in file_path:
+        candidate = os.path.join(CORRECTIONS_DIR, file_path)
+        if os.path.exists(candidate):
+            full_path = candidate
+        elif not file_path.lower().endswith('.docx'):
+            candidate = os.path.join(CORRECTIONS_DIR, file_path + '.docx')
+            if os.path.exists(candidate):
+                full_path = candidate
+
+    # 2. Check if it's an absolute path or relative path that exists
+    if not full_path:
+        if os.path.exists(file_path):
+            full_path = file_path
+
+    # 3. Check relative to project root
+    if not full_path and not os.path.isabs(file_path):
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        candidate = os.path.join(base_dir, file_path)
+        if os.path.exists(candidate):
+            full_path = candidate
+
+    if not full_path or not os.path.exists(full_path):
+        return None
+    return full_path
+
+
 @bp.route('/generate', methods=['POST'])
 def generate_preview():
     """
     Generates an HTML preview for a given DOCX file path.
-    Expects JSON body: { "path": "..." }
+    Expects JSON body: { "path": "...", "paginate": false }
     """
     data = request.json
     if not data or 'path' not in data:
@@ -23,39 +56,30 @@ def generate_preview():
     current_app.logger.info(f"Generating preview for: {file_path}")
     
     try:
-        # Security/Path resolution logic similar to download_file
-        full_path = None
-        
-        # 1. Check if it's a simple filename in CORRECTIONS_DIR
-        if '/' not in file_path and '\\' not in file_path:
-            candidate = os.path.join(CORRECTIONS_DIR, file_path)
-            if os.path.exists(candidate):
-                full_path = candidate
-            elif not file_path.lower().endswith('.docx'):
-                candidate = os.path.join(CORRECTIONS_DIR, file_path + '.docx')
-                if os.path.exists(candidate):
-                    full_path = candidate
-        
-        # 2. Check if it's an absolute path or relative path that exists
+        full_path = _resolve_preview_path(file_path)
         if not full_path:
-            if os.path.exists(file_path):
-                full_path = file_path
-            
-        # 3. Check relative to project root
-        if not full_path and not os.path.isabs(file_path):
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            candidate = os.path.join(base_dir, file_path)
-            if os.path.exists(candidate):
-                full_path = candidate
-
-        if not full_path or not os.path.exists(full_path):
             current_app.logger.error(f"File not found for preview: {file_path}")
             return jsonify({'error': 'File not found'}), 404
 
-        # Generate Preview
         service = PreviewService()
+
+        # Paginated mode: first page now, the rest via /page
+        if data.get('paginate'):
+            preview = service.get_preview(full_path)
+            first_page = service.get_page(preview['preview_id'], 1)
+            return jsonify({
+                'success': True,
+                'preview_id': preview['preview_id'],
+                'pages': first_page['pages'],
+                'titles': [page['title'] for page in preview['pages']],
+                'page': 1,
+                'html': first_page['html'],
+                'path': full_path
+            }), 200
+
+        # Generate Preview
         html_content = service.generate_preview(full_path)
-        
+
         return jsonify({
             'success': True,
             'html': html_content,
@@ -66,3 +90,29 @@ def generate_preview():
         current_app.logger.error(f"Error generating preview: {str(e)}")
         traceback.print_exc(file=sys.stdout)
         return jsonify({'error': f'Error generating preview: {str(e)}'}), 500
+
+
+@bp.route('/page', methods=['GET'])
+def get_preview_page():
+    """
+    Returns one page of a cached preview.
+    Query params: id (preview_id from /generate), page (1-based)
+    """
+    preview_id = request.args.get('id', '')
+    try:
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        return jsonify({'error': 'Invalid page number'}), 400
+
+    try:
+        page_data = PreviewService().get_page(preview_id, page)
+    except IndexError as e:
+        return jsonify({'error': str(e)}), 404
+
+    if page_data is None:
+        return jsonify({'error': 'Preview not found, call /generate first'}), 404
+
+    response = jsonify({'success': True, **page_data})
+    # Pages are keyed by content hash and never change
+    response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response, 200
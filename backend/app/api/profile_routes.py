@@ -8,6 +8,16 @@ from datetime import datetime, timedelta
 from functools import lru_cache
 from typing import Dict, Any, Optional, List, Tuple
 
+from app.services.profile_catalog import get_profile_catalog
+from app.services.profile_loader import (
+    SYSTEM_PROFILES,
+    bump_profiles_version,
+    profiles_version,
+    resolve_profile,
+    thaw,
+)
+from app.services.storage_usage import storage_usage
+
 bp = Blueprint('profiles', __name__, url_prefix='/api/profiles')
 
 # Директория для хранения профилей
@@ -19,32 +29,40 @@ HISTORY_DIR = os.path.join(PROFILES_DIR, '.history')
 # Максимальное количество версий в истории
 MAX_HISTORY_VERSIONS = 10
 
-# Системные профили (нельзя редактировать/удалять)
-SYSTEM_PROFILES = ['default_gost', 'gost_7_32_2017', 'gost_r_7_0_100_2018']
-
-# Максимальная глубина наследования
-MAX_INHERITANCE_DEPTH = 5
-
 # Кэш для профилей (сбрасывается при изменениях)
 _profile_cache_version = 0
 
 
-def _get_cache_key() -> int:
-    """Возвращает текущую версию кэша"""
-    return _profile_cache_version
+def _get_cache_key() -> Tuple[int, int]:
+    """
+    Возвращает текущую версию кэша: локальный счётчик и общую для всех
+    воркеров метку каталога профилей
+    """
+    return _profile_cache_version, profiles_version(PROFILES_DIR)
 
 
-def invalidate_profile_cache() -> None:
-    """Сбрасывает кэш профилей при изменениях"""
+def invalidate_profile_cache(*profile_ids: str) -> None:
+    """
+    Сбрасывает кэш профилей при изменениях (во всех воркерах).
+    Каталог поиска обновляется точечно для profile_ids, без них — целиком.
+    """
     global _profile_cache_version
     _profile_cache_version += 1
+    bump_profiles_version(PROFILES_DIR)
     # Очищаем lru_cache
     load_profile_cached.cache_clear()
     list_profiles_cached.cache_clear()
+    catalog = get_profile_catalog(PROFILES_DIR)
+    if profile_ids:
+        catalog.refresh(profile_ids)
+    else:
+        catalog.rebuild()
+    # Обновляем учёт занимаемого профилями места
+    storage_usage.refresh('profiles')
 
 
 @lru_cache(maxsize=64)
-def load_profile_cached(profile_id: str, cache_version: int) -> Dict[str, Any]:
+def load_profile_cached(profile_id: str, cache_version: Tuple[int, int]) -> Dict[str, Any]:
     """
     Загружает профиль с диска с кэшированием.
     cache_version используется для инвалидации кэша.
@@ -59,7 +77,7 @@ def load_profile_cached(profile_id: str, cache_version: int) -> Dict[str, Any]:
 
 
 @lru_cache(maxsize=8)
-def list_profiles_cached(cache_version: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+def list_profiles_cached(cache_version: Tuple[int, int], category: Optional[str] = None) -> List[Dict[str, Any]]:
     """Кэшированный список профилей"""
     profiles = []
     
@@ -261,34 +279,12 @@ def deep_merge(base, override):
     return result
 
 
-def load_profile_with_inheritance(profile_id, depth=0, visited=None):
-    """Загружает профиль с применением наследования (с кэшированием)"""
-    if visited is None:
-        visited = set()
-    
-    if depth > MAX_INHERITANCE_DEPTH:
-        raise ValueError(f"Превышена максимальная глубина наследования ({MAX_INHERITANCE_DEPTH})")
-    
-    if profile_id in visited:
-        raise ValueError(f"Обнаружено циклическое наследование: {profile_id}")
-    
-    visited.add(profile_id)
-    
-    # Используем кэшированную функцию для загрузки с диска
-    cache_version = _get_cache_key()
-    profile_data = copy.deepcopy(load_profile_cached(profile_id, cache_version))
-    
-    # Если есть наследование, загружаем родительский профиль
-    parent_id = profile_data.get('extends')
-    
-    if parent_id:
-        parent_data = load_profile_with_inheritance(parent_id, depth + 1, visited)
-        merged = deep_merge(parent_data, profile_data)
-        merged['_inheritance_chain'] = parent_data.get('_inheritance_chain', [parent_id]) + [profile_id]
-        return merged
-    else:
-        profile_data['_inheritance_chain'] = [profile_id]
-        return profile_data
+def load_profile_with_inheritance(profile_id):
+    """
+    Загружает профиль с применением наследования (изменяемая копия
+    разрешённого профиля из кэша profile_loader)
+    """
+    return thaw(resolve_profile(profile_id, PROFILES_DIR))
 
 
 @bp.route('/', methods=['GET'])
@@ -417,7 +413,7 @@ def create_profile():
             json.dump(data, f, ensure_ascii=False, indent=4)
         
         # Сбрасываем кэш после создания профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(profile_id)
         
         return jsonify({
             'success': True,
@@ -470,7 +466,7 @@ def update_profile(profile_id):
             json.dump(existing, f, ensure_ascii=False, indent=4)
         
         # Сбрасываем кэш после обновления профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(profile_id)
         
         return jsonify({
             'success': True,
@@ -512,7 +508,7 @@ def delete_profile(profile_id):
         os.remove(profile_path)
         
         # Сбрасываем кэш после удаления профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(profile_id)
         
         return jsonify({
             'success': True,
@@ -559,7 +555,7 @@ def duplicate_profile(profile_id):
             json.dump(new_data, f, ensure_ascii=False, indent=4)
         
         # Сбрасываем кэш после дублирования профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(new_id)
         
         return jsonify({
             'success': True,
@@ -715,7 +711,7 @@ def import_profile():
             json.dump(data, f, ensure_ascii=False, indent=4)
         
         # Сбрасываем кэш после импорта профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(profile_id)
         
         return jsonify({
             'success': True,
@@ -929,7 +925,7 @@ def restore_profile_version(profile_id, version_filename):
             json.dump(old_data, f, ensure_ascii=False, indent=4)
         
         # Сбрасываем кэш после восстановления профиля
-        invalidate_profile_cache()
+        invalidate_profile_cache(profile_id)
         
         return jsonify({
             'success': True,
@@ -1104,126 +1100,16 @@ def search_profiles():
     min_sources = request.args.get('min_sources', type=int)
     font_name = request.args.get('font_name', '').lower()
     
-    results = []
-    
-    if not os.path.exists(PROFILES_DIR):
-        return jsonify([])
-    
-    for filename in os.listdir(PROFILES_DIR):
-        if not filename.endswith('.json'):
-            continue
-        
-        try:
-            with open(os.path.join(PROFILES_DIR, filename), 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Фильтрация по категории
-            if category and data.get('category') != category:
-                continue
-            
-            # Поиск по тексту
-            if query:
-                name = data.get('name', '').lower()
-                description = data.get('description', '').lower()
-                if query not in name and query not in description:
-                    continue
-            
-            # Фильтрация по минимальному количеству источников
-            if min_sources:
-                profile_min = data.get('rules', {}).get('bibliography', {}).get('min_sources', 0)
-                if profile_min < min_sources:
-                    continue
-            
-            # Фильтрация по шрифту
-            if font_name:
-                profile_font = data.get('rules', {}).get('font', {}).get('name', '').lower()
-                if font_name not in profile_font:
-                    continue
-            
-            results.append({
-                'id': filename.replace('.json', ''),
-                'name': data.get('name'),
-                'description': data.get('description'),
-                'category': data.get('category'),
-                'version': data.get('version'),
-                'is_system': data.get('is_system', filename.replace('.json', '') in SYSTEM_PROFILES)
-            })
-            
-        except Exception:
-            pass
-    
+    results = get_profile_catalog(PROFILES_DIR).search(
+        query=query,
+        category=category,
+        font_name=font_name,
+        min_sources=min_sources,
+    )
     return jsonify(results)
 
 
 @bp.route('/statistics', methods=['GET'])
 def get_profiles_statistics():
-    """Получить статистику по всем профилям"""
-    stats = {
-        'total': 0,
-        'by_category': {'gost': 0, 'university': 0, 'custom': 0},
-        'system_profiles': 0,
-        'with_inheritance': 0,
-        'fonts_used': {},
-        'avg_min_sources': 0,
-        'recently_updated': []
-    }
-    
-    if not os.path.exists(PROFILES_DIR):
-        return jsonify(stats)
-    
-    min_sources_list = []
-    recently_updated = []
-    
-    for filename in os.listdir(PROFILES_DIR):
-        if not filename.endswith('.json'):
-            continue
-        
-        try:
-            with open(os.path.join(PROFILES_DIR, filename), 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            stats['total'] += 1
-            
-            # По категориям
-            cat = data.get('category', 'custom')
-            if cat in stats['by_category']:
-                stats['by_category'][cat] += 1
-            
-            # Системные
-            if data.get('is_system') or filename.replace('.json', '') in SYSTEM_PROFILES:
-                stats['system_profiles'] += 1
-            
-            # С наследованием
-            if data.get('extends'):
-                stats['with_inheritance'] += 1
-            
-            # Шрифты
-            font = data.get('rules', {}).get('font', {}).get('name', 'Unknown')
-            stats['fonts_used'][font] = stats['fonts_used'].get(font, 0) + 1
-            
-            # Мин. источники
-            min_src = data.get('rules', {}).get('bibliography', {}).get('min_sources')
-            if min_src:
-                min_sources_list.append(min_src)
-            
-            # Недавно обновленные
-            updated = data.get('updated_at') or data.get('created_at')
-            if updated:
-                recently_updated.append({
-                    'id': filename.replace('.json', ''),
-                    'name': data.get('name'),
-                    'updated_at': updated
-                })
-                
-        except Exception:
-            pass
-    
-    # Средние источники
-    if min_sources_list:
-        stats['avg_min_sources'] = sum(min_sources_list) / len(min_sources_list)
-    
-    # Сортируем недавно обновленные
-    recently_updated.sort(key=lambda x: x.get('updated_at', ''), reverse=True)
-    stats['recently_updated'] = recently_updated[:5]
-    
-    return jsonify(stats)
+    """Получить статистику по всем профилям (предрасчитана в каталоге)"""
+    return jsonify(get_profile_catalog(PROFILES_DIR).statistics())
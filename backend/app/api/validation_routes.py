@@ -3,14 +3,12 @@ API маршруты для валидации документов.
 """
 
 from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-import os
-import tempfile
 import logging
 from pathlib import Path
 
 from app.services.validation_engine import ValidationEngine
 from app.services.document_processor import DocumentProcessor
+from app.services.upload_ingestion import UploadRejected, check_request_size, ingest_upload
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +29,9 @@ def validate_document():
         JSON с результатами валидации
     """
     try:
+        # Отклоняем заведомо слишком большие запросы до разбора multipart
+        check_request_size(request.content_length)
+
         # Проверка наличия файла
         if 'file' not in request.files:
             return jsonify({
@@ -56,10 +57,9 @@ def validate_document():
         # Получаем профиль (опционально)
         profile_id = request.form.get('profile_id', 'gost_7_32_2017')
 
-        # Сохраняем файл во временную директорию
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-            file.save(tmp_file.name)
-            temp_path = tmp_file.name
+        # Потоково сохраняем файл с проверкой архива до разбора XML
+        upload = ingest_upload(file)
+        temp_path = upload.path
 
         try:
             # Загружаем профиль
@@ -84,11 +84,13 @@ def validate_document():
 
         finally:
             # Удаляем временный файл
-            try:
-                os.unlink(temp_path)
-            except Exception as e:
-                logger.warning(f"Не удалось удалить временный файл {temp_path}: {e}")
+            upload.cleanup()
 
+    except UploadRejected as e:
+        return jsonify({
+            'status': 'error',
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         logger.error(f"Ошибка при валидации документа: {str(e)}", exc_info=True)
         return jsonify({
@@ -117,9 +119,9 @@ def quick_validate():
         if not file.filename.lower().endswith('.docx'):
             return jsonify({'status': 'error', 'message': 'Только DOCX файлы'}), 400
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-            file.save(tmp_file.name)
-            temp_path = tmp_file.name
+        check_request_size(request.content_length)
+        upload = ingest_upload(file)
+        temp_path = upload.path
 
         try:
             # Обрабатываем документ
@@ -145,11 +147,10 @@ def quick_validate():
             return jsonify(quick_report), 200
 
         finally:
-            try:
-                os.unlink(temp_path)
-            except Exception:
-                pass
+            upload.cleanup()
 
+    except UploadRejected as e:
+        return jsonify({'status': 'error', 'message': e.message}), e.status_code
     except Exception as e:
         logger.error(f"Ошибка при быстрой проверке: {str(e)}", exc_info=True)
         return jsonify({
@@ -6,6 +6,8 @@ import os
 import socket
 from datetime import timedelta
 
+from app.config import security
+
 
 def _normalize_database_url(raw_url: str) -> str:
     """Normalize DB URL for local development.
@@ -33,6 +35,10 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
     DEBUG = os.getenv("FLASK_DEBUG", "False").lower() == "true"
     TESTING = False
+    # Число доверенных прокси перед приложением (nginx и т.п.): IP клиента
+    # берётся из X-Forwarded-For только в пределах этих прокси (ProxyFix).
+    # 0 — заголовок игнорируется, используется адрес соединения
+    TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 0))
 
     # Database
     SQLALCHEMY_DATABASE_URI = _normalize_database_url(
@@ -61,6 +67,9 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(
         seconds=int(os.getenv("JWT_REFRESH_TOKEN_EXPIRES", 2592000))
     )  # 30 days
+    # Сколько секунд отзыв токена в другом процессе может оставаться незамеченным
+    # (0 — проверять Redis на каждом запросе)
+    JWT_REVOCATION_STALENESS = float(os.getenv("JWT_REVOCATION_STALENESS", 5))
     JWT_TOKEN_LOCATION = ["headers"]
     JWT_HEADER_NAME = "Authorization"
     JWT_HEADER_TYPE = "Bearer"
@@ -69,18 +78,68 @@ class Config:
     CORS_ORIGINS = os.getenv("FRONTEND_ORIGINS", "http://localhost:3000").split(",")
     CORS_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
     CORS_ALLOW_HEADERS = ["Content-Type", "Authorization"]
-    CORS_EXPOSE_HEADERS = ["Content-Type", "Authorization"]
+    CORS_EXPOSE_HEADERS = [
+        "Content-Type",
+        "Authorization",
+        "ETag",
+        "Accept-Ranges",
+        "Content-Range",
+        "Content-Disposition",
+    ]
     CORS_SUPPORTS_CREDENTIALS = True
 
-    # File Upload
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB
+    # File Upload (пределы размеров — в app.config.security)
+    MAX_CONTENT_LENGTH = security.MAX_CONTENT_LENGTH
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads")
     CORRECTIONS_FOLDER = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), "static", "corrections"
     )
     REPORTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "reports")
+    # Интервал фоновой сверки учёта занимаемого места (секунды)
+    STORAGE_RECONCILE_INTERVAL = int(os.getenv("STORAGE_RECONCILE_INTERVAL", 300))
+    # Прогрев веб-процесса в create_app() (профили, проверяющие, парсеры DOCX).
+    # По умолчанию выключен: иначе его платит каждый скрипт и тест, создающий
+    # приложение. gc.freeze() выполняется только перед fork (gunicorn.conf.py)
+    WEB_WARMUP = os.getenv("WEB_WARMUP", "0").lower() not in ("0", "false", "no", "off", "")
+    # Отдача файлов фронт-прокси: "" (сам Flask), "x-accel" (nginx) или "x-sendfile"
+    DOWNLOAD_OFFLOAD = os.getenv("DOWNLOAD_OFFLOAD", "").lower()
+    # Внутренний location nginx и корень файлов, от которого строится путь
+    DOWNLOAD_OFFLOAD_PREFIX = os.getenv("DOWNLOAD_OFFLOAD_PREFIX", "/protected/")
+    DOWNLOAD_OFFLOAD_ROOT = os.getenv("DOWNLOAD_OFFLOAD_ROOT", "")
+    DOWNLOAD_CACHE_MAX_AGE = int(os.getenv("DOWNLOAD_CACHE_MAX_AGE", 0))
+
+    # Бюджет времени синхронной обработки документа (секунды, 0 — без
+    # ограничения); по его исчерпании возвращается результат с incomplete=true
+    REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 90))
+
+    # Профилирование запросов (см. app.services.request_profiler): каталог
+    # профилей (по умолчанию app/logs/request_profiles), доля запросов,
+    # профилируемых всегда (0 — только по запросу администратора), период
+    # выборки стека (секунды) и максимум хранимых профилей
+    REQUEST_PROFILE_DIR = os.getenv("REQUEST_PROFILE_DIR", "")
+    REQUEST_PROFILE_SAMPLE_RATE = float(os.getenv("REQUEST_PROFILE_SAMPLE_RATE", 0))
+    REQUEST_PROFILE_SAMPLE_INTERVAL = float(os.getenv("REQUEST_PROFILE_SAMPLE_INTERVAL", 0.005))
+    REQUEST_PROFILE_MAX_FILES = int(os.getenv("REQUEST_PROFILE_MAX_FILES", 200))
 
     # Celery
+    # Исполнитель фоновых задач: celery, local (пул процессов) или auto
+    TASK_BACKEND = os.getenv("TASK_BACKEND", "auto").lower()
+    # Размер локального пула процессов (0 — по числу CPU)
+    LOCAL_EXECUTOR_WORKERS = int(os.getenv("LOCAL_EXECUTOR_WORKERS", 0))
+    # Парк воркеров Celery: процессов в каждом воркере (--concurrency) и число
+    # воркеров; их произведение — ёмкость планировщика по умолчанию
+    CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 2))
+    CELERY_WORKERS = int(os.getenv("CELERY_WORKERS", 1))
+    # Справедливое планирование: одновременно запущенные задачи во всём парке
+    # исполнителей (0 — по CELERY_WORKER_CONCURRENCY × CELERY_WORKERS или по
+    # размеру локальных пулов) и места, которые не могут занимать пакеты
+    SCHEDULER_MAX_INFLIGHT = int(os.getenv("SCHEDULER_MAX_INFLIGHT", 0))
+    SCHEDULER_INTERACTIVE_RESERVED = int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", 2))
+    # Общий учёт планировщика для всех веб-процессов: redis (очередь и
+    # ограничения общие для кластера), local (только в памяти процесса) или auto
+    SCHEDULER_LEDGER = os.getenv("SCHEDULER_LEDGER", "auto").lower()
+    # Максимум одновременно обрабатываемых документов одного пакета
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 
@@ -100,6 +159,18 @@ class Config:
     SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL", "noreply@cursa.app")
     EMAIL_VERIFICATION_REQUIRED = os.getenv("EMAIL_VERIFICATION_REQUIRED", "true").lower() == "true"
 
+    # Кэш API-ключей: время жизни записи (секунды) и размер
+    API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", 30))
+    API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", 1024))
+    # Буферизованная запись аудита использования API-ключей: интервал сброса
+    # (секунды, 0 — запись сразу), размер пачки и предел очереди
+    API_KEY_AUDIT_FLUSH_INTERVAL = float(os.getenv("API_KEY_AUDIT_FLUSH_INTERVAL", 2))
+    API_KEY_AUDIT_BATCH_SIZE = int(os.getenv("API_KEY_AUDIT_BATCH_SIZE", 500))
+    API_KEY_AUDIT_MAX_PENDING = int(os.getenv("API_KEY_AUDIT_MAX_PENDING", 10000))
+    # Каталог для пачек аудита, которые не удалось записать в БД (по умолчанию
+    # app/logs/audit_spool); они дописываются при следующем успешном сбросе
+    API_KEY_AUDIT_SPOOL_DIR = os.getenv("API_KEY_AUDIT_SPOOL_DIR", "")
+
     # Rate Limiting
     RATELIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
     RATELIMIT_STORAGE_URI = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -152,6 +223,7 @@ class TestingConfig(Config):
     SQLALCHEMY_ENGINE_OPTIONS = {}  # SQLite doesn't support pool_size, etc.
     JWT_SECRET_KEY = "test-jwt-secret"
     SECRET_KEY = "test-secret-key"
+    API_KEY_AUDIT_FLUSH_INTERVAL = 0
 
 
 # Configuration dictionary
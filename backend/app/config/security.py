@@ -28,9 +28,6 @@ RATE_LIMITS: Dict[str, str] = {
 
 # === Валидация загрузок ===
 
-# Максимальный размер файла (в байтах)
-MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB
-
 # Разрешённые расширения файлов
 ALLOWED_EXTENSIONS = {"docx"}
 
@@ -46,6 +43,36 @@ MIN_FILE_SIZE = 1024  # 1 KB
 # Максимальный размер JSON payload для профилей
 MAX_PROFILE_SIZE = 1 * 1024 * 1024  # 1 MB
 
+# Максимальный размер одного загружаемого DOCX (проверяется при потоковой записи).
+# Единственный предел размера документа: его же использует DocumentProcessor
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20 MB
+
+# Максимальное количество файлов в одной пакетной загрузке
+MAX_BATCH_FILES = 50
+
+# Максимальный суммарный размер файлов пакетной загрузки
+MAX_BATCH_UPLOAD_SIZE = 100 * 1024 * 1024  # 100 MB
+
+# Запас на заголовки multipart и поля формы сверх размера файлов
+MULTIPART_OVERHEAD = 1024 * 1024  # 1 MB
+
+# Максимальный размер тела запроса (Flask MAX_CONTENT_LENGTH): самый большой
+# допустимый запрос — пакетная загрузка
+MAX_CONTENT_LENGTH = MAX_BATCH_UPLOAD_SIZE + MULTIPART_OVERHEAD
+
+# Размер блока при потоковой записи загрузки на диск
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64 KB
+
+# Ограничения ZIP-архива DOCX (защита от zip-бомб)
+MAX_ZIP_ENTRIES = 2000
+MAX_ZIP_UNCOMPRESSED_SIZE = 200 * 1024 * 1024  # 200 MB
+MAX_ZIP_COMPRESSION_RATIO = 100
+# Записи меньше этого размера не проверяются на коэффициент сжатия
+ZIP_RATIO_CHECK_MIN_SIZE = 1024 * 1024  # 1 MB
+
+# Обязательные части DOCX-архива
+REQUIRED_DOCX_PARTS = ("[Content_Types].xml", "word/document.xml")
+
 
 # === Защита путей ===
 
@@ -139,5 +166,11 @@ def get_config() -> Dict[str, Any]:
         "allowed_mime_types": list(ALLOWED_MIME_TYPES),
         "min_file_size": MIN_FILE_SIZE,
         "max_profile_size": MAX_PROFILE_SIZE,
+        "max_upload_size": MAX_UPLOAD_SIZE,
+        "max_batch_files": MAX_BATCH_FILES,
+        "max_batch_upload_size": MAX_BATCH_UPLOAD_SIZE,
+        "max_zip_entries": MAX_ZIP_ENTRIES,
+        "max_zip_uncompressed_size": MAX_ZIP_UNCOMPRESSED_SIZE,
+        "max_zip_compression_ratio": MAX_ZIP_COMPRESSION_RATIO,
         "security_headers": SECURITY_HEADERS,
     }
@@ -5,6 +5,9 @@
 from app.metrics.prometheus import (
     metrics,
     MetricsCollector,
+    BoundCounter,
+    BoundGauge,
+    BoundHistogram,
     track_request_time,
     track_document_processing,
     RequestMetricsMiddleware,
@@ -17,6 +20,9 @@ from app.metrics.prometheus import (
 __all__ = [
     'metrics',
     'MetricsCollector',
+    'BoundCounter',
+    'BoundGauge',
+    'BoundHistogram',
     'track_request_time',
     'track_document_processing',
     'RequestMetricsMiddleware',
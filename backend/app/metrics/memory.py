@@ -0,0 +1,282 @@
+"""
+Учёт памяти этапов обработки документа и бюджет памяти задачи.
+
+track_stage_memory() оборачивает этап конвейера (см.
+WorkflowService.run_stage) и записывает:
+
+- RSS процесса в начале и в конце этапа и пик RSS за этап — максимум по
+  контрольным точкам (check_memory_budget) и по ru_maxrss, если за этап
+  вырос максимум процесса;
+- в режиме tracemalloc — наибольший прирост памяти Python-объектов за
+  этап (по текущему объёму в контрольных точках относительно начала этапа)
+  и места, выделившие больше всего памяти (сравнение снимков до и после).
+  Трассировка общая для процесса: её запускает первый такой этап и
+  останавливает последний завершившийся, поэтому параллельные этапы
+  (потоки gthread-воркера) не мешают друг другу; пик процесса
+  (reset_peak) не сбрасывается.
+
+Итоги этапа попадают в состояние задачи (state['memory']) и в gauges
+cursa_stage_memory_*{stage=...}; по ним подбирается число процессов воркера.
+
+Бюджет памяти (MEMORY_BUDGET_MB, 0 — без ограничения) проверяется на
+границах этапов и в контрольных точках внутри них: перед каждой нормой и
+каждым проходом коррекции. Функция check_memory_budget() выбрасывает
+MemoryBudgetExceeded, а этап, в котором это произошло, отмечается в
+StageMemory.exceeded, чтобы задача завершилась понятной ошибкой, а не
+OOM-kill воркера.
+
+Настройки (переменные окружения, общие для веб-процесса и Celery):
+MEMORY_ACCOUNTING — off, rss (по умолчанию) или tracemalloc (заметно
+замедляет обработку, включается для диагностики); MEMORY_TRACE_TOP — число
+мест выделения памяти в отчёте этапа.
+"""
+
+import contextvars
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.metrics.prometheus import metrics
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = 'off'
+MODE_RSS = 'rss'
+MODE_TRACEMALLOC = 'tracemalloc'
+
+MEMORY_ACCOUNTING = os.environ.get('MEMORY_ACCOUNTING', MODE_RSS).lower()
+MEMORY_BUDGET_MB = float(os.environ.get('MEMORY_BUDGET_MB', 0))
+MEMORY_TRACE_TOP = int(os.environ.get('MEMORY_TRACE_TOP', 10))
+
+MB = 1024 * 1024
+
+# Пики разных воркеров не складываются
+for _name in ('cursa_stage_memory_rss_delta_bytes', 'cursa_stage_memory_peak_bytes',
+              'cursa_stage_memory_traced_peak_bytes'):
+    metrics.set_gauge_mode(_name, 'max')
+
+# Сколько этапов сейчас используют tracemalloc и запустили ли его мы
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+_current: contextvars.ContextVar[Optional['StageMemory']] = contextvars.ContextVar(
+    'cursa_stage_memory', default=None
+)
+
+
+class MemoryBudgetExceeded(Exception):
+    """Процесс превысил бюджет памяти задачи."""
+
+
+def rss_bytes() -> Optional[int]:
+    """Текущий RSS процесса (None, если psutil недоступен)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def max_rss_bytes() -> Optional[int]:
+    """Максимальный RSS процесса за всё время работы."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+class StageMemory:
+    """Память одного этапа."""
+
+    def __init__(self, stage: str, mode: str, budget_bytes: int):
+        self.stage = stage
+        self.mode = mode
+        self.budget_bytes = budget_bytes
+        self.rss_start = rss_bytes()
+        self.rss_end: Optional[int] = None
+        self.rss_peak = self.rss_start
+        self.max_rss_start = max_rss_bytes()
+        self.traced_start: Optional[int] = None
+        self.traced_max: Optional[int] = None
+        self.traced_peak: Optional[int] = None
+        self.top_allocations: List[Dict[str, Any]] = []
+        # Сообщение о превышении бюджета (None — бюджет не превышен)
+        self.exceeded: Optional[str] = None
+
+    def sample(self) -> Optional[int]:
+        if self.traced_start is not None and tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[0]
+            self.traced_max = max(self.traced_max or 0, traced)
+        rss = rss_bytes()
+        if rss is not None and (self.rss_peak is None or rss > self.rss_peak):
+            self.rss_peak = rss
+        return rss
+
+    def check_budget(self, where: str = '') -> None:
+        if not self.budget_bytes:
+            return
+        rss = self.sample()
+        if rss is not None and rss > self.budget_bytes:
+            location = f'{self.stage}, {where}' if where else self.stage
+            self.exceeded = (
+                f'Превышен бюджет памяти: {rss / MB:.0f} МБ при лимите '
+                f'{self.budget_bytes / MB:.0f} МБ (этап {location}). '
+                f'Документ слишком велик для обработки'
+            )
+            raise MemoryBudgetExceeded(self.exceeded)
+
+    def finish(self) -> None:
+        self.rss_end = self.sample()
+        max_rss_end = max_rss_bytes()
+        # Максимум процесса вырос — значит, пик случился внутри этапа
+        if max_rss_end and self.max_rss_start and max_rss_end > self.max_rss_start:
+            self.rss_peak = max(self.rss_peak or 0, max_rss_end)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            'stage': self.stage,
+            'rss_start_mb': _mb(self.rss_start),
+            'rss_end_mb': _mb(self.rss_end),
+            'rss_peak_mb': _mb(self.rss_peak),
+            'rss_peak_delta_mb': _mb(self.peak_delta),
+        }
+        if self.traced_peak is not None:
+            data['traced_peak_mb'] = _mb(self.traced_peak)
+            data['top_allocations'] = self.top_allocations
+        if self.exceeded:
+            data['budget_exceeded'] = True
+        return data
+
+    @property
+    def peak_delta(self) -> Optional[int]:
+        if self.rss_peak is None or self.rss_start is None:
+            return None
+        return max(0, self.rss_peak - self.rss_start)
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / MB, 1)
+
+
+def _acquire_tracing() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        if _trace_users == 0:
+            # Трассировку, запущенную не нами (PYTHONTRACEMALLOC), не останавливаем
+            _trace_owned = not tracemalloc.is_tracing()
+            if _trace_owned:
+                tracemalloc.start()
+        _trace_users += 1
+
+
+def _release_tracing() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+
+def _top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                     limit: int) -> List[Dict[str, Any]]:
+    filters = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    )
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    top = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        top.append({
+            'location': f'{frame.filename}:{frame.lineno}',
+            'size_kb': round(stat.size_diff / 1024, 1),
+            'count': stat.count_diff,
+        })
+    return top
+
+
+@contextmanager
+def track_stage_memory(
+    stage: str,
+    mode: Optional[str] = None,
+    budget_mb: Optional[float] = None,
+) -> Iterator[StageMemory]:
+    """
+    Учёт памяти этапа. MemoryBudgetExceeded не выбрасывается наружу из
+    блока: превышение бюджета нужно проверить по StageMemory.exceeded.
+
+    Args:
+        mode: off, rss или tracemalloc (по умолчанию MEMORY_ACCOUNTING)
+        budget_mb: Бюджет RSS процесса в МБ (по умолчанию MEMORY_BUDGET_MB)
+    """
+    mode = mode or MEMORY_ACCOUNTING
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    usage = StageMemory(stage, mode, int(budget_mb * MB) if budget_mb else 0)
+
+    tracing = mode == MODE_TRACEMALLOC
+    before = None
+    if tracing:
+        _acquire_tracing()
+        before = tracemalloc.take_snapshot()
+        usage.traced_start = usage.traced_max = tracemalloc.get_traced_memory()[0]
+
+    token = _current.set(usage)
+    try:
+        try:
+            yield usage
+        except MemoryBudgetExceeded:
+            pass
+        usage.finish()
+        if usage.budget_bytes and usage.exceeded is None:
+            try:
+                usage.check_budget('конец')
+            except MemoryBudgetExceeded:
+                pass
+    finally:
+        _current.reset(token)
+        if tracing:
+            try:
+                usage.sample()
+                usage.traced_peak = usage.traced_max - usage.traced_start
+                usage.top_allocations = _top_allocations(before, tracemalloc.take_snapshot(), MEMORY_TRACE_TOP)
+            finally:
+                _release_tracing()
+
+    if mode != MODE_OFF:
+        _record_gauges(usage)
+
+
+def check_memory_budget(where: str = '') -> None:
+    """
+    Контрольная точка внутри этапа: обновляет пик RSS и выбрасывает
+    MemoryBudgetExceeded, если бюджет превышен. Вне track_stage_memory
+    ничего не делает.
+    """
+    usage = _current.get()
+    if usage is not None and usage.mode != MODE_OFF:
+        if usage.budget_bytes:
+            usage.check_budget(where)
+        else:
+            usage.sample()
+
+
+def _record_gauges(usage: StageMemory) -> None:
+    labels = {'stage': usage.stage}
+    if usage.peak_delta is not None:
+        metrics.gauge_set('cursa_stage_memory_rss_delta_bytes', usage.peak_delta, labels)
+    if usage.rss_peak is not None:
+        metrics.gauge_set('cursa_stage_memory_peak_bytes', usage.rss_peak, labels)
+    if usage.traced_peak is not None:
+        metrics.gauge_set('cursa_stage_memory_traced_peak_bytes', usage.traced_peak, labels)
+    if usage.exceeded:
+        metrics.counter_inc('cursa_memory_budget_exceeded_total', labels=labels)
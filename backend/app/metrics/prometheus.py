@@ -3,154 +3,659 @@
 Включает кастомные счётчики, гистограммы и метрики бизнес-логики.
 """
 
-import time
+import bisect
 import functools
-from typing import Callable, Any, Dict, Optional
-from flask import request, g
+import json
+import logging
+import os
+import tempfile
 import threading
+import time
+import weakref
+from typing import Callable, Any, Dict, Iterable, List, Optional, Tuple
+from flask import request, g
+
+logger = logging.getLogger(__name__)
+
+# Стандартные бакеты гистограмм
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# Длительности обработки документов: извлечение, проверка, исправление
+PROCESSING_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0, float('inf'))
+
+# Размеры файлов в байтах
+SIZE_BUCKETS = (10240, 102400, 512000, 1048576, 5242880, 10485760, 26214400, 52428800, float('inf'))
+
+# Количества (исправлений, ошибок)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+# Ограничение OpenMetrics на суммарную длину labels экземпляра
+EXEMPLAR_MAX_LENGTH = 128
+
+# Способы объединения gauge разных воркеров
+GAUGE_MODES = ('sum', 'max', 'min')
+
+# Снимок, в который gunicorn child_exit переносит счётчики завершившихся воркеров
+RETIRED_FILENAME = 'metrics_retired.json'
+
+MetricKey = str
+
+
+class _Shard:
+    """
+    Метрики одного потока. Пишет в шард только его поток, поэтому
+    обновления идут без блокировок; сборщик читает копии словарей.
+    """
+
+    __slots__ = ('counters', 'gauges', 'histograms', 'exemplars', '__weakref__')
+
+    def __init__(self):
+        self.counters: Dict[MetricKey, float] = {}
+        # key -> [поколение gauge_set, накопленное изменение]
+        self.gauges: Dict[MetricKey, List[float]] = {}
+        # key -> [счётчики бакетов (не накопительные)..., sum, count]
+        self.histograms: Dict[MetricKey, List[float]] = {}
+        # key -> {индекс бакета: (labels, значение, время)}
+        self.exemplars: Dict[MetricKey, Dict[int, Tuple[str, float, float]]] = {}
+
+
+class _ThreadToken:
+    """
+    Хранится в threading.local рядом с шардом потока. Локальные данные
+    потока освобождаются при его завершении, и финализатор токена сливает
+    шард в общий шард завершившихся потоков.
+    """
+
+    __slots__ = ('__weakref__',)
+
+
+def _fold_shard(target: _Shard, shard: _Shard) -> None:
+    """Добавляет значения shard к target."""
+    for key, value in shard.counters.copy().items():
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, (generation, delta) in shard.gauges.copy().items():
+        entry = target.gauges.get(key)
+        if entry is None or entry[0] < generation:
+            target.gauges[key] = [generation, delta]
+        elif entry[0] == generation:
+            entry[1] += delta
+    for key, hist in shard.histograms.copy().items():
+        _add_histogram(target.histograms, key, list(hist))
+    for key, by_bucket in shard.exemplars.copy().items():
+        _add_exemplars(target.exemplars, key, by_bucket.copy())
+
+
+def _retire_shard(collector_ref: 'weakref.ref[MetricsCollector]', shard: _Shard, epoch: int) -> None:
+    collector = collector_ref()
+    if collector is not None:
+        collector._retire(shard, epoch)
+
+
+class BoundCounter:
+    """Счётчик с заранее вычисленным ключом (см. MetricsCollector.counter)."""
+
+    __slots__ = ('_collector', 'key')
+
+    def __init__(self, collector: 'MetricsCollector', key: MetricKey):
+        self._collector = collector
+        self.key = key
+
+    def inc(self, value: float = 1) -> None:
+        counters = self._collector._shard().counters
+        counters[self.key] = counters.get(self.key, 0) + value
+
+
+class BoundGauge:
+    """Gauge с заранее вычисленным ключом (см. MetricsCollector.gauge)."""
+
+    __slots__ = ('_collector', 'key')
+
+    def __init__(self, collector: 'MetricsCollector', key: MetricKey):
+        self._collector = collector
+        self.key = key
 
-# Потокобезопасное хранилище метрик
-_lock = threading.Lock()
+    def set(self, value: float) -> None:
+        self._collector._gauge_set_key(self.key, value)
+
+    def inc(self, value: float = 1) -> None:
+        self._collector._gauge_inc_key(self.key, value)
+
+    def dec(self, value: float = 1) -> None:
+        self._collector._gauge_inc_key(self.key, -value)
+
+
+class BoundHistogram:
+    """Гистограмма с заранее вычисленным ключом (см. MetricsCollector.histogram)."""
+
+    __slots__ = ('_collector', 'name', 'key')
+
+    def __init__(self, collector: 'MetricsCollector', name: str, key: MetricKey):
+        self._collector = collector
+        self.name = name
+        self.key = key
+
+    def observe(self, value: float, exemplar: Optional[Dict[str, Any]] = None) -> None:
+        self._collector._observe_key(self.name, self.key, value, exemplar)
 
 
 class MetricsCollector:
     """
     Сборщик метрик для Prometheus.
     Поддерживает counters, gauges, histograms.
+
+    Каждый поток пишет в свой шард без блокировок; export_prometheus
+    складывает шарды. Шард завершившегося потока сливается в общий шард
+    (_retired), поэтому число шардов не растёт с числом созданных потоков.
+    Если задан каталог multiproc_dir (METRICS_MULTIPROC_DIR),
+    каждый процесс периодически сохраняет туда свой снимок, а экспорт
+    объединяет снимки всех воркеров: counters и histograms суммируются,
+    gauges живых воркеров объединяются по режиму метрики (set_gauge_mode).
+    Каталог очищается при старте gunicorn (clear_multiproc_dir), а снимок
+    завершившегося воркера сводится в общий (mark_process_dead).
+
+    Для горячих мест есть привязанные к labels объекты (counter, gauge,
+    histogram), которые не строят ключ метрики при каждом вызове.
+
+    Бакеты гистограмм задаются для каждой метрики (set_buckets). Наблюдение
+    ищет свой бакет двоичным поиском и увеличивает только его; накопительные
+    значения считаются при экспорте. К наблюдению можно приложить экземпляр
+    (exemplar), например ID задачи и хеш документа: для каждого бакета
+    хранится последний, в OpenMetrics он выводится рядом с бакетом.
     """
-    
-    def __init__(self):
-        self._counters: Dict[str, float] = {}
-        self._gauges: Dict[str, float] = {}
-        self._histograms: Dict[str, Dict] = {}
-        self._labels: Dict[str, Dict[str, Any]] = {}
-    
+
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_interval: float = 1.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        # Значения завершившихся потоков; меняется только под _registry_lock
+        self._retired = _Shard()
+        # Меняется при fork: шарды потоков родителя в дочерний процесс не сливаются
+        self._epoch = 0
+        self._registry_lock = threading.Lock()
+        # key -> (поколение, значение) последнего gauge_set
+        self._gauge_base: Dict[MetricKey, Tuple[int, float]] = {}
+        self._gauge_generation = 0
+        self._gauge_modes: Dict[str, str] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        if hasattr(os, 'register_at_fork'):
+            reset_ref = weakref.WeakMethod(self._reset_after_fork)
+
+            def reset_after_fork():
+                reset = reset_ref()
+                if reset is not None:
+                    reset()
+
+            os.register_at_fork(after_in_child=reset_after_fork)
+
+    # === Запись ===
+
     def counter_inc(self, name: str, value: float = 1, labels: Dict[str, str] = None):
         """Увеличивает счётчик"""
         key = self._make_key(name, labels)
-        with _lock:
-            self._counters[key] = self._counters.get(key, 0) + value
-            if labels:
-                self._labels[key] = labels
-    
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0) + value
+
     def gauge_set(self, name: str, value: float, labels: Dict[str, str] = None):
         """Устанавливает значение gauge"""
-        key = self._make_key(name, labels)
-        with _lock:
-            self._gauges[key] = value
-            if labels:
-                self._labels[key] = labels
-    
+        self._gauge_set_key(self._make_key(name, labels), value)
+
     def gauge_inc(self, name: str, value: float = 1, labels: Dict[str, str] = None):
         """Увеличивает gauge"""
-        key = self._make_key(name, labels)
-        with _lock:
-            self._gauges[key] = self._gauges.get(key, 0) + value
-            if labels:
-                self._labels[key] = labels
-    
+        self._gauge_inc_key(self._make_key(name, labels), value)
+
     def gauge_dec(self, name: str, value: float = 1, labels: Dict[str, str] = None):
         """Уменьшает gauge"""
         self.gauge_inc(name, -value, labels)
-    
-    def histogram_observe(self, name: str, value: float, labels: Dict[str, str] = None):
-        """Добавляет наблюдение в гистограмму"""
-        key = self._make_key(name, labels)
-        
-        # Стандартные бакеты
-        buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
-        
-        with _lock:
-            if key not in self._histograms:
-                self._histograms[key] = {
-                    'buckets': {b: 0 for b in buckets},
-                    'sum': 0,
-                    'count': 0
-                }
-            
-            hist = self._histograms[key]
-            hist['sum'] += value
-            hist['count'] += 1
-            
-            for bucket in buckets:
-                if value <= bucket:
-                    hist['buckets'][bucket] += 1
-            
-            if labels:
-                self._labels[key] = labels
-    
+
+    def histogram_observe(
+        self,
+        name: str,
+        value: float,
+        labels: Dict[str, str] = None,
+        exemplar: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Добавляет наблюдение в гистограмму.
+
+        Args:
+            exemplar: Labels экземпляра, например {'task_id': ..., 'document': ...}
+        """
+        self._observe_key(name, self._make_key(name, labels), value, exemplar)
+
+    def counter(self, name: str, labels: Dict[str, str] = None) -> BoundCounter:
+        """Счётчик с привязанными labels: metrics.counter(...).inc()"""
+        return BoundCounter(self, self._make_key(name, labels))
+
+    def gauge(self, name: str, labels: Dict[str, str] = None) -> BoundGauge:
+        """Gauge с привязанными labels"""
+        return BoundGauge(self, self._make_key(name, labels))
+
+    def histogram(self, name: str, labels: Dict[str, str] = None) -> BoundHistogram:
+        """Гистограмма с привязанными labels: metrics.histogram(...).observe(v)"""
+        return BoundHistogram(self, name, self._make_key(name, labels))
+
+    def set_buckets(self, name: str, buckets: Iterable[float]) -> None:
+        """
+        Задаёт верхние границы бакетов гистограммы name.
+        Вызывается до первых наблюдений; +Inf добавляется автоматически.
+        """
+        bounds = sorted(set(float(bucket) for bucket in buckets))
+        if not bounds:
+            raise ValueError(f"Пустой список бакетов для {name}")
+        if bounds[-1] != float('inf'):
+            bounds.append(float('inf'))
+        self._buckets[name] = tuple(bounds)
+
+    def buckets_for(self, name: str) -> Tuple[float, ...]:
+        """Бакеты гистограммы name"""
+        return self._buckets.get(name, DEFAULT_BUCKETS)
+
+    def set_gauge_mode(self, name: str, mode: str) -> None:
+        """Как объединять gauge name разных воркеров: sum (по умолчанию), max, min"""
+        if mode not in GAUGE_MODES:
+            raise ValueError(f"Неизвестный режим gauge: {mode}")
+        self._gauge_modes[name] = mode
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            token = _ThreadToken()
+            finalizer = weakref.finalize(token, _retire_shard, weakref.ref(self), shard, self._epoch)
+            # При выходе интерпретатора сливать шарды незачем
+            finalizer.atexit = False
+            self._local.shard = shard
+            self._local.token = token
+            with self._registry_lock:
+                self._shards.append(shard)
+            self._ensure_flusher()
+        return shard
+
+    def _retire(self, shard: _Shard, epoch: int) -> None:
+        """Сливает шард завершившегося потока в _retired."""
+        with self._registry_lock:
+            if epoch != self._epoch:
+                return
+            try:
+                self._shards.remove(shard)
+            except ValueError:
+                return
+            _fold_shard(self._retired, shard)
+
+    def _gauge_set_key(self, key: MetricKey, value: float) -> None:
+        with self._registry_lock:
+            self._gauge_generation += 1
+            self._gauge_base[key] = (self._gauge_generation, value)
+        self._shard()
+
+    def _gauge_inc_key(self, key: MetricKey, value: float) -> None:
+        generation = self._gauge_base.get(key, (0, 0))[0]
+        gauges = self._shard().gauges
+        entry = gauges.get(key)
+        if entry is None or entry[0] != generation:
+            # После gauge_set накопленные до него изменения не учитываются
+            gauges[key] = [generation, value]
+        else:
+            entry[1] += value
+
+    def _observe_key(
+        self,
+        name: str,
+        key: MetricKey,
+        value: float,
+        exemplar: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+        shard = self._shard()
+        hist = shard.histograms.get(key)
+        if hist is None or len(hist) != len(buckets) + 2:
+            hist = shard.histograms[key] = [0] * (len(buckets) + 2)
+        # Первый бакет с границей >= value (le — включительно)
+        index = bisect.bisect_left(buckets, value)
+        hist[index] += 1
+        hist[-2] += value
+        hist[-1] += 1
+        if exemplar:
+            shard.exemplars.setdefault(key, {})[index] = (
+                _exemplar_labels(exemplar), value, time.time()
+            )
+
     def _make_key(self, name: str, labels: Dict[str, str] = None) -> str:
         """Создаёт уникальный ключ для метрики с labels"""
         if not labels:
             return name
         label_str = ','.join(f'{k}="{v}"' for k, v in sorted(labels.items()))
         return f'{name}{{{label_str}}}'
-    
+
+    # === Чтение ===
+
+    def _local_snapshot(self) -> Dict[str, Dict[MetricKey, Any]]:
+        """Метрики текущего процесса (все потоки)."""
+        with self._registry_lock:
+            shards = list(self._shards)
+            gauge_base = dict(self._gauge_base)
+            # Копия: _retired дополняется при завершении потоков
+            retired = _Shard()
+            _fold_shard(retired, self._retired)
+        shards.append(retired)
+
+        counters: Dict[MetricKey, float] = {}
+        gauges: Dict[MetricKey, float] = {key: value for key, (_, value) in gauge_base.items()}
+        histograms: Dict[MetricKey, List[float]] = {}
+        exemplars: Dict[MetricKey, Dict[int, Tuple[str, float, float]]] = {}
+
+        for shard in shards:
+            # dict.copy() выполняется атомарно под GIL
+            for key, value in shard.counters.copy().items():
+                counters[key] = counters.get(key, 0) + value
+            for key, (generation, delta) in shard.gauges.copy().items():
+                if generation == gauge_base.get(key, (0, 0))[0]:
+                    gauges[key] = gauges.get(key, 0) + delta
+            for key, hist in shard.histograms.copy().items():
+                _add_histogram(histograms, key, list(hist))
+            for key, by_bucket in shard.exemplars.copy().items():
+                _add_exemplars(exemplars, key, by_bucket.copy())
+
+        return {
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+            'exemplars': exemplars,
+        }
+
+    def snapshot(self) -> Dict[str, Dict[MetricKey, Any]]:
+        """
+        Метрики всех воркеров: counters, gauges, histograms
+        (гистограмма — [счётчики бакетов..., sum, count], счётчики не
+        накопительные) и exemplars ({индекс бакета: (labels, значение, время)}).
+        """
+        merged = self._local_snapshot()
+        if not self.multiproc_dir:
+            return merged
+
+        self.flush()
+        gauge_values: Dict[MetricKey, List[float]] = {
+            key: [value] for key, value in merged['gauges'].items()
+        }
+        for pid, data in self._read_worker_files():
+            if pid == os.getpid():
+                continue
+            for key, value in data.get('counters', {}).items():
+                merged['counters'][key] = merged['counters'].get(key, 0) + value
+            for key, hist in data.get('histograms', {}).items():
+                _add_histogram(merged['histograms'], key, hist)
+            for key, by_bucket in data.get('exemplars', {}).items():
+                _add_exemplars(
+                    merged['exemplars'], key,
+                    {int(index): tuple(item) for index, item in by_bucket.items()},
+                )
+            if pid and _pid_alive(pid):
+                for key, value in data.get('gauges', {}).items():
+                    gauge_values.setdefault(key, []).append(value)
+
+        merged['gauges'] = {
+            key: self._combine_gauge(key, values) for key, values in gauge_values.items()
+        }
+        return merged
+
+    def _combine_gauge(self, key: MetricKey, values: List[float]) -> float:
+        mode = self._gauge_modes.get(key.split('{')[0], 'sum')
+        if mode == 'max':
+            return max(values)
+        if mode == 'min':
+            return min(values)
+        return sum(values)
+
     def get_counter(self, name: str, labels: Dict[str, str] = None) -> float:
         """Получает значение счётчика"""
-        key = self._make_key(name, labels)
-        with _lock:
-            return self._counters.get(key, 0)
-    
+        return self.snapshot()['counters'].get(self._make_key(name, labels), 0)
+
     def get_gauge(self, name: str, labels: Dict[str, str] = None) -> float:
         """Получает значение gauge"""
-        key = self._make_key(name, labels)
-        with _lock:
-            return self._gauges.get(key, 0)
-    
-    def export_prometheus(self) -> str:
-        """Экспортирует все метрики в формате Prometheus"""
+        return self.snapshot()['gauges'].get(self._make_key(name, labels), 0)
+
+    def export_prometheus(self, exclude: Iterable[str] = (), openmetrics: bool = False) -> str:
+        """
+        Экспортирует все метрики в формате Prometheus.
+
+        Args:
+            exclude: Имена метрик, которые уже экспортированы в другом месте
+            openmetrics: Формат OpenMetrics (с экземплярами гистограмм);
+                строку '# EOF' добавляет вызывающий
+        """
+        exclude = set(exclude)
+        data = self.snapshot()
         lines = []
-        
-        # Экспорт counters
-        exported_counters = set()
-        with _lock:
-            for key, value in self._counters.items():
-                name = key.split('{')[0]
-                if name not in exported_counters:
-                    lines.append(f'# HELP {name} Counter metric')
-                    lines.append(f'# TYPE {name} counter')
-                    exported_counters.add(name)
-                lines.append(f'{key} {value}')
-        
-        # Экспорт gauges
-        exported_gauges = set()
-        with _lock:
-            for key, value in self._gauges.items():
+
+        for kind, values in (('counter', data['counters']), ('gauge', data['gauges'])):
+            exported = set()
+            for key, value in sorted(values.items()):
                 name = key.split('{')[0]
-                if name not in exported_gauges:
-                    lines.append(f'# HELP {name} Gauge metric')
-                    lines.append(f'# TYPE {name} gauge')
-                    exported_gauges.add(name)
+                if name in exclude:
+                    continue
+                if name not in exported:
+                    family = name
+                    if openmetrics and kind == 'counter' and name.endswith('_total'):
+                        family = name[:-len('_total')]
+                    lines.append(f'# HELP {family} {kind.capitalize()} metric')
+                    lines.append(f'# TYPE {family} {kind}')
+                    exported.add(name)
                 lines.append(f'{key} {value}')
-        
-        # Экспорт histograms
+
         exported_histograms = set()
-        with _lock:
-            for key, hist in self._histograms.items():
-                name = key.split('{')[0]
-                labels_part = key[len(name):] if '{' in key else ''
-                
-                if name not in exported_histograms:
-                    lines.append(f'# HELP {name} Histogram metric')
-                    lines.append(f'# TYPE {name} histogram')
-                    exported_histograms.add(name)
-                
-                for bucket, count in hist['buckets'].items():
-                    bucket_label = f'le="{bucket}"' if bucket != float('inf') else 'le="+Inf"'
-                    if labels_part:
-                        lines.append(f'{name}_bucket{{{labels_part[1:-1]},{bucket_label}}} {count}')
-                    else:
-                        lines.append(f'{name}_bucket{{{bucket_label}}} {count}')
-                
-                lines.append(f'{name}_sum{labels_part} {hist["sum"]}')
-                lines.append(f'{name}_count{labels_part} {hist["count"]}')
-        
+        for key, hist in sorted(data['histograms'].items()):
+            name = key.split('{')[0]
+            if name in exclude:
+                continue
+            labels_part = key[len(name):] if '{' in key else ''
+            buckets = self.buckets_for(name)
+            if len(hist) != len(buckets) + 2:
+                # Снимок воркера с другими бакетами
+                continue
+            exemplars = data['exemplars'].get(key, {}) if openmetrics else {}
+
+            if name not in exported_histograms:
+                lines.append(f'# HELP {name} Histogram metric')
+                lines.append(f'# TYPE {name} histogram')
+                exported_histograms.add(name)
+
+            cumulative = 0
+            for index, bucket in enumerate(buckets):
+                cumulative += hist[index]
+                bucket_label = f'le="{bucket}"' if bucket != float('inf') else 'le="+Inf"'
+                if labels_part:
+                    line = f'{name}_bucket{{{labels_part[1:-1]},{bucket_label}}} {cumulative}'
+                else:
+                    line = f'{name}_bucket{{{bucket_label}}} {cumulative}'
+                exemplar = exemplars.get(index)
+                if exemplar:
+                    line += f' # {exemplar[0]} {exemplar[1]} {round(exemplar[2], 3)}'
+                lines.append(line)
+
+            lines.append(f'{name}_sum{labels_part} {hist[-2]}')
+            lines.append(f'{name}_count{labels_part} {hist[-1]}')
+
         return '\n'.join(lines)
 
+    # === Несколько процессов ===
+
+    def _worker_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f'metrics_{pid}.json')
+
+    def _write_snapshot(self, path: str, data: Dict[str, Any]) -> None:
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.multiproc_dir, prefix='.metrics_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def flush(self) -> None:
+        """Сохраняет снимок процесса в multiproc_dir."""
+        if not self.multiproc_dir:
+            return
+        try:
+            self._write_snapshot(self._worker_path(os.getpid()), self._local_snapshot())
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Не удалось сохранить метрики процесса: {e}")
+
+    def mark_process_dead(self, pid: int) -> None:
+        """
+        Убирает снимок завершившегося воркера (gunicorn child_exit).
+
+        Counters, histograms и exemplars переносятся в общий снимок
+        завершившихся воркеров, поэтому суммы не уменьшаются, а число файлов
+        не растёт с каждым перезапуском воркера; gauges отбрасываются.
+        """
+        if not self.multiproc_dir:
+            return
+        path = self._worker_path(pid)
+        try:
+            with open(path, 'r') as f:
+                dead = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать метрики воркера {pid}: {e}")
+            dead = {}
+
+        retired_path = os.path.join(self.multiproc_dir, RETIRED_FILENAME)
+        try:
+            with open(retired_path, 'r') as f:
+                retired = json.load(f)
+        except (OSError, ValueError):
+            retired = {}
+        for kind in ('counters', 'histograms', 'exemplars'):
+            retired.setdefault(kind, {})
+        for key, value in dead.get('counters', {}).items():
+            retired['counters'][key] = retired['counters'].get(key, 0) + value
+        for key, hist in dead.get('histograms', {}).items():
+            _add_histogram(retired['histograms'], key, hist)
+        for key, by_bucket in dead.get('exemplars', {}).items():
+            _add_exemplars(retired['exemplars'], key, by_bucket)
+
+        try:
+            self._write_snapshot(retired_path, retired)
+            os.remove(path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Не удалось убрать метрики воркера {pid}: {e}")
+
+    def clear_multiproc_dir(self) -> None:
+        """Удаляет снимки прошлого запуска сервера (gunicorn on_starting)."""
+        if not self.multiproc_dir:
+            return
+        try:
+            names = os.listdir(self.multiproc_dir)
+        except OSError:
+            return
+        for filename in names:
+            if filename.startswith(('metrics_', '.metrics_')):
+                try:
+                    os.remove(os.path.join(self.multiproc_dir, filename))
+                except OSError:
+                    pass
+
+    def _read_worker_files(self) -> List[Tuple[int, Dict[str, Any]]]:
+        result = []
+        try:
+            names = os.listdir(self.multiproc_dir)
+        except OSError:
+            return result
+        for filename in names:
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                # Снимок завершившихся воркеров: только counters и histograms
+                pid = 0 if filename == RETIRED_FILENAME else int(filename[len('metrics_'):-len('.json')])
+                with open(os.path.join(self.multiproc_dir, filename), 'r') as f:
+                    result.append((pid, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    def _ensure_flusher(self) -> None:
+        if not self.multiproc_dir or self.flush_interval <= 0:
+            return
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._registry_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name='metrics-flusher', daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _reset_after_fork(self) -> None:
+        # Дочерний процесс начинает с нуля: значения родителя остаются в его снимке
+        self._epoch += 1
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._registry_lock = threading.Lock()
+        self._gauge_base = {}
+        self._flusher = None
+
+
+def _add_histogram(histograms: Dict[MetricKey, List[float]], key: MetricKey, hist: List[float]) -> None:
+    current = histograms.get(key)
+    if current is None or len(current) != len(hist):
+        histograms[key] = list(hist)
+        return
+    for index, value in enumerate(hist):
+        current[index] += value
+
+
+def _add_exemplars(
+    exemplars: Dict[MetricKey, Dict[int, Tuple[str, float, float]]],
+    key: MetricKey,
+    by_bucket: Dict[int, Tuple[str, float, float]],
+) -> None:
+    current = exemplars.setdefault(key, {})
+    for index, item in by_bucket.items():
+        # Остаётся самый свежий экземпляр бакета
+        if index not in current or item[2] > current[index][2]:
+            current[index] = item
+
+
+def _exemplar_labels(exemplar: Dict[str, Any]) -> str:
+    """labels экземпляра в виде {k="v",...} в пределах EXEMPLAR_MAX_LENGTH."""
+    parts = []
+    length = 0
+    for name, value in exemplar.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        length += len(name) + len(value)
+        if length > EXEMPLAR_MAX_LENGTH:
+            break
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
 
 # Глобальный экземпляр
-metrics = MetricsCollector()
+metrics = MetricsCollector(
+    multiproc_dir=os.environ.get('METRICS_MULTIPROC_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR'),
+    flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0)),
+)
+metrics.set_buckets('cursa_processing_time_seconds', PROCESSING_BUCKETS)
+metrics.set_buckets('cursa_document_stage_duration_seconds', PROCESSING_BUCKETS)
+metrics.set_buckets('cursa_task_queue_wait_seconds', PROCESSING_BUCKETS)
+metrics.set_buckets('cursa_document_size_bytes', SIZE_BUCKETS)
+metrics.set_buckets('cursa_corrections_per_document', COUNT_BUCKETS)
 
 
 def track_request_time(func: Callable = None, name: str = None):
@@ -243,10 +748,12 @@ class RequestMetricsMiddleware:
         self._setup_hooks()
     
     def _setup_hooks(self):
+        active_requests = metrics.gauge('cursa_active_requests')
+
         @self.app.before_request
         def before_request():
             g.start_time = time.time()
-            metrics.gauge_inc('cursa_active_requests')
+            active_requests.inc()
         
         @self.app.after_request
         def after_request(response):
@@ -267,7 +774,7 @@ class RequestMetricsMiddleware:
                     labels={'method': method, 'status': status_code}
                 )
             
-            metrics.gauge_dec('cursa_active_requests')
+            active_requests.dec()
             return response
         
         @self.app.teardown_request
@@ -282,6 +789,8 @@ class RequestMetricsMiddleware:
 # Предопределённые метрики приложения
 def init_app_metrics():
     """Инициализирует метрики приложения"""
+    # Одинаковые во всех воркерах значения не суммируются
+    metrics.set_gauge_mode('cursa_info', 'max')
     metrics.gauge_set('cursa_info', 1, {'version': '1.2.0', 'env': 'production'})
     metrics.gauge_set('cursa_active_requests', 0)
     metrics.gauge_set('cursa_documents_in_progress', 0)
@@ -294,11 +803,21 @@ def record_document_upload(file_size: int, file_type: str):
     metrics.histogram_observe('cursa_document_size_bytes', file_size, {'type': file_type})
 
 
-def record_document_processed(corrections_count: int, processing_time: float):
-    """Записывает метрику обработанного документа"""
+def record_document_processed(
+    corrections_count: int,
+    processing_time: float,
+    exemplar: Optional[Dict[str, Any]] = None,
+):
+    """
+    Записывает метрику обработанного документа.
+
+    Args:
+        exemplar: Например {'task_id': ..., 'document': <хеш>} для поиска
+            медленных документов по бакету гистограммы
+    """
     metrics.counter_inc('cursa_documents_processed_total')
-    metrics.histogram_observe('cursa_processing_time_seconds', processing_time)
-    metrics.histogram_observe('cursa_corrections_per_document', corrections_count)
+    metrics.histogram_observe('cursa_processing_time_seconds', processing_time, exemplar=exemplar)
+    metrics.histogram_observe('cursa_corrections_per_document', corrections_count, exemplar=exemplar)
 
 
 def record_error(error_type: str, component: str):
@@ -0,0 +1,130 @@
+"""
+Замеры времени этапов обработки документа.
+
+span() измеряет блок кода и вкладывается в объемлющий span того же потока
+(через contextvars, без передачи объектов через вызовы):
+
+    with span('check', profile='default_gost'):        # этап конвейера
+        with span('02_check_font', kind='rule'):       # норма внутри этапа
+            ...
+
+Каждый span попадает в гистограмму cursa_pipeline_span_seconds с labels
+kind, name, stage и profile (stage и profile наследуются от родителя), поэтому
+замеры можно оставлять включёнными в production и по ним искать норму или
+проход, который стал медленнее.
+
+Дерево замеров нужно только по запросу: collect_timings() собирает все span
+внутри себя, а Span.to_dict() превращает их в поле ответа API 'timings'.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.metrics.prometheus import BoundHistogram, metrics
+
+SPAN_METRIC = 'cursa_pipeline_span_seconds'
+
+# Нормы и валидаторы занимают миллисекунды, этапы — до минут
+SPAN_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, float('inf'),
+)
+
+KIND_STAGE = 'stage'
+KIND_RULE = 'rule'
+KIND_VALIDATOR = 'validator'
+KIND_PASS = 'pass'
+
+metrics.set_buckets(SPAN_METRIC, SPAN_BUCKETS)
+
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('cursa_span', default=None)
+
+# (kind, name, stage, profile) -> гистограмма с привязанными labels
+_histograms: Dict[Tuple[str, str, str, str], BoundHistogram] = {}
+
+
+class Span:
+    """Замер одного блока кода."""
+
+    __slots__ = ('name', 'kind', 'stage', 'profile', 'duration', 'children')
+
+    def __init__(self, name: str, kind: str, stage: str = '', profile: str = ''):
+        self.name = name
+        self.kind = kind
+        self.stage = stage
+        self.profile = profile
+        self.duration = 0.0
+        self.children: List['Span'] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Дерево замеров для ответа API (длительности в миллисекундах)."""
+        data: Dict[str, Any] = {
+            'name': self.name,
+            'kind': self.kind,
+            'duration_ms': round(self.duration * 1000, 3),
+        }
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children]
+        return data
+
+
+def current_span() -> Optional[Span]:
+    """Активный span текущего потока (None вне замеров)."""
+    return _current.get()
+
+
+def _histogram(node: Span) -> BoundHistogram:
+    key = (node.kind, node.name, node.stage, node.profile)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = metrics.histogram(SPAN_METRIC, {
+            'kind': node.kind, 'name': node.name, 'stage': node.stage, 'profile': node.profile,
+        })
+    return histogram
+
+
+@contextmanager
+def span(name: str, kind: str = KIND_STAGE, profile: Optional[str] = None) -> Iterator[Span]:
+    """
+    Измеряет блок кода.
+
+    Args:
+        name: Имя этапа, нормы, валидатора или прохода
+        kind: stage, rule, validator или pass
+        profile: ID профиля (по умолчанию — как у родительского span)
+    """
+    parent = _current.get()
+    stage = name if kind == KIND_STAGE else (parent.stage if parent else '')
+    if profile is None:
+        profile = parent.profile if parent else ''
+    node = Span(name, kind, stage, profile)
+
+    _current.set(node)
+    start = time.perf_counter()
+    try:
+        yield node
+    finally:
+        node.duration = time.perf_counter() - start
+        _current.set(parent)
+        if parent is not None:
+            parent.children.append(node)
+        _histogram(node).observe(node.duration)
+
+
+@contextmanager
+def collect_timings(name: str = 'request') -> Iterator[Span]:
+    """
+    Собирает дерево span, выполненных внутри блока.
+    Корневой span в метрики не попадает.
+    """
+    parent = _current.get()
+    root = Span(name, 'request')
+    _current.set(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    finally:
+        root.duration = time.perf_counter() - start
+        _current.set(parent)
@@ -1,12 +1,255 @@
-"""Helpers for API key authentication and scope validation."""
+"""
+Helpers for API key authentication and scope validation.
 
-from datetime import datetime, timezone, timedelta
-from typing import Optional, Tuple
+Keys are resolved through a small TTL-bounded LRU cache of immutable
+snapshots, so repeated requests with the same key do not hit the database.
+Management routes invalidate entries on revoke/update/regenerate; other
+processes pick up changes after API_KEY_CACHE_TTL seconds.
+
+The hourly per-key limit is enforced with a token bucket (capacity
+``rate_limit``, refilled at ``rate_limit`` tokens per hour) kept in Redis when
+the app has a Redis connection and in process memory otherwise. Usage events
+go to the buffered audit writer (app.services.audit_buffer), so a request
+with a cached key does no database work at all.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from flask import current_app, jsonify, request
 
-from app.extensions import db
-from app.models import APIKey, APIKeyAudit
+from app.models import APIKey
+from app.services.audit_buffer import USAGE_EVENT, get_audit_buffer
+
+RATE_LIMIT_PERIOD = 3600  # seconds; APIKey.rate_limit is requests per hour
+
+
+@dataclass(frozen=True)
+class ResolvedAPIKey:
+    """Immutable snapshot of an API key, safe to share between requests."""
+
+    id: int
+    user_id: int
+    name: str
+    scopes: Tuple[str, ...]
+    rate_limit: int
+    is_active: bool
+    expires_at: Optional[datetime]
+    plan: str
+
+    @classmethod
+    def from_model(cls, api_key: APIKey) -> "ResolvedAPIKey":
+        from app.services.payment_service import plan_key_for_user
+
+        return cls(
+            id=api_key.id,
+            user_id=api_key.user_id,
+            name=api_key.name,
+            scopes=tuple(api_key.scopes or ()),
+            rate_limit=api_key.rate_limit or 0,
+            is_active=bool(api_key.is_active),
+            expires_at=api_key.expires_at,
+            plan=plan_key_for_user(api_key.user),
+        )
+
+    @property
+    def is_valid(self) -> bool:
+        if not self.is_active:
+            return False
+        if self.expires_at:
+            expires_at = self.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at < datetime.now(timezone.utc):
+                return False
+        return True
+
+
+class APIKeyCache:
+    """
+    LRU cache of key_hash -> ResolvedAPIKey with a short TTL.
+
+    Unknown hashes are cached as well (as None) so that repeated requests
+    with an invalid key do not reach the database either.
+    """
+
+    def __init__(self, ttl: float = 30, max_size: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Optional[ResolvedAPIKey]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_hash: str) -> Tuple[bool, Optional[ResolvedAPIKey]]:
+        """Return (found, snapshot); expired entries count as misses."""
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key_hash)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key_hash]
+            self.misses += 1
+            return False, None
+
+    def put(self, key_hash: str, value: Optional[ResolvedAPIKey]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key_hash] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: Optional[str] = None, key_id: Optional[int] = None) -> None:
+        with self._lock:
+            if key_hash is not None:
+                self._entries.pop(key_hash, None)
+            if key_id is not None:
+                for cached_hash, (_, value) in list(self._entries.items()):
+                    if value is not None and value.id == key_id:
+                        del self._entries[cached_hash]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# KEYS[1] = bucket key; ARGV = capacity, refill rate per second, ttl
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {allowed, tostring(tokens)}
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token bucket.
+
+    With a Redis client the bucket is shared by all processes (atomic Lua
+    script); without one, or when Redis fails, buckets live in this process.
+    """
+
+    def __init__(self, redis_client=None, max_keys: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.redis = redis_client
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Any, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._script = None
+
+    def acquire(self, key: Any, capacity: int, period: float = RATE_LIMIT_PERIOD) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, tokens left)."""
+        if self.redis is not None:
+            try:
+                return self._acquire_redis(key, capacity, period)
+            except Exception as exc:
+                current_app.logger.warning("Redis token bucket unavailable, using memory: %s", exc)
+        return self._acquire_memory(key, capacity, period)
+
+    def _acquire_redis(self, key: Any, capacity: int, period: float) -> Tuple[bool, float]:
+        if self._script is None:
+            self._script = self.redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        allowed, tokens = self._script(
+            keys=[f"api_key_bucket:{key}"],
+            args=[capacity, capacity / period, int(period) + 60],
+        )
+        return bool(int(allowed)), float(tokens)
+
+    def _acquire_memory(self, key: Any, capacity: int, period: float) -> Tuple[bool, float]:
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated_at) * capacity / period)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def reset(self, key: Any) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(f"api_key_bucket:{key}")
+            except Exception:
+                pass
+
+
+def get_api_key_cache() -> APIKeyCache:
+    """API key cache of the current app (API_KEY_CACHE_TTL / API_KEY_CACHE_SIZE)."""
+    cache = current_app.extensions.get("api_key_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "api_key_cache",
+            APIKeyCache(
+                ttl=float(current_app.config.get("API_KEY_CACHE_TTL", 30)),
+                max_size=int(current_app.config.get("API_KEY_CACHE_SIZE", 1024)),
+            ),
+        )
+    return cache
+
+
+def get_rate_limiter() -> TokenBucketLimiter:
+    """Token bucket limiter of the current app (Redis-backed when available)."""
+    limiter = current_app.extensions.get("api_key_limiter")
+    if limiter is None:
+        token_manager = getattr(current_app, "token_manager", None)
+        limiter = current_app.extensions.setdefault(
+            "api_key_limiter",
+            TokenBucketLimiter(getattr(token_manager, "redis", None)),
+        )
+    return limiter
+
+
+def invalidate_api_key(key_hash: Optional[str] = None, key_id: Optional[int] = None) -> None:
+    """Drop a key from the cache after it was revoked, updated or regenerated."""
+    get_api_key_cache().invalidate(key_hash=key_hash, key_id=key_id)
+
+
+def resolve_api_key(raw_key: str) -> Optional[ResolvedAPIKey]:
+    """Look up an API key by its raw value (cached)."""
+    key_hash = APIKey.hash_key(raw_key)
+    cache = get_api_key_cache()
+    found, resolved = cache.get(key_hash)
+    if found:
+        return resolved
+
+    api_key = APIKey.query.filter_by(key_hash=key_hash).first()
+    resolved = ResolvedAPIKey.from_model(api_key) if api_key else None
+    cache.put(key_hash, resolved)
+    return resolved
 
 
 def _extract_api_key_from_request() -> Tuple[Optional[str], bool]:
@@ -47,7 +290,7 @@ def authorize_api_key_request(required_scope: Optional[str] = None):
     - If API key auth is attempted, key must be valid and have required scope.
 
     Returns:
-        (api_key, error_response)
+        (ResolvedAPIKey, error_response)
     """
     raw_key, explicit_api_key_attempt = _extract_api_key_from_request()
 
@@ -57,8 +300,7 @@ def authorize_api_key_request(required_scope: Optional[str] = None):
     if not raw_key:
         return None, (jsonify({"error": "API key is required"}), 401)
 
-    key_hash = APIKey.hash_key(raw_key)
-    api_key = APIKey.query.filter_by(key_hash=key_hash).first()
+    api_key = resolve_api_key(raw_key)
 
     if not api_key:
         return None, (jsonify({"error": "Invalid API key"}), 401)
@@ -66,7 +308,7 @@ def authorize_api_key_request(required_scope: Optional[str] = None):
     if not api_key.is_valid:
         return None, (jsonify({"error": "API key is inactive or expired"}), 401)
 
-    key_scopes = api_key.scopes or []
+    key_scopes = list(api_key.scopes)
     if required_scope and required_scope not in key_scopes:
         return None, (
             jsonify(
@@ -79,16 +321,11 @@ def authorize_api_key_request(required_scope: Optional[str] = None):
             403,
         )
 
-    # Enforce per-key rate limit using usage audit within the last hour.
-    hourly_limit = api_key.rate_limit or 0
+    # Enforce per-key hourly limit with a token bucket.
+    hourly_limit = api_key.rate_limit
     if hourly_limit > 0:
-        window_start = datetime.now(timezone.utc) - timedelta(hours=1)
-        recent_usage_count = APIKeyAudit.query.filter(
-            APIKeyAudit.api_key_id == api_key.id,
-            APIKeyAudit.event == "api_key_used",
-            APIKeyAudit.created_at >= window_start,
-        ).count()
-        if recent_usage_count >= hourly_limit:
+        allowed, _ = get_rate_limiter().acquire(api_key.id, hourly_limit)
+        if not allowed:
             return None, (
                 jsonify(
                     {
@@ -100,26 +337,21 @@ def authorize_api_key_request(required_scope: Optional[str] = None):
                 429,
             )
 
+    # usage_count/last_used_at are updated when the buffer is flushed.
     try:
-        api_key.last_used_at = datetime.now(timezone.utc)
-        api_key.usage_count = (api_key.usage_count or 0) + 1
-
-        usage_event = APIKeyAudit(
+        get_audit_buffer().record(
             user_id=api_key.user_id,
             api_key_id=api_key.id,
-            event="api_key_used",
+            event=USAGE_EVENT,
             details={
                 "required_scope": required_scope,
                 "path": request.path,
                 "method": request.method,
             },
-            ip_address=request.headers.get("X-Forwarded-For", request.remote_addr),
+            ip_address=request.remote_addr,
             user_agent=(request.headers.get("User-Agent") or "")[:512],
         )
-        db.session.add(usage_event)
-        db.session.commit()
     except Exception as exc:
-        db.session.rollback()
-        current_app.logger.warning("Failed to update API key usage stats: %s", exc)
+        current_app.logger.warning("Failed to record API key usage: %s", exc)
 
     return api_key, None
@@ -0,0 +1,142 @@
+"""
+Хранилище промежуточных артефактов конвейера обработки документов.
+
+Этапы конвейера (извлечение, проверка, исправление, повторная проверка, отчёт)
+передают друг другу не сами данные, а ссылки вида ``<job_id>/<name>`` на
+артефакты в общей директории. Это держит сообщения брокера маленькими и
+позволяет повторить упавший этап, не пересчитывая предыдущие.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ARTIFACTS_DIR = os.path.join(BASE_DIR, 'app', 'static', 'artifacts')
+
+# Срок хранения артефактов незавершённых конвейеров
+ARTIFACT_MAX_AGE_SECONDS = 24 * 3600
+
+_REF_RE = re.compile(r'^[0-9a-f]{32}/[A-Za-z0-9_.\-]+$')
+
+
+class ArtifactNotFound(Exception):
+    """Артефакт отсутствует (удалён по сроку хранения или не был создан)."""
+
+
+class ArtifactStore:
+    """
+    Файловое хранилище артефактов, сгруппированных по задаче (job).
+
+    Args:
+        root: Корневая директория; должна быть общей для всех воркеров
+    """
+
+    def __init__(self, root: str = DEFAULT_ARTIFACTS_DIR):
+        self.root = root
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    def _path(self, ref: str) -> str:
+        if not ref or not _REF_RE.match(ref):
+            raise ArtifactNotFound(ref)
+        return os.path.join(self.root, *ref.split('/'))
+
+    def job_dir(self, job_id: str) -> str:
+        path = os.path.join(self.root, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def put_json(self, job_id: str, name: str, data: Any) -> str:
+        """
+        Сохраняет JSON-артефакт атомарно.
+
+        Returns:
+            Ссылка на артефакт
+        """
+        ref = f'{job_id}/{name}.json'
+        target = self._path(ref)
+        job_dir = self.job_dir(job_id)
+
+        fd, tmp_path = tempfile.mkstemp(dir=job_dir, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return ref
+
+    def get_json(self, ref: str) -> Any:
+        """
+        Загружает JSON-артефакт.
+
+        Raises:
+            ArtifactNotFound: если артефакт отсутствует
+        """
+        try:
+            with open(self._path(ref), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ArtifactNotFound(ref)
+
+    def put_file(self, job_id: str, name: str, source_path: str) -> str:
+        """Копирует файл в хранилище и возвращает ссылку на него."""
+        ref = f'{job_id}/{name}'
+        target = self._path(ref)
+        self.job_dir(job_id)
+        shutil.copy2(source_path, target)
+        return ref
+
+    def path(self, ref: str) -> str:
+        """
+        Возвращает путь к файловому артефакту.
+
+        Raises:
+            ArtifactNotFound: если файл отсутствует
+        """
+        path = self._path(ref)
+        if not os.path.exists(path):
+            raise ArtifactNotFound(ref)
+        return path
+
+    def delete_job(self, job_id: str) -> None:
+        """Удаляет все артефакты задачи."""
+        shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+
+    def cleanup_older_than(self, max_age_seconds: float) -> int:
+        """
+        Удаляет артефакты задач старше заданного возраста.
+
+        Returns:
+            Количество удалённых задач
+        """
+        if not os.path.isdir(self.root):
+            return 0
+
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for job_id in os.listdir(self.root):
+            job_dir = os.path.join(self.root, job_id)
+            try:
+                if os.path.isdir(job_dir) and os.path.getmtime(job_dir) < cutoff:
+                    shutil.rmtree(job_dir, ignore_errors=True)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Не удалось удалить артефакты {job_id}: {e}")
+        return removed
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,370 @@
+"""
+Buffered writes of API key usage audit events.
+
+Requests only append an event to an in-memory buffer; a background thread
+flushes it in batches: one bulk insert of APIKeyAudit rows plus one
+aggregated usage_count/last_used_at update per key. The buffer is bounded:
+when it is full the request that hits the limit flushes it inline instead
+of dropping events, and pending events are flushed on shutdown, so audit
+history stays complete.
+
+A batch the database rejects is spilled to a JSON-lines file in the spool
+directory (API_KEY_AUDIT_SPOOL_DIR) and replayed by a later successful
+flush, so a database outage does not cost audit events or memory. A spool
+file that keeps failing while the database accepts other writes is retried
+row by row after MAX_REPLAY_ATTEMPTS; the rows it still rejects are moved
+to a ".rejected" file and logged, so one bad batch cannot block the rest of
+the spool. Only if
+the spool cannot be written either do events stay in memory, and past
+max_pending the oldest are dropped: each dropped event is logged in full
+and counted in cursa_api_key_audit_dropped_total.
+
+API_KEY_AUDIT_FLUSH_INTERVAL=0 disables buffering (every event is written
+immediately), which is what the test configuration uses.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import APIKey, APIKeyAudit
+
+logger = logging.getLogger(__name__)
+
+USAGE_EVENT = "api_key_used"
+
+DEFAULT_SPOOL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "audit_spool"
+)
+SPOOL_SUFFIX = ".jsonl"
+CLAIM_SUFFIX = ".replaying"
+REJECTED_SUFFIX = ".rejected"
+# Failed replays of one spool file (while the database is up) before it is
+# written row by row
+MAX_REPLAY_ATTEMPTS = 3
+
+
+class AuditBuffer:
+    """
+    Bounded in-memory queue of APIKeyAudit rows with a background flusher.
+
+    Args:
+        app: Flask app whose database the rows are written to
+        flush_interval: Seconds between background flushes (0 = write through)
+        batch_size: Pending rows that trigger an early flush
+        max_pending: Hard bound; reaching it flushes in the caller's thread
+        spool_dir: Where failed batches are spilled (None = keep them in memory)
+    """
+
+    def __init__(self, app: Flask, flush_interval: float = 2.0, batch_size: int = 500,
+                 max_pending: int = 10000, spool_dir: Optional[str] = None):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(self.batch_size, max_pending)
+        self.spool_dir = spool_dir
+        self._spool_seq = itertools.count()
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def record(self, *, user_id: int, api_key_id: Optional[int], event: str,
+               details: Optional[dict] = None, ip_address: Optional[str] = None,
+               user_agent: Optional[str] = None) -> None:
+        """Queue one audit event (timestamped now)."""
+        row = {
+            "user_id": user_id,
+            "api_key_id": api_key_id,
+            "event": event,
+            "details": details or {},
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "created_at": datetime.now(timezone.utc),
+        }
+        with self._lock:
+            self._pending.append(row)
+            pending = len(self._pending)
+
+        if self.flush_interval <= 0 or pending >= self.max_pending:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write all pending and spilled events. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as exc:
+                    self.failed_flushes += 1
+                    logger.warning("Failed to flush %d API key audit events: %s", len(batch), exc)
+                    self._keep(batch)
+                    return 0
+                self.flushed += len(batch)
+            # The database accepts writes again: replay what earlier failures spilled
+            return len(batch) + self._replay_spool(healthy=bool(batch))
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        usage: Dict[int, List[Any]] = {}
+        for row in batch:
+            if row["event"] == USAGE_EVENT and row["api_key_id"] is not None:
+                entry = usage.setdefault(row["api_key_id"], [0, row["created_at"]])
+                entry[0] += 1
+                entry[1] = max(entry[1], row["created_at"])
+
+        with self.app.app_context():
+            try:
+                db.session.bulk_insert_mappings(APIKeyAudit, batch)
+                for key_id, (count, last_used_at) in usage.items():
+                    APIKey.query.filter_by(id=key_id).update(
+                        {
+                            APIKey.usage_count: func.coalesce(APIKey.usage_count, 0) + count,
+                            APIKey.last_used_at: last_used_at,
+                        },
+                        synchronize_session=False,
+                    )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _keep(self, batch: List[Dict[str, Any]]) -> None:
+        """Hold on to a batch the database rejected: spill it, or requeue it in memory."""
+        if self.spool_dir:
+            try:
+                self._spill(batch)
+                return
+            except OSError as exc:
+                logger.error("Failed to spill %d API key audit events to %s: %s",
+                             len(batch), self.spool_dir, exc)
+
+        with self._lock:
+            merged = batch + self._pending
+            overflow = max(0, len(merged) - self.max_pending)
+            dropped, self._pending = merged[:overflow], merged[overflow:]
+        for row in dropped:
+            # The log line is the last remaining record of the event
+            logger.error("Dropped API key audit event: %s", json.dumps(_encode(row), ensure_ascii=False))
+        if dropped:
+            self.dropped += len(dropped)
+            _count("cursa_api_key_audit_dropped_total", len(dropped))
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        name = f"audit-{time.time_ns()}-{os.getpid()}-{next(self._spool_seq)}"
+        tmp_path = os.path.join(self.spool_dir, name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps(_encode(row), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.spool_dir, name + SPOOL_SUFFIX))
+        self.spilled += len(batch)
+        _count("cursa_api_key_audit_spilled_total", len(batch))
+        logger.warning("Spilled %d API key audit events to %s", len(batch), name + SPOOL_SUFFIX)
+
+    def _replay_spool(self, healthy: bool = False) -> int:
+        """
+        Write spilled batches, oldest first.
+
+        A failing file stops the replay unless the database accepted another
+        write during this flush (`healthy`): then the failure is blamed on the
+        file, counted in its name, and the replay moves on to the next one.
+        """
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+
+        replayed = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith(CLAIM_SUFFIX) and _claim_orphaned(name):
+                # A process died while replaying this file
+                original = name[: -len(CLAIM_SUFFIX)].rsplit(".", 1)[0]
+                path = os.path.join(self.spool_dir, original)
+                try:
+                    os.rename(os.path.join(self.spool_dir, name), path)
+                except OSError:
+                    continue
+            elif not name.endswith(SPOOL_SUFFIX):
+                continue
+
+            # Claim the file so other processes sharing the spool skip it
+            claimed = f"{path}.{os.getpid()}{CLAIM_SUFFIX}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+
+            try:
+                with open(claimed, "r", encoding="utf-8") as f:
+                    batch = [_decode(json.loads(line)) for line in f if line.strip()]
+            except (OSError, ValueError, KeyError) as exc:
+                logger.error("Unreadable API key audit spool file %s kept as %s.corrupt: %s",
+                             path, path, exc)
+                os.rename(claimed, path + ".corrupt")
+                continue
+
+            base, attempts = _spool_attempts(path)
+            if attempts >= MAX_REPLAY_ATTEMPTS and healthy:
+                try:
+                    written = self._write_rows(batch, base)
+                except OSError as exc:
+                    logger.error("Failed to write rejected API key audit events of %s: %s", path, exc)
+                    os.rename(claimed, path)
+                    break
+            else:
+                try:
+                    self._write(batch)
+                except Exception as exc:
+                    logger.warning("Failed to replay %d spilled API key audit events: %s", len(batch), exc)
+                    if not healthy:
+                        os.rename(claimed, path)
+                        break
+                    os.rename(claimed, f"{base}.{attempts + 1}{SPOOL_SUFFIX}")
+                    continue
+                written = len(batch)
+            os.remove(claimed)
+            healthy = True
+            self.flushed += written
+            replayed += written
+        return replayed
+
+    def _write_rows(self, batch: List[Dict[str, Any]], base: str) -> int:
+        """Write a batch one row at a time; rows still rejected go to a .rejected file."""
+        rejected = []
+        for row in batch:
+            try:
+                self._write([row])
+            except Exception as exc:
+                logger.error("API key audit event rejected by the database: %s (%s)",
+                             json.dumps(_encode(row), ensure_ascii=False), exc)
+                rejected.append(row)
+        if rejected:
+            with open(base + REJECTED_SUFFIX, "a", encoding="utf-8") as f:
+                for row in rejected:
+                    f.write(json.dumps(_encode(row), ensure_ascii=False) + "\n")
+            self.rejected += len(rejected)
+            _count("cursa_api_key_audit_rejected_total", len(rejected))
+        return len(batch) - len(rejected)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the flusher and write whatever is still pending."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="api-key-audit-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.warning("API key audit flusher error: %s", exc)
+
+
+def _encode(row: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(row, created_at=row["created_at"].isoformat())
+
+
+def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(row, created_at=datetime.fromisoformat(row["created_at"]))
+
+
+def _spool_attempts(path: str):
+    """Split a spool file path into its base and the failed replays recorded in the name."""
+    stem = path[: -len(SPOOL_SUFFIX)]
+    base, _, attempts = stem.rpartition(".")
+    if base and attempts.isdigit():
+        return base, int(attempts)
+    return stem, 0
+
+
+def _claim_orphaned(name: str) -> bool:
+    """Whether the process that claimed a spool file is gone."""
+    try:
+        pid = int(name[: -len(CLAIM_SUFFIX)].rsplit(".", 1)[1])
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except (ValueError, IndexError, OSError):
+        return False
+    return False
+
+
+def _count(name: str, value: int) -> None:
+    try:
+        from app.metrics import metrics
+        metrics.counter_inc(name, value)
+    except ImportError:
+        pass
+
+
+def get_audit_buffer() -> AuditBuffer:
+    """Audit buffer of the current app (API_KEY_AUDIT_* settings)."""
+    buffer = current_app.extensions.get("api_key_audit_buffer")
+    if buffer is None:
+        app = current_app._get_current_object()
+        buffer = AuditBuffer(
+            app,
+            flush_interval=float(app.config.get("API_KEY_AUDIT_FLUSH_INTERVAL", 2.0)),
+            batch_size=int(app.config.get("API_KEY_AUDIT_BATCH_SIZE", 500)),
+            max_pending=int(app.config.get("API_KEY_AUDIT_MAX_PENDING", 10000)),
+            spool_dir=app.config.get("API_KEY_AUDIT_SPOOL_DIR") or DEFAULT_SPOOL_DIR,
+        )
+        buffer = app.extensions.setdefault("api_key_audit_buffer", buffer)
+        if buffer.flush_interval > 0:
+            atexit.register(buffer.shutdown)
+    return buffer
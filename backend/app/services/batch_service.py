@@ -0,0 +1,184 @@
+"""
+Пакетная обработка документов с ограниченным параллелизмом.
+
+Файлы пакета и результаты по каждому документу хранятся в ArtifactStore под
+идентификатором пакета, поэтому статус пакета читается без брокера и без
+result backend Celery. Параллелизм ограничивается «дорожками»: документы
+раскладываются по N цепочкам, которые выполняются одновременно, а внутри
+цепочки — последовательно.
+"""
+
+import datetime
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from app.services.artifact_store import ArtifactNotFound, artifact_store
+
+logger = logging.getLogger(__name__)
+
+# Поля результата, которые не возвращаются в кратком статусе пакета
+DETAIL_FIELDS = ('check_results', 'corrected_check_results')
+
+
+class BatchNotFound(Exception):
+    """Пакет не найден или удалён по сроку хранения."""
+
+
+def plan_lanes(total: int, concurrency: int) -> List[List[int]]:
+    """
+    Раскладывает индексы документов по дорожкам (round-robin).
+
+    Args:
+        total: Количество документов
+        concurrency: Максимальное число одновременно обрабатываемых документов
+
+    Returns:
+        Список дорожек, каждая — список индексов документов
+    """
+    lanes_count = max(1, min(concurrency, total))
+    lanes = [[] for _ in range(lanes_count)]
+    for index in range(total):
+        lanes[index % lanes_count].append(index)
+    return [lane for lane in lanes if lane]
+
+
+def create_batch(
+    files: List[Dict[str, str]],
+    profile_id: Optional[str] = None,
+    concurrency: int = 1,
+    batch_id: Optional[str] = None,
+) -> str:
+    """
+    Регистрирует пакет и копирует его файлы в хранилище артефактов.
+
+    Args:
+        files: Список {'path': ..., 'filename': ...}
+        profile_id: ID профиля нормоконтроля
+        concurrency: Ограничение параллелизма пакета
+        batch_id: Идентификатор (по умолчанию создаётся новый)
+
+    Returns:
+        str: batch_id
+    """
+    batch_id = batch_id or artifact_store.new_job_id()
+    items = []
+    for index, item in enumerate(files):
+        ref = artifact_store.put_file(batch_id, f'file_{index}.docx', item['path'])
+        items.append({'index': index, 'filename': item['filename'], 'ref': ref})
+
+    artifact_store.put_json(batch_id, 'batch', {
+        'batch_id': batch_id,
+        'profile_id': profile_id,
+        'concurrency': concurrency,
+        'total': len(items),
+        'items': items,
+        'created_at': datetime.datetime.utcnow().isoformat(),
+    })
+    return batch_id
+
+
+def load_batch(batch_id: str) -> Dict[str, Any]:
+    try:
+        return artifact_store.get_json(f'{batch_id}/batch.json')
+    except ArtifactNotFound:
+        raise BatchNotFound(batch_id)
+
+
+def process_batch_item(batch_id: str, index: int, workflow, deadline=None) -> Dict[str, Any]:
+    """
+    Обрабатывает один документ пакета и сохраняет результат.
+
+    Ошибки не пробрасываются: пакет должен завершиться, даже если отдельные
+    документы обработать не удалось.
+
+    Args:
+        deadline: Бюджет времени на документ (см. app.services.deadline)
+    """
+    manifest = load_batch(batch_id)
+    item = manifest['items'][index]
+    filename = item['filename']
+
+    try:
+        file_path = artifact_store.path(item['ref'])
+        result = workflow.process_document(
+            file_path, filename, manifest.get('profile_id'), deadline=deadline
+        )
+    except Exception as e:
+        logger.error(f"Batch {batch_id}: ошибка обработки {filename}: {e}")
+        result = {'filename': filename, 'success': False, 'error': str(e)}
+
+    result.setdefault('filename', filename)
+    result['index'] = index
+    artifact_store.put_json(batch_id, f'result_{index}', result)
+
+    # Исходный файл больше не нужен
+    try:
+        os.remove(artifact_store.path(item['ref']))
+    except (ArtifactNotFound, OSError):
+        pass
+
+    return {'index': index, 'success': bool(result.get('success'))}
+
+
+def finalize_batch(batch_id: str) -> Dict[str, Any]:
+    """Фиксирует завершение пакета и возвращает сводку."""
+    status = get_batch_status(batch_id)
+    summary = {
+        'batch_id': batch_id,
+        'total': status['total'],
+        'successful': status['successful'],
+        'failed': status['failed'],
+        'completed_at': datetime.datetime.utcnow().isoformat(),
+    }
+    artifact_store.put_json(batch_id, 'summary', summary)
+    return summary
+
+
+def get_batch_status(batch_id: str, include_details: bool = False) -> Dict[str, Any]:
+    """
+    Возвращает статус пакета и уже готовые результаты.
+
+    Args:
+        batch_id: Идентификатор пакета
+        include_details: Включать полные результаты проверок
+    """
+    manifest = load_batch(batch_id)
+
+    results = []
+    for item in manifest['items']:
+        try:
+            result = artifact_store.get_json(f"{batch_id}/result_{item['index']}.json")
+        except ArtifactNotFound:
+            continue
+        if not include_details:
+            result = {key: value for key, value in result.items() if key not in DETAIL_FIELDS}
+        results.append(result)
+
+    try:
+        summary = artifact_store.get_json(f'{batch_id}/summary.json')
+    except ArtifactNotFound:
+        summary = None
+
+    completed = len(results)
+    successful = sum(1 for result in results if result.get('success'))
+
+    if summary is not None:
+        state = 'completed'
+    elif completed:
+        state = 'processing'
+    else:
+        state = 'queued'
+
+    return {
+        'batch_id': batch_id,
+        'status': state,
+        'total': manifest['total'],
+        'completed': completed,
+        'successful': successful,
+        'failed': completed - successful,
+        'progress': round(completed / manifest['total'] * 100) if manifest['total'] else 100,
+        'created_at': manifest.get('created_at'),
+        'completed_at': summary.get('completed_at') if summary else None,
+        'results': results,
+    }
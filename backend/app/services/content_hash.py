@@ -0,0 +1,80 @@
+"""
+Кэш SHA-256 хешей содержимого файлов.
+
+Хеш вычисляется один раз (при потоковой загрузке или при первом обращении) и
+переиспользуется кэшами превью, отчётов и ETag при скачивании. Запись кэша
+привязана к (mtime, size), поэтому изменённый файл пересчитывается автоматически.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Максимальное количество файлов в кэше хешей
+MAX_CACHED_DIGESTS = 4096
+
+_digests: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _stat_key(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def register_digest(path: str, digest: str) -> None:
+    """Сохраняет заранее вычисленный хеш файла (например, при загрузке)."""
+    key = _stat_key(path)
+    if key is None:
+        return
+
+    abs_path = os.path.abspath(path)
+    with _lock:
+        _digests[abs_path] = (key[0], key[1], digest)
+        _digests.move_to_end(abs_path)
+        while len(_digests) > MAX_CACHED_DIGESTS:
+            _digests.popitem(last=False)
+
+
+def get_file_digest(path: str) -> Optional[str]:
+    """
+    Возвращает SHA-256 содержимого файла.
+
+    Returns:
+        Hex-строка хеша или None, если файл недоступен
+    """
+    key = _stat_key(path)
+    if key is None:
+        return None
+
+    abs_path = os.path.abspath(path)
+    with _lock:
+        cached = _digests.get(abs_path)
+        if cached and (cached[0], cached[1]) == key:
+            _digests.move_to_end(abs_path)
+            return cached[2]
+
+    sha256 = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+    except OSError:
+        return None
+
+    digest = sha256.hexdigest()
+    register_digest(path, digest)
+    return digest
+
+
+def forget_digest(path: str) -> None:
+    """Удаляет хеш файла из кэша (после удаления файла)."""
+    with _lock:
+        _digests.pop(os.path.abspath(path), None)
@@ -0,0 +1,112 @@
+"""
+Бюджет времени обработки документа.
+
+Deadline передаётся из маршрута или задачи Celery через WorkflowService в
+проверку норм и автоисправление. Перед каждой нормой и каждым проходом
+коррекции проверяется оставшееся время:
+
+- когда осталось меньше LOW_PRIORITY_RESERVE бюджета, пропускаются нормы
+  низкого приоритета и необязательные проходы;
+- когда бюджет исчерпан, пропускается всё, что ещё не начато.
+
+Результат в этом случае помечается incomplete, а пропущенные нормы и этапы
+перечисляются в нём, поэтому тяжёлый документ даёт частичный результат
+вместо срабатывания task_soft_time_limit.
+
+Момент окончания хранится как time.time(), поэтому Deadline можно передать
+между этапами конвейера в состоянии (to_state / from_state).
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Union
+
+# Доля бюджета, при которой начинают пропускаться нормы низкого приоритета
+LOW_PRIORITY_RESERVE = 0.25
+
+PRIORITY_HIGH = 'high'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+
+
+class Deadline:
+    """
+    Момент, к которому обработка должна завершиться.
+
+    Args:
+        expires_at: Время окончания (time.time()); None — без ограничения
+        budget: Полный бюджет в секундах (для расчёта доли остатка)
+    """
+
+    def __init__(
+        self,
+        expires_at: Optional[float] = None,
+        budget: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.expires_at = expires_at
+        self.budget = budget
+        self._clock = clock
+
+    @classmethod
+    def after(cls, seconds: Optional[float], clock: Callable[[], float] = time.time) -> 'Deadline':
+        """Бюджет в seconds секунд от текущего момента (None или 0 — без ограничения)."""
+        if not seconds or seconds <= 0:
+            return cls(clock=clock)
+        return cls(clock() + seconds, float(seconds), clock)
+
+    @classmethod
+    def from_state(cls, data: Optional[Dict[str, Any]]) -> 'Deadline':
+        if not data:
+            return cls()
+        return cls(data.get('expires_at'), data.get('budget'))
+
+    def to_state(self) -> Optional[Dict[str, Any]]:
+        if self.unlimited:
+            return None
+        return {'expires_at': self.expires_at, 'budget': self.budget}
+
+    @property
+    def unlimited(self) -> bool:
+        return self.expires_at is None
+
+    def remaining(self) -> float:
+        """Оставшееся время в секундах (inf без ограничения)."""
+        if self.unlimited:
+            return math.inf
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return not self.unlimited and self.remaining() <= 0
+
+    def fraction_left(self) -> float:
+        if self.unlimited or not self.budget:
+            return 1.0
+        return self.remaining() / self.budget
+
+    def allows(self, priority: str = PRIORITY_NORMAL) -> bool:
+        """Можно ли начинать работу с данным приоритетом."""
+        if self.unlimited:
+            return True
+        if self.expired():
+            return False
+        if priority == PRIORITY_LOW:
+            return self.fraction_left() >= LOW_PRIORITY_RESERVE
+        return True
+
+    def __repr__(self) -> str:
+        if self.unlimited:
+            return 'Deadline(unlimited)'
+        return f'Deadline(remaining={self.remaining():.1f}s, budget={self.budget}s)'
+
+
+NO_DEADLINE = Deadline()
+
+
+def as_deadline(value: Union['Deadline', float, int, None]) -> Deadline:
+    """Приводит число секунд, None или Deadline к Deadline."""
+    if isinstance(value, Deadline):
+        return value
+    if value is None:
+        return NO_DEADLINE
+    return Deadline.after(float(value))
@@ -2,7 +2,6 @@ import os
 import re
 import datetime
 import tempfile
-import json
 import copy
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
@@ -19,6 +18,13 @@ import shutil
 from docxtpl import DocxTemplate
 from docxcompose.composer import Composer
 
+from app.services.deadline import PRIORITY_LOW, as_deadline
+from app.services.profile_loader import load_resolved_profile
+from app.services.rule_plan import rule_plan_for
+from app.services.progress import null_progress, scale_progress
+from app.metrics.memory import check_memory_budget
+from app.metrics.timing import KIND_PASS, span
+
 # Импортируем XML-редактор для гибридного подхода
 try:
     from app.services.xml_document_editor import XMLDocumentEditor, apply_xml_corrections
@@ -63,6 +69,9 @@ class CorrectionReport:
     remaining_issues: int = 0
     passes_completed: int = 0
     max_passes: int = 3
+    # Коррекция прервана по бюджету времени; пропущенные проходы
+    incomplete: bool = False
+    skipped_passes: List[str] = field(default_factory=list)
     
     def add_action(self, action: CorrectionAction):
         """Добавляет действие в отчёт"""
@@ -79,6 +88,8 @@ class CorrectionReport:
             "total_issues_found": self.total_issues_found,
             "total_issues_fixed": self.total_issues_fixed,
             "remaining_issues": self.remaining_issues,
+            "incomplete": self.incomplete,
+            "skipped_passes": self.skipped_passes,
             "success_rate": round(self.total_issues_fixed / max(self.total_issues_found, 1) * 100, 2),
             "actions_by_phase": self._count_actions_by_phase(),
             "actions_by_type": self._count_actions_by_type(),
@@ -153,33 +164,17 @@ class DocumentCorrector:
         # Если профиль не передан, пытаемся загрузить стандартный
         if profile_data is None:
             try:
-                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                profile_path = os.path.join(base_dir, 'profiles', 'default_gost.json')
-                if os.path.exists(profile_path):
-                    with open(profile_path, 'r', encoding='utf-8') as f:
-                        profile_data = json.load(f)
+                profile_data = load_resolved_profile(fallback=None)
             except Exception as e:
                 print(f"Ошибка при загрузке стандартного профиля: {e}")
 
-        # Если все еще нет профиля, используем жестко заданный минимум (fallback)
-        if profile_data is None:
-            self.profile = {
-                'rules': {
-                    'font': {'name': 'Times New Roman', 'size': 14.0},
-                    'margins': {'left': 3.0, 'right': 1.5, 'top': 2.0, 'bottom': 2.0},
-                    'line_spacing': 1.5,
-                    'first_line_indent': 1.25,
-                    'headings': {
-                        'h1': {'font_size': 14.0, 'bold': True, 'alignment': 'CENTER', 'all_caps': True},
-                        'h2': {'font_size': 14.0, 'bold': True, 'alignment': 'LEFT'}
-                    }
-                }
-            }
-        else:
-            self.profile = profile_data
+        # Без профиля используются общие значения по умолчанию (rule_plan.DEFAULT_RULES)
+        self.profile = profile_data or {}
 
-        # Для удобства доступа к правилам
-        self.rules = self.profile.get('rules', {})
+        # Скомпилированные правила; self.rules — правила профиля вместе
+        # со значениями по умолчанию
+        self.rule_plan = rule_plan_for(self.profile)
+        self.rules = self.rule_plan.rules
         
         self.errors = []
         self.temp_files = []
@@ -212,7 +207,8 @@ class DocumentCorrector:
     # ============================================================================
     
     def correct_document_multipass(self, file_path: str, errors: List = None, 
-                                   out_path: str = None, max_passes: int = None) -> Tuple[str, CorrectionReport]:
+                                   out_path: str = None, max_passes: int = None,
+                                   progress=None, deadline=None) -> Tuple[str, CorrectionReport]:
         """
         Исправляет документ с использованием многопроходной коррекции.
         
@@ -226,12 +222,18 @@ class DocumentCorrector:
             errors: Список ошибок для исправления (опционально)
             out_path: Путь для сохранения (опционально)
             max_passes: Максимальное количество проходов (по умолчанию 3)
+            progress: Callback прогресса этапа correct (см. app.services.progress)
+            deadline: Бюджет времени (см. app.services.deadline). Первый проход
+                выполняется всегда; следующие проходы и XML-коррекция
+                пропускаются, если времени не осталось
             
         Returns:
             Tuple[str, CorrectionReport]: Путь к исправленному файлу и отчёт
         """
         if max_passes is None:
             max_passes = self.max_passes
+        progress = progress or null_progress
+        deadline = as_deadline(deadline)
         
         # Инициализируем отчёт
         self.correction_report = CorrectionReport(
@@ -260,31 +262,42 @@ class DocumentCorrector:
             # Сначала собираем информацию о проблемах
             initial_issues = self._analyze_document_issues(document)
             self.correction_report.total_issues_found = len(initial_issues)
+            progress('correct', 5, f"Найдено проблем: {len(initial_issues)}")
             
             if self.verbose_logging:
                 print(f"[MULTIPASS] Найдено проблем: {len(initial_issues)}")
             
             # Выполняем многопроходную коррекцию
             for pass_num in range(1, max_passes + 1):
+                if pass_num > 1 and not deadline.allows():
+                    self.correction_report.incomplete = True
+                    self.correction_report.skipped_passes.extend(
+                        f"pass_{skipped}" for skipped in range(pass_num, max_passes + 1)
+                    )
+                    break
+                
                 if self.verbose_logging:
                     print(f"\n[MULTIPASS] === Проход {pass_num}/{max_passes} ===")
                 
+                check_memory_budget(f"pass_{pass_num}")
                 issues_before = self._count_current_issues(document)
                 
                 # Определяем фазу в зависимости от номера прохода
-                if pass_num == 1:
-                    # Проход 1: Структура и стили
-                    self._execute_structure_pass(document)
-                elif pass_num == 2:
-                    # Проход 2: Детальное форматирование
-                    self._execute_formatting_pass(document)
-                else:
-                    # Проход 3+: Верификация и доработка
-                    self._execute_verification_pass(document)
+                with span(f"pass_{pass_num}", KIND_PASS):
+                    if pass_num == 1:
+                        # Проход 1: Структура и стили
+                        self._execute_structure_pass(document)
+                    elif pass_num == 2:
+                        # Проход 2: Детальное форматирование
+                        self._execute_formatting_pass(document)
+                    else:
+                        # Проход 3+: Верификация и доработка
+                        self._execute_verification_pass(document)
                 
                 self.correction_report.passes_completed = pass_num
                 
                 issues_after = self._count_current_issues(document)
+                progress('correct', 5 + 70 * pass_num / max_passes, f"Проход {pass_num}/{max_passes}")
                 
                 if self.verbose_logging:
                     print(f"[MULTIPASS] Проход {pass_num}: {issues_before} -> {issues_after} проблем")
@@ -301,21 +314,30 @@ class DocumentCorrector:
                         print("[MULTIPASS] Прогресса нет, завершаем.")
                     break
             
-            # Финальная верификация
-            self._run_final_verification(document)
+            # Финальная верификация (последняя контрольная точка бюджета памяти
+            # до записи файла)
+            check_memory_budget("final_verification")
+            with span("final_verification", KIND_PASS):
+                self._run_final_verification(document)
             
             # Сохраняем документ
-            document.save(out_path)
+            with span("save", KIND_PASS):
+                document.save(out_path)
             
             # === ГЛУБОКАЯ XML-КОРРЕКЦИЯ ===
             # Если остались проблемы, применяем прямую работу с XML
             remaining_before_xml = self._count_current_issues(Document(out_path))
-            if remaining_before_xml > 0 and XML_EDITOR_AVAILABLE and self.enable_xml_correction:
+            xml_needed = remaining_before_xml > 0 and XML_EDITOR_AVAILABLE and self.enable_xml_correction
+            if xml_needed and not deadline.allows(PRIORITY_LOW):
+                self.correction_report.incomplete = True
+                self.correction_report.skipped_passes.append("xml")
+            elif xml_needed:
                 if self.verbose_logging:
                     print(f"\n[XML] Применяем глубокую XML-коррекцию ({remaining_before_xml} проблем)...")
                 
                 try:
-                    self._execute_xml_deep_pass(out_path)
+                    with span("xml_deep", KIND_PASS):
+                        self._execute_xml_deep_pass(out_path, scale_progress(progress, 80, 95, 'correct'))
                     
                     # Проверяем результат
                     remaining_after_xml = self._count_current_issues(Document(out_path))
@@ -329,6 +351,7 @@ class DocumentCorrector:
             self.correction_report.end_time = datetime.datetime.now()
             remaining = self._count_current_issues(Document(out_path))
             self.correction_report.remaining_issues = remaining
+            progress('correct', 100, f"Осталось проблем: {remaining}")
             
             if self.verbose_logging:
                 print(f"\n[MULTIPASS] Готово! Осталось проблем: {remaining}")
@@ -341,7 +364,7 @@ class DocumentCorrector:
             print(f"Ошибка при многопроходной коррекции: {str(e)}")
             raise
     
-    def _execute_xml_deep_pass(self, file_path: str):
+    def _execute_xml_deep_pass(self, file_path: str, progress=None):
         """
         Выполняет глубокую XML-коррекцию документа.
         Напрямую редактирует XML внутри DOCX для исправления проблем,
@@ -354,20 +377,20 @@ class DocumentCorrector:
         
         with XMLDocumentEditor(file_path) as editor:
             # Устанавливаем правила из профиля
-            editor.gost_rules['font_name'] = self.rules.get('font', {}).get('name', 'Times New Roman')
-            editor.gost_rules['font_size'] = int(self.rules.get('font', {}).get('size', 14) * 2)  # В полупунктах
-            editor.gost_rules['line_spacing'] = int(self.rules.get('line_spacing', 1.5) * 240)  # В твипах
+            editor.gost_rules['font_name'] = self.rule_plan.font.name
+            editor.gost_rules['font_size'] = self.rule_plan.font.half_points
+            editor.gost_rules['line_spacing'] = self.rule_plan.line_spacing_twips
             # 1 см = 567 твипов, но Word округляет 1.25 см до 720 твипов для совместимости
             editor.gost_rules['first_line_indent'] = 720  # 1.25 см = 720 твипов (стандарт Word)
             
-            margins = self.rules.get('margins', {})
-            editor.gost_rules['left_margin'] = int(margins.get('left', 3.0) * 567)
-            editor.gost_rules['right_margin'] = int(margins.get('right', 1.5) * 567)
-            editor.gost_rules['top_margin'] = int(margins.get('top', 2.0) * 567)
-            editor.gost_rules['bottom_margin'] = int(margins.get('bottom', 2.0) * 567)
+            margins = self.rule_plan.margins
+            editor.gost_rules['left_margin'] = int(margins.left_cm * 567)
+            editor.gost_rules['right_margin'] = int(margins.right_cm * 567)
+            editor.gost_rules['top_margin'] = int(margins.top_cm * 567)
+            editor.gost_rules['bottom_margin'] = int(margins.bottom_cm * 567)
             
             # Применяем все XML-исправления
-            report = editor.fix_all()
+            report = editor.fix_all(progress)
             
             # Сохраняем
             editor.save(file_path)
@@ -402,33 +425,33 @@ class DocumentCorrector:
         # Проверяем шрифты
         for i, para in enumerate(document.paragraphs):
             for run in para.runs:
-                if run.font.name and run.font.name != self.rules.get('font', {}).get('name', 'Times New Roman'):
+                if run.font.name and run.font.name != self.rule_plan.font.name:
                     issues.append({
                         'type': 'font_name',
                         'element': 'paragraph',
                         'index': i,
                         'current': run.font.name,
-                        'expected': self.rules.get('font', {}).get('name', 'Times New Roman')
+                        'expected': self.rule_plan.font.name
                     })
-                if run.font.size and run.font.size != Pt(self.rules.get('font', {}).get('size', 14)):
+                if run.font.size and run.font.size != self.rule_plan.font.size:
                     issues.append({
                         'type': 'font_size',
                         'element': 'paragraph',
                         'index': i,
                         'current': run.font.size,
-                        'expected': Pt(self.rules.get('font', {}).get('size', 14))
+                        'expected': self.rule_plan.font.size
                     })
         
         # Проверяем интервалы
         for i, para in enumerate(document.paragraphs):
             pf = para.paragraph_format
-            if pf.line_spacing and pf.line_spacing != self.rules.get('line_spacing', 1.5):
+            if pf.line_spacing and pf.line_spacing != self.rule_plan.line_spacing:
                 issues.append({
                     'type': 'line_spacing',
                     'element': 'paragraph',
                     'index': i,
                     'current': pf.line_spacing,
-                    'expected': self.rules.get('line_spacing', 1.5)
+                    'expected': self.rule_plan.line_spacing
                 })
         
         # Проверяем поля
@@ -521,8 +544,8 @@ class DocumentCorrector:
         # Повторно проверяем и исправляем шрифты
         for i, para in enumerate(document.paragraphs):
             for run in para.runs:
-                expected_font = self.rules.get('font', {}).get('name', 'Times New Roman')
-                expected_size = Pt(self.rules.get('font', {}).get('size', 14))
+                expected_font = self.rule_plan.font.name
+                expected_size = self.rule_plan.font.size
                 
                 if run.font.name != expected_font:
                     old_value = run.font.name
@@ -545,7 +568,7 @@ class DocumentCorrector:
         # Повторно проверяем интервалы
         for i, para in enumerate(document.paragraphs):
             pf = para.paragraph_format
-            expected_spacing = self.rules.get('line_spacing', 1.5)
+            expected_spacing = self.rule_plan.line_spacing
             
             if pf.line_spacing != expected_spacing:
                 old_value = pf.line_spacing
@@ -569,7 +592,7 @@ class DocumentCorrector:
         
         # Проверка шрифтов
         font_issues = 0
-        expected_font = self.rules.get('font', {}).get('name', 'Times New Roman')
+        expected_font = self.rule_plan.font.name
         for para in document.paragraphs:
             for run in para.runs:
                 if run.font.name and run.font.name != expected_font:
@@ -581,7 +604,7 @@ class DocumentCorrector:
         
         # Проверка интервалов
         spacing_issues = 0
-        expected_spacing = self.rules.get('line_spacing', 1.5)
+        expected_spacing = self.rule_plan.line_spacing
         for para in document.paragraphs:
             if para.paragraph_format.line_spacing and para.paragraph_format.line_spacing != expected_spacing:
                 spacing_issues += 1
@@ -776,7 +799,7 @@ class DocumentCorrector:
             normal_style.paragraph_format.right_indent = Cm(0)
             normal_style.paragraph_format.space_before = Pt(0)
             normal_style.paragraph_format.space_after = Pt(0)
-            normal_style.paragraph_format.line_spacing = self.rules['line_spacing']
+            normal_style.paragraph_format.line_spacing = self.rule_plan.line_spacing
             normal_style.paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
             normal_style.paragraph_format.keep_together = False
             normal_style.paragraph_format.keep_with_next = False
@@ -816,7 +839,7 @@ class DocumentCorrector:
             heading_style.paragraph_format.keep_with_next = True
             heading_style.paragraph_format.keep_together = True
             # Полуторный интервал и для заголовков (требование общего межстрочного интервала)
-            heading_style.paragraph_format.line_spacing = self.rules['line_spacing']
+            heading_style.paragraph_format.line_spacing = self.rule_plan.line_spacing
             heading_style.paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
 
     def _parse_alignment(self, alignment_value):
@@ -856,7 +879,7 @@ class DocumentCorrector:
 
     def _set_style_font_defaults(self, style, font_size, *, bold=False, all_caps=False):
         """Применяет единый шрифт Times New Roman к стилю."""
-        font_name = self.rules['font']['name']
+        font_name = self.rule_plan.font.name
         style.font.name = font_name
         style.font.size = Pt(font_size)
         style.font.bold = bold
@@ -1106,25 +1129,25 @@ class DocumentCorrector:
                     for run in paragraph.runs:
                         try:
                             # Устанавливаем базовый шрифт для всех элементов
-                            if run.font.name != self.rules['font']['name']:
-                                run.font.name = self.rules['font']['name']
+                            if run.font.name != self.rule_plan.font.name:
+                                run.font.name = self.rule_plan.font.name
                             
                             if is_heading and heading_level == 1:
                                 # Для заголовков 1 уровня
-                                if run.font.size != Pt(self.rules['headings']['h1']['font_size']):
-                                    run.font.size = Pt(self.rules['headings']['h1']['font_size'])
-                                if run.font.bold != self.rules['headings']['h1']['bold']:
-                                    run.font.bold = self.rules['headings']['h1']['bold']
+                                if run.font.size != self.rule_plan.headings['h1'].font_size:
+                                    run.font.size = self.rule_plan.headings['h1'].font_size
+                                if run.font.bold != self.rule_plan.headings['h1'].bold:
+                                    run.font.bold = self.rule_plan.headings['h1'].bold
                             elif is_heading and heading_level == 2:
                                 # Для заголовков 2 уровня
-                                if run.font.size != Pt(self.rules['headings']['h2']['font_size']):
-                                    run.font.size = Pt(self.rules['headings']['h2']['font_size'])
-                                if run.font.bold != self.rules['headings']['h2']['bold']:
-                                    run.font.bold = self.rules['headings']['h2']['bold']
+                                if run.font.size != self.rule_plan.headings['h2'].font_size:
+                                    run.font.size = self.rule_plan.headings['h2'].font_size
+                                if run.font.bold != self.rule_plan.headings['h2'].bold:
+                                    run.font.bold = self.rule_plan.headings['h2'].bold
                             else:
                                 # Для обычного текста
-                                if run.font.size != Pt(self.rules['font']['size']):
-                                    run.font.size = Pt(self.rules['font']['size'])
+                                if run.font.size != self.rule_plan.font.size:
+                                    run.font.size = self.rule_plan.font.size
                         
                         except Exception as e:
                             print(f"ОШИБКА при установке шрифта для run: {str(e)}")
@@ -1146,10 +1169,10 @@ class DocumentCorrector:
         # Устанавливаем правильные поля для всех секций документа
         for section in document.sections:
             # Устанавливаем значения полей в сантиметрах
-            section.top_margin = Cm(self.rules['margins']['top'])
-            section.bottom_margin = Cm(self.rules['margins']['bottom'])
-            section.left_margin = Cm(self.rules['margins']['left'])
-            section.right_margin = Cm(self.rules['margins']['right'])
+            section.top_margin = self.rule_plan.margins.top
+            section.bottom_margin = self.rule_plan.margins.bottom
+            section.left_margin = self.rule_plan.margins.left
+            section.right_margin = self.rule_plan.margins.right
             
             # Устанавливаем стандартную ориентацию страницы
             section.orientation = 0  # 0 - портретная ориентация
@@ -1185,8 +1208,8 @@ class DocumentCorrector:
                     pf = paragraph.paragraph_format
                     
                     # Устанавливаем полуторный интервал (1.5) для всех абзацев, включая заголовки
-                    if pf.line_spacing != self.rules['line_spacing']:
-                        pf.line_spacing = self.rules['line_spacing']
+                    if pf.line_spacing != self.rule_plan.line_spacing:
+                        pf.line_spacing = self.rule_plan.line_spacing
                         pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
 
                     # Для обычного текста сбрасываем интервалы до/после; для заголовков их задают стили
@@ -1235,7 +1258,7 @@ class DocumentCorrector:
                 continue
                 
             # Принудительно устанавливаем отступ первой строки 1.25 см для остальных параграфов
-            paragraph.paragraph_format.first_line_indent = Cm(self.rules.get('first_line_indent', 1.25))
+            paragraph.paragraph_format.first_line_indent = self.rule_plan.first_line_indent
             
             # Сбрасываем другие отступы, которые могут мешать
             paragraph.paragraph_format.left_indent = Cm(0)
@@ -1260,7 +1283,7 @@ class DocumentCorrector:
                                 else:
                                     # Для остальных строк - только если отступа нет
                                     if paragraph.paragraph_format.first_line_indent is None or paragraph.paragraph_format.first_line_indent == Cm(0):
-                                        paragraph.paragraph_format.first_line_indent = Cm(self.rules.get('first_line_indent', 1.25))
+                                        paragraph.paragraph_format.first_line_indent = self.rule_plan.first_line_indent
                                 
                                 # НЕ трогаем left/right indent в таблицах!
                                 # paragraph.paragraph_format.left_indent = Cm(0)
@@ -1402,13 +1425,13 @@ class DocumentCorrector:
                         
                         # Форматирование шрифта заголовка
                         for run in paragraph.runs:
-                            run.font.name = self.rules['font']['name']
+                            run.font.name = self.rule_plan.font.name
                             if level == 1:
-                                run.font.size = Pt(self.rules['headings']['h1']['font_size'])
-                                run.font.bold = self.rules['headings']['h1']['bold']
+                                run.font.size = self.rule_plan.headings['h1'].font_size
+                                run.font.bold = self.rule_plan.headings['h1'].bold
                             elif level == 2:
-                                run.font.size = Pt(self.rules['headings']['h2']['font_size'])
-                                run.font.bold = self.rules['headings']['h2']['bold']
+                                run.font.size = self.rule_plan.headings['h2'].font_size
+                                run.font.bold = self.rule_plan.headings['h2'].bold
                             else:
                                 run.font.size = Pt(14)
                                 run.font.bold = True
@@ -1680,10 +1703,10 @@ class DocumentCorrector:
                                 try:
                                     # Устанавливаем шрифт
                                     for run in paragraph.runs:
-                                        if run.font.name != self.rules['font']['name']:
-                                            run.font.name = self.rules['font']['name']
-                                        if run.font.size != Pt(self.rules['font']['size']):
-                                            run.font.size = Pt(self.rules['font']['size'])
+                                        if run.font.name != self.rule_plan.font.name:
+                                            run.font.name = self.rule_plan.font.name
+                                        if run.font.size != self.rule_plan.font.size:
+                                            run.font.size = self.rule_plan.font.size
                                     
                                     # Выравнивание: только если не задано явно
                                     if paragraph.paragraph_format.alignment is None or paragraph.paragraph_format.alignment == WD_PARAGRAPH_ALIGNMENT.LEFT:
@@ -1693,14 +1716,14 @@ class DocumentCorrector:
                                     if row_idx > 0 and not is_merged:
                                         # Проверяем, не задан ли уже отступ
                                         if paragraph.paragraph_format.first_line_indent is None or paragraph.paragraph_format.first_line_indent == Cm(0):
-                                            paragraph.paragraph_format.first_line_indent = Cm(self.rules.get('first_line_indent', 1.25))
+                                            paragraph.paragraph_format.first_line_indent = self.rule_plan.first_line_indent
                                     elif row_idx == 0:
                                         # Для первой строки (заголовок) - явно убираем отступ
                                         paragraph.paragraph_format.first_line_indent = Cm(0)
                                     
                                     # Межстрочный интервал - аккуратно
                                     if paragraph.paragraph_format.line_spacing_rule != WD_LINE_SPACING.MULTIPLE:
-                                        paragraph.paragraph_format.line_spacing = self.rules['line_spacing']
+                                        paragraph.paragraph_format.line_spacing = self.rule_plan.line_spacing
                                         paragraph.paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
                                     
                                     # Убираем интервалы ДО и ПОСЛЕ только внутри ячеек
@@ -1943,8 +1966,8 @@ class DocumentCorrector:
                             pf.first_line_indent = Cm(-0.5)  # Обратный отступ для маркера
                         
                         # Устанавливаем межстрочный интервал
-                        if pf.line_spacing != self.rules['line_spacing']:
-                            pf.line_spacing = self.rules['line_spacing']
+                        if pf.line_spacing != self.rule_plan.line_spacing:
+                            pf.line_spacing = self.rule_plan.line_spacing
                             pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
                         
                         # Выравнивание по ширине только если не установлено
@@ -1953,10 +1976,10 @@ class DocumentCorrector:
                         
                         # Шрифт для элементов списка - БЕЗ УДАЛЕНИЯ RUNS
                         for run in paragraph.runs:
-                            if run.font.name != self.rules['font']['name']:
-                                run.font.name = self.rules['font']['name']
-                            if run.font.size != Pt(self.rules['font']['size']):
-                                run.font.size = Pt(self.rules['font']['size'])
+                            if run.font.name != self.rule_plan.font.name:
+                                run.font.name = self.rule_plan.font.name
+                            if run.font.size != self.rule_plan.font.size:
+                                run.font.size = self.rule_plan.font.size
                 
                 except Exception as e:
                     print(f"ОШИБКА при обработке элемента списка '{paragraph.text[:50]}...': {str(e)}")
@@ -2027,10 +2050,10 @@ class DocumentCorrector:
                         
                         # Восстанавливаем форматирование шрифта БЕЗ УНИЧТОЖЕНИЯ runs
                         for run in paragraph.runs:
-                            if run.font.name != self.rules['font']['name']:
-                                run.font.name = self.rules['font']['name']
-                            if run.font.size != Pt(self.rules['font']['size']):
-                                run.font.size = Pt(self.rules['font']['size'])
+                            if run.font.name != self.rule_plan.font.name:
+                                run.font.name = self.rule_plan.font.name
+                            if run.font.size != self.rule_plan.font.size:
+                                run.font.size = self.rule_plan.font.size
                 
                 except Exception as e:
                     print(f"ОШИБКА при обработке буквенного перечисления '{text[:50]}...': {str(e)}")
@@ -2262,10 +2285,10 @@ class DocumentCorrector:
                         
                         # Проверяем шрифт
                         for run in paragraph.runs:
-                            if run.font.name != self.rules['font']['name']:
-                                run.font.name = self.rules['font']['name']
-                            if run.font.size != Pt(self.rules['font']['size']):
-                                run.font.size = Pt(self.rules['font']['size'])
+                            if run.font.name != self.rule_plan.font.name:
+                                run.font.name = self.rule_plan.font.name
+                            if run.font.size != self.rule_plan.font.size:
+                                run.font.size = self.rule_plan.font.size
                                 
         except Exception as e:
             print(f"ОШИБКА при исправлении формул: {str(e)}")
@@ -2363,8 +2386,8 @@ class DocumentCorrector:
                 
                 # Шрифт
                 for run in paragraph.runs:
-                    run.font.name = self.rules['font']['name']
-                    run.font.size = Pt(self.rules['font']['size'])
+                    run.font.name = self.rule_plan.font.name
+                    run.font.size = self.rule_plan.font.size
                     
                 # Проверка на наличие года издания (простая эвристика)
                 # ГОСТ требует указывать год, например: 2023.
@@ -2410,23 +2433,23 @@ class DocumentCorrector:
                     if paragraph.style.name.startswith('TOC'):
                         # Устанавливаем шрифт
                         for run in paragraph.runs:
-                            run.font.name = self.rules['font']['name']
-                            run.font.size = Pt(self.rules['font']['size'])
+                            run.font.name = self.rule_plan.font.name
+                            run.font.size = self.rule_plan.font.size
                             run.font.bold = False
                             run.font.italic = False
                         
                         # Устанавливаем интервал
-                        paragraph.paragraph_format.line_spacing = self.rules['line_spacing']
+                        paragraph.paragraph_format.line_spacing = self.rule_plan.line_spacing
                         paragraph.paragraph_format.space_after = Pt(0)
                         paragraph.paragraph_format.space_before = Pt(0)
                     elif paragraph.text.strip():
                         # Если стиль не TOC, но это часть оглавления (например, вручную сделанное)
                         # Проверяем наличие номеров страниц (цифры в конце строки)
                         if re.search(r'\d+$', paragraph.text.strip()):
-                            paragraph.paragraph_format.line_spacing = self.rules['line_spacing']
+                            paragraph.paragraph_format.line_spacing = self.rule_plan.line_spacing
                             for run in paragraph.runs:
-                                run.font.name = self.rules['font']['name']
-                                run.font.size = Pt(self.rules['font']['size'])
+                                run.font.name = self.rule_plan.font.name
+                                run.font.size = self.rule_plan.font.size
                         else:
                             # Возможно, оглавление закончилось
                             pass
@@ -2513,10 +2536,10 @@ class DocumentCorrector:
                             
                             # Восстанавливаем форматирование шрифта
                             for run in paragraph.runs:
-                                if run.font.name != self.rules['font']['name']:
-                                    run.font.name = self.rules['font']['name']
-                                if run.font.size != Pt(self.rules['font']['size']):
-                                    run.font.size = Pt(self.rules['font']['size'])
+                                if run.font.name != self.rule_plan.font.name:
+                                    run.font.name = self.rule_plan.font.name
+                                if run.font.size != self.rule_plan.font.size:
+                                    run.font.size = self.rule_plan.font.size
                         
                         # Для подписей к рисункам и таблицам применяем специальное форматирование
                         elif re.match(r'^(рисунок|рис\.)', text.lower()):
@@ -2601,8 +2624,8 @@ class DocumentCorrector:
                 # Используем основной стиль текста документа
                 for run in paragraph.runs:
                     # Устанавливаем стандартный шрифт и размер
-                    run.font.name = self.rules['font']['name']
-                    run.font.size = Pt(self.rules['font']['size'])
+                    run.font.name = self.rule_plan.font.name
+                    run.font.size = self.rule_plan.font.size
                     
                     # Сбрасываем жирность и курсив
                     run.font.bold = False
@@ -2656,7 +2679,7 @@ class DocumentCorrector:
                                 
                                 # Форматируем шрифт сноски (обычно шрифт для сносок - 10pt)
                                 for run in p.runs:
-                                    run.font.name = self.rules['font']['name']
+                                    run.font.name = self.rule_plan.font.name
                                     run.font.size = Pt(10)  # Размер шрифта для сносок
                                     
                                     # Убираем курсив из URL (если это не ГОСТ)
@@ -2674,7 +2697,7 @@ class DocumentCorrector:
                         
                         # Форматируем шрифт сноски
                         for run in para.runs:
-                            run.font.name = self.rules['font']['name']
+                            run.font.name = self.rule_plan.font.name
                             run.font.size = Pt(10)  # Размер шрифта для сносок
                             
                             # Убираем курсив из URL
@@ -3027,8 +3050,8 @@ class DocumentCorrector:
                 
                 # Восстанавливаем форматирование после изменения текста
                 for run in paragraph.runs:
-                    run.font.name = self.rules['font']['name']
-                    run.font.size = Pt(self.rules['font']['size'])
+                    run.font.name = self.rule_plan.font.name
+                    run.font.size = self.rule_plan.font.size
             
             # Проверяем использование сокращений в тексте
             self._check_abbreviations_usage(document, abbreviations_dict)
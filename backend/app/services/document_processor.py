@@ -16,12 +16,12 @@ import os
 import json
 import uuid
 from docx import Document
-from docx.shared import Pt, Cm
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
+from app.config.security import MAX_UPLOAD_SIZE
 from .norm_control_checker import NormControlChecker
 from .document_corrector import DocumentCorrector
-from datetime import datetime
+from .progress import null_progress
 import shutil
 import tempfile
 import logging
@@ -42,7 +42,7 @@ class DocumentProcessor:
     
     # Константы класса
     ALLOWED_EXTENSIONS: List[str] = ['.docx']
-    MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
+    MAX_FILE_SIZE: int = MAX_UPLOAD_SIZE
     
     @staticmethod
     def is_valid_file(file_obj: Any) -> bool:
@@ -318,71 +318,40 @@ class DocumentProcessor:
             except Exception as e:
                 logger.warning(f"Ошибка при удалении временного файла: {str(e)}")
 
-    def extract_data(self):
+    def extract_data(self, progress=None):
         """
         Извлекает все необходимые данные из документа для анализа
+        
+        Args:
+            progress: Callback прогресса (см. app.services.progress)
         """
+        progress = progress or null_progress
         document_data = {}
         
         # Извлекаем разные типы данных, защищая каждый вызов от ошибок
-        try:
-            document_data['paragraphs'] = self._extract_paragraphs()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении параграфов: {str(e)}")
-            document_data['paragraphs'] = []
-            
-        try:
-            document_data['tables'] = self._extract_tables()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении таблиц: {str(e)}")
-            document_data['tables'] = []
-            
-        try:
-            document_data['headings'] = self._extract_headings()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении заголовков: {str(e)}")
-            document_data['headings'] = []
-            
-        try:
-            document_data['bibliography'] = self._extract_bibliography()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении библиографии: {str(e)}")
-            document_data['bibliography'] = []
-            
-        try:
-            document_data['styles'] = self._extract_styles()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении стилей: {str(e)}")
-            document_data['styles'] = {}
-            
-        try:
-            document_data['page_setup'] = self._extract_page_setup()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении настроек страницы: {str(e)}")
-            document_data['page_setup'] = {}
-            
-        try:
-            document_data['images'] = self._extract_images()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении изображений: {str(e)}")
-            document_data['images'] = []
-            
-        try:
-            document_data['page_numbers'] = self._extract_page_numbers()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении нумерации страниц: {str(e)}")
-            document_data['page_numbers'] = {
+        steps = (
+            ('paragraphs', self._extract_paragraphs, list, 'параграфов'),
+            ('tables', self._extract_tables, list, 'таблиц'),
+            ('headings', self._extract_headings, list, 'заголовков'),
+            ('bibliography', self._extract_bibliography, list, 'библиографии'),
+            ('styles', self._extract_styles, dict, 'стилей'),
+            ('page_setup', self._extract_page_setup, dict, 'настроек страницы'),
+            ('images', self._extract_images, list, 'изображений'),
+            ('page_numbers', self._extract_page_numbers, lambda: {
                 'has_page_numbers': False,
                 'position': None,
                 'first_numbered_page': None,
                 'alignment': None
-            }
-            
-        try:
-            document_data['document_properties'] = self._extract_document_properties()
-        except Exception as e:
-            logger.error(f"Ошибка при извлечении свойств документа: {str(e)}")
-            document_data['document_properties'] = {}
+            }, 'нумерации страниц'),
+            ('document_properties', self._extract_document_properties, dict, 'свойств документа'),
+        )
+        for index, (key, extractor, default, label) in enumerate(steps, start=1):
+            try:
+                document_data[key] = extractor()
+            except Exception as e:
+                logger.error(f"Ошибка при извлечении {label}: {str(e)}")
+                document_data[key] = default()
+            progress('extract', index / len(steps) * 100, f"Извлечение {label}")
             
         # Выделяем титульный лист
         document_data['title_page'] = self._extract_title_page(document_data.get('paragraphs', []))
@@ -964,6 +933,9 @@ class DocumentProcessor:
         """
         Генерирует DOCX-отчет по результатам проверки.
 
+        Отчет строится через report_service и кэшируется по хешу результатов;
+        для отложенной генерации используйте report_service.register_report().
+
         Args:
             check_results: словарь с ключами как минимум 'issues', 'total_issues_count', 'statistics',
                            а также 'rules_results' (если есть) — см. NormControlChecker.check_document().
@@ -973,94 +945,13 @@ class DocumentProcessor:
             str: относительный путь от корня backend до созданного файла (например, 'app/static/reports/report_...docx').
         """
         try:
-            # Каталог для отчетов внутри backend/app/static/reports
-            backend_root = Path(__file__).resolve().parents[2]  # .../backend
-            reports_dir = backend_root / 'app' / 'static' / 'reports'
-            reports_dir.mkdir(parents=True, exist_ok=True)
-
-            # Имя файла отчета
-            base_name = Path(original_filename).stem or 'document'
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            report_filename = f"report_{base_name}_{timestamp}.docx"
-            report_path = reports_dir / report_filename
-
-            # Создание документа
-            doc = Document()
-
-            # Заголовок
-            title = doc.add_paragraph()
-            run = title.add_run("Отчет о проверке документа")
-            run.bold = True
-            run.font.size = Pt(16)
-            title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-            # Информация о документе
-            doc.add_paragraph("")
-            meta = doc.add_paragraph()
-            meta.add_run("Исходный файл: ").bold = True
-            meta.add_run(original_filename)
-            meta2 = doc.add_paragraph()
-            meta2.add_run("Дата генерации: ").bold = True
-            meta2.add_run(datetime.now().strftime('%d.%m.%Y %H:%M:%S'))
-
-            # Резюме
-            doc.add_paragraph("")
-            doc.add_paragraph("Итоги проверки:").runs[0].bold = True
-            total_issues = int(check_results.get('total_issues_count') or check_results.get('statistics', {}).get('total_issues') or 0)
-            stats = check_results.get('statistics', {}) or {}
-            severity = stats.get('severity', {}) or {}
-            auto_fixable = stats.get('auto_fixable_count', 0)
-
-            summary = doc.add_paragraph()
-            summary.add_run(f"Всего несоответствий: {total_issues}\n")
-            summary.add_run(f"Критические: {severity.get('high', 0)}; ")
-            summary.add_run(f"Средние: {severity.get('medium', 0)}; ")
-            summary.add_run(f"Незначительные: {severity.get('low', 0)}\n")
-            summary.add_run(f"Автоматически исправимых: {auto_fixable}")
-
-            # Список проблем (группируем по типу/описанию для компактности)
-            issues = check_results.get('issues', []) or []
-            if issues:
-                doc.add_paragraph("")
-                doc.add_paragraph("Детализация проблем:").runs[0].bold = True
-
-                # Группировка одинаковых проблем по (type, description)
-                grouped = {}
-                for issue in issues:
-                    key = (issue.get('type', ''), issue.get('description', ''))
-                    if key not in grouped:
-                        grouped[key] = {
-                            'severity': issue.get('severity', 'low'),
-                            'auto_fixable': bool(issue.get('auto_fixable', False)),
-                            'locations': []
-                        }
-                    loc = issue.get('location')
-                    if loc:
-                        grouped[key]['locations'].append(loc)
-
-                # Выводим по группам
-                for (itype, desc), data in grouped.items():
-                    p = doc.add_paragraph()
-                    p.style = doc.styles['List Bullet'] if 'List Bullet' in doc.styles else None
-                    header = f"[{data['severity']}] {desc or itype}"
-                    if data['auto_fixable']:
-                        header += " (автоисправимо)"
-                    p.add_run(header).bold = False
-                    # Локации при наличии
-                    if data['locations']:
-                        loc_line = ", ".join(sorted(set(data['locations'])))
-                        doc.add_paragraph(f"Места: {loc_line}")
-            else:
-                doc.add_paragraph("")
-                ok = doc.add_paragraph("Несоответствия не обнаружены.")
-                ok.runs[0].bold = True
+            from .report_service import BACKEND_ROOT, get_report_file, register_report
 
-            # Сохранение файла
-            doc.save(str(report_path))
+            report_id = register_report(check_results, original_filename)
+            report_path = Path(get_report_file(report_id, 'docx'))
 
             # Возвращаем относительный путь от backend корня — так ожидает download-report
-            rel_path = str(report_path.relative_to(backend_root)).replace('\\', '/')
-            return rel_path
+            return str(report_path.relative_to(BACKEND_ROOT)).replace('\\', '/')
         except Exception as e:
             logger.error(f"Ошибка при генерации отчета: {e}")
             raise
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Отдача сохранённых артефактов (исправленные документы, отчёты).
+
+- сильный ETag из SHA-256 содержимого (см. ``content_hash``);
+- поддержка ``If-None-Match`` и ``Range`` через условные ответы werkzeug;
+- опциональная передача отдачи фронт-прокси через ``X-Accel-Redirect`` (nginx)
+  или ``X-Sendfile`` (Apache/lighttpd);
+- кэш разрешения пути запроса в путь на диске.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from urllib.parse import quote
+
+from flask import Response, current_app, request, send_file
+
+from app.services.content_hash import get_file_digest, forget_digest
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Максимальное количество закэшированных разрешений путей
+MAX_RESOLVED_PATHS = 1024
+
+_resolved_paths: "OrderedDict[str, str]" = OrderedDict()
+_resolved_lock = threading.Lock()
+
+
+def resolve_path_cached(cache_key: str, resolver: Callable[[], Optional[str]]) -> Optional[str]:
+    """
+    Возвращает путь к файлу, используя кэш разрешений.
+
+    При попадании в кэш выполняется одна проверка существования файла вместо
+    перебора всех кандидатов; если файл пропал, путь разрешается заново.
+
+    Args:
+        cache_key: Ключ запроса (например, ``'corrected:<path>'``)
+        resolver: Функция, перебирающая кандидатов и возвращающая путь или None
+    """
+    with _resolved_lock:
+        cached = _resolved_paths.get(cache_key)
+
+    if cached and os.path.isfile(cached):
+        with _resolved_lock:
+            if cache_key in _resolved_paths:
+                _resolved_paths.move_to_end(cache_key)
+        return cached
+
+    full_path = resolver()
+    with _resolved_lock:
+        if full_path and os.path.isfile(full_path):
+            _resolved_paths[cache_key] = full_path
+            _resolved_paths.move_to_end(cache_key)
+            while len(_resolved_paths) > MAX_RESOLVED_PATHS:
+                _resolved_paths.popitem(last=False)
+        else:
+            _resolved_paths.pop(cache_key, None)
+    return full_path
+
+
+def forget_path(full_path: str) -> None:
+    """Удаляет файл из кэшей разрешения путей и хешей (после удаления файла)."""
+    abs_path = os.path.abspath(full_path)
+    with _resolved_lock:
+        stale_keys = [key for key, value in _resolved_paths.items() if os.path.abspath(value) == abs_path]
+        for key in stale_keys:
+            del _resolved_paths[key]
+    forget_digest(full_path)
+
+
+def _accel_location(full_path: str) -> Optional[str]:
+    """
+    Внутренний URI nginx для X-Accel-Redirect.
+
+    Returns:
+        str: prefix + путь относительно DOWNLOAD_OFFLOAD_ROOT; None — файл вне
+        корня (путь вида ../, символическая ссылка), такой файл отдаётся самим
+        приложением
+    """
+    root = os.path.realpath(current_app.config.get('DOWNLOAD_OFFLOAD_ROOT') or BASE_DIR)
+    real_path = os.path.realpath(full_path)
+    try:
+        inside = os.path.commonpath([root, real_path]) == root
+    except ValueError:
+        inside = False
+    if not inside:
+        current_app.logger.warning(f"Файл {full_path} вне DOWNLOAD_OFFLOAD_ROOT, отдаётся без X-Accel-Redirect")
+        return None
+
+    prefix = current_app.config.get('DOWNLOAD_OFFLOAD_PREFIX', '/protected/')
+    relative = os.path.relpath(real_path, root).replace('\\', '/')
+    return prefix.rstrip('/') + '/' + quote(relative)
+
+
+def _offloaded_response(header: str, value: str, download_name: str, mimetype: str,
+                        etag: Optional[str]) -> Response:
+    """Формирует пустой ответ, тело которого отдаст фронт-прокси."""
+    response = Response(status=200, mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        f"attachment; filename*=UTF-8''{quote(download_name)}"
+    )
+    if etag:
+        response.set_etag(etag)
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+    response.headers[header] = value
+    return response
+
+
+def send_artifact(full_path: str, download_name: str, mimetype: str = DOCX_MIMETYPE) -> Response:
+    """
+    Отправляет файл с сильным ETag и поддержкой условных/частичных запросов.
+
+    Args:
+        full_path: Абсолютный путь к файлу
+        download_name: Имя файла для Content-Disposition
+        mimetype: MIME-тип
+    """
+    etag = get_file_digest(full_path)
+
+    mode = current_app.config.get('DOWNLOAD_OFFLOAD')
+    if mode == 'x-accel':
+        location = _accel_location(full_path)
+        if location is not None:
+            return _offloaded_response('X-Accel-Redirect', location, download_name, mimetype, etag)
+    elif mode == 'x-sendfile':
+        return _offloaded_response('X-Sendfile', full_path, download_name, mimetype, etag)
+
+    response = send_file(
+        path_or_file=full_path,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype,
+        conditional=True,
+        etag=etag if etag else True,
+        max_age=current_app.config.get('DOWNLOAD_CACHE_MAX_AGE', 0),
+    )
+    # werkzeug объявляет поддержку Range только в ответе на Range-запрос;
+    # сообщаем о ней сразу, чтобы клиент мог докачивать файл
+    response.accept_ranges = 'bytes'
+    return response
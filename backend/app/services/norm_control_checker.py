@@ -1,12 +1,17 @@
 import os
 import re
-import json
-from typing import Dict, Any, List, Optional, Tuple, Union
-from docx.shared import Pt, Cm
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from collections import defaultdict
 from pathlib import Path
 
+from .deadline import PRIORITY_LOW, PRIORITY_NORMAL, as_deadline
+from .profile_loader import load_resolved_profile
+from .rule_plan import DEFAULT_PLAN, RulePlan, rule_plan_for
+from .progress import null_progress
+from app.metrics.memory import check_memory_budget
+from app.metrics.timing import KIND_RULE, span
+
 # Type aliases для улучшения читаемости
 DocumentData = Dict[str, Any]
 IssueDict = Dict[str, Any]
@@ -16,6 +21,17 @@ CheckResult = Dict[str, Any]
 # Директория с профилями
 PROFILES_DIR = Path(__file__).parent.parent.parent / 'profiles'
 
+# Базовые паттерны библиографических записей (скомпилированы один раз)
+BIBLIOGRAPHY_PATTERNS = {
+    'one_author': re.compile(r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.\s.*\s[–—-]\s.*,\s\d{4}\.\s[–—-]\s\d+\sс\.?$'),
+    '2_3_authors': re.compile(r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\..*\s[–—-]\s.*,\s\d{4}\.\s[–—-]\s\d+\sс\.?$'),
+    '4_authors': re.compile(r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\..*$'),
+    '5_plus_authors': re.compile(r'^.*\[и\sдр\.\].*$'),
+    'web_resource': re.compile(r'^.*\s?\[Электронный\sресурс\]\s?.*URL:\s.+\s\(дата\sобращения:?\s\d{2}\.\d{2}\.\d{4}\)\.?$'),
+    'law': re.compile(r'^.*(закон|постановление|указ|кодекс).*от\s\d{2}\.\d{2}\.\d{4}.*№.*$'),
+    'gost': re.compile(r'^ГОСТ\s.*[–—-]\s\d{4}.*$')
+}
+
 # === NORM_RULES: 30 нормоконтрольных правил ===
 NORM_RULES = [
     {"id": 1, "name": "Наименование темы работы", "description": "Тема соответствует утвержденной приказом.", "checker": "_check_topic_title"},    {"id": 2, "name": "Размер шрифта", "description": "Размер основного шрифта — 14pt. Для листингов кода допустим 12pt.", "checker": "_check_font"},
@@ -49,6 +65,12 @@ NORM_RULES = [
     {"id": 30, "name": "Библиографические ссылки", "description": "[5], [1, с. 28] и т.д.", "checker": "_check_bibliography_references"},
 ]
 
+# Нормы, которые первыми пропускаются при нехватке времени (см. app.services.deadline);
+# остальные имеют приоритет normal и пропускаются, только когда бюджет исчерпан
+RULE_PRIORITIES = {
+    rule_id: PRIORITY_LOW for rule_id in (1, 7, 14, 16, 18, 19, 20, 22, 23)
+}
+
 class NormControlChecker:
     """
     Класс для проверки документа на соответствие требованиям нормоконтроля
@@ -73,7 +95,8 @@ class NormControlChecker:
             profile_data: Данные профиля напрямую (имеет приоритет над profile_id)
         """
         # Загружаем базовые стандартные правила
-        self.standard_rules = self._get_default_rules()
+        self.rule_plan = DEFAULT_PLAN
+        self.standard_rules = self._rules_from_plan(self.rule_plan)
         
         # Применяем профиль, если указан
         self.profile = None
@@ -84,15 +107,9 @@ class NormControlChecker:
         elif profile_id:
             self._load_and_apply_profile(profile_id)
         
-        # Улучшенные паттерны для проверки литературы
+        # Паттерны для проверки литературы: шаблоны профиля дополняют базовые
         self.bibliography_patterns = {
-            'one_author': r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.\s.*\s[–—-]\s.*,\s\d{4}\.\s[–—-]\s\d+\sс\.?$',
-            '2_3_authors': r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\..*\s[–—-]\s.*,\s\d{4}\.\s[–—-]\s\d+\sс\.?$',
-            '4_authors': r'^[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\.,\s[А-Я][а-я]+,\s[А-Я]\.\s?[А-Я]\..*$',
-            '5_plus_authors': r'^.*\[и\sдр\.\].*$',
-            'web_resource': r'^.*\s?\[Электронный\sресурс\]\s?.*URL:\s.+\s\(дата\sобращения:?\s\d{2}\.\d{2}\.\d{4}\)\.?$',
-            'law': r'^.*(закон|постановление|указ|кодекс).*от\s\d{2}\.\d{2}\.\d{4}.*№.*$',
-            'gost': r'^ГОСТ\s.*[–—-]\s\d{4}.*$'
+            **BIBLIOGRAPHY_PATTERNS, **self.rule_plan.bibliography.patterns
         }
         
         # Типовые сообщения об ошибках
@@ -103,137 +120,60 @@ class NormControlChecker:
             '5_plus_authors': "Неправильное оформление источника с 5 и более авторами. Должно содержать '[и др.]'.",
             'web_resource': "Неправильное оформление интернет-ресурса. Должно содержать '[Электронный ресурс]', 'URL:' и '(дата обращения: ДД.ММ.ГГГГ)'.",
             'law': "Неправильное оформление законодательного акта. Должно содержать тип документа, дату и номер.",
-            'gost': "Неправильное оформление ГОСТа. Должно быть: 'ГОСТ Номер–Год...'."
+            'gost': "Неправильное оформление ГОСТа. Должно быть: 'ГОСТ Номер–Год...'.",
+            **self.rule_plan.bibliography.messages,
         }
     
-    def _get_default_rules(self):
-        """Возвращает базовые правила ГОСТ по умолчанию"""
+    @staticmethod
+    def _rules_from_plan(plan: RulePlan) -> Dict[str, Any]:
+        """Правила плана в виде словаря standard_rules"""
         return {
-            'font': {
-                'name': 'Times New Roman',
-                'size': 14.0,  # pt
-            },
+            'font': {'name': plan.font.name, 'size': plan.font.size_pt},
             'margins': {
-                'left': 3.0,  # cm
-                'right': 1.5,  # cm
-                'top': 2.0,  # cm
-                'bottom': 2.0,  # cm
+                'left': plan.margins.left_cm,
+                'right': plan.margins.right_cm,
+                'top': plan.margins.top_cm,
+                'bottom': plan.margins.bottom_cm,
             },
-            'line_spacing': 1.5,
-            'first_line_indent': Cm(1.25),
+            'line_spacing': plan.line_spacing,
+            'first_line_indent': plan.first_line_indent,
             'headings': {
-                'h1': {
-                    'font_size': 16.0,  # pt
-                    'bold': True,
-                    'alignment': WD_PARAGRAPH_ALIGNMENT.CENTER,
-                    'all_caps': True
-                },
-                'h2': {
-                    'font_size': 14.0,  # pt
-                    'bold': True,
-                    'alignment': WD_PARAGRAPH_ALIGNMENT.LEFT
+                level: {
+                    'font_size': heading.font_size_pt,
+                    'bold': heading.bold,
+                    'alignment': heading.alignment,
+                    'all_caps': heading.all_caps,
                 }
+                for level, heading in plan.headings.items()
             },
-            'required_sections': [
-                'введение', 
-                'заключение', 
-                'список литературы', 
-                'содержание',
-                'цель',
-                'задачи'
-            ],
+            'required_sections': list(plan.required_sections),
             'bibliography': {
-                'min_sources': 15,
-                'max_age_years': 5
-            }
+                'min_sources': plan.bibliography.min_sources,
+                'max_age_years': plan.bibliography.max_age_years,
+            },
         }
     
     def _load_and_apply_profile(self, profile_id):
         """Загружает профиль из файла и применяет его"""
         try:
-            profile_path = PROFILES_DIR / f"{profile_id}.json"
-            
-            if not profile_path.exists():
-                # Пробуем default_gost как fallback
-                profile_path = PROFILES_DIR / "default_gost.json"
-            
-            if profile_path.exists():
-                with open(profile_path, 'r', encoding='utf-8') as f:
-                    profile_data = json.load(f)
+            # Если профиля нет, используется default_gost. Разрешённый
+            # профиль общий для всех проверок и не копируется
+            profile_data = load_resolved_profile(profile_id)
+            if profile_data:
                 self._apply_profile(profile_data)
         except Exception as e:
             # Если не удалось загрузить, используем базовые правила
             logger.error(f"Ошибка загрузки профиля {profile_id}: {e}")
     
     def _apply_profile(self, profile_data):
-        """Применяет правила из профиля к standard_rules"""
+        """Применяет профиль: компилирует план правил (см. app.services.rule_plan)"""
         if not profile_data:
             return
             
         self.profile = profile_data
         self.profile_name = profile_data.get('name', 'Пользовательский профиль')
-        
-        rules = profile_data.get('rules', {})
-        
-        # Применяем правила шрифта
-        if 'font' in rules:
-            font_rules = rules['font']
-            if 'name' in font_rules:
-                self.standard_rules['font']['name'] = font_rules['name']
-            if 'size' in font_rules:
-                self.standard_rules['font']['size'] = float(font_rules['size'])
-        
-        # Применяем правила полей
-        if 'margins' in rules:
-            margins = rules['margins']
-            for side in ['left', 'right', 'top', 'bottom']:
-                if side in margins:
-                    self.standard_rules['margins'][side] = float(margins[side])
-        
-        # Применяем межстрочный интервал
-        if 'line_spacing' in rules:
-            self.standard_rules['line_spacing'] = float(rules['line_spacing'])
-        
-        # Применяем отступ первой строки
-        if 'first_line_indent' in rules:
-            self.standard_rules['first_line_indent'] = Cm(float(rules['first_line_indent']))
-        
-        # Применяем правила заголовков
-        if 'headings' in rules:
-            for level in ['h1', 'h2', 'h3']:
-                if level in rules['headings']:
-                    if level not in self.standard_rules['headings']:
-                        self.standard_rules['headings'][level] = {}
-                    
-                    h_rules = rules['headings'][level]
-                    if 'font_size' in h_rules:
-                        self.standard_rules['headings'][level]['font_size'] = float(h_rules['font_size'])
-                    if 'bold' in h_rules:
-                        self.standard_rules['headings'][level]['bold'] = h_rules['bold']
-                    if 'alignment' in h_rules:
-                        align_map = {
-                            'CENTER': WD_PARAGRAPH_ALIGNMENT.CENTER,
-                            'LEFT': WD_PARAGRAPH_ALIGNMENT.LEFT,
-                            'RIGHT': WD_PARAGRAPH_ALIGNMENT.RIGHT,
-                            'JUSTIFY': WD_PARAGRAPH_ALIGNMENT.JUSTIFY
-                        }
-                        self.standard_rules['headings'][level]['alignment'] = align_map.get(
-                            h_rules['alignment'], WD_PARAGRAPH_ALIGNMENT.LEFT
-                        )
-        
-        # Применяем обязательные разделы
-        if 'required_sections' in rules:
-            self.standard_rules['required_sections'] = rules['required_sections']
-        
-        # Применяем правила библиографии
-        if 'bibliography' in rules:
-            if 'bibliography' not in self.standard_rules:
-                self.standard_rules['bibliography'] = {}
-            bib = rules['bibliography']
-            if 'min_sources' in bib:
-                self.standard_rules['bibliography']['min_sources'] = int(bib['min_sources'])
-            if 'max_age_years' in bib:
-                self.standard_rules['bibliography']['max_age_years'] = int(bib['max_age_years'])
+        self.rule_plan = rule_plan_for(profile_data)
+        self.standard_rules = self._rules_from_plan(self.rule_plan)
     
     def get_profile_info(self) -> Dict[str, Any]:
         """Возвращает информацию о текущем профиле"""
@@ -244,21 +184,55 @@ class NormControlChecker:
             'rules': self.standard_rules
         }
     
-    def check_document(self, document_data: DocumentData) -> CheckResult:
+    def check_document(self, document_data: DocumentData, progress=None, deadline=None) -> CheckResult:
         """
         Проверяет документ на соответствие требованиям нормоконтроля
         
         Args:
             document_data: Структурированные данные документа
+            progress: Callback прогресса (см. app.services.progress)
+            deadline: Бюджет времени (Deadline или секунды, см. app.services.deadline)
             
         Returns:
             dict: Результаты проверки с выявленными несоответствиями
         """
-        results: List[RuleResult] = []
-        for rule in NORM_RULES:
+        return self.build_check_result(list(self.iter_check_document(document_data, progress, deadline)))
+    
+    def iter_check_document(self, document_data: DocumentData, progress=None,
+                            deadline=None) -> Iterator[RuleResult]:
+        """
+        Проверяет документ по одной норме за раз.
+        
+        Результат каждой нормы отдаётся сразу после её проверки, что позволяет
+        передавать результаты клиенту потоком (см. /api/document/analyze).
+        
+        Args:
+            document_data: Структурированные данные документа
+            progress: Callback прогресса (см. app.services.progress)
+            deadline: Бюджет времени; нормы, на которые его не хватило,
+                возвращаются с пометкой skipped
+            
+        Yields:
+            dict: Результат проверки одной нормы
+        """
+        progress = progress or null_progress
+        deadline = as_deadline(deadline)
+        for index, rule in enumerate(NORM_RULES, start=1):
+            if not deadline.allows(RULE_PRIORITIES.get(rule["id"], PRIORITY_NORMAL)):
+                progress('check', index / len(NORM_RULES) * 100, rule["name"])
+                yield {
+                    "rule_id": rule["id"],
+                    "rule_name": rule["name"],
+                    "description": rule["description"],
+                    "issues": [],
+                    "skipped": True
+                }
+                continue
             check_func = getattr(self, rule["checker"], None)
             if check_func is not None:
-                result = check_func(document_data)
+                check_memory_budget(rule["checker"])
+                with span(f'{rule["id"]:02d}{rule["checker"]}', KIND_RULE):
+                    result = check_func(document_data)
             else:
                 result = [{
                     'type': 'not_implemented',
@@ -267,13 +241,24 @@ class NormControlChecker:
                     'description': f'Проверка для нормы "{rule["name"]}" ещё не реализована.',
                     'auto_fixable': False
                 }]
-            results.append({
+            progress('check', index / len(NORM_RULES) * 100, rule["name"])
+            yield {
                 "rule_id": rule["id"],
                 "rule_name": rule["name"],
                 "description": rule["description"],
                 "issues": result
-            })
+            }
+    
+    def build_check_result(self, results: List[RuleResult]) -> CheckResult:
+        """
+        Собирает итоговый результат проверки из результатов отдельных норм
         
+        Args:
+            results: Результаты iter_check_document()
+            
+        Returns:
+            dict: Результаты проверки с выявленными несоответствиями
+        """
         # Считаем общее количество проблем
         all_issues = []
         for rule_result in results:
@@ -281,13 +266,16 @@ class NormControlChecker:
                 all_issues.extend(rule_result['issues'])
         
         # Преобразуем список результатов в словарь для ответа
+        skipped_rules = [rule_result['rule_id'] for rule_result in results if rule_result.get('skipped')]
         response = {
             'rules_results': results,
             'total_issues_count': len(all_issues),
             'issues': all_issues,
-            'profile': self.get_profile_info()
+            'profile': self.get_profile_info(),
+            'incomplete': bool(skipped_rules),
+            'skipped_rules': skipped_rules
         }
-          # Подготовим статистику по категориям и серьезности проблем
+        # Подготовим статистику по категориям и серьезности проблем
         response['statistics'] = self._calculate_statistics(results)
         
         return response
@@ -324,7 +312,7 @@ class NormControlChecker:
             
             # Проверяем название шрифта
             font_name = font.get('name')
-            if font_name and font_name != self.standard_rules['font']['name']:
+            if font_name and font_name != self.rule_plan.font.name:
                 # Если это листинг кода и используется Courier New, это допустимо
                 if is_code_listing and font_name in ['Courier New', 'Consolas', 'Monaco', 'Menlo']:
                     continue  # Пропускаем - это допустимо для кода
@@ -333,12 +321,12 @@ class NormControlChecker:
                     'type': 'font_name',
                     'severity': 'high',
                     'location': f"Параграф {para['index'] + 1}",
-                    'description': f"Неверный шрифт: {font_name}. Должен быть {self.standard_rules['font']['name']} (для листингов кода допустимы моноширинные шрифты).",
+                    'description': f"Неверный шрифт: {font_name}. Должен быть {self.rule_plan.font.name} (для листингов кода допустимы моноширинные шрифты).",
                     'auto_fixable': True
                 })                
             # Проверяем размер шрифта
             font_size = font.get('size')
-            if font_size and font_size != self.standard_rules['font']['size']:
+            if font_size and font_size != self.rule_plan.font.size_pt:
                 # Для листингов кода допустим размер 12pt
                 if is_code_listing and font_size == 12.0:
                     continue  # Пропускаем - это допустимо для кода
@@ -347,7 +335,7 @@ class NormControlChecker:
                     'type': 'font_size',
                     'severity': 'high',
                     'location': f"Параграф {para['index'] + 1}",
-                    'description': f"Неверный размер шрифта: {font_size}. Должен быть {self.standard_rules['font']['size']} (для листингов кода допустим 12pt).",
+                    'description': f"Неверный размер шрифта: {font_size}. Должен быть {self.rule_plan.font.size_pt} (для листингов кода допустим 12pt).",
                     'auto_fixable': True
                 })
                 
@@ -426,45 +414,45 @@ class NormControlChecker:
             
         # Проверяем левое поле
         left_margin = section_data.get('left_margin')
-        if left_margin and abs(left_margin - self.standard_rules['margins']['left']) > 0.1:
+        if left_margin and abs(left_margin - self.rule_plan.margins.left_cm) > 0.1:
             issues.append({
                 'type': 'left_margin',
                 'severity': 'medium',
                 'location': "Настройки страницы",
-                'description': f"Неверное левое поле: {left_margin} см. Должно быть {self.standard_rules['margins']['left']} см.",
+                'description': f"Неверное левое поле: {left_margin} см. Должно быть {self.rule_plan.margins.left_cm} см.",
                 'auto_fixable': True
             })
             
         # Проверяем правое поле
         right_margin = section_data.get('right_margin')
-        if right_margin and abs(right_margin - self.standard_rules['margins']['right']) > 0.1:
+        if right_margin and abs(right_margin - self.rule_plan.margins.right_cm) > 0.1:
             issues.append({
                 'type': 'right_margin',
                 'severity': 'medium',
                 'location': "Настройки страницы",
-                'description': f"Неверное правое поле: {right_margin} см. Должно быть {self.standard_rules['margins']['right']} см.",
+                'description': f"Неверное правое поле: {right_margin} см. Должно быть {self.rule_plan.margins.right_cm} см.",
                 'auto_fixable': True
             })
             
         # Проверяем верхнее поле
         top_margin = section_data.get('top_margin')
-        if top_margin and abs(top_margin - self.standard_rules['margins']['top']) > 0.1:
+        if top_margin and abs(top_margin - self.rule_plan.margins.top_cm) > 0.1:
             issues.append({
                 'type': 'top_margin',
                 'severity': 'medium',
                 'location': "Настройки страницы",
-                'description': f"Неверное верхнее поле: {top_margin} см. Должно быть {self.standard_rules['margins']['top']} см.",
+                'description': f"Неверное верхнее поле: {top_margin} см. Должно быть {self.rule_plan.margins.top_cm} см.",
                 'auto_fixable': True
             })
             
         # Проверяем нижнее поле
         bottom_margin = section_data.get('bottom_margin')
-        if bottom_margin and abs(bottom_margin - self.standard_rules['margins']['bottom']) > 0.1:
+        if bottom_margin and abs(bottom_margin - self.rule_plan.margins.bottom_cm) > 0.1:
             issues.append({
                 'type': 'bottom_margin',
                 'severity': 'medium',
                 'location': "Настройки страницы",
-                'description': f"Неверное нижнее поле: {bottom_margin} см. Должно быть {self.standard_rules['margins']['bottom']} см.",
+                'description': f"Неверное нижнее поле: {bottom_margin} см. Должно быть {self.rule_plan.margins.bottom_cm} см.",
                 'auto_fixable': True
             })
             
@@ -484,12 +472,12 @@ class NormControlChecker:
             line_spacing = para.get('line_spacing')
             
             # Если информация о межстрочном интервале доступна
-            if line_spacing and line_spacing != self.standard_rules['line_spacing']:
+            if line_spacing and line_spacing != self.rule_plan.line_spacing:
                 issues.append({
                     'type': 'line_spacing',
                     'severity': 'medium',
                     'location': f"Параграф {para['index'] + 1}",
-                    'description': f"Неверный межстрочный интервал: {line_spacing}. Должен быть {self.standard_rules['line_spacing']}.",
+                    'description': f"Неверный межстрочный интервал: {line_spacing}. Должен быть {self.rule_plan.line_spacing}.",
                     'auto_fixable': True
                 })
                 
@@ -511,7 +499,7 @@ class NormControlChecker:
             first_line_indent = paragraph_format.get('first_line_indent')
             
             # Если отступ первой строки отличается от стандартного
-            expected_indent = self.standard_rules['first_line_indent'].cm
+            expected_indent = self.rule_plan.first_line_indent_cm
             if first_line_indent is not None and abs(first_line_indent - expected_indent) > 0.05:
                 issues.append({
                     'type': 'first_line_indent',
@@ -566,7 +554,7 @@ class NormControlChecker:
                 
                 # Проверка размера шрифта для заголовка первого уровня
                 font_size = heading.get('font', {}).get('size')
-                expected_size = self.standard_rules['headings']['h1']['font_size']
+                expected_size = self.rule_plan.headings['h1'].font_size_pt
                 if font_size and abs(font_size - expected_size) > 0.1:
                     issues.append({
                         'type': 'heading_font_size',
@@ -1084,12 +1072,12 @@ class NormControlChecker:
                 
                 # Проверка на соответствие форматирования для списков
                 line_spacing = para.get('line_spacing')
-                if line_spacing and line_spacing != self.standard_rules['line_spacing']:
+                if line_spacing and line_spacing != self.rule_plan.line_spacing:
                     issues.append({
                         'type': 'list_line_spacing',
                         'severity': 'low',
                         'location': f"Параграф {para['index'] + 1}",
-                        'description': f"Неверный межстрочный интервал в элементе списка. Должен быть {self.standard_rules['line_spacing']}.",
+                        'description': f"Неверный межстрочный интервал в элементе списка. Должен быть {self.rule_plan.line_spacing}.",
                         'auto_fixable': True
                     })
             
@@ -1220,7 +1208,7 @@ class NormControlChecker:
         all_text = " ".join([p.get('text', '').lower() for p in document_data['paragraphs']])
         
         # Проверяем наличие обязательных разделов
-        for section in self.standard_rules['required_sections']:
+        for section in self.rule_plan.required_sections:
             # Проверяем, содержится ли раздел в тексте
             if section not in all_text:
                 issues.append({
@@ -1419,20 +1407,20 @@ class NormControlChecker:
                 continue
             font = para.get('font', {})
             pf = para.get('paragraph_format', {})
-            if font.get('name') and font.get('name') != self.standard_rules['font']['name']:
+            if font.get('name') and font.get('name') != self.rule_plan.font.name:
                 issues.append({
                     'type': 'title_page_font',
                     'severity': 'high',
                     'location': f"Титульный лист, параграф {idx_p+1}",
-                    'description': f"Неверный шрифт: {font.get('name')}. Должен быть {self.standard_rules['font']['name']}.",
+                    'description': f"Неверный шрифт: {font.get('name')}. Должен быть {self.rule_plan.font.name}.",
                     'auto_fixable': True
                 })
-            if font.get('size') and font.get('size') != self.standard_rules['font']['size']:
+            if font.get('size') and font.get('size') != self.rule_plan.font.size_pt:
                 issues.append({
                     'type': 'title_page_font_size',
                     'severity': 'high',
                     'location': f"Титульный лист, параграф {idx_p+1}",
-                    'description': f"Неверный размер шрифта: {font.get('size')}. Должен быть {self.standard_rules['font']['size']}.",
+                    'description': f"Неверный размер шрифта: {font.get('size')}. Должен быть {self.rule_plan.font.size_pt}.",
                     'auto_fixable': True
                 })
             if pf.get('alignment') is not None and pf.get('alignment') != WD_PARAGRAPH_ALIGNMENT.CENTER:
@@ -1707,7 +1695,7 @@ class NormControlChecker:
                 
                 # Проверяем шрифт
                 font_name = run_style.get('font', {}).get('name')
-                if font_name and font_name != self.standard_rules['font']['name']:
+                if font_name and font_name != self.rule_plan.font.name:
                     issues.append({
                         'type': 'accent_font',
                         'severity': 'high',
@@ -1719,7 +1707,7 @@ class NormControlChecker:
                 
                 # Проверяем размер шрифта
                 font_size = run_style.get('font', {}).get('size')
-                if font_size and font_size != self.standard_rules['font']['size'] and not run_style.get('bold') and not run_style.get('italic'):
+                if font_size and font_size != self.rule_plan.font.size_pt and not run_style.get('bold') and not run_style.get('italic'):
                     # Допускаем размер 12 pt для подписей к таблицам и рисункам
                     if para.get('is_caption') and font_size == 12.0:
                         continue
@@ -2718,10 +2706,10 @@ class NormControlChecker:
         
         # Проверяем наличие всех обязательных разделов в оглавлении
         toc_entries = document_data['toc']
-        required_sections_lower = [s.lower() for s in self.standard_rules['required_sections']]
+        required_sections_lower = [s.lower() for s in self.rule_plan.required_sections]
         
         # Проверяем присутствие всех обязательных разделов
-        for req_section in self.standard_rules['required_sections']:
+        for req_section in self.rule_plan.required_sections:
             found = False
             for entry in toc_entries:
                 if 'title' in entry and req_section.lower() in entry['title'].lower():
@@ -41,6 +41,9 @@ PLANS: dict[str, dict] = {
             "batch_processing": False,
             "custom_profiles": 0,
             "team_members": 1,
+            "queue_priority": 7,  # broker priority, 0 = highest (Redis)
+            "queue_weight": 1,  # fair-share weight between tenants
+            "max_concurrent_jobs": 1,  # per API key
         },
         "features": [
             "5 проверок в день",
@@ -63,6 +66,9 @@ PLANS: dict[str, dict] = {
             "batch_processing": False,
             "custom_profiles": 2,
             "team_members": 1,
+            "queue_priority": 6,  # broker priority, 0 = highest (Redis)
+            "queue_weight": 2,  # fair-share weight between tenants
+            "max_concurrent_jobs": 2,  # per API key
         },
         "features": [
             "20 проверок в день",
@@ -87,6 +93,9 @@ PLANS: dict[str, dict] = {
             "batch_processing": True,
             "custom_profiles": 10,
             "team_members": 1,
+            "queue_priority": 4,  # broker priority, 0 = highest (Redis)
+            "queue_weight": 4,  # fair-share weight between tenants
+            "max_concurrent_jobs": 4,  # per API key
         },
         "features": [
             "Безлимитные проверки",
@@ -113,6 +122,9 @@ PLANS: dict[str, dict] = {
             "batch_processing": True,
             "custom_profiles": 50,
             "team_members": 10,
+            "queue_priority": 3,  # broker priority, 0 = highest (Redis)
+            "queue_weight": 6,  # fair-share weight between tenants
+            "max_concurrent_jobs": 8,  # per API key
         },
         "features": [
             "Всё из тарифа PRO",
@@ -138,6 +150,9 @@ PLANS: dict[str, dict] = {
             "batch_processing": True,
             "custom_profiles": -1,  # unlimited
             "team_members": -1,
+            "queue_priority": 2,  # broker priority, 0 = highest (Redis)
+            "queue_weight": 8,  # fair-share weight between tenants
+            "max_concurrent_jobs": 16,  # per API key
         },
         "features": [
             "Всё из тарифа Команда",
@@ -162,6 +177,13 @@ PROMO_CODES: dict[str, int] = {
 }
 
 
+def plan_key_for_user(user: Optional[User]) -> str:
+    """Return the plan key for the user's role (roles without a plan fall back to FREE in PLANS)."""
+    if user is None:
+        return "FREE"
+    return user.role.value.upper() if user.role != UserRole.USER else "FREE"
+
+
 class PaymentServiceError(Exception):
     """Base error for payment service operations"""
 
@@ -234,7 +256,7 @@ class PaymentService:
         if not user:
             raise PaymentServiceError("User not found", "user_not_found")
 
-        plan_key = user.role.value.upper() if user.role != UserRole.USER else "FREE"
+        plan_key = plan_key_for_user(user)
         plan = PLANS.get(plan_key, PLANS["FREE"])
 
         base = {
@@ -467,7 +489,7 @@ class PaymentService:
         if not user:
             return False, "User not found"
 
-        plan_key = user.role.value.upper() if user.role != UserRole.USER else "FREE"
+        plan_key = plan_key_for_user(user)
         limits = PLANS.get(plan_key, PLANS["FREE"])["limits"]
         daily_limit = limits["checks_per_day"]
 
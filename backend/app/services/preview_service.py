@@ -1,23 +1,217 @@
+import json
 import os
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import mammoth
+from lxml import etree, html as lxml_html
+
+from app.services.content_hash import get_file_digest
+
+logger = logging.getLogger(__name__)
+
+# On-disk preview cache shared between web and worker processes
+PREVIEW_CACHE_DIR = os.getenv('PREVIEW_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'previews'
+)
+
+# Approximate size of one preview page (characters of HTML)
+PREVIEW_PAGE_CHARS = 30000
+# Headings that always start a new page
+PAGE_BREAK_TAGS = {'h1', 'h2'}
+# Number of converted documents kept in memory
+MAX_CACHED_PREVIEWS = 32
+
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Per-digest locks so concurrent requests do not convert the same file twice
+_convert_locks = [threading.Lock() for _ in range(16)]
+_warmup_executor = None
+_warmup_lock = threading.Lock()
+
+
+def _wrap(html_content):
+    # Wrap in the container class expected by frontend
+    return f'<div class="docx-preview-content">{html_content}</div>'
+
+
+def split_into_pages(html_content, page_chars=PREVIEW_PAGE_CHARS):
+    """
+    Splits mammoth HTML into pages on top-level block boundaries.
+
+    A new page starts at every h1/h2 heading or when the current page
+    exceeds page_chars. Returns a list of {'title', 'html'} dicts.
+    """
+    if not html_content.strip():
+        return [{'title': None, 'html': ''}]
+
+    fragments = lxml_html.fragments_fromstring(html_content)
+
+    pages = []
+    current = []
+    current_size = 0
+    current_title = None
+
+    for fragment in fragments:
+        if isinstance(fragment, str):
+            # Text outside of block elements, rare in mammoth output
+            block = fragment
+            tag = None
+        else:
+            block = etree.tostring(fragment, method='html', encoding='unicode', with_tail=True)
+            tag = fragment.tag
+
+        starts_section = tag in PAGE_BREAK_TAGS
+        if current and (starts_section or current_size + len(block) > page_chars):
+            pages.append({'title': current_title, 'html': ''.join(current)})
+            current, current_size, current_title = [], 0, None
+
+        if starts_section and current_title is None:
+            current_title = fragment.text_content().strip() or None
+
+        current.append(block)
+        current_size += len(block)
+
+    if current:
+        pages.append({'title': current_title, 'html': ''.join(current)})
+
+    return pages
+
 
 class PreviewService:
     def generate_preview(self, file_path):
         """
         Converts a DOCX file to HTML using mammoth.
         """
+        preview = self.get_preview(file_path)
+        return _wrap(''.join(page['html'] for page in preview['pages']))
+
+    def get_preview(self, file_path):
+        """
+        Returns the paginated preview for a file, converting it only once per content hash.
+
+        Returns:
+            dict with 'preview_id' (SHA-256 of the file) and 'pages'
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
 
+        digest = get_file_digest(file_path)
+        if digest is None:
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        preview = self.get_cached_preview(digest)
+        if preview is not None:
+            return preview
+
+        with _convert_locks[int(digest[:2], 16) % len(_convert_locks)]:
+            preview = self.get_cached_preview(digest)
+            if preview is not None:
+                return preview
+
+            preview = {'preview_id': digest, 'pages': split_into_pages(self._convert(file_path))}
+            _remember(digest, preview)
+            _store_on_disk(digest, preview)
+            return preview
+
+    def get_page(self, preview_id, page):
+        """
+        Returns a single preview page from the cache.
+
+        Returns:
+            dict with 'html', 'title', 'page' and 'pages', or None if the preview is unknown
+        """
+        preview = self.get_cached_preview(preview_id)
+        if preview is None:
+            return None
+
+        pages = preview['pages']
+        if page < 1 or page > len(pages):
+            raise IndexError(f"Page {page} out of range (1-{len(pages)})")
+
+        return {
+            'preview_id': preview_id,
+            'page': page,
+            'pages': len(pages),
+            'title': pages[page - 1]['title'],
+            'html': _wrap(pages[page - 1]['html']),
+        }
+
+    def get_cached_preview(self, digest):
+        """Looks up a converted preview in memory, then on disk."""
+        with _cache_lock:
+            preview = _memory_cache.get(digest)
+            if preview is not None:
+                _memory_cache.move_to_end(digest)
+                return preview
+
+        preview = _load_from_disk(digest)
+        if preview is not None:
+            _remember(digest, preview)
+        return preview
+
+    def _convert(self, file_path):
         try:
             with open(file_path, "rb") as docx_file:
-                # Convert to HTML using mammoth
                 # We can add style maps if needed, but default is usually good for preview
-                result = mammoth.convert_to_html(docx_file)
-                html_content = result.value
-                
-                # Wrap in the container class expected by frontend
-                return f'<div class="docx-preview-content">{html_content}</div>'
-                
+                return mammoth.convert_to_html(docx_file).value
         except Exception as e:
             raise ValueError(f"Could not convert DOCX file: {str(e)}")
+
+
+def _is_valid_digest(digest):
+    return bool(digest) and len(digest) == 64 and all(c in '0123456789abcdef' for c in digest)
+
+
+def _remember(digest, preview):
+    with _cache_lock:
+        _memory_cache[digest] = preview
+        _memory_cache.move_to_end(digest)
+        while len(_memory_cache) > MAX_CACHED_PREVIEWS:
+            _memory_cache.popitem(last=False)
+
+
+def _cache_path(digest):
+    return os.path.join(PREVIEW_CACHE_DIR, f"{digest}.json")
+
+
+def _store_on_disk(digest, preview):
+    try:
+        os.makedirs(PREVIEW_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PREVIEW_CACHE_DIR, prefix='.tmp_')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(preview, f, ensure_ascii=False)
+        os.replace(tmp_path, _cache_path(digest))
+    except OSError as e:
+        logger.warning(f"Could not store preview cache for {digest[:12]}: {e}")
+
+
+def _load_from_disk(digest):
+    if not _is_valid_digest(digest):
+        return None
+    try:
+        with open(_cache_path(digest), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def warm_preview(file_path):
+    """
+    Converts the file in the background so the first preview request is served from cache.
+    """
+    global _warmup_executor
+    with _warmup_lock:
+        if _warmup_executor is None:
+            _warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preview-warmup')
+
+    def _warm():
+        try:
+            PreviewService().get_preview(file_path)
+        except Exception as e:
+            logger.warning(f"Preview warm-up failed for {file_path}: {e}")
+
+    return _warmup_executor.submit(_warm)
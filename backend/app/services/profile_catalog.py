@@ -0,0 +1,329 @@
+"""
+Каталог профилей в памяти для поиска и статистики.
+
+Каталог строится один раз (при прогреве или первом обращении) из кэша
+profile_loader и затем отвечает на запросы без обращения к диску:
+
+- полнотекстовый поиск по названию, описанию и вузу — инвертированный
+  индекс слов; слово запроса совпадает с любым словом профиля, которое с
+  него начинается («мгу», «информ»);
+- фильтры по категории, шрифту и минимальному числу источников —
+  предпостроенные наборы ID;
+- статистика по каталогу считается при изменении, а не при запросе.
+
+Маршруты профилей обновляют каталог точечно (refresh) после создания,
+изменения, удаления и импорта. Другие воркеры узнают об изменениях по общей
+метке версии (profile_loader.profiles_version) и перестраивают каталог
+целиком.
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .profile_loader import PROFILES_DIR, SYSTEM_PROFILES, _read_cached, profiles_version
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('gost', 'university', 'custom')
+
+RECENTLY_UPDATED_LIMIT = 5
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text: Any) -> List[str]:
+    """Слова текста в нижнем регистре."""
+    if not text:
+        return []
+    return _WORD_RE.findall(str(text).lower())
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """Проиндексированные поля одного профиля."""
+
+    id: str
+    summary: Dict[str, Any]
+    tokens: FrozenSet[str]
+    category: Optional[str]
+    font: str
+    font_label: str
+    min_sources: Any
+    is_system: bool
+    extends: Optional[str]
+    updated_at: Optional[str]
+
+    @classmethod
+    def from_profile(cls, profile_id: str, data: Dict[str, Any]) -> 'CatalogEntry':
+        rules = data.get('rules') or {}
+        university = data.get('university') or {}
+        if not isinstance(university, dict):
+            university = {'name': university}
+        is_system = bool(data.get('is_system') or profile_id in SYSTEM_PROFILES)
+        font = (rules.get('font') or {}).get('name', 'Unknown')
+
+        text = ' '.join(
+            str(value) for value in (
+                data.get('name'),
+                data.get('description'),
+                university.get('name'),
+                university.get('short_name'),
+            ) if value
+        )
+        return cls(
+            id=profile_id,
+            summary={
+                'id': profile_id,
+                'name': data.get('name'),
+                'description': data.get('description'),
+                'category': data.get('category'),
+                'version': data.get('version'),
+                'is_system': data.get('is_system', profile_id in SYSTEM_PROFILES),
+            },
+            tokens=frozenset(tokenize(text)),
+            category=data.get('category'),
+            font='' if font == 'Unknown' else str(font).lower(),
+            font_label=font,
+            min_sources=(rules.get('bibliography') or {}).get('min_sources'),
+            is_system=is_system,
+            extends=data.get('extends'),
+            updated_at=data.get('updated_at') or data.get('created_at'),
+        )
+
+
+class ProfileCatalog:
+    """
+    Индекс профилей одного каталога.
+
+    Args:
+        profiles_dir: Каталог профилей (по умолчанию PROFILES_DIR)
+    """
+
+    def __init__(self, profiles_dir: Optional[str] = None):
+        self.profiles_dir = profiles_dir or PROFILES_DIR
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._words: List[str] = []
+        self._postings: Dict[str, Set[str]] = {}
+        self._by_category: Dict[Optional[str], Set[str]] = {}
+        self._by_font: Dict[str, Set[str]] = {}
+        self._by_min_sources: List[Tuple[float, str]] = []
+        self._statistics: Dict[str, Any] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+
+    # === Построение ===
+
+    def rebuild(self) -> int:
+        """Перечитывает весь каталог. Возвращает число профилей."""
+        with self._lock:
+            version = profiles_version(self.profiles_dir)
+            entries = {}
+            for profile_id in self._profile_ids():
+                entry = self._load_entry(profile_id)
+                if entry is not None:
+                    entries[profile_id] = entry
+            self._entries = entries
+            self._reindex()
+            self._version = version
+            self.rebuilds += 1
+            return len(entries)
+
+    def refresh(self, profile_ids: Iterable[str]) -> None:
+        """Обновляет (или удаляет) отдельные профили после их изменения."""
+        with self._lock:
+            if self._version is None:
+                self.rebuild()
+                return
+            for profile_id in profile_ids:
+                entry = self._load_entry(profile_id)
+                if entry is None:
+                    self._entries.pop(profile_id, None)
+                else:
+                    self._entries[profile_id] = entry
+            self._reindex()
+            self._version = profiles_version(self.profiles_dir)
+
+    def ensure_current(self) -> None:
+        """Перестраивает каталог, если профили изменил другой процесс."""
+        if self._version is None or self._version != profiles_version(self.profiles_dir):
+            self.rebuild()
+
+    def _profile_ids(self) -> List[str]:
+        if not os.path.isdir(self.profiles_dir):
+            return []
+        return sorted(
+            filename[:-len('.json')]
+            for filename in os.listdir(self.profiles_dir)
+            if filename.endswith('.json')
+        )
+
+    def _load_entry(self, profile_id: str) -> Optional[CatalogEntry]:
+        try:
+            data = _read_cached(profile_id, self.profiles_dir)
+            if not isinstance(data, dict):
+                return None
+            return CatalogEntry.from_profile(profile_id, data)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Профиль {profile_id} не добавлен в каталог: {e}")
+            return None
+
+    def _reindex(self) -> None:
+        postings: Dict[str, Set[str]] = {}
+        by_category: Dict[Optional[str], Set[str]] = {}
+        by_font: Dict[str, Set[str]] = {}
+        by_min_sources: List[Tuple[float, str]] = []
+
+        for entry in self._entries.values():
+            for word in entry.tokens:
+                postings.setdefault(word, set()).add(entry.id)
+            by_category.setdefault(entry.category, set()).add(entry.id)
+            by_font.setdefault(entry.font, set()).add(entry.id)
+            by_min_sources.append((self._number(entry.min_sources), entry.id))
+
+        by_min_sources.sort()
+        self._postings = postings
+        self._words = sorted(postings)
+        self._by_category = by_category
+        self._by_font = by_font
+        self._by_min_sources = by_min_sources
+        self._statistics = self._compute_statistics()
+
+    @staticmethod
+    def _number(value: Any) -> float:
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _compute_statistics(self) -> Dict[str, Any]:
+        stats = {
+            'total': len(self._entries),
+            'by_category': {category: 0 for category in CATEGORIES},
+            'system_profiles': 0,
+            'with_inheritance': 0,
+            'fonts_used': {},
+            'avg_min_sources': 0,
+            'recently_updated': [],
+        }
+        min_sources = []
+        recently_updated = []
+
+        for entry in self._entries.values():
+            category = entry.category or 'custom'
+            if category in stats['by_category']:
+                stats['by_category'][category] += 1
+            if entry.is_system:
+                stats['system_profiles'] += 1
+            if entry.extends:
+                stats['with_inheritance'] += 1
+
+            font = entry.font_label
+            stats['fonts_used'][font] = stats['fonts_used'].get(font, 0) + 1
+
+            if entry.min_sources:
+                min_sources.append(entry.min_sources)
+            if entry.updated_at:
+                recently_updated.append({
+                    'id': entry.id,
+                    'name': entry.summary['name'],
+                    'updated_at': entry.updated_at,
+                })
+
+        if min_sources:
+            stats['avg_min_sources'] = sum(min_sources) / len(min_sources)
+        recently_updated.sort(key=lambda item: item.get('updated_at', ''), reverse=True)
+        stats['recently_updated'] = recently_updated[:RECENTLY_UPDATED_LIMIT]
+        return stats
+
+    # === Запросы ===
+
+    def search(
+        self,
+        query: str = '',
+        category: Optional[str] = None,
+        font_name: str = '',
+        min_sources: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск профилей.
+
+        Args:
+            query: Текст; каждое слово должно совпасть с началом слова профиля
+            category: Категория профиля
+            font_name: Подстрока названия шрифта (без учёта регистра)
+            min_sources: Минимально требуемое профилем число источников
+
+        Returns:
+            list: Краткие описания профилей, отсортированные по ID
+        """
+        self.ensure_current()
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+
+            for word in tokenize(query):
+                candidates = self._intersect(candidates, self._prefix_matches(word))
+                if not candidates:
+                    return []
+
+            if category:
+                candidates = self._intersect(candidates, self._by_category.get(category, set()))
+            if font_name:
+                font_name = font_name.lower()
+                fonts = set()
+                for font, ids in self._by_font.items():
+                    if font_name in font:
+                        fonts |= ids
+                candidates = self._intersect(candidates, fonts)
+            if min_sources:
+                start = bisect.bisect_left(self._by_min_sources, (float(min_sources), ''))
+                candidates = self._intersect(
+                    candidates, {profile_id for _, profile_id in self._by_min_sources[start:]}
+                )
+
+            ids = self._entries.keys() if candidates is None else candidates
+            return [dict(self._entries[profile_id].summary) for profile_id in sorted(ids)]
+
+    def statistics(self) -> Dict[str, Any]:
+        """Предрасчитанная статистика по каталогу."""
+        self.ensure_current()
+        with self._lock:
+            stats = dict(self._statistics)
+            stats['by_category'] = dict(stats['by_category'])
+            stats['fonts_used'] = dict(stats['fonts_used'])
+            stats['recently_updated'] = list(stats['recently_updated'])
+            return stats
+
+    def _prefix_matches(self, word: str) -> Set[str]:
+        matches: Set[str] = set()
+        index = bisect.bisect_left(self._words, word)
+        while index < len(self._words) and self._words[index].startswith(word):
+            matches |= self._postings[self._words[index]]
+            index += 1
+        return matches
+
+    @staticmethod
+    def _intersect(candidates: Optional[Set[str]], ids: Set[str]) -> Set[str]:
+        return set(ids) if candidates is None else candidates & ids
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_catalogs: Dict[str, ProfileCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_profile_catalog(profiles_dir: Optional[str] = None) -> ProfileCatalog:
+    """Каталог профилей процесса (один на каталог)."""
+    directory = profiles_dir or PROFILES_DIR
+    with _catalogs_lock:
+        catalog = _catalogs.get(directory)
+        if catalog is None:
+            catalog = _catalogs[directory] = ProfileCatalog(directory)
+    return catalog
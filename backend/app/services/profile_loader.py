@@ -0,0 +1,311 @@
+"""
+Загрузка профилей проверки из каталога profiles/.
+
+Профили читаются с диска один раз на процесс и затем отдаются из памяти;
+изменение файла (mtime/размер) инвалидирует запись, поэтому правки через
+API профилей подхватываются без перезапуска. load_profile_data отдаёт
+глубокую копию, которую вызывающий код может свободно изменять.
+
+Для пути проверки профили разрешаются заранее: resolve_profile сливает
+цепочку наследования (extends) и кэширует результат как неизменяемый
+FrozenDict, который отдаётся без копирования. Запись в кэше действительна,
+пока не изменился ни один файл цепочки, поэтому правка профиля в одном
+процессе видна всем воркерам. Для списков профилей (которые не привязаны к
+конкретному файлу) служит общая метка версии — mtime файла .version в
+каталоге профилей (profiles_version / bump_profiles_version).
+"""
+
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'profiles'
+)
+
+DEFAULT_PROFILE_ID = 'default_gost'
+
+# Системные профили (нельзя редактировать/удалять)
+SYSTEM_PROFILES = ['default_gost', 'gost_7_32_2017', 'gost_r_7_0_100_2018']
+
+# Максимальная глубина наследования
+MAX_INHERITANCE_DEPTH = 5
+
+VERSION_FILE = '.version'
+
+Stamp = Tuple[int, int]
+
+# путь к файлу -> ((mtime_ns, size), данные профиля)
+_cache: Dict[str, Tuple[Stamp, Dict[str, Any]]] = {}
+# (каталог, ID профиля) -> (метки файлов цепочки, разрешённый профиль)
+_resolved: Dict[Tuple[str, str], Tuple[Tuple[Tuple[str, Stamp], ...], 'FrozenDict']] = {}
+_lock = threading.Lock()
+
+
+class FrozenDict(dict):
+    """
+    Неизменяемый словарь разрешённого профиля.
+
+    Остаётся dict, поэтому сериализуется jsonify/json.dumps как обычно;
+    copy.copy и copy.deepcopy возвращают изменяемую копию (см. thaw).
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Разрешённый профиль доступен только для чтения; используйте thaw()')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Рекурсивно превращает словари в FrozenDict, списки — в кортежи."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Изменяемая копия замороженного профиля."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def _safe_id(profile_id: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_-]', '_', str(profile_id))
+
+
+def _profile_path(profile_id: str, profiles_dir: Optional[str] = None) -> str:
+    return os.path.join(profiles_dir or PROFILES_DIR, f"{profile_id}.json")
+
+
+def _stamp(path: str) -> Optional[Stamp]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read_cached(profile_id: str, profiles_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    path = _profile_path(profile_id, profiles_dir)
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _lock:
+        _cache[path] = (stamp, data)
+    return data
+
+
+def load_profile_data(
+    profile_id: Optional[str] = None,
+    fallback: Optional[str] = DEFAULT_PROFILE_ID,
+    profiles_dir: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает данные профиля.
+
+    Args:
+        profile_id: ID профиля (имя файла без .json); None — профиль по умолчанию
+        fallback: Профиль, который используется, если запрошенного нет
+            (None — без подстановки)
+        profiles_dir: Каталог профилей (по умолчанию PROFILES_DIR)
+
+    Returns:
+        dict: Копия данных профиля или None, если профиль не найден
+    """
+    candidates = [profile_id or fallback]
+    if fallback and fallback not in candidates:
+        candidates.append(fallback)
+
+    for candidate in candidates:
+        if not candidate:
+            continue
+        data = _read_cached(candidate, profiles_dir)
+        if data is not None:
+            return copy.deepcopy(data)
+    return None
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(base)
+    for key, value in override.items():
+        if isinstance(result.get(key), dict) and isinstance(value, dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def _resolve_chain(profile_id: str, profiles_dir: Optional[str]):
+    """Сливает цепочку наследования. Возвращает (данные, метки файлов цепочки)."""
+    chain: List[str] = []
+    stamps: List[Tuple[str, Stamp]] = []
+    layers: List[Dict[str, Any]] = []
+    current: Optional[str] = profile_id
+
+    while current:
+        if len(chain) > MAX_INHERITANCE_DEPTH:
+            raise ValueError(f"Превышена максимальная глубина наследования ({MAX_INHERITANCE_DEPTH})")
+        if current in chain:
+            raise ValueError(f"Обнаружено циклическое наследование: {current}")
+
+        path = _profile_path(current, profiles_dir)
+        stamp = _stamp(path)
+        data = _read_cached(current, profiles_dir) if stamp is not None else None
+        if data is None:
+            raise FileNotFoundError(f"Профиль '{current}' не найден")
+        if not isinstance(data, dict) or not isinstance(data.get('rules', {}), dict):
+            raise ValueError(f"Некорректная структура профиля '{current}'")
+
+        chain.append(current)
+        stamps.append((path, stamp))
+        layers.append(data)
+        parent = data.get('extends')
+        current = _safe_id(parent) if parent else None
+
+    merged: Dict[str, Any] = {}
+    for layer in reversed(layers):
+        merged = _merge(merged, layer)
+    merged['_inheritance_chain'] = list(reversed(chain))
+    return merged, tuple(stamps)
+
+
+def resolve_profile(profile_id: str, profiles_dir: Optional[str] = None) -> FrozenDict:
+    """
+    Профиль с применённым наследованием, без копирования.
+
+    Raises:
+        FileNotFoundError: Профиль или один из родителей не найден
+        ValueError: Циклическое или слишком глубокое наследование,
+            некорректная структура профиля
+
+    Returns:
+        FrozenDict: Общий для всех вызывающих неизменяемый профиль
+            (для изменения — thaw())
+    """
+    profile_id = _safe_id(profile_id)
+    key = (profiles_dir or PROFILES_DIR, profile_id)
+
+    with _lock:
+        entry = _resolved.get(key)
+    if entry is not None and all(_stamp(path) == stamp for path, stamp in entry[0]):
+        return entry[1]
+
+    merged, stamps = _resolve_chain(profile_id, profiles_dir)
+    frozen = freeze(merged)
+    with _lock:
+        _resolved[key] = (stamps, frozen)
+    return frozen
+
+
+def load_resolved_profile(
+    profile_id: Optional[str] = None,
+    fallback: Optional[str] = DEFAULT_PROFILE_ID,
+    profiles_dir: Optional[str] = None,
+) -> Optional[FrozenDict]:
+    """
+    Как load_profile_data, но возвращает разрешённый неизменяемый профиль.
+
+    Returns:
+        FrozenDict: Профиль или None, если ни запрошенный, ни запасной
+            профиль не удалось разрешить
+    """
+    candidates = [profile_id or fallback]
+    if fallback and fallback not in candidates:
+        candidates.append(fallback)
+
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return resolve_profile(candidate, profiles_dir)
+        except FileNotFoundError:
+            continue
+        except ValueError as e:
+            logger.warning(f"Не удалось разрешить профиль {candidate}: {e}")
+    return None
+
+
+def profiles_version(profiles_dir: Optional[str] = None) -> int:
+    """Общая для всех процессов метка версии каталога профилей."""
+    stamp = _stamp(os.path.join(profiles_dir or PROFILES_DIR, VERSION_FILE))
+    return stamp[0] if stamp else 0
+
+
+def bump_profiles_version(profiles_dir: Optional[str] = None) -> int:
+    """Отмечает изменение каталога профилей для всех воркеров."""
+    path = os.path.join(profiles_dir or PROFILES_DIR, VERSION_FILE)
+    previous = profiles_version(profiles_dir)
+    stamp = max(time.time_ns(), previous + 1)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(str(stamp))
+        os.utime(path, ns=(stamp, stamp))
+    except OSError as e:
+        logger.warning(f"Не удалось обновить метку версии профилей: {e}")
+        return previous
+    return stamp
+
+
+def preload_profiles(profiles_dir: Optional[str] = None) -> List[str]:
+    """
+    Загружает в память все профили каталога и разрешает их наследование.
+
+    Returns:
+        list: ID загруженных профилей
+    """
+    directory = profiles_dir or PROFILES_DIR
+    loaded = []
+    if not os.path.isdir(directory):
+        return loaded
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        profile_id = filename[:-len('.json')]
+        try:
+            if _read_cached(profile_id, profiles_dir) is not None:
+                loaded.append(profile_id)
+                resolve_profile(profile_id, profiles_dir)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить профиль {profile_id}: {e}")
+    return loaded
+
+
+def clear_profile_cache() -> None:
+    with _lock:
+        _cache.clear()
+        _resolved.clear()
@@ -0,0 +1,133 @@
+"""
+Прогресс обработки документа.
+
+Сервисы (извлечение, проверка норм, проходы автоисправления, XML-коррекция)
+сообщают прогресс через простой callback:
+
+    progress(stage, sub_progress, message=None)
+
+где stage — этап из ProgressEmitter.STAGES, а sub_progress — прогресс внутри
+этапа (0-100). ProgressReporter ограничивает частоту событий и рассылает их
+в приёмники: WebSocket (ProgressEmitter) и meta задачи Celery.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[..., None]
+ProgressSink = Callable[[str, float, float, Optional[str]], None]
+
+# Минимальный интервал между событиями одного этапа (секунды)
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", 0.25))
+
+
+def null_progress(stage: str, sub_progress: float, message: Optional[str] = None) -> None:
+    """Callback по умолчанию: прогресс никуда не передаётся."""
+
+
+def overall_progress(stage: str, sub_progress: float) -> float:
+    """Общий прогресс (0-100) по этапу и прогрессу внутри него."""
+    from app.websocket import ProgressEmitter
+
+    start, end, _ = ProgressEmitter.STAGES.get(stage, (0, 0, None))
+    return start + (end - start) * (sub_progress / 100)
+
+
+def scale_progress(
+    progress: Optional[ProgressCallback],
+    start: float,
+    end: float,
+    stage: Optional[str] = None,
+) -> ProgressCallback:
+    """
+    Отображает прогресс вложенной операции на диапазон [start, end] этапа.
+
+    Args:
+        progress: Внешний callback
+        start, end: Диапазон прогресса внутри этапа внешнего callback
+        stage: Этап внешнего callback (по умолчанию — этап вложенной операции)
+    """
+    if progress is None:
+        return null_progress
+
+    def scaled(inner_stage: str, sub_progress: float, message: Optional[str] = None) -> None:
+        progress(stage or inner_stage, start + (end - start) * (sub_progress / 100), message)
+
+    return scaled
+
+
+class ProgressReporter:
+    """
+    Callback прогресса с ограничением частоты.
+
+    Событие того же этапа отправляется не чаще раза в min_interval секунд;
+    смена этапа и завершение этапа (100%) отправляются всегда.
+
+    Args:
+        *sinks: Приёмники sink(stage, progress, sub_progress, message)
+        min_interval: Минимальный интервал между событиями (секунды)
+    """
+
+    def __init__(self, *sinks: ProgressSink, min_interval: float = PROGRESS_MIN_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sinks = list(sinks)
+        self.min_interval = min_interval
+        self._clock = clock
+        self._stage: Optional[str] = None
+        self._last_emit = 0.0
+        self.emitted = 0
+        self.suppressed = 0
+
+    def __call__(self, stage: str, sub_progress: float, message: Optional[str] = None) -> None:
+        now = self._clock()
+        sub_progress = max(0.0, min(100.0, float(sub_progress)))
+
+        if (stage == self._stage and sub_progress < 100
+                and now - self._last_emit < self.min_interval):
+            self.suppressed += 1
+            return
+
+        self._stage = stage
+        self._last_emit = now
+        self.emitted += 1
+
+        progress = overall_progress(stage, sub_progress)
+        for sink in self.sinks:
+            try:
+                sink(stage, progress, sub_progress, message)
+            except Exception as e:
+                logger.debug(f"Ошибка передачи прогресса: {e}")
+
+
+def emitter_sink(emitter) -> ProgressSink:
+    """Приёмник для app.websocket.ProgressEmitter."""
+
+    def sink(stage: str, progress: float, sub_progress: float, message: Optional[str]) -> None:
+        emitter.emit(stage, sub_progress, message)
+
+    return sink
+
+
+def task_sink(task, task_id: Optional[str] = None, **extra_meta: Any) -> ProgressSink:
+    """
+    Приёмник, публикующий прогресс в meta задачи Celery (state PROCESSING).
+
+    task_id — под каким идентификатором публиковать (по умолчанию — своим);
+    этапы цепочки публикуют под идентификатором, который видит клиент.
+    """
+
+    def sink(stage: str, progress: float, sub_progress: float, message: Optional[str]) -> None:
+        meta: Dict[str, Any] = {
+            'stage': stage,
+            'progress': round(progress, 1),
+            'sub_progress': round(sub_progress, 1),
+            'message': message,
+        }
+        meta.update(extra_meta)
+        task.update_state(task_id=task_id, state='PROCESSING', meta=meta)
+
+    return sink
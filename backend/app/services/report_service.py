@@ -0,0 +1,355 @@
+"""
+Отложенная генерация отчетов о проверке.
+
+При обработке документа сохраняются только результаты проверки под
+идентификатором ``report_id`` — хешем их канонического JSON. Сам отчет строится
+при первом обращении и кэшируется на диске, поэтому неиспользованные отчеты
+ничего не стоят, а повторные запросы одинаковых результатов отдаются из кэша.
+
+Поддерживаемые форматы: ``json`` (сводка), ``html`` и ``docx``. DOCX собирается
+из заранее подготовленного шаблона со стилями, а не настраивается заново.
+"""
+
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Pt
+
+from .storage_usage import storage_usage
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+REPORTS_DIR = BACKEND_ROOT / 'app' / 'static' / 'reports'
+# Результаты проверки, из которых строятся отчеты; хранятся вне static/,
+# чтобы не раздаваться напрямую, и должны быть общими для web и воркеров
+REPORT_DATA_DIR = Path(os.getenv('REPORT_DATA_DIR') or BACKEND_ROOT / 'app' / 'data' / 'reports')
+
+REPORT_FORMATS = ('json', 'html', 'docx')
+
+_REPORT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+SEVERITY_LABELS = {
+    'high': 'Критические',
+    'medium': 'Средние',
+    'low': 'Незначительные',
+}
+
+_template_bytes: Optional[bytes] = None
+_template_lock = threading.Lock()
+# Блокировки рендеринга (по хешу report_id), чтобы один отчет не строился дважды
+_render_locks = [threading.Lock() for _ in range(16)]
+
+
+class ReportNotFound(Exception):
+    """Результаты проверки для отчета не найдены."""
+
+
+def compute_report_id(check_results: dict, original_filename: str = '') -> str:
+    """Возвращает идентификатор отчета — хеш канонического JSON результатов."""
+    canonical = json.dumps(
+        {'filename': original_filename, 'results': check_results},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+def is_valid_report_id(report_id: str) -> bool:
+    return bool(report_id and _REPORT_ID_RE.match(report_id))
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Записывает файл через временный файл, чтобы читатели не видели частичный результат."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, str(path))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    storage_usage.record_write(str(path))
+
+
+def register_report(check_results: dict, original_filename: str = 'document.docx') -> str:
+    """
+    Сохраняет результаты проверки для последующей генерации отчета.
+
+    Args:
+        check_results: Результаты NormControlChecker.check_document()
+        original_filename: Имя проверяемого файла
+
+    Returns:
+        str: report_id
+    """
+    report_id = compute_report_id(check_results, original_filename)
+    data_path = REPORT_DATA_DIR / f'{report_id}.json'
+    if not data_path.exists():
+        payload = {
+            'report_id': report_id,
+            'original_filename': original_filename,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'check_results': check_results,
+        }
+        _atomic_write(data_path, json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+    return report_id
+
+
+def load_report_data(report_id: str) -> Dict[str, Any]:
+    """
+    Загружает сохраненные результаты проверки.
+
+    Raises:
+        ReportNotFound: если идентификатор некорректен или данные отсутствуют
+    """
+    if not is_valid_report_id(report_id):
+        raise ReportNotFound(report_id)
+
+    data_path = REPORT_DATA_DIR / f'{report_id}.json'
+    try:
+        with open(data_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ReportNotFound(report_id)
+
+
+def build_report_summary(check_results: dict) -> Dict[str, Any]:
+    """
+    Сводка по результатам проверки, общая для всех форматов отчета.
+
+    Одинаковые проблемы группируются по (type, description).
+    """
+    check_results = check_results or {}
+    stats = check_results.get('statistics', {}) or {}
+    severity = stats.get('severity', {}) or {}
+    total_issues = int(check_results.get('total_issues_count') or stats.get('total_issues') or 0)
+
+    grouped: Dict[tuple, Dict[str, Any]] = {}
+    for issue in check_results.get('issues', []) or []:
+        key = (issue.get('type', ''), issue.get('description', ''))
+        group = grouped.get(key)
+        if group is None:
+            group = grouped[key] = {
+                'type': key[0],
+                'description': key[1] or key[0],
+                'severity': issue.get('severity', 'low'),
+                'auto_fixable': bool(issue.get('auto_fixable', False)),
+                'count': 0,
+                'locations': set(),
+            }
+        group['count'] += 1
+        location = issue.get('location')
+        if location:
+            group['locations'].add(str(location))
+
+    groups: List[Dict[str, Any]] = []
+    for group in grouped.values():
+        group['locations'] = sorted(group['locations'])
+        groups.append(group)
+
+    return {
+        'total_issues': total_issues,
+        'severity': {
+            'high': severity.get('high', 0),
+            'medium': severity.get('medium', 0),
+            'low': severity.get('low', 0),
+        },
+        'auto_fixable': stats.get('auto_fixable_count', 0),
+        'groups': groups,
+    }
+
+
+def _format_date(iso_value: Optional[str]) -> str:
+    try:
+        return datetime.fromisoformat(iso_value).strftime('%d.%m.%Y %H:%M:%S')
+    except (TypeError, ValueError):
+        return iso_value or ''
+
+
+def render_json(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Отчет в виде JSON-сводки."""
+    return {
+        'report_id': report_data['report_id'],
+        'original_filename': report_data.get('original_filename'),
+        'created_at': report_data.get('created_at'),
+        'summary': build_report_summary(report_data.get('check_results')),
+    }
+
+
+def render_html(report_data: Dict[str, Any]) -> str:
+    """Отчет в виде самостоятельной HTML-страницы."""
+    summary = build_report_summary(report_data.get('check_results'))
+    esc = html.escape
+
+    parts = [
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">',
+        '<title>Отчет о проверке документа</title>',
+        '<style>body{font-family:sans-serif;max-width:900px;margin:2em auto;}'
+        '.high{color:#c62828}.medium{color:#ef6c00}.low{color:#546e7a}'
+        'li{margin-bottom:.5em}.loc{color:#666;font-size:.9em}</style>',
+        '</head><body>',
+        '<h1>Отчет о проверке документа</h1>',
+        f'<p><b>Исходный файл:</b> {esc(report_data.get("original_filename") or "")}</p>',
+        f'<p><b>Дата проверки:</b> {esc(_format_date(report_data.get("created_at")))}</p>',
+        '<h2>Итоги проверки</h2><ul>',
+        f'<li>Всего несоответствий: {summary["total_issues"]}</li>',
+    ]
+    for level, label in SEVERITY_LABELS.items():
+        parts.append(f'<li class="{level}">{label}: {summary["severity"][level]}</li>')
+    parts.append(f'<li>Автоматически исправимых: {summary["auto_fixable"]}</li></ul>')
+
+    if summary['groups']:
+        parts.append('<h2>Детализация проблем</h2><ul>')
+        for group in summary['groups']:
+            severity = esc(str(group['severity']))
+            header = f'[{severity}] {esc(group["description"])}'
+            if group['auto_fixable']:
+                header += ' (автоисправимо)'
+            parts.append(f'<li class="{severity}">{header}')
+            if group['locations']:
+                parts.append(f'<div class="loc">Места: {esc(", ".join(group["locations"]))}</div>')
+            parts.append('</li>')
+        parts.append('</ul>')
+    else:
+        parts.append('<p><b>Несоответствия не обнаружены.</b></p>')
+
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def _build_template() -> bytes:
+    """Собирает пустой документ с настроенными стилями отчета."""
+    doc = Document()
+    styles = doc.styles
+
+    title_style = styles.add_style('Report Title', WD_STYLE_TYPE.PARAGRAPH)
+    title_style.base_style = styles['Normal']
+    title_style.font.size = Pt(16)
+    title_style.font.bold = True
+    title_style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    title_style.paragraph_format.space_after = Pt(12)
+
+    section_style = styles.add_style('Report Section', WD_STYLE_TYPE.PARAGRAPH)
+    section_style.base_style = styles['Normal']
+    section_style.font.bold = True
+    section_style.paragraph_format.space_before = Pt(12)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _get_template_bytes() -> bytes:
+    global _template_bytes
+    if _template_bytes is None:
+        with _template_lock:
+            if _template_bytes is None:
+                _template_bytes = _build_template()
+    return _template_bytes
+
+
+def _render_docx_document(report_data: Dict[str, Any]) -> Document:
+    """Заполняет шаблон отчета содержимым."""
+    summary = build_report_summary(report_data.get('check_results'))
+    doc = Document(io.BytesIO(_get_template_bytes()))
+
+    doc.add_paragraph('Отчет о проверке документа', style='Report Title')
+
+    meta = doc.add_paragraph()
+    meta.add_run('Исходный файл: ').bold = True
+    meta.add_run(report_data.get('original_filename') or '')
+    meta2 = doc.add_paragraph()
+    meta2.add_run('Дата проверки: ').bold = True
+    meta2.add_run(_format_date(report_data.get('created_at')))
+
+    doc.add_paragraph('Итоги проверки:', style='Report Section')
+    doc.add_paragraph(
+        f"Всего несоответствий: {summary['total_issues']}\n"
+        + '; '.join(f'{label}: {summary["severity"][level]}' for level, label in SEVERITY_LABELS.items())
+        + f"\nАвтоматически исправимых: {summary['auto_fixable']}"
+    )
+
+    if summary['groups']:
+        doc.add_paragraph('Детализация проблем:', style='Report Section')
+        for group in summary['groups']:
+            header = f"[{group['severity']}] {group['description']}"
+            if group['auto_fixable']:
+                header += ' (автоисправимо)'
+            doc.add_paragraph(header, style='List Bullet')
+            if group['locations']:
+                doc.add_paragraph(f"Места: {', '.join(group['locations'])}")
+    else:
+        ok = doc.add_paragraph()
+        ok.add_run('Несоответствия не обнаружены.').bold = True
+
+    return doc
+
+
+def _render_lock(report_id: str) -> threading.Lock:
+    return _render_locks[int(report_id[:2], 16) % len(_render_locks)]
+
+
+def get_report_file(report_id: str, fmt: str = 'docx') -> str:
+    """
+    Возвращает путь к файлу отчета, создавая его при первом обращении.
+
+    Args:
+        report_id: Идентификатор отчета
+        fmt: 'docx' или 'html'
+
+    Returns:
+        str: Абсолютный путь к файлу отчета
+
+    Raises:
+        ReportNotFound: если результаты проверки не найдены
+        ValueError: если формат не поддерживается файловым кэшем
+    """
+    if fmt not in ('docx', 'html'):
+        raise ValueError(f'Неподдерживаемый формат отчета: {fmt}')
+    if not is_valid_report_id(report_id):
+        raise ReportNotFound(report_id)
+
+    report_path = REPORTS_DIR / f'report_{report_id}.{fmt}'
+    if report_path.exists():
+        return str(report_path)
+
+    with _render_lock(report_id):
+        if report_path.exists():
+            return str(report_path)
+
+        report_data = load_report_data(report_id)
+        if fmt == 'docx':
+            buffer = io.BytesIO()
+            _render_docx_document(report_data).save(buffer)
+            data = buffer.getvalue()
+        else:
+            data = render_html(report_data).encode('utf-8')
+
+        _atomic_write(report_path, data)
+        logger.info(f"Отчет {report_id} ({fmt}) сгенерирован")
+
+    return str(report_path)
+
+
+def get_report_download_name(report_data: Dict[str, Any], fmt: str) -> str:
+    """Имя файла отчета для Content-Disposition."""
+    base_name = Path(report_data.get('original_filename') or 'document').stem or 'document'
+    return f'report_{base_name}.{fmt}'
@@ -0,0 +1,350 @@
+"""
+Профилирование отдельных запросов.
+
+Администратор включает профилирование запроса заголовком
+X-Profile-Request (или параметром profile_request): значение cprofile
+(по умолчанию) запускает детерминированный cProfile, sample — выборочный
+профилировщик стека. Право на это есть у пользователя с ролью admin (JWT) и
+у API-ключа администратора со scope admin:profile (выдать этот scope может
+только администратор); для остальных флаг игнорируется.
+
+Кроме того, REQUEST_PROFILE_SAMPLE_RATE задаёт долю запросов, которые
+профилируются выборочным профилировщиком всегда (в production — малая доля,
+например 0.01): он лишь раз в REQUEST_PROFILE_SAMPLE_INTERVAL секунд читает
+стек потока запроса.
+
+Результат сохраняется в REQUEST_PROFILE_DIR под ID профиля (заголовок ответа
+X-Profile-Id):
+
+- <id>.json — метаданные запроса;
+- <id>.pstats — для cProfile (snakeviz, gprof2dot, pstats);
+- <id>.collapsed — свёрнутые стеки для flamegraph.pl / speedscope
+  (выборочный режим).
+
+Хранится не больше REQUEST_PROFILE_MAX_FILES профилей, старые удаляются.
+Профили отдаются через /api/document/admin/profiles.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile-Request'
+PROFILE_PARAM = 'profile_request'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_SCOPE = 'admin:profile'
+
+MODE_CPROFILE = 'cprofile'
+MODE_SAMPLE = 'sample'
+MODES = (MODE_CPROFILE, MODE_SAMPLE)
+
+ARTIFACT_SUFFIXES = {MODE_CPROFILE: '.pstats', MODE_SAMPLE: '.collapsed'}
+
+DEFAULT_PROFILE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'request_profiles'
+)
+
+# Глубина стека, которую сохраняет выборочный профилировщик
+MAX_STACK_DEPTH = 128
+
+
+class StackSampler:
+    """
+    Выборочный профилировщик одного потока: фоновый поток раз в interval
+    секунд читает стек профилируемого потока и считает одинаковые стеки.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            del frame
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        """Стеки в формате 'a;b;c <число выборок>' (по строке на стек)."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """Профилирование одного запроса."""
+
+    def __init__(self, mode: str, trigger: str, interval: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.trigger = trigger
+        self.started_at = time.perf_counter()
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+        if mode == MODE_CPROFILE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._profile = profile
+            except ValueError:
+                # В потоке уже работает другой профилировщик
+                self.mode = MODE_SAMPLE
+        if self.mode == MODE_SAMPLE:
+            self._sampler = StackSampler(threading.get_ident(), interval)
+            self._sampler.start()
+
+    def stop(self) -> float:
+        """Останавливает профилировщик; возвращает длительность в секундах."""
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        return time.perf_counter() - self.started_at
+
+    def write_artifact(self, path: str) -> None:
+        if self._profile is not None:
+            self._profile.dump_stats(path)
+        elif self._sampler is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._sampler.collapsed())
+
+
+class RequestProfiler:
+    """
+    Профилировщик запросов приложения и хранилище профилей.
+
+    Args:
+        directory: Каталог профилей
+        sample_rate: Доля запросов, профилируемых без запроса администратора
+        sample_interval: Период выборки стека (секунды)
+        max_files: Максимум хранимых профилей
+    """
+
+    def __init__(self, directory: str = DEFAULT_PROFILE_DIR, sample_rate: float = 0.0,
+                 sample_interval: float = 0.005, max_files: int = 200):
+        self.directory = directory
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.sample_interval = max(0.001, sample_interval)
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+
+    def start(self, mode: str, trigger: str) -> ProfileSession:
+        return ProfileSession(mode, trigger, self.sample_interval)
+
+    def finish(self, session: ProfileSession, meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Останавливает профилирование и сохраняет профиль."""
+        duration = session.stop()
+        record = dict(
+            meta,
+            id=session.id,
+            mode=session.mode,
+            trigger=session.trigger,
+            created_at=session.created_at,
+            duration_ms=round(duration * 1000, 3),
+            artifact=session.id + ARTIFACT_SUFFIXES[session.mode],
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            session.write_artifact(os.path.join(self.directory, record['artifact']))
+            with open(os.path.join(self.directory, f'{session.id}.json'), 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить профиль запроса {session.id}: {e}")
+            return None
+        self._prune()
+        return record
+
+    def list_profiles(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Метаданные профилей, новые первыми."""
+        records = []
+        for path in self._meta_files()[:limit]:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return records
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _valid_id(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{profile_id}.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def artifact_path(self, record: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, record['artifact'])
+
+    def summary(self, record: Dict[str, Any], limit: int = 40) -> str:
+        """Текстовая сводка профиля: top функций cProfile или самые частые стеки."""
+        path = self.artifact_path(record)
+        if record['mode'] == MODE_CPROFILE:
+            out = io.StringIO()
+            pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+        with open(path, 'r', encoding='utf-8') as f:
+            return ''.join(line for _, line in zip(range(limit), f))
+
+    def _meta_files(self) -> List[str]:
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return []
+        paths = [os.path.join(self.directory, name) for name in names]
+        return sorted(paths, key=_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        with self._lock:
+            for path in self._meta_files()[self.max_files:]:
+                profile_id = os.path.basename(path)[:-len('.json')]
+                for suffix in ('.json',) + tuple(ARTIFACT_SUFFIXES.values()):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + suffix))
+                    except OSError:
+                        pass
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _valid_id(profile_id: str) -> bool:
+    return bool(profile_id) and len(profile_id) <= 32 and all(c in '0123456789abcdef' for c in profile_id)
+
+
+def is_profiling_admin() -> bool:
+    """Запрос от администратора: JWT пользователя admin или его API-ключ со scope admin:profile."""
+    from app.services.api_key_auth import _extract_api_key_from_request, resolve_api_key
+
+    raw_key, api_key_attempt = _extract_api_key_from_request()
+    if api_key_attempt:
+        api_key = resolve_api_key(raw_key) if raw_key else None
+        if not (api_key and api_key.is_valid and PROFILE_SCOPE in api_key.scopes):
+            return False
+        # Scope могли выдать до того, как владелец лишился роли admin
+        return _is_admin_user(api_key.user_id)
+
+    if not (request.headers.get('Authorization') or '').lower().startswith('bearer '):
+        return False
+    try:
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception as e:
+        logger.debug(f"Профилирование недоступно: {e}")
+        return False
+    return identity is not None and _is_admin_user(identity)
+
+
+def _is_admin_user(user_id) -> bool:
+    from app.extensions import db
+    from app.models import User
+
+    try:
+        user = db.session.get(User, int(user_id))
+    except Exception as e:
+        logger.debug(f"Профилирование недоступно: {e}")
+        return False
+    return bool(user and user.is_admin)
+
+
+def get_request_profiler() -> RequestProfiler:
+    """Профилировщик текущего приложения (настройки REQUEST_PROFILE_*)."""
+    profiler = current_app.extensions.get('request_profiler')
+    if profiler is None:
+        profiler = current_app.extensions.setdefault(
+            'request_profiler', _build_profiler(current_app.config)
+        )
+    return profiler
+
+
+def _build_profiler(config) -> RequestProfiler:
+    return RequestProfiler(
+        directory=config.get('REQUEST_PROFILE_DIR') or DEFAULT_PROFILE_DIR,
+        sample_rate=float(config.get('REQUEST_PROFILE_SAMPLE_RATE', 0) or 0),
+        sample_interval=float(config.get('REQUEST_PROFILE_SAMPLE_INTERVAL', 0.005) or 0.005),
+        max_files=int(config.get('REQUEST_PROFILE_MAX_FILES', 200) or 200),
+    )
+
+
+def _requested_mode() -> Optional[str]:
+    value = (request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAM) or '').strip().lower()
+    if not value or value in ('0', 'false', 'off', 'no'):
+        return None
+    return value if value in MODES else MODE_CPROFILE
+
+
+def init_request_profiler(app: Flask) -> RequestProfiler:
+    """Подключает профилирование запросов к приложению."""
+    profiler = app.extensions.setdefault('request_profiler', _build_profiler(app.config))
+
+    @app.before_request
+    def _start_request_profile():
+        mode = _requested_mode()
+        if mode is not None and is_profiling_admin():
+            g.request_profile = profiler.start(mode, 'admin')
+        elif profiler.sample_rate and random.random() < profiler.sample_rate:
+            g.request_profile = profiler.start(MODE_SAMPLE, 'sampled')
+
+    def _finish(status_code: int) -> Optional[Dict[str, Any]]:
+        session = g.pop('request_profile', None)
+        if session is None:
+            return None
+        return profiler.finish(session, {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': status_code,
+        })
+
+    @app.after_request
+    def _finish_request_profile(response):
+        record = _finish(response.status_code)
+        if record is not None:
+            response.headers[PROFILE_ID_HEADER] = record['id']
+        return response
+
+    @app.teardown_request
+    def _abort_request_profile(exception):
+        # after_request не вызывается при необработанном исключении
+        _finish(500)
+
+    return profiler
@@ -0,0 +1,275 @@
+"""
+Скомпилированный план правил профиля.
+
+Проверка норм (NormControlChecker), валидаторы (BaseValidator) и
+автоисправление (DocumentCorrector) раньше читали JSON профиля каждый
+по-своему и со своими значениями по умолчанию. compile_rule_plan один раз
+превращает профиль в неизменяемый RulePlan:
+
+- значения по умолчанию берутся из единого DEFAULT_RULES (совпадает с
+  профилем default_gost);
+- размеры переведены в единицы python-docx (Length: EMU, .pt, .cm, .twips),
+  размер шрифта — ещё и в полупункты, межстрочный интервал — в твипы;
+- выравнивания приведены к WD_PARAGRAPH_ALIGNMENT;
+- шаблоны библиографии скомпилированы.
+
+В горячих циклах правила читаются как атрибуты (plan.font.size), для
+произвольных ключей есть plan.get('tables.font_size') — поиск в заранее
+развёрнутом словаре, без разбора пути.
+
+rule_plan_for кэширует план для разрешённых профилей profile_loader
+(FrozenDict): пока профиль не изменился, все проверки используют один план.
+"""
+
+import re
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Pattern, Tuple
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Cm, Length, Pt
+
+from .profile_loader import FrozenDict, freeze
+
+# Единые значения по умолчанию (совпадают с profiles/default_gost.json)
+DEFAULT_RULES: Dict[str, Any] = {
+    'font': {'name': 'Times New Roman', 'size': 14.0, 'color': '000000'},
+    'margins': {'left': 3.0, 'right': 1.5, 'top': 2.0, 'bottom': 2.0},
+    'line_spacing': 1.5,
+    'first_line_indent': 1.25,
+    'paragraph_alignment': 'JUSTIFY',
+    'headings': {
+        'h1': {'font_size': 14.0, 'bold': True, 'alignment': 'CENTER', 'all_caps': True,
+               'space_before': 0, 'space_after': 12},
+        'h2': {'font_size': 14.0, 'bold': True, 'alignment': 'LEFT',
+               'space_before': 12, 'space_after': 12},
+        'h3': {'font_size': 14.0, 'bold': True, 'alignment': 'LEFT',
+               'space_before': 12, 'space_after': 0},
+    },
+    'tables': {'font_size': 12.0},
+    'required_sections': ['введение', 'заключение', 'список литературы', 'содержание'],
+    'bibliography': {'min_sources': 15, 'max_age_years': 5},
+}
+
+ALIGNMENTS = {
+    'LEFT': WD_PARAGRAPH_ALIGNMENT.LEFT,
+    'CENTER': WD_PARAGRAPH_ALIGNMENT.CENTER,
+    'RIGHT': WD_PARAGRAPH_ALIGNMENT.RIGHT,
+    'JUSTIFY': WD_PARAGRAPH_ALIGNMENT.JUSTIFY,
+}
+
+
+def _alignment(value: Any, default=WD_PARAGRAPH_ALIGNMENT.LEFT):
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        return value
+    return ALIGNMENTS.get(value.upper(), default)
+
+
+def _merge(base: Mapping[str, Any], override: Mapping[str, Any]) -> Dict[str, Any]:
+    result = dict(base)
+    for key, value in override.items():
+        if isinstance(result.get(key), Mapping) and isinstance(value, Mapping):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def _flatten(value: Mapping[str, Any], prefix: str = '', out: Optional[Dict[str, Any]] = None):
+    out = {} if out is None else out
+    for key, item in value.items():
+        path = f'{prefix}{key}'
+        out[path] = item
+        if isinstance(item, Mapping):
+            _flatten(item, f'{path}.', out)
+    return out
+
+
+@dataclass(frozen=True)
+class FontPlan:
+    name: str
+    size_pt: float
+    size: Length
+    half_points: int
+    color: Optional[str]
+    allowed_fonts: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class MarginsPlan:
+    left_cm: float
+    right_cm: float
+    top_cm: float
+    bottom_cm: float
+    left: Length
+    right: Length
+    top: Length
+    bottom: Length
+
+
+@dataclass(frozen=True)
+class HeadingPlan:
+    level: str
+    font_size_pt: float
+    font_size: Length
+    bold: bool
+    alignment: Any
+    all_caps: bool
+    space_before_pt: float
+    space_after_pt: float
+
+
+@dataclass(frozen=True)
+class BibliographyPlan:
+    min_sources: int
+    max_age_years: int
+    patterns: Mapping[str, Pattern] = field(default_factory=FrozenDict)
+    # Те же шаблоны без учёта регистра (для валидатора библиографии)
+    patterns_ci: Mapping[str, Pattern] = field(default_factory=FrozenDict)
+    messages: Mapping[str, str] = field(default_factory=FrozenDict)
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Правила профиля в готовом к использованию виде."""
+
+    name: str
+    font: FontPlan
+    margins: MarginsPlan
+    line_spacing: float
+    line_spacing_twips: int
+    first_line_indent_cm: float
+    first_line_indent: Length
+    paragraph_alignment: Any
+    headings: Mapping[str, HeadingPlan]
+    required_sections: Tuple[str, ...]
+    bibliography: BibliographyPlan
+    validation: Mapping[str, Any]
+    # Правила профиля вместе со значениями по умолчанию
+    rules: Mapping[str, Any]
+    _flat: Mapping[str, Any] = field(repr=False, compare=False)
+
+    def get(self, rule_key: str, default: Any = None) -> Any:
+        """Значение правила по пути вида 'font.size' (None — default)."""
+        value = self._flat.get(rule_key)
+        return default if value is None else value
+
+    def heading(self, level: str) -> Optional[HeadingPlan]:
+        return self.headings.get(level)
+
+
+def _heading(level: str, rules: Mapping[str, Any], font_size: float) -> HeadingPlan:
+    size = float(rules.get('font_size') or font_size)
+    return HeadingPlan(
+        level=level,
+        font_size_pt=size,
+        font_size=Pt(size),
+        bold=bool(rules.get('bold', True)),
+        alignment=_alignment(rules.get('alignment')),
+        all_caps=bool(rules.get('all_caps', False)),
+        space_before_pt=float(rules.get('space_before') or 0),
+        space_after_pt=float(rules.get('space_after') or 0),
+    )
+
+
+def _bibliography(profile: Mapping[str, Any], rules: Mapping[str, Any]) -> BibliographyPlan:
+    bib_rules = rules.get('bibliography') or {}
+    # Шаблоны хранятся либо в rules.bibliography, либо в разделе bibliography профиля
+    top = profile.get('bibliography') or {}
+    patterns = _merge(bib_rules.get('patterns') or {}, top.get('patterns') or {})
+    messages = _merge(bib_rules.get('messages') or {}, top.get('messages') or {})
+
+    compiled, compiled_ci = {}, {}
+    for key, pattern in patterns.items():
+        try:
+            compiled[key] = re.compile(pattern)
+            compiled_ci[key] = re.compile(pattern, re.IGNORECASE)
+        except (re.error, TypeError):
+            continue
+    return BibliographyPlan(
+        min_sources=int(bib_rules.get('min_sources') or 0),
+        max_age_years=int(bib_rules.get('max_age_years') or 0),
+        patterns=FrozenDict(compiled),
+        patterns_ci=FrozenDict(compiled_ci),
+        messages=FrozenDict(messages),
+    )
+
+
+def compile_rule_plan(profile: Optional[Mapping[str, Any]]) -> RulePlan:
+    """Компилирует профиль (или None — правила по умолчанию) в RulePlan."""
+    profile = profile or {}
+    rules = freeze(_merge(DEFAULT_RULES, profile.get('rules') or {}))
+
+    font_rules = rules['font']
+    font_size = float(font_rules.get('size') or DEFAULT_RULES['font']['size'])
+    font_name = font_rules.get('name') or DEFAULT_RULES['font']['name']
+    margins = {side: float(rules['margins'].get(side) or DEFAULT_RULES['margins'][side])
+               for side in ('left', 'right', 'top', 'bottom')}
+    line_spacing = float(rules.get('line_spacing') or DEFAULT_RULES['line_spacing'])
+    indent = rules.get('first_line_indent')
+    indent = float(DEFAULT_RULES['first_line_indent'] if indent is None else indent)
+
+    headings = {
+        level: _heading(level, rules['headings'][level], font_size)
+        for level in rules['headings'] if isinstance(rules['headings'][level], Mapping)
+    }
+
+    return RulePlan(
+        name=profile.get('name', 'Базовый ГОСТ'),
+        font=FontPlan(
+            name=font_name,
+            size_pt=font_size,
+            size=Pt(font_size),
+            half_points=int(font_size * 2),
+            color=font_rules.get('color'),
+            allowed_fonts=tuple(font_rules.get('allowed_fonts') or (font_name,)),
+        ),
+        margins=MarginsPlan(
+            left_cm=margins['left'], right_cm=margins['right'],
+            top_cm=margins['top'], bottom_cm=margins['bottom'],
+            left=Cm(margins['left']), right=Cm(margins['right']),
+            top=Cm(margins['top']), bottom=Cm(margins['bottom']),
+        ),
+        line_spacing=line_spacing,
+        line_spacing_twips=int(line_spacing * 240),
+        first_line_indent_cm=indent,
+        first_line_indent=Cm(indent),
+        paragraph_alignment=_alignment(rules.get('paragraph_alignment'), WD_PARAGRAPH_ALIGNMENT.JUSTIFY),
+        headings=FrozenDict(headings),
+        required_sections=tuple(rules.get('required_sections') or ()),
+        bibliography=_bibliography(profile, rules),
+        validation=freeze(dict(profile.get('validation') or {})),
+        rules=rules,
+        _flat=FrozenDict(_flatten(rules)),
+    )
+
+
+DEFAULT_PLAN = compile_rule_plan(None)
+
+# Планы разрешённых профилей; запись исчезает вместе с профилем
+_plans: 'weakref.WeakKeyDictionary[FrozenDict, RulePlan]' = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def rule_plan_for(profile: Optional[Mapping[str, Any]]) -> RulePlan:
+    """
+    План для профиля.
+
+    Для FrozenDict из profile_loader план компилируется один раз; изменяемые
+    словари компилируются при каждом вызове.
+    """
+    if not profile:
+        return DEFAULT_PLAN
+    if not isinstance(profile, FrozenDict):
+        return compile_rule_plan(profile)
+
+    with _lock:
+        plan = _plans.get(profile)
+    if plan is None:
+        plan = compile_rule_plan(profile)
+        with _lock:
+            _plans[profile] = plan
+    return plan
@@ -0,0 +1,200 @@
+"""
+Инкрементальный учёт занимаемого места в каталогах хранилища.
+
+Вместо обхода файловой системы на каждый запрос ``/health/detailed`` размеры
+каталогов обновляются при записи/удалении артефактов и периодически
+сверяются с диском фоновым потоком. Health-эндпоинты читают готовый снимок
+из памяти.
+"""
+
+import os
+import threading
+import time
+import logging
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Каталоги, которые отслеживаются по умолчанию
+DEFAULT_TRACKED_DIRS: Dict[str, str] = {
+    "corrections": os.path.join(BASE_DIR, "app", "static", "corrections"),
+    "reports": os.path.join(BASE_DIR, "app", "static", "reports"),
+    "profiles": os.path.join(BASE_DIR, "profiles"),
+    "logs": os.path.join(BASE_DIR, "app", "logs"),
+}
+
+# Интервал фоновой сверки с диском (секунды)
+DEFAULT_RECONCILE_INTERVAL = int(os.getenv("STORAGE_RECONCILE_INTERVAL", "300"))
+
+
+def _scan_directory(path: str) -> Dict[str, int]:
+    """Обходит каталог и возвращает размеры файлов верхнего уровня и вложенных."""
+    sizes: Dict[str, int] = {}
+    if not os.path.exists(path):
+        return sizes
+
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            try:
+                sizes[os.path.relpath(file_path, path)] = os.path.getsize(file_path)
+            except (OSError, IOError):
+                pass
+    return sizes
+
+
+class StorageUsageTracker:
+    """
+    Потокобезопасный учёт количества и размера файлов в каталогах хранилища.
+
+    Для каждого каталога хранится карта ``относительный путь -> размер``,
+    поэтому перезапись и удаление файлов корректно учитываются без обхода диска.
+    """
+
+    def __init__(self, directories: Optional[Dict[str, str]] = None):
+        self._directories = {
+            name: os.path.abspath(path)
+            for name, path in (directories or DEFAULT_TRACKED_DIRS).items()
+        }
+        self._files: Dict[str, Dict[str, int]] = {name: {} for name in self._directories}
+        self._lock = threading.Lock()
+        self._reconciled = False
+        self._last_reconcile_at: Optional[float] = None
+        self._last_reconcile_duration: Optional[float] = None
+        self._reconcile_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _locate(self, path: str):
+        """Возвращает (имя каталога, относительный путь) для отслеживаемого файла."""
+        abs_path = os.path.abspath(path)
+        for name, directory in self._directories.items():
+            if abs_path.startswith(directory + os.sep):
+                return name, os.path.relpath(abs_path, directory)
+        return None, None
+
+    def record_write(self, path: str, size: Optional[int] = None) -> None:
+        """Учитывает создание или перезапись файла."""
+        name, rel_path = self._locate(path)
+        if name is None:
+            return
+
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except (OSError, IOError):
+                return
+
+        with self._lock:
+            self._files[name][rel_path] = size
+
+    def record_delete(self, path: str) -> None:
+        """Учитывает удаление файла."""
+        name, rel_path = self._locate(path)
+        if name is None:
+            return
+
+        with self._lock:
+            self._files[name].pop(rel_path, None)
+
+    def refresh(self, name: str) -> None:
+        """Пересканирует один небольшой каталог (например, профили после изменения)."""
+        directory = self._directories.get(name)
+        if directory is None:
+            return
+
+        scanned = _scan_directory(directory)
+        with self._lock:
+            self._files[name] = scanned
+
+    def reconcile(self) -> float:
+        """
+        Сверяет учёт с фактическим содержимым каталогов.
+
+        Returns:
+            Длительность сверки в секундах
+        """
+        start_time = time.perf_counter()
+        scanned = {name: _scan_directory(path) for name, path in self._directories.items()}
+        duration = time.perf_counter() - start_time
+
+        with self._lock:
+            self._files = scanned
+            self._reconciled = True
+            self._last_reconcile_at = time.time()
+            self._last_reconcile_duration = duration
+
+        try:
+            from app.metrics import metrics
+
+            metrics.histogram_observe("cursa_storage_reconcile_duration_seconds", duration)
+            metrics.set_gauge_mode("cursa_storage_reconcile_last_duration_seconds", "max")
+            metrics.gauge_set("cursa_storage_reconcile_last_duration_seconds", duration)
+        except ImportError:
+            pass
+
+        logger.debug("Сверка хранилища завершена за %.4f с", duration)
+        return duration
+
+    def get_usage(self, name: str, extension: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Возвращает количество файлов и размер каталога.
+
+        Args:
+            name: Имя отслеживаемого каталога
+            extension: Учитывать в количестве только файлы с этим расширением
+                (только файлы верхнего уровня, как в прежнем ``get_files_count``)
+        """
+        if not self._reconciled:
+            self.reconcile()
+
+        with self._lock:
+            files = self._files.get(name, {})
+            total_size = sum(files.values())
+            count = sum(
+                1
+                for rel_path in files
+                if os.sep not in rel_path and (extension is None or rel_path.endswith(extension))
+            )
+
+        return {"count": count, "size_bytes": total_size}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Метаданные последней сверки."""
+        return {
+            "last_reconcile_at": self._last_reconcile_at,
+            "last_reconcile_duration_seconds": (
+                round(self._last_reconcile_duration, 4)
+                if self._last_reconcile_duration is not None
+                else None
+            ),
+        }
+
+    def start_background_reconcile(self, interval: int = DEFAULT_RECONCILE_INTERVAL) -> None:
+        """Запускает фоновый поток периодической сверки (идемпотентно)."""
+        if self._reconcile_thread and self._reconcile_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.warning("Ошибка фоновой сверки хранилища: %s", e)
+                self._stop_event.wait(interval)
+
+        self._reconcile_thread = threading.Thread(
+            target=_loop, name="storage-usage-reconcile", daemon=True
+        )
+        self._reconcile_thread.start()
+
+    def stop_background_reconcile(self) -> None:
+        """Останавливает фоновую сверку."""
+        self._stop_event.set()
+
+
+# Глобальный экземпляр
+storage_usage = StorageUsageTracker()
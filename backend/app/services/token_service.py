@@ -1,12 +1,168 @@
 """Token management with Redis blacklist support"""
 
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
 from flask_jwt_extended import create_access_token, create_refresh_token
 from redis import Redis
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+BLACKLIST_PREFIX = "token_blacklist:"
+# Sorted set jti -> expiry timestamp (full blacklist, loaded on start)
+BLACKLIST_INDEX_KEY = "token_blacklist_index"
+# Sorted set "jti:expiry" -> revocation timestamp, read incrementally by caches
+BLACKLIST_LOG_KEY = "token_blacklist_log"
+# Log entries older than this are trimmed; a cache that has not synced for
+# that long falls back to a full load from the index
+BLACKLIST_LOG_RETENTION = 24 * 3600
+# Re-read window behind the last sync point: covers clock skew between
+# processes and revocations whose pipeline was still in flight
+BLACKLIST_LOG_OVERLAP = 30.0
+
+
+class RevocationCache:
+    """
+    In-process copy of the token blacklist.
+
+    Every process keeps the set of revoked JTIs (with their expiry) in memory
+    and answers revocation checks from it. The index is loaded once; after
+    that, at most once per `staleness` seconds, only the revocations logged
+    since the previous sync are fetched from BLACKLIST_LOG_KEY and merged in.
+    A revocation made in another process is therefore seen after at most
+    `staleness` seconds, one made in this process immediately.
+
+    Redis is queried outside the lock that guards the local set, so checks
+    are not blocked by a sync in progress; concurrent syncs are serialized.
+
+    If the blacklist cannot be refreshed once the staleness bound has passed,
+    checks fail closed (the token is treated as revoked), as before.
+    """
+
+    def __init__(self, redis_client: Redis, staleness: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+        self.redis = redis_client
+        self.staleness = staleness
+        self._clock = clock
+        self._revoked: Dict[str, float] = {}
+        self._cursor: Optional[float] = None
+        self._synced_at: Optional[float] = None
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.checks = 0
+        self.local = 0
+        self.syncs = 0
+        self.reloads = 0
+        self.fetched = 0
+        self.sync_errors = 0
+
+    def is_revoked(self, jti: str) -> bool:
+        with self._lock:
+            self.checks += 1
+            fresh = self._is_fresh()
+        if not fresh and not self.sync(force=False):
+            return True
+        with self._lock:
+            self.local += 1
+            expires_at = self._revoked.get(jti)
+            return expires_at is not None and expires_at > self._clock()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self, force: bool = True) -> bool:
+        """Refresh from Redis. Returns False if Redis is unavailable."""
+        with self._sync_lock:
+            with self._lock:
+                # Another thread may have synced while we waited
+                if not force and self._is_fresh():
+                    return True
+                cursor = self._cursor
+            started = self._clock()
+            full = cursor is None or started - cursor > BLACKLIST_LOG_RETENTION - BLACKLIST_LOG_OVERLAP
+            try:
+                if full:
+                    revoked = self._load_index(started, initial=cursor is None)
+                else:
+                    revoked = self._fetch_log(cursor - BLACKLIST_LOG_OVERLAP)
+            except Exception as e:
+                with self._lock:
+                    self.sync_errors += 1
+                logger.error(f"✗ Failed to sync token blacklist: {str(e)}")
+                return False
+
+            with self._lock:
+                if full:
+                    self.reloads += 1
+                    # Keep local revocations the index has not caught up with yet
+                    for jti, expires_at in self._revoked.items():
+                        revoked.setdefault(jti, expires_at)
+                    self._revoked = revoked
+                else:
+                    self.fetched += len(revoked)
+                    self._revoked.update(revoked)
+                self._prune(started)
+                self._cursor = started
+                self.syncs += 1
+                self._synced_at = self._clock()
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            age = None if self._synced_at is None else round(self._clock() - self._synced_at, 3)
+            return {
+                "size": len(self._revoked),
+                "checks": self.checks,
+                "local": self.local,
+                "hit_rate": round(self.local / self.checks, 4) if self.checks else None,
+                "syncs": self.syncs,
+                "reloads": self.reloads,
+                "fetched": self.fetched,
+                "sync_errors": self.sync_errors,
+                "staleness_seconds": self.staleness,
+                "sync_age_seconds": age,
+            }
+
+    def _is_fresh(self) -> bool:
+        return self._synced_at is not None and self._clock() - self._synced_at < self.staleness
+
+    def _prune(self, now: float) -> None:
+        # Expired entries are harmless (checks compare the expiry), so the
+        # O(n) sweep runs at most once per overlap window
+        if now - self._pruned_at < BLACKLIST_LOG_OVERLAP:
+            return
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._pruned_at = now
+
+    def _fetch_log(self, since: float) -> Dict[str, float]:
+        revoked = {}
+        for member, _ in self.redis.zrangebyscore(BLACKLIST_LOG_KEY, since, "+inf", withscores=True):
+            member = member.decode() if isinstance(member, bytes) else member
+            jti, _, expires_at = member.rpartition(":")
+            revoked[jti] = float(expires_at)
+        return revoked
+
+    def _load_index(self, now: float, initial: bool) -> Dict[str, float]:
+        revoked = {
+            (jti.decode() if isinstance(jti, bytes) else jti): score
+            for jti, score in self.redis.zrangebyscore(
+                BLACKLIST_INDEX_KEY, now, "+inf", withscores=True
+            )
+        }
+        if initial:
+            # Entries revoked before the index existed only have their own key
+            for key in self.redis.scan_iter(match=f"{BLACKLIST_PREFIX}*", count=500):
+                key = key.decode() if isinstance(key, bytes) else key
+                jti = key[len(BLACKLIST_PREFIX):]
+                if jti not in revoked:
+                    ttl = self.redis.ttl(key)
+                    revoked[jti] = now + ttl if ttl and ttl > 0 else float("inf")
+        return revoked
+
 
 class TokenManager:
     """Manages JWT tokens with Redis blacklist for logout support"""
@@ -20,12 +176,16 @@ class TokenManager:
             config: Config dict with JWT settings
                 - JWT_ACCESS_TOKEN_EXPIRES: seconds (default 900 = 15 min)
                 - JWT_REFRESH_TOKEN_EXPIRES: seconds (default 2592000 = 30 days)
+                - JWT_REVOCATION_STALENESS: seconds a revocation made in another
+                  process may go unnoticed (default 5; 0 = check Redis on every request)
         """
         self.redis = redis_client
         self.access_expires = self._normalize_expiry(config.get("JWT_ACCESS_TOKEN_EXPIRES", 900))
         self.refresh_expires = self._normalize_expiry(
             config.get("JWT_REFRESH_TOKEN_EXPIRES", 2592000)
         )
+        staleness = float(config.get("JWT_REVOCATION_STALENESS", 5))
+        self.revocations = RevocationCache(redis_client, staleness) if staleness > 0 else None
 
         # Validate Redis connection
         try:
@@ -80,15 +240,28 @@ class TokenManager:
 
         Args:
             jti: JWT ID (from token payload)
-            expires_in: Seconds until token naturally expires (to clean up Redis)
+            expires_in: Seconds until token naturally expires (to clean up Redis);
+                an absolute `exp` timestamp is accepted as well
 
         Returns:
             True if revoked successfully
         """
+        now = time.time()
+        expires_in = int(expires_in)
+        if expires_in > now:
+            expires_in = int(expires_in - now)
+        expires_in = max(1, expires_in)
         try:
-            self.redis.setex(
-                f"token_blacklist:{jti}", expires_in, "revoked"  # Auto-delete after token expires
-            )
+            pipe = self.redis.pipeline()
+            # Auto-delete after token expires
+            pipe.setex(f"{BLACKLIST_PREFIX}{jti}", expires_in, "revoked")
+            pipe.zadd(BLACKLIST_INDEX_KEY, {jti: now + expires_in})
+            pipe.zremrangebyscore(BLACKLIST_INDEX_KEY, "-inf", now)
+            pipe.zadd(BLACKLIST_LOG_KEY, {f"{jti}:{now + expires_in}": now})
+            pipe.zremrangebyscore(BLACKLIST_LOG_KEY, "-inf", now - BLACKLIST_LOG_RETENTION)
+            pipe.execute()
+            if self.revocations is not None:
+                self.revocations.add(jti, now + expires_in)
             logger.info(f"✓ Revoked token {jti[:10]}...")
             return True
         except Exception as e:
@@ -99,14 +272,23 @@ class TokenManager:
         """
         Check if JWT is in blacklist
 
+        Answered from the in-process RevocationCache unless it is disabled
+        (JWT_REVOCATION_STALENESS=0).
+
         Args:
             jti: JWT ID from token
 
         Returns:
             True if token is revoked, False otherwise
         """
+        if self.revocations is not None:
+            is_revoked = self.revocations.is_revoked(jti)
+            if is_revoked:
+                logger.debug(f"✗ Token {jti[:10]}... is revoked")
+            return is_revoked
+
         try:
-            is_revoked = self.redis.exists(f"token_blacklist:{jti}") > 0
+            is_revoked = self.redis.exists(f"{BLACKLIST_PREFIX}{jti}") > 0
             if is_revoked:
                 logger.debug(f"✗ Token {jti[:10]}... is revoked")
             return is_revoked
@@ -160,6 +342,10 @@ class TokenManager:
             logger.error(f"✗ Failed to refresh token: {str(e)}")
             raise
 
+    def revocation_stats(self) -> Optional[dict]:
+        """Hit rate and freshness of the local revocation cache"""
+        return self.revocations.stats() if self.revocations is not None else None
+
     def get_token_expiry_times(self) -> dict:
         """Get configured token expiry times"""
         return {
@@ -0,0 +1,200 @@
+"""
+Потоковый приём загружаемых DOCX-файлов.
+
+Файл пишется на диск блоками с одновременным вычислением SHA-256 и контролем
+размера. До любого разбора XML проверяется центральный каталог ZIP-архива:
+количество записей, суммарный распакованный размер и коэффициент сжатия.
+Некорректные загрузки отклоняются без запуска python-docx.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from werkzeug.utils import secure_filename
+
+from app.config.security import (
+    MAX_UPLOAD_SIZE,
+    MAX_BATCH_UPLOAD_SIZE,
+    MULTIPART_OVERHEAD,
+    MIN_FILE_SIZE,
+    UPLOAD_CHUNK_SIZE,
+    MAX_ZIP_ENTRIES,
+    MAX_ZIP_UNCOMPRESSED_SIZE,
+    MAX_ZIP_COMPRESSION_RATIO,
+    ZIP_RATIO_CHECK_MIN_SIZE,
+    REQUIRED_DOCX_PARTS,
+)
+from app.services.content_hash import register_digest
+
+logger = logging.getLogger(__name__)
+
+
+class UploadRejected(Exception):
+    """Загрузка отклонена на этапе приёма."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+@dataclass
+class IngestedUpload:
+    """Результат приёма загрузки."""
+
+    path: str
+    temp_dir: str
+    filename: str
+    size: int
+    sha256: str
+
+    def cleanup(self) -> None:
+        """Удаляет файл и временную директорию."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def normalize_docx_filename(raw_filename: str) -> str:
+    """Возвращает безопасное имя файла с расширением .docx."""
+    filename = secure_filename(raw_filename or '') or 'document.docx'
+    if not filename.lower().endswith('.docx'):
+        filename = os.path.splitext(filename)[0] + '.docx'
+    return filename
+
+
+def check_request_size(content_length: Optional[int], batch: bool = False) -> None:
+    """
+    Отклоняет запрос по заголовку Content-Length до разбора multipart.
+
+    Args:
+        batch: Пакетная загрузка — предел на все файлы запроса
+            (MAX_BATCH_UPLOAD_SIZE), а не на один файл (MAX_UPLOAD_SIZE)
+
+    Raises:
+        UploadRejected: если заявленный размер превышает допустимый
+    """
+    limit = MAX_BATCH_UPLOAD_SIZE if batch else MAX_UPLOAD_SIZE
+    if content_length and content_length > limit + MULTIPART_OVERHEAD:
+        scope = 'на пакет' if batch else 'на файл'
+        raise UploadRejected(
+            f'Размер запроса превышает допустимый ({limit // (1024 * 1024)} МБ {scope})',
+            413,
+        )
+
+
+def inspect_docx_archive(file_path: str) -> None:
+    """
+    Проверяет DOCX по центральному каталогу ZIP без распаковки и разбора XML.
+
+    Raises:
+        UploadRejected: если архив некорректен или похож на zip-бомбу
+    """
+    if not zipfile.is_zipfile(file_path):
+        raise UploadRejected('Файл не является корректным DOCX архивом')
+
+    try:
+        with zipfile.ZipFile(file_path, 'r') as archive:
+            entries = archive.infolist()
+    except (zipfile.BadZipFile, OSError) as exc:
+        raise UploadRejected(f'Некорректный DOCX файл: {exc}')
+
+    if len(entries) > MAX_ZIP_ENTRIES:
+        raise UploadRejected(f'Слишком много частей в DOCX архиве ({len(entries)})')
+
+    total_uncompressed = 0
+    names = set()
+    for entry in entries:
+        names.add(entry.filename)
+        total_uncompressed += entry.file_size
+        if total_uncompressed > MAX_ZIP_UNCOMPRESSED_SIZE:
+            raise UploadRejected('Распакованный размер DOCX превышает допустимый', 413)
+
+        if entry.file_size >= ZIP_RATIO_CHECK_MIN_SIZE:
+            ratio = entry.file_size / max(entry.compress_size, 1)
+            if ratio > MAX_ZIP_COMPRESSION_RATIO:
+                raise UploadRejected(
+                    f'Подозрительный коэффициент сжатия части {entry.filename} ({ratio:.0f}:1)'
+                )
+
+    for required_part in REQUIRED_DOCX_PARTS:
+        if required_part not in names:
+            raise UploadRejected(f'В DOCX отсутствует обязательная часть {required_part}')
+
+
+def ingest_upload(
+    file_storage,
+    filename: Optional[str] = None,
+    temp_dir: Optional[str] = None,
+    max_size: int = MAX_UPLOAD_SIZE,
+) -> IngestedUpload:
+    """
+    Потоково сохраняет загруженный файл и проверяет его.
+
+    Args:
+        file_storage: werkzeug FileStorage из request.files
+        filename: Имя файла на диске (по умолчанию — нормализованное имя загрузки)
+        temp_dir: Директория для сохранения (по умолчанию создаётся новая)
+        max_size: Максимальный размер файла в байтах
+
+    Returns:
+        IngestedUpload с путём, размером и SHA-256
+
+    Raises:
+        UploadRejected: если файл пустой, слишком большой или не является DOCX
+    """
+    filename = filename or normalize_docx_filename(file_storage.filename)
+    owns_temp_dir = temp_dir is None
+    temp_dir = temp_dir or tempfile.mkdtemp()
+    file_path = os.path.join(temp_dir, filename)
+
+    sha256 = hashlib.sha256()
+    size = 0
+    accepted = False
+
+    try:
+        with open(file_path, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadRejected(
+                        f'Файл превышает допустимый размер ({max_size // (1024 * 1024)} МБ)',
+                        413,
+                    )
+                sha256.update(chunk)
+                out.write(chunk)
+
+        if size <= 0:
+            raise UploadRejected('Файл пустой или не был сохранен корректно')
+
+        if size < MIN_FILE_SIZE:
+            raise UploadRejected('Файл слишком маленький для корректного DOCX документа')
+
+        inspect_docx_archive(file_path)
+        accepted = True
+    finally:
+        # Отклонённый или не дочитанный (ошибка чтения, диска) файл не остаётся на диске
+        if not accepted:
+            if owns_temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            elif os.path.exists(file_path):
+                os.remove(file_path)
+
+    digest = sha256.hexdigest()
+    register_digest(file_path, digest)
+    logger.debug("Загрузка %s принята: %d байт, sha256=%s", filename, size, digest[:12])
+
+    return IngestedUpload(
+        path=file_path,
+        temp_dir=temp_dir,
+        filename=filename,
+        size=size,
+        sha256=digest,
+    )
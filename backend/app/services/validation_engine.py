@@ -6,10 +6,13 @@ from typing import Dict, Any, List, Optional, Type
 import time
 import logging
 from pathlib import Path
-import json
 
 from docx import Document
 
+from app.metrics.timing import KIND_VALIDATOR, span
+
+from .profile_loader import load_resolved_profile
+from .rule_plan import rule_plan_for
 from .validators import BaseValidator, ValidationResult, ValidationIssue, Severity
 from .validators.font_validator import FontValidator
 from .validators.margin_validator import MarginValidator
@@ -73,6 +76,8 @@ class ValidationEngine:
         """
         self.logger = logger  # Инициализируем логгер ДО инициализации валидаторов
         self.profile = profile or self._load_default_profile()
+        # Правила профиля компилируются один раз для всех валидаторов
+        self.rule_plan = rule_plan_for(self.profile)
         self.validators = self._initialize_validators()
 
     def validate_document(
@@ -106,7 +111,8 @@ class ValidationEngine:
                 if validator.enabled:
                     self.logger.info(f"Запуск валидатора: {validator.name}")
                     try:
-                        result = validator.validate(document, document_data)
+                        with span(validator.name, KIND_VALIDATOR):
+                            result = validator.validate(document, document_data)
                         validation_results.append(result)
 
                         self.logger.info(
@@ -145,7 +151,7 @@ class ValidationEngine:
 
         for ValidatorClass in self.VALIDATORS:
             try:
-                validator = ValidatorClass(profile=self.profile)
+                validator = ValidatorClass(profile=self.profile, rule_plan=self.rule_plan)
                 validators.append(validator)
                 self.logger.debug(f"Инициализирован валидатор: {validator.name}")
             except Exception as e:
@@ -312,12 +318,9 @@ class ValidationEngine:
             Словарь с профилем
         """
         try:
-            profiles_dir = Path(__file__).parent.parent.parent / "profiles"
-            default_profile_path = profiles_dir / "gost_7_32_2017.json"
-
-            if default_profile_path.exists():
-                with open(default_profile_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            profile = load_resolved_profile("gost_7_32_2017", fallback=None)
+            if profile is not None:
+                return profile
         except Exception as e:
             self.logger.warning(f"Не удалось загрузить профиль по умолчанию: {e}")
 
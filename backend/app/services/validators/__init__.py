@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from enum import Enum
 import logging
 
+from ..rule_plan import RulePlan, rule_plan_for
+
 logger = logging.getLogger(__name__)
 
 
@@ -100,14 +102,18 @@ class BaseValidator(ABC):
     (форматирование, структура, содержание и т.д.)
     """
 
-    def __init__(self, profile: Optional[Dict[str, Any]] = None):
+    def __init__(self, profile: Optional[Dict[str, Any]] = None,
+                 rule_plan: Optional[RulePlan] = None):
         """
         Инициализация валидатора.
 
         Args:
             profile: Профиль требований (из JSON конфигурации)
+            rule_plan: Скомпилированные правила профиля (по умолчанию
+                компилируются из profile)
         """
         self.profile = profile or {}
+        self.rule_plan = rule_plan or rule_plan_for(self.profile)
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
 
     @property
@@ -119,7 +125,7 @@ class BaseValidator(ABC):
     @property
     def enabled(self) -> bool:
         """Включен ли валидатор (можно отключить через профиль)"""
-        validation_settings = self.profile.get('validation', {})
+        validation_settings = self.rule_plan.validation
         check_key = f"check_{self.name.lower().replace(' ', '_')}"
         return validation_settings.get(check_key, True)
 
@@ -143,22 +149,13 @@ class BaseValidator(ABC):
 
         Args:
             rule_key: Ключ правила (например, 'font.size')
-            default: Значение по умолчанию
+            default: Значение по умолчанию (если правила нет ни в профиле,
+                ни в общих значениях по умолчанию rule_plan.DEFAULT_RULES)
 
         Returns:
             Значение настройки или default
         """
-        rules = self.profile.get('rules', {})
-        keys = rule_key.split('.')
-
-        value = rules
-        for key in keys:
-            if isinstance(value, dict):
-                value = value.get(key)
-            else:
-                return default
-
-        return value if value is not None else default
+        return self.rule_plan.get(rule_key, default)
 
     def _create_issue(
         self,
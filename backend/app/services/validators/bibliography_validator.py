@@ -2,12 +2,25 @@
 Валидатор для проверки оформления списка литературы.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Pattern
 import time
 import re
 from datetime import datetime
 from . import BaseValidator, ValidationResult, ValidationIssue, Severity
 
+# Дефолтные паттерны библиографических записей
+DEFAULT_PATTERNS = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in {
+        'one_author': r'^[А-ЯЁ][а-яё]+,\s[А-ЯЁ]\.\s?[А-ЯЁ]?\.\s.*[–—-]\s.*,\s\d{4}',
+        '2_3_authors': r'^[А-ЯЁ][а-яё]+,\s[А-ЯЁ]\.\s?[А-ЯЁ]?\.\?,\s[А-ЯЁ][а-яё]+.*[–—-]\s.*,\s\d{4}',
+        'collective': r'.*\[и\sдр\.\].*',
+        'web_resource': r'.*\[Электронный\sресурс\].*URL:.*\(дата\sобращения.*\)',
+        'gost': r'^ГОСТ\s[\d\.]+[–—-]\d{4}',
+        'law': r'^(Федеральный закон|Постановление|Указ).*от\s\d{2}\.\d{2}\.\d{4}.*№',
+    }.items()
+}
+
 
 class BibliographyValidator(BaseValidator):
     """
@@ -86,7 +99,7 @@ class BibliographyValidator(BaseValidator):
             source_text = source['text'].strip()
 
             for pattern_name, pattern in patterns.items():
-                if re.search(pattern, source_text, re.IGNORECASE):
+                if pattern.search(source_text):
                     matched = True
                     break
 
@@ -181,26 +194,15 @@ class BibliographyValidator(BaseValidator):
 
         return sources  # Упрощенная версия
 
-    def _get_bibliography_patterns(self) -> Dict[str, str]:
+    def _get_bibliography_patterns(self) -> Dict[str, Pattern]:
         """
         Возвращает паттерны для проверки библиографических записей.
 
         Returns:
-            Словарь с паттернами
+            Словарь скомпилированных паттернов (без учёта регистра)
         """
-        # Получаем паттерны из профиля или используем дефолтные
-        profile_patterns = self._get_rule_config('bibliography.patterns', {})
-
-        default_patterns = {
-            'one_author': r'^[А-ЯЁ][а-яё]+,\s[А-ЯЁ]\.\s?[А-ЯЁ]?\.\s.*[–—-]\s.*,\s\d{4}',
-            '2_3_authors': r'^[А-ЯЁ][а-яё]+,\s[А-ЯЁ]\.\s?[А-ЯЁ]?\.\?,\s[А-ЯЁ][а-яё]+.*[–—-]\s.*,\s\d{4}',
-            'collective': r'.*\[и\sдр\.\].*',
-            'web_resource': r'.*\[Электронный\sресурс\].*URL:.*\(дата\sобращения.*\)',
-            'gost': r'^ГОСТ\s[\d\.]+[–—-]\d{4}',
-            'law': r'^(Федеральный закон|Постановление|Указ).*от\s\d{2}\.\d{2}\.\d{4}.*№'
-        }
-
-        return {**default_patterns, **profile_patterns}
+        # Паттерны профиля (из плана правил) дополняют дефолтные
+        return {**DEFAULT_PATTERNS, **self.rule_plan.bibliography.patterns_ci}
 
     def _get_format_suggestion(self, source_text: str) -> str:
         """
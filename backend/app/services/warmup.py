@@ -0,0 +1,274 @@
+"""
+Прогрев процесса перед обработкой первых документов.
+
+Без прогрева первая задача воркера и первый запрос веб-процесса платят за
+импорт python-docx/lxml/mammoth, чтение профилей, сборку проверяющих и
+валидаторов и компиляцию регулярных выражений (модульный кэш re). warm_up()
+делает всё это заранее:
+
+- импортирует тяжёлые модули;
+- загружает и разрешает все профили из profiles/ (app.services.profile_loader)
+  и строит каталог для поиска (app.services.profile_catalog);
+- собирает NormControlChecker для каждого профиля и ValidationEngine;
+- прогоняет извлечение, проверку норм и валидацию на небольшом
+  синтетическом документе, чтобы заполнить кэши регулярных выражений.
+
+Если после прогрева процесс порождает дочерние через fork (пул prefork
+Celery, gunicorn с preload_app), прогретое состояние наследуется.
+freeze_for_fork() переносит объекты в постоянное поколение сборщика мусора
+(gc.freeze), чтобы сборка мусора в дочерних процессах не трогала эти страницы
+и они оставались общими (copy-on-write). Вызывать его имеет смысл только
+в родителе перед fork: главный процесс воркера Celery с пулом prefork
+(app.tasks.celery_tasks) и мастер gunicorn (gunicorn.conf.py).
+
+Где прогрев включён: воркер Celery — WORKER_WARMUP (по умолчанию да), веб-
+процесс — WEB_WARMUP (по умолчанию нет, см. create_app).
+
+Замер до/после: python -m app.services.warmup запускает два чистых
+интерпретатора (с прогревом и без) и сравнивает время обработки первого
+документа и RSS процесса.
+"""
+
+import gc
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODULES = (
+    'docx',
+    'lxml.etree',
+    'mammoth',
+    'docxtpl',
+    'docxcompose.composer',
+)
+
+_stats: Dict[str, Any] = {'warmed': False}
+_lock = threading.Lock()
+_frozen = False
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 ** 2), 1)
+    except Exception:
+        return None
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def build_sample_document(path: str) -> str:
+    """
+    Создаёт небольшой документ со всеми основными элементами работы:
+    заголовки, основной текст, список литературы, таблица.
+    """
+    from docx import Document
+
+    document = Document()
+    document.add_heading('СОДЕРЖАНИЕ', level=1)
+    document.add_paragraph('Введение\t3')
+    document.add_heading('ВВЕДЕНИЕ', level=1)
+    document.add_paragraph(
+        'Цель работы — проверить оформление документа. Задачи: изучить '
+        'требования, описать результаты (см. рисунок 1 и таблицу 1) [1, с. 5].'
+    )
+    document.add_heading('1 Основная часть', level=2)
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = 'Параметр'
+    table.cell(0, 1).text = 'Значение'
+    document.add_paragraph('Таблица 1 – Параметры')
+    document.add_paragraph('Рисунок 1 – Схема')
+    document.add_heading('ЗАКЛЮЧЕНИЕ', level=1)
+    document.add_paragraph('Задачи работы решены.')
+    document.add_heading('СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ', level=1)
+    for entry in (
+        'Иванов, И. И. Основы нормоконтроля – Москва, 2023. – 120 с.',
+        'ГОСТ 7.32–2017. Отчёт о научно-исследовательской работе.',
+        'Портал [Электронный ресурс]. URL: https://example.org (дата обращения: 01.09.2024).',
+    ):
+        document.add_paragraph(entry, style='List Number')
+    document.save(path)
+    return path
+
+
+def _process_sample(path: str) -> None:
+    from .document_processor import DocumentProcessor
+    from .norm_control_checker import NormControlChecker
+    from .validation_engine import ValidationEngine
+
+    document_data = DocumentProcessor(path).extract_data()
+    NormControlChecker().check_document(document_data)
+    ValidationEngine().validate_document(path, document_data)
+
+
+def warm_up(run_sample: bool = True, freeze: bool = False) -> Dict[str, Any]:
+    """
+    Прогревает процесс (повторные вызовы ничего не делают).
+
+    Args:
+        run_sample: Прогнать обработку синтетического документа
+        freeze: Вызвать gc.freeze() после прогрева (только в родителе перед fork)
+
+    Returns:
+        dict: Статистика прогрева (см. get_warmup_stats)
+    """
+    with _lock:
+        if _stats['warmed']:
+            if freeze:
+                _stats['frozen'] = _freeze()
+            return dict(_stats)
+
+        started = time.perf_counter()
+        stats: Dict[str, Any] = {'rss_before_mb': _rss_mb(), 'errors': []}
+
+        step = time.perf_counter()
+        modules: List[str] = []
+        for name in WARMUP_MODULES:
+            try:
+                importlib.import_module(name)
+                modules.append(name)
+            except ImportError as e:
+                stats['errors'].append(f'{name}: {e}')
+        stats['modules'] = modules
+        stats['imports_ms'] = _elapsed_ms(step)
+
+        step = time.perf_counter()
+        from .norm_control_checker import NormControlChecker
+        from .profile_loader import load_resolved_profile, preload_profiles
+        from .validation_engine import ValidationEngine
+
+        profiles = preload_profiles()
+        for profile_id in profiles:
+            try:
+                NormControlChecker(profile_data=load_resolved_profile(profile_id, fallback=None))
+            except Exception as e:
+                stats['errors'].append(f'{profile_id}: {e}')
+        ValidationEngine()
+        from .profile_catalog import get_profile_catalog
+        get_profile_catalog().rebuild()
+        stats['profiles'] = len(profiles)
+        stats['profiles_ms'] = _elapsed_ms(step)
+
+        if run_sample:
+            step = time.perf_counter()
+            with tempfile.TemporaryDirectory(prefix='cursa_warmup_') as temp_dir:
+                try:
+                    _process_sample(build_sample_document(os.path.join(temp_dir, 'sample.docx')))
+                except Exception as e:
+                    stats['errors'].append(f'sample: {e}')
+            stats['sample_ms'] = _elapsed_ms(step)
+
+        gc.collect()
+        stats['frozen'] = _freeze() if freeze else _frozen
+
+        stats['duration_ms'] = _elapsed_ms(started)
+        stats['rss_after_mb'] = _rss_mb()
+        stats['pid'] = os.getpid()
+        stats['warmed'] = True
+        _stats.clear()
+        _stats.update(stats)
+
+    logger.info(
+        f"Прогрев завершён за {stats['duration_ms']} мс: профилей {stats['profiles']}, "
+        f"RSS {stats['rss_before_mb']} → {stats['rss_after_mb']} МБ"
+    )
+    for error in stats['errors']:
+        logger.warning(f"Прогрев: {error}")
+    return dict(stats)
+
+
+def _freeze() -> bool:
+    global _frozen
+    if not _frozen and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+        _frozen = True
+    return _frozen
+
+
+def freeze_for_fork() -> bool:
+    """
+    gc.freeze() перед порождением дочерних процессов (один раз на процесс).
+
+    Returns:
+        bool: Объекты процесса заморожены
+    """
+    with _lock:
+        frozen = _freeze()
+        if _stats.get('warmed'):
+            _stats['frozen'] = frozen
+        return frozen
+
+
+def get_warmup_stats() -> Dict[str, Any]:
+    """Статистика прогрева текущего процесса."""
+    with _lock:
+        return dict(_stats)
+
+
+def warmup_enabled(value: Any = None) -> bool:
+    """Включён ли прогрев (WORKER_WARMUP, по умолчанию включён)."""
+    if value is None:
+        value = os.environ.get('WORKER_WARMUP', '1')
+    return str(value).lower() not in ('0', 'false', 'no', 'off', '')
+
+
+# === Замер до/после ===
+
+def _probe(warm: bool) -> Dict[str, Any]:
+    """Время обработки первого документа и RSS в чистом процессе."""
+    rss_start = _rss_mb()
+    warmup_ms = None
+    if warm:
+        warmup_ms = warm_up()['duration_ms']
+
+    with tempfile.TemporaryDirectory(prefix='cursa_probe_') as temp_dir:
+        path = build_sample_document(os.path.join(temp_dir, 'first.docx'))
+        started = time.perf_counter()
+        _process_sample(path)
+        first_ms = _elapsed_ms(started)
+
+    return {
+        'warm': warm,
+        'warmup_ms': warmup_ms,
+        'first_request_ms': first_ms,
+        'rss_start_mb': rss_start,
+        'rss_mb': _rss_mb(),
+    }
+
+
+def measure(python: str = sys.executable) -> Dict[str, Any]:
+    """
+    Сравнивает первый запрос в холодном и прогретом процессах.
+
+    Каждый замер выполняется в отдельном интерпретаторе, иначе импорты и
+    кэши первого замера исказили бы второй.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    results = {}
+    for mode in ('cold', 'warm'):
+        output = subprocess.run(
+            [python, '-m', 'app.services.warmup', '--probe', mode],
+            cwd=backend_dir, capture_output=True, text=True, check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--probe':
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(_probe(sys.argv[2] == 'warm')))
+    else:
+        print(json.dumps(measure(), ensure_ascii=False, indent=2))
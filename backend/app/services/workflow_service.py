@@ -1,5 +1,4 @@
 import os
-import json
 import datetime
 import traceback
 import logging
@@ -9,12 +8,24 @@ from werkzeug.utils import secure_filename
 from app.services.document_processor import DocumentProcessor
 from app.services.norm_control_checker import NormControlChecker
 from app.services.document_corrector import DocumentCorrector
+from app.services.storage_usage import storage_usage
+from app.services.report_service import register_report
+from app.services.preview_service import warm_preview
+from app.services.artifact_store import artifact_store
+from app.services.deadline import PRIORITY_LOW, Deadline, as_deadline
+from app.services.profile_loader import load_resolved_profile
+from app.services.progress import null_progress, scale_progress
+from app.metrics.memory import MODE_OFF, check_memory_budget, track_stage_memory
+from app.metrics.timing import span
 
 logger = logging.getLogger(__name__)
 
 
 SESSION_TTL_SECONDS = 60 * 60
 
+# Этапы конвейера обработки документа в порядке выполнения
+PIPELINE_STAGES = ('ingest', 'extract', 'check', 'correct', 'verify', 'report')
+
 
 def _get_total_issues(check_results):
     """Извлекает total_issues из разных форматов ответа проверок."""
@@ -163,9 +174,28 @@ class WorkflowService:
 
         return True
 
-    def analyze_document(self, file_path, original_filename, profile_id=None):
+    def analyze_document(self, file_path, original_filename, profile_id=None, deadline=None):
         """
         Только анализ документа: извлечение структуры и проверка нормоконтроля.
+
+        Args:
+            deadline: Бюджет времени (см. app.services.deadline); если его не
+                хватило, результат помечается incomplete
+        """
+        result = None
+        for event, payload in self.iter_analyze_document(file_path, original_filename, profile_id, deadline):
+            if event == 'result':
+                result = payload
+        return result
+
+    def iter_analyze_document(self, file_path, original_filename, profile_id=None, deadline=None):
+        """
+        Анализ документа с выдачей промежуточных событий.
+
+        Yields:
+            tuple: ('start', {...}) после извлечения данных, ('rule', результат
+            нормы) по мере проверки и последним — ('result', результат как у
+            analyze_document)
         """
         result = {
             'success': False,
@@ -174,18 +204,22 @@ class WorkflowService:
             'check_results': None,
             'structure': None,
             'formatting': None,
+            'incomplete': False,
             'errors': []
         }
+        deadline = as_deadline(deadline)
 
         try:
             logger.info(f"Analyzing document: {original_filename}")
 
             # Шаг 1: Используем process_document для получения данных и структуры
-            proc_result = DocumentProcessor.process_document(file_path)
+            with span('extract', profile=self._profile_label(profile_id)):
+                proc_result = DocumentProcessor.process_document(file_path)
 
             if proc_result.get('status') == 'error':
                 result['errors'].append(proc_result.get('message', 'Unknown error'))
-                return result
+                yield 'result', result
+                return
 
             result['structure'] = proc_result.get('structure')
             result['formatting'] = proc_result.get('formatting')
@@ -193,234 +227,492 @@ class WorkflowService:
 
             if not document_data:
                 result['errors'].append('Не удалось извлечь данные из документа')
-                return result
+                yield 'result', result
+                return
 
             # Шаг 2: Проверка нормоконтроля
             logger.info(f"Using profile: {profile_id or 'default_gost'}")
             checker = NormControlChecker(profile_id=profile_id)
-            check_results = checker.check_document(document_data)
-            result['check_results'] = check_results
+            yield 'start', {'filename': original_filename, 'profile': checker.get_profile_info()['name']}
 
+            rules_results = []
+            for rule_result in checker.iter_check_document(document_data, deadline=deadline):
+                rules_results.append(rule_result)
+                yield 'rule', rule_result
+
+            result['check_results'] = checker.build_check_result(rules_results)
+            result['incomplete'] = result['check_results']['incomplete']
             result['success'] = True
-            return result
 
         except Exception as e:
             logger.error(f"Analysis failed: {e}")
             logger.error(traceback.format_exc())
             result['errors'].append(f"Критическая ошибка анализа: {str(e)}")
-            return result
 
-    def process_document(self, file_path, original_filename, profile_id=None):
+        yield 'result', result
+
+    def process_document(self, file_path, original_filename, profile_id=None, progress=None, deadline=None):
         """
         Полный цикл обработки документа: извлечение, проверка, исправление, отчет.
+
+        Этапы выполняются последовательно в текущем процессе; те же этапы
+        используются конвейером Celery (см. app.tasks.celery_tasks). Промежуточные
+        результаты остаются в памяти и в хранилище артефактов не пишутся.
+
+        Args:
+            progress: Callback прогресса (см. app.services.progress)
+            deadline: Бюджет времени (Deadline или секунды). Если его не
+                хватает, пропускаются нормы низкого приоритета, проходы и
+                попытки коррекции, а результат помечается incomplete
         """
-        result = {
-            'success': False,
+        state = self.start_pipeline(
+            file_path, original_filename, profile_id, copy_source=False, deadline=deadline
+        )
+        state['payloads'] = {}
+        for stage in PIPELINE_STAGES[1:]:
+            state = self.run_stage(stage, state, progress)
+        return self.build_result(state)
+
+    # === Этапы конвейера ===
+    #
+    # Каждый этап принимает и возвращает JSON-сериализуемое состояние со ссылками
+    # на артефакты в artifact_store, поэтому этапы можно выполнять в разных
+    # процессах и повторять по отдельности. При выполнении всех этапов в одном
+    # процессе (process_document) результаты хранятся прямо в state['payloads'] —
+    # такое состояние не сериализуется. Если этап завершился ошибкой обработки
+    # (а не исключением инфраструктуры), в состоянии выставляется 'failed' и
+    # последующие этапы пропускаются. Бюджет времени хранится в state['deadline'].
+
+    def run_stage(self, stage, state, progress=None):
+        """
+        Выполняет этап конвейера с замером времени и памяти (см.
+        app.metrics.timing и app.metrics.memory).
+
+        При превышении бюджета памяти задача завершается ошибкой: этап
+        прерывается в ближайшей контрольной точке, последующие этапы
+        пропускаются.
+        """
+        skipped = state['failed']
+        with span(stage, profile=self._profile_label(state['profile_id'])), \
+                track_stage_memory(stage) as usage:
+            check_memory_budget('начало')
+            state = getattr(self, f'run_{stage}_stage')(state, progress)
+
+        if usage.mode != MODE_OFF and not skipped:
+            state['result'].setdefault('memory', []).append(usage.to_dict())
+        if usage.exceeded:
+            self._fail_memory_budget(state, usage.exceeded)
+        return state
+
+    def start_pipeline(self, file_path, original_filename, profile_id=None, copy_source=True, job_id=None,
+                       deadline=None):
+        """
+        Этап ingest: создаёт состояние конвейера.
+
+        Args:
+            file_path: Путь к загруженному файлу
+            original_filename: Исходное имя файла
+            profile_id: ID профиля нормоконтроля
+            copy_source: Скопировать файл в хранилище артефактов (нужно, если
+                исходный временный файл будет удалён до завершения конвейера)
+            job_id: Идентификатор задачи (по умолчанию создаётся новый)
+            deadline: Бюджет времени всего конвейера (Deadline или секунды)
+
+        Returns:
+            dict: Состояние конвейера
+        """
+        job_id = job_id or artifact_store.new_job_id()
+        base_name, _ = os.path.splitext(original_filename)
+
+        state = {
+            'job_id': job_id,
             'filename': original_filename,
-            'temp_path': file_path,
-            'check_results': None,
-            'correction_success': False,
-            'corrected_file_path': None,
-            'corrected_check_results': None,
-            'report_path': None,
-            'errors': []
+            'profile_id': profile_id,
+            'safe_base': secure_filename(base_name) or "document",
+            'timestamp': datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+            'source_path': file_path,
+            'refs': {},
+            'attempts': [],
+            'failed': False,
+            'deadline': as_deadline(deadline).to_state(),
+            'result': {
+                'success': False,
+                'filename': original_filename,
+                'temp_path': file_path,
+                'correction_success': False,
+                'corrected_file_path': None,
+                'report_id': None,
+                'report_url': None,
+                'incomplete': False,
+                'skipped_stages': [],
+                'errors': []
+            },
         }
 
+        if copy_source:
+            source_ref = artifact_store.put_file(job_id, 'source.docx', file_path)
+            state['source_path'] = artifact_store.path(source_ref)
+
+        logger.info(f"Processing document: {original_filename} (job {job_id})")
+        return state
+
+    def run_extract_stage(self, state, progress=None):
+        """Этап extract: извлечение данных документа."""
+        if state['failed']:
+            return state
+
         try:
-            # Шаг 1: Создание DocumentProcessor
-            logger.info(f"Processing document: {original_filename}")
-            doc_processor = DocumentProcessor(file_path)
+            document_data = DocumentProcessor(state['source_path']).extract_data(progress)
+            if document_data:
+                self._put_payload(state, 'document_data', document_data)
+        except Exception as e:
+            return self._fail(state, e)
 
-            # Шаг 2: Извлечение данных
-            document_data = doc_processor.extract_data()
-            if not document_data:
-                result['errors'].append('Не удалось извлечь данные из документа')
-                return result
+        if not document_data:
+            state['result']['errors'].append('Не удалось извлечь данные из документа')
+            state['failed'] = True
+        return state
+
+    def run_check_stage(self, state, progress=None):
+        """Этап check: проверка нормоконтроля исходного документа."""
+        if state['failed']:
+            return state
 
-            # Шаг 3: Проверка нормоконтроля
+        try:
+            document_data = self._get_payload(state, 'document_data')
+            profile_id = state['profile_id']
             logger.info(f"Using profile: {profile_id or 'default_gost'}")
-            checker = NormControlChecker(profile_id=profile_id)
-            check_results = checker.check_document(document_data)
-            result['check_results'] = check_results
-            before_total_issues = _get_total_issues(check_results)
-
-            # Шаг 4: Автоисправление
-            try:
-                # Загружаем профиль
-                profile_filename = f"{profile_id}.json" if profile_id else 'default_gost.json'
-                profile_data = None
-
-                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                profile_path = os.path.join(base_dir, 'profiles', profile_filename)
-
-                if not os.path.exists(profile_path):
-                    profile_path = os.path.join(base_dir, 'profiles', 'default_gost.json')
-
-                if os.path.exists(profile_path):
-                    with open(profile_path, 'r', encoding='utf-8') as f:
-                        profile_data = json.load(f)
-
-                corrector = DocumentCorrector(profile_data=profile_data)
-
-                # Генерируем имя исправленного файла
-                base_name, _ = os.path.splitext(original_filename)
-                safe_base = secure_filename(base_name) or "document"
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                max_passes = 4 if before_total_issues >= 80 else 3
-                attempt_passes = [max_passes]
-                if before_total_issues > 0:
-                    attempt_passes.append(min(max_passes + 1, 5))
-
-                best_attempt = None
-                attempts_meta = []
-
-                for attempt_index, passes in enumerate(attempt_passes, start=1):
-                    suffix = '' if attempt_index == 1 else f"_retry{attempt_index}"
-                    corrected_filename = f"{safe_base}_corrected_{timestamp}{suffix}.docx"
-                    permanent_path = os.path.join(self.corrections_dir, corrected_filename)
-
-                    corrector.max_passes = passes
-                    corrected_file_path, correction_report = corrector.correct_document_multipass(
-                        file_path,
-                        out_path=permanent_path,
-                        max_passes=passes,
+            check_results = NormControlChecker(profile_id=profile_id).check_document(
+                document_data, progress, Deadline.from_state(state.get('deadline'))
+            )
+            self._put_payload(state, 'check_results', check_results)
+        except Exception as e:
+            return self._fail(state, e)
+
+        state['before_total_issues'] = _get_total_issues(check_results)
+        if check_results.get('incomplete'):
+            state['result']['incomplete'] = True
+            state['check_incomplete'] = True
+        return state
+
+    def run_correct_stage(self, state, progress=None):
+        """Этап correct: попытки многопроходного автоисправления."""
+        if state['failed']:
+            return state
+
+        # Без полной проверки сравнение до/после некорректно, а без запаса
+        # времени коррекция всё равно не успеет завершиться
+        deadline = Deadline.from_state(state.get('deadline'))
+        if state.get('check_incomplete') or not deadline.allows(PRIORITY_LOW):
+            self._skip_stage(state, 'correct')
+            state['correction_skipped'] = True
+            return state
+
+        before_total_issues = state['before_total_issues']
+        attempts = []
+
+        try:
+            corrector = DocumentCorrector(profile_data=self._load_profile_data(state['profile_id']))
+
+            max_passes = 4 if before_total_issues >= 80 else 3
+            attempt_passes = [max_passes]
+            if before_total_issues > 0:
+                attempt_passes.append(min(max_passes + 1, 5))
+
+            for attempt_index, passes in enumerate(attempt_passes, start=1):
+                # Повторная попытка лишь улучшает результат первой
+                if attempt_index > 1 and not deadline.allows(PRIORITY_LOW):
+                    logger.info(f"Повторная попытка коррекции пропущена по бюджету времени ({deadline})")
+                    break
+
+                suffix = '' if attempt_index == 1 else f"_retry{attempt_index}"
+                corrected_filename = f"{state['safe_base']}_corrected_{state['timestamp']}{suffix}.docx"
+                permanent_path = os.path.join(self.corrections_dir, corrected_filename)
+
+                corrector.max_passes = passes
+                corrected_file_path, correction_report = corrector.correct_document_multipass(
+                    state['source_path'],
+                    out_path=permanent_path,
+                    max_passes=passes,
+                    progress=scale_progress(
+                        progress,
+                        (attempt_index - 1) / len(attempt_passes) * 100,
+                        attempt_index / len(attempt_passes) * 100,
+                    ),
+                    deadline=deadline,
+                )
+
+                if not os.path.exists(corrected_file_path):
+                    state['result']['errors'].append(
+                        f'Файл исправления не был создан (попытка {attempt_index}).'
                     )
+                    continue
+                storage_usage.record_write(corrected_file_path)
+
+                attempts.append({
+                    'attempt': attempt_index,
+                    'passes': passes,
+                    'corrected_filename': corrected_filename,
+                    'corrected_file_path': corrected_file_path,
+                    'passes_completed': correction_report.passes_completed,
+                    'remaining_issues_reported': correction_report.remaining_issues,
+                    'incomplete': correction_report.incomplete,
+                })
 
-                    if not os.path.exists(corrected_file_path):
-                        result['errors'].append(
-                            f'Файл исправления не был создан (попытка {attempt_index}).'
-                        )
-                        continue
-
-                    corrected_proc = DocumentProcessor.process_document(corrected_file_path)
-                    if corrected_proc.get('status') == 'error' or not corrected_proc.get('raw_data'):
-                        result['errors'].append(
-                            f'Не удалось выполнить повторную проверку исправленного документа (попытка {attempt_index}).'
-                        )
-                        continue
-
-                    corrected_check_results = checker.check_document(corrected_proc['raw_data'])
-                    after_total_issues = _get_total_issues(corrected_check_results)
-                    completion_percentage = _get_completion_percentage(corrected_check_results)
-                    attempts_meta.append({
-                        'attempt': attempt_index,
-                        'passes': passes,
-                        'after_total_issues': after_total_issues,
-                        'completion_percentage': completion_percentage,
-                    })
-
-                    attempt_payload = {
-                        'corrected_filename': corrected_filename,
-                        'corrected_file_path': corrected_file_path,
-                        'correction_report': correction_report,
-                        'corrected_check_results': corrected_check_results,
-                        'after_total_issues': after_total_issues,
-                        'completion_percentage': completion_percentage,
-                        'passes': passes,
-                    }
-
-                    is_better = False
-                    if best_attempt is None:
-                        is_better = True
-                    elif after_total_issues < best_attempt['after_total_issues']:
-                        is_better = True
-                    elif after_total_issues == best_attempt['after_total_issues']:
-                        best_completion = best_attempt.get('completion_percentage')
-                        current_completion = completion_percentage
-                        if current_completion is not None and (
-                            best_completion is None or current_completion > best_completion
-                        ):
-                            is_better = True
-
-                    if is_better:
-                        if best_attempt and os.path.exists(best_attempt['corrected_file_path']):
-                            try:
-                                os.remove(best_attempt['corrected_file_path'])
-                            except OSError:
-                                logger.warning(
-                                    "Не удалось удалить файл худшей попытки коррекции: %s",
-                                    best_attempt['corrected_file_path'],
-                                )
-                        best_attempt = attempt_payload
-                    else:
-                        try:
-                            os.remove(corrected_file_path)
-                        except OSError:
-                            logger.warning(
-                                "Не удалось удалить файл невыбранной попытки коррекции: %s",
-                                corrected_file_path,
-                            )
-
-                if best_attempt:
-                    result['corrected_file_path'] = best_attempt['corrected_filename']
-                    result['full_corrected_path'] = best_attempt['corrected_file_path']
-                    result['corrected_check_results'] = best_attempt['corrected_check_results']
-
-                    after_total_issues = best_attempt['after_total_issues']
-                    completion_percentage = best_attempt['completion_percentage']
-                    report = best_attempt['correction_report']
-
-                    result['quality_metrics'] = {
-                        'before_total_issues': before_total_issues,
-                        'after_total_issues': after_total_issues,
-                        'resolved_total_issues': max(0, before_total_issues - after_total_issues),
-                        'completion_percentage': completion_percentage,
-                        'passes_completed': report.passes_completed,
-                        'remaining_issues_reported': report.remaining_issues,
-                        'attempts': attempts_meta,
-                        'fallback_applied': False,
-                    }
-
-                    result['quality_gate_passed'] = after_total_issues <= before_total_issues
-                    if not result['quality_gate_passed']:
-                        # Гарантия отсутствия деградации: если коррекция ухудшила результат,
-                        # возвращаем безопасную копию исходного документа.
-                        safe_filename = f"{safe_base}_safe_{timestamp}.docx"
-                        safe_output_path = os.path.join(self.corrections_dir, safe_filename)
-                        shutil.copy2(file_path, safe_output_path)
-
-                        result['corrected_file_path'] = safe_filename
-                        result['full_corrected_path'] = safe_output_path
-                        result['corrected_check_results'] = check_results
-                        result['quality_metrics'].update({
-                            'after_total_issues': before_total_issues,
-                            'resolved_total_issues': 0,
-                            'completion_percentage': _get_completion_percentage(check_results),
-                            'fallback_applied': True,
-                        })
-                        result['quality_gate_passed'] = True
-                        result['errors'].append(
-                            'Обнаружено ухудшение качества после автокоррекции; применен безопасный fallback без деградации.'
-                        )
-
-                    readiness = _build_graduation_readiness(
-                        result['quality_metrics']['after_total_issues'],
-                        result['quality_metrics']['completion_percentage'],
+        except Exception as e:
+            logger.error(f"Correction failed: {e}")
+            state['result']['errors'].append(f"Ошибка автоисправления: {str(e)}")
+            for attempt in attempts:
+                self._remove_corrected_file(attempt['corrected_file_path'])
+            attempts = []
+            state['correction_failed'] = True
+
+        state['attempts'] = attempts
+        return state
+
+    def run_verify_stage(self, state, progress=None):
+        """Этап verify: повторная проверка попыток, выбор лучшей и контроль деградации."""
+        if state['failed'] or state.get('correction_failed') or state.get('correction_skipped'):
+            return state
+        if not state['attempts']:
+            state['result']['errors'].append('Автокоррекция не смогла сформировать валидный улучшенный результат.')
+            return state
+
+        result = state['result']
+        before_total_issues = state['before_total_issues']
+
+        deadline = Deadline.from_state(state.get('deadline'))
+
+        try:
+            checker = NormControlChecker(profile_id=state['profile_id'])
+            best_attempt = None
+            attempts_meta = []
+
+            attempts_count = len(state['attempts'])
+            for position, attempt in enumerate(state['attempts']):
+                attempt_index = attempt['attempt']
+                corrected_file_path = attempt['corrected_file_path']
+
+                # Первая попытка проверяется всегда (от неё зависит контроль
+                # деградации), остальные — пока есть время
+                if best_attempt is not None and not deadline.allows():
+                    self._remove_corrected_file(corrected_file_path)
+                    self._skip_stage(state, f'verify_attempt_{attempt_index}')
+                    continue
+
+                attempt_progress = scale_progress(
+                    progress,
+                    position / attempts_count * 100,
+                    (position + 1) / attempts_count * 100,
+                    'verify',
+                )
+
+                corrected_proc = DocumentProcessor.process_document(corrected_file_path)
+                if corrected_proc.get('status') == 'error' or not corrected_proc.get('raw_data'):
+                    result['errors'].append(
+                        f'Не удалось выполнить повторную проверку исправленного документа (попытка {attempt_index}).'
                     )
-                    result['graduation_ready'] = readiness['status'] in {'ready', 'almost_ready'}
-                    result['graduation_readiness'] = readiness
+                    continue
+
+                corrected_check_results = checker.check_document(corrected_proc['raw_data'], attempt_progress)
+                after_total_issues = _get_total_issues(corrected_check_results)
+                completion_percentage = _get_completion_percentage(corrected_check_results)
+                attempts_meta.append({
+                    'attempt': attempt_index,
+                    'passes': attempt['passes'],
+                    'after_total_issues': after_total_issues,
+                    'completion_percentage': completion_percentage,
+                })
+
+                attempt_payload = dict(
+                    attempt,
+                    corrected_check_results=corrected_check_results,
+                    after_total_issues=after_total_issues,
+                    completion_percentage=completion_percentage,
+                )
+
+                is_better = False
+                if best_attempt is None:
+                    is_better = True
+                elif after_total_issues < best_attempt['after_total_issues']:
+                    is_better = True
+                elif after_total_issues == best_attempt['after_total_issues']:
+                    best_completion = best_attempt.get('completion_percentage')
+                    current_completion = completion_percentage
+                    if current_completion is not None and (
+                        best_completion is None or current_completion > best_completion
+                    ):
+                        is_better = True
 
-                    result['correction_success'] = True
+                if is_better:
+                    if best_attempt:
+                        self._remove_corrected_file(best_attempt['corrected_file_path'])
+                    best_attempt = attempt_payload
                 else:
-                    result['errors'].append('Автокоррекция не смогла сформировать валидный улучшенный результат.')
+                    self._remove_corrected_file(corrected_file_path)
+
+            if not best_attempt:
+                result['errors'].append('Автокоррекция не смогла сформировать валидный улучшенный результат.')
+                return state
+
+            corrected_check_results = best_attempt['corrected_check_results']
+            after_total_issues = best_attempt['after_total_issues']
+            completion_percentage = best_attempt['completion_percentage']
+
+            result['corrected_file_path'] = best_attempt['corrected_filename']
+            result['full_corrected_path'] = best_attempt['corrected_file_path']
+            result['quality_metrics'] = {
+                'before_total_issues': before_total_issues,
+                'after_total_issues': after_total_issues,
+                'resolved_total_issues': max(0, before_total_issues - after_total_issues),
+                'completion_percentage': completion_percentage,
+                'passes_completed': best_attempt['passes_completed'],
+                'remaining_issues_reported': best_attempt['remaining_issues_reported'],
+                'attempts': attempts_meta,
+                'fallback_applied': False,
+                'incomplete': best_attempt.get('incomplete', False),
+            }
+            if best_attempt.get('incomplete'):
+                result['incomplete'] = True
+
+            result['quality_gate_passed'] = after_total_issues <= before_total_issues
+            if not result['quality_gate_passed']:
+                # Гарантия отсутствия деградации: если коррекция ухудшила результат,
+                # возвращаем безопасную копию исходного документа.
+                check_results = self._get_payload(state, 'check_results')
+                safe_filename = f"{state['safe_base']}_safe_{state['timestamp']}.docx"
+                safe_output_path = os.path.join(self.corrections_dir, safe_filename)
+                shutil.copy2(state['source_path'], safe_output_path)
+                storage_usage.record_write(safe_output_path)
+
+                result['corrected_file_path'] = safe_filename
+                result['full_corrected_path'] = safe_output_path
+                corrected_check_results = check_results
+                result['quality_metrics'].update({
+                    'after_total_issues': before_total_issues,
+                    'resolved_total_issues': 0,
+                    'completion_percentage': _get_completion_percentage(check_results),
+                    'fallback_applied': True,
+                })
+                result['quality_gate_passed'] = True
+                result['errors'].append(
+                    'Обнаружено ухудшение качества после автокоррекции; применен безопасный fallback без деградации.'
+                )
+
+            self._put_payload(state, 'corrected_check_results', corrected_check_results)
+
+            readiness = _build_graduation_readiness(
+                result['quality_metrics']['after_total_issues'],
+                result['quality_metrics']['completion_percentage'],
+            )
+            result['graduation_ready'] = readiness['status'] in {'ready', 'almost_ready'}
+            result['graduation_readiness'] = readiness
+
+            result['correction_success'] = True
 
-            except Exception as e:
-                logger.error(f"Correction failed: {e}")
-                result['errors'].append(f"Ошибка автоисправления: {str(e)}")
+        except Exception as e:
+            logger.error(f"Correction failed: {e}")
+            result['errors'].append(f"Ошибка автоисправления: {str(e)}")
 
-            # Шаг 5: Генерация отчета
-            try:
-                report_path = doc_processor.generate_report_document(check_results, original_filename)
-                result['report_path'] = report_path
-            except Exception as e:
-                logger.error(f"Report generation failed: {e}")
-                result['errors'].append(f"Ошибка генерации отчета: {str(e)}")
+        return state
 
-            result['success'] = True
-            return result
+    def run_report_stage(self, state, progress=None):
+        """Этап report: регистрация отчета и подготовка превью."""
+        if state['failed']:
+            return state
 
+        progress = progress or null_progress
+        result = state['result']
+
+        # Превью исправленного файла готовим заранее, пока клиент получает ответ
+        if result.get('full_corrected_path'):
+            warm_preview(result['full_corrected_path'])
+
+        # Регистрация отчета (сам отчет строится при первом скачивании)
+        try:
+            check_results = self._get_payload(state, 'check_results')
+            report_id = register_report(check_results, state['filename'])
+            result['report_id'] = report_id
+            result['report_url'] = f'/api/document/report/{report_id}'
         except Exception as e:
-            logger.error(f"Workflow failed: {e}")
-            logger.error(traceback.format_exc())
-            result['errors'].append(f"Критическая ошибка обработки: {str(e)}")
-            return result
+            logger.error(f"Report registration failed: {e}")
+            result['errors'].append(f"Ошибка сохранения отчета: {str(e)}")
+
+        result['success'] = True
+        progress('report', 100)
+        return state
+
+    def build_result(self, state, include_payloads=True):
+        """
+        Собирает итоговый результат обработки из состояния конвейера.
+
+        Args:
+            state: Состояние после этапа report
+            include_payloads: Подставить полные результаты проверок вместо ссылок
+        """
+        result = dict(state['result'])
+
+        if include_payloads:
+            result['check_results'] = self._get_payload(state, 'check_results')
+            result['corrected_check_results'] = self._get_payload(state, 'corrected_check_results')
+        return result
+
+    @staticmethod
+    def _put_payload(state, name, data):
+        """Сохраняет промежуточный результат: в памяти или в хранилище артефактов."""
+        if 'payloads' in state:
+            state['payloads'][name] = data
+        else:
+            state['refs'][name] = artifact_store.put_json(state['job_id'], name, data)
+
+    @staticmethod
+    def _get_payload(state, name):
+        """Возвращает промежуточный результат, сохранённый _put_payload (или None)."""
+        if 'payloads' in state:
+            return state['payloads'].get(name)
+        ref = state['refs'].get(name)
+        return artifact_store.get_json(ref) if ref else None
+
+    @staticmethod
+    def _skip_stage(state, stage):
+        """Отмечает этап, пропущенный из-за нехватки времени."""
+        logger.warning(f"Этап {stage} пропущен по бюджету времени (job {state['job_id']})")
+        state['result']['incomplete'] = True
+        state['result'].setdefault('skipped_stages', []).append(stage)
+
+    def _fail(self, state, exc):
+        logger.error(f"Workflow failed: {exc}")
+        logger.error(traceback.format_exc())
+        state['result']['errors'].append(f"Критическая ошибка обработки: {str(exc)}")
+        state['failed'] = True
+        return state
+
+    @staticmethod
+    def _fail_memory_budget(state, message):
+        logger.error(f"Job {state['job_id']}: {message}")
+        errors = state['result']['errors']
+        # Этап мог уже записать ошибку со своим префиксом
+        if not any(message in error for error in errors):
+            errors.append(message)
+        state['failed'] = True
+
+    @staticmethod
+    def _load_profile_data(profile_id):
+        return load_resolved_profile(profile_id)
+
+    @staticmethod
+    def _profile_label(profile_id):
+        """ID профиля, который будет применён (для labels метрик)."""
+        profile = load_resolved_profile(profile_id) or {}
+        chain = profile.get('_inheritance_chain') or ()
+        return chain[-1] if chain else ''
+
+    @staticmethod
+    def _remove_corrected_file(path):
+        if not path or not os.path.exists(path):
+            return
+        try:
+            os.remove(path)
+            storage_usage.record_delete(path)
+        except OSError:
+            logger.warning("Не удалось удалить файл невыбранной попытки коррекции: %s", path)
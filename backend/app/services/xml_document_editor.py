@@ -717,30 +717,34 @@ class XMLDocumentEditor:
     # ПОЛНОЕ ИСПРАВЛЕНИЕ ДОКУМЕНТА
     # =========================================================================
     
-    def fix_all(self) -> XMLEditReport:
+    def fix_all(self, progress=None) -> XMLEditReport:
         """
         Выполняет полное исправление документа по ГОСТ.
         
+        Args:
+            progress: Callback прогресса progress(stage, sub_progress, message)
+        
         Returns:
             XMLEditReport: Отчёт о выполненных изменениях
         """
-        # 1. Исправляем стиль Normal
-        self.fix_normal_style()
-        
-        # 2. Исправляем стили заголовков
-        self.fix_heading_styles()
-        
-        # 3. Исправляем стили оглавления
-        self.fix_toc_styles()
-        
-        # 4. Исправляем поля страницы
-        self.fix_page_margins()
-        
-        # 5. Исправляем все шрифты
-        self.fix_all_fonts()
-        
-        # 6. Исправляем все абзацы
-        self.fix_all_paragraphs()
+        steps = (
+            # 1. Исправляем стиль Normal
+            (self.fix_normal_style, "Стиль Normal"),
+            # 2. Исправляем стили заголовков
+            (self.fix_heading_styles, "Стили заголовков"),
+            # 3. Исправляем стили оглавления
+            (self.fix_toc_styles, "Стили оглавления"),
+            # 4. Исправляем поля страницы
+            (self.fix_page_margins, "Поля страницы"),
+            # 5. Исправляем все шрифты
+            (self.fix_all_fonts, "Шрифты"),
+            # 6. Исправляем все абзацы
+            (self.fix_all_paragraphs, "Абзацы"),
+        )
+        for index, (fix, label) in enumerate(steps, start=1):
+            fix()
+            if progress is not None:
+                progress("xml", index / len(steps) * 100, label)
         
         return self.report
     
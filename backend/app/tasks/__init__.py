@@ -8,7 +8,15 @@ from app.tasks.celery_tasks import (
     send_email,
     cleanup_old_files,
     health_check,
-    batch_process
+    batch_process,
+    build_document_pipeline,
+    build_batch_workflow
+)
+from app.tasks.dispatch import (
+    get_task_backend,
+    submit_document,
+    submit_batch,
+    get_task_status
 )
 
 __all__ = [
@@ -17,5 +25,11 @@ __all__ = [
     'send_email',
     'cleanup_old_files',
     'health_check',
-    'batch_process'
+    'batch_process',
+    'build_document_pipeline',
+    'build_batch_workflow',
+    'get_task_backend',
+    'submit_document',
+    'submit_batch',
+    'get_task_status'
 ]
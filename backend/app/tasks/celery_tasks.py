@@ -5,7 +5,8 @@ Celery задачи для фоновой обработки документо
 import os
 import time
 import logging
-from celery import Celery, Task
+from celery import Celery, Task, chain, chord, group
+from celery.signals import worker_init, worker_process_init
 from typing import Dict, Any, Optional
 
 # Настройка Celery
@@ -30,11 +31,28 @@ celery_app.conf.update(
     task_reject_on_worker_lost=True,
     result_expires=3600,  # Результаты хранятся 1 час
     
+    # Приоритеты (Redis: 0 — наивысший), см. app.tasks.scheduling
+    task_default_priority=5,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    
     # Очереди
     task_routes={
         'cursa_tasks.process_document': {'queue': 'documents'},
+        'cursa_tasks.pipeline_ingest': {'queue': 'documents'},
+        'cursa_tasks.pipeline_extract': {'queue': 'extraction'},
+        'cursa_tasks.pipeline_check': {'queue': 'checking'},
+        'cursa_tasks.pipeline_correct': {'queue': 'correction'},
+        'cursa_tasks.pipeline_verify': {'queue': 'checking'},
+        'cursa_tasks.pipeline_report': {'queue': 'reports'},
         'cursa_tasks.send_email': {'queue': 'emails'},
         'cursa_tasks.cleanup_old_files': {'queue': 'maintenance'},
+        'cursa_tasks.batch_process': {'queue': 'documents'},
+        'cursa_tasks.batch_item': {'queue': 'documents'},
+        'cursa_tasks.batch_finalize': {'queue': 'documents'},
     },
     
     # Beat schedule (периодические задачи)
@@ -54,6 +72,40 @@ celery_app.conf.update(
 
 logger = logging.getLogger(__name__)
 
+CORRECTIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'corrections'
+)
+
+# Бюджет времени обработки документа (секунды) с запасом до task_soft_time_limit:
+# по его исчерпании возвращается частичный результат (см. app.services.deadline)
+TASK_DEADLINE = int(os.environ.get('TASK_DEADLINE', 480))
+
+# Прогресс (в процентах) на начало каждого этапа конвейера
+PIPELINE_PROGRESS = {
+    'ingest': 5,
+    'extract': 10,
+    'check': 25,
+    'correct': 50,
+    'verify': 75,
+    'report': 85,
+}
+
+# Ограничение параллелизма пакета по умолчанию
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 8))
+
+_workflow = None
+
+
+def broker_available() -> bool:
+    """Быстрая проверка доступности брокера (без повторных попыток)."""
+    try:
+        with celery_app.connection_for_write() as conn:
+            conn.ensure_connection(max_retries=0, timeout=1)
+        return True
+    except Exception as e:
+        logger.warning(f"Celery broker unavailable: {e}")
+        return False
+
 
 class BaseTask(Task):
     """Базовый класс задачи с обработкой ошибок"""
@@ -114,15 +166,7 @@ def process_document(
             meta={'stage': 'upload', 'progress': 10}
         )
         
-        # Импортируем сервисы внутри задачи (избегаем циклических импортов)
-        from app.services.workflow_service import WorkflowService
-        
-        # Настройка директории для исправлений
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        corrections_dir = os.path.join(base_dir, 'static', 'corrections')
-        
-        # Инициализация сервиса
-        workflow = WorkflowService(corrections_dir)
+        workflow = _get_workflow()
         
         # Этап 1: Обработка через WorkflowService
         self.update_state(
@@ -130,63 +174,299 @@ def process_document(
             meta={'stage': 'workflow', 'progress': 30}
         )
         
+        from app.services.progress import ProgressReporter, task_sink
+        
         original_filename = os.path.basename(file_path)
         result = workflow.process_document(
             file_path=file_path,
             original_filename=original_filename,
-            profile_id=profile_name
+            profile_id=profile_name,
+            progress=ProgressReporter(task_sink(self)),
+            deadline=TASK_DEADLINE
         )
         
         if not result['success']:
             raise Exception(f"Workflow failed: {result.get('errors')}")
             
-        self.update_state(
-            state='PROCESSING',
-            meta={'stage': 'finishing', 'progress': 90}
+        return _finish_processing(
+            self, result, original_filename, profile_name, user_email, time.time() - start_time,
+            source_path=file_path
         )
         
-        processing_time = time.time() - start_time
-        
-        # Этап 2: Отправка email (если указан)
-        if user_email:
-            self.update_state(
-                state='PROCESSING',
-                meta={'stage': 'email', 'progress': 95}
-            )
-            
-            corrected_file_path = None
-            if result.get('corrected_file_path'):
-                corrected_file_path = os.path.join(corrections_dir, result['corrected_file_path'])
-                
-            send_email.delay(
-                to_email=user_email,
-                subject=f'Результаты проверки: {original_filename}',
-                corrected_file=corrected_file_path,
-                report_file=result.get('report_path')
-            )
-        
-        # Записываем метрики
-        try:
-            from app.metrics import record_document_processed
-            corrections_count = 1 if result.get('correction_success') else 0
-            record_document_processed(corrections_count, processing_time)
-        except ImportError:
-            pass
-        
-        return {
-            'success': True,
-            'corrected_file': result.get('corrected_file_path'),
-            'report_file': result.get('report_path'),
-            'processing_time': round(processing_time, 2),
-            'issues_found': len(result.get('check_results', {}).get('issues', [])),
-            'profile_used': profile_name
-        }
-        
     except Exception as e:
         logger.exception(f"Error processing document: {e}")
         raise
 
 
+def _get_workflow():
+    """WorkflowService процесса воркера (создаётся один раз)."""
+    global _workflow
+    if _workflow is None:
+        # Импортируем сервисы внутри задачи (избегаем циклических импортов)
+        from app.services.workflow_service import WorkflowService
+        _workflow = WorkflowService(CORRECTIONS_DIR)
+    return _workflow
+
+
+def _is_prefork_pool(worker) -> bool:
+    """Порождает ли воркер процессы пула через fork (пул prefork)."""
+    pool = getattr(worker, 'pool_cls', None) or celery_app.conf.worker_pool or 'prefork'
+    name = pool if isinstance(pool, str) else f'{pool.__module__}.{pool.__name__}'
+    return 'prefork' in name.lower() or name == 'processes'
+
+
+@worker_init.connect
+def _warm_up_worker(sender=None, **kwargs):
+    """
+    Прогрев главного процесса воркера до запуска пула.
+
+    Дочерние процессы prefork наследуют прогретое состояние; gc.freeze()
+    (WARMUP_GC_FREEZE) сохраняет общие страницы памяти (copy-on-write).
+    В пулах без fork (solo, threads, eventlet) заморозка ничего не даёт.
+    """
+    from app.services.warmup import warm_up, warmup_enabled
+
+    if warmup_enabled():
+        freeze = _is_prefork_pool(sender) and warmup_enabled(os.environ.get('WARMUP_GC_FREEZE', '1'))
+        warm_up(freeze=freeze)
+        _get_workflow()
+
+
+@worker_process_init.connect
+def _warm_up_worker_process(**kwargs):
+    """Прогрев процесса пула (если он не унаследовал прогрев от родителя)."""
+    from app.services.warmup import warm_up, warmup_enabled
+
+    if warmup_enabled():
+        warm_up()
+        _get_workflow()
+
+
+def _finish_processing(
+    task,
+    result: Dict[str, Any],
+    original_filename: str,
+    profile_name: str,
+    user_email: Optional[str],
+    processing_time: float,
+    source_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """Отправка email, метрики и краткий итог обработки документа."""
+    task.update_state(
+        state='PROCESSING',
+        meta={'stage': 'finishing', 'progress': 90}
+    )
+    
+    # Отправка email (если указан)
+    if user_email:
+        task.update_state(
+            state='PROCESSING',
+            meta={'stage': 'email', 'progress': 95}
+        )
+        
+        corrected_file_path = None
+        if result.get('corrected_file_path'):
+            corrected_file_path = os.path.join(CORRECTIONS_DIR, result['corrected_file_path'])
+            
+        # Отчет для вложения строится только здесь, по требованию
+        report_file = None
+        if result.get('report_id'):
+            from app.services.report_service import get_report_file
+            report_file = get_report_file(result['report_id'], 'docx')
+
+        send_email.delay(
+            to_email=user_email,
+            subject=f'Результаты проверки: {original_filename}',
+            corrected_file=corrected_file_path,
+            report_file=report_file
+        )
+    
+    # Записываем метрики
+    try:
+        from app.metrics import record_document_processed
+        from app.services.content_hash import get_file_digest
+        corrections_count = 1 if result.get('correction_success') else 0
+        # Экземпляр гистограммы: по нему медленный документ находится из Grafana
+        exemplar = {'task_id': task.request.id} if task.request.id else {}
+        digest = get_file_digest(source_path) if source_path else None
+        if digest:
+            exemplar['document'] = digest[:16]
+        record_document_processed(corrections_count, processing_time, exemplar=exemplar)
+    except ImportError:
+        pass
+    
+    return {
+        'success': True,
+        'corrected_file': result.get('corrected_file_path'),
+        'report_id': result.get('report_id'),
+        'report_url': result.get('report_url'),
+        'processing_time': round(processing_time, 2),
+        'issues_found': len((result.get('check_results') or {}).get('issues', [])),
+        'profile_used': profile_name,
+        # Память по этапам (см. app.metrics.memory); нет при MEMORY_ACCOUNTING=off
+        'memory': result.get('memory'),
+    }
+
+
+# === Поэтапный конвейер обработки документа ===
+#
+# ingest → extract → check → correct → verify → report. Каждый этап — отдельная
+# задача в своей очереди; между этапами передаётся состояние со ссылками на
+# артефакты (см. app.services.artifact_store), а не сами данные. Воркеры
+# коррекции масштабируются отдельно от дешёвых этапов, а повтор упавшего этапа
+# не пересчитывает предыдущие.
+
+def _with_priority(signature, priority: Optional[int]):
+    return signature.set(priority=priority) if priority is not None else signature
+
+
+class PipelineFailed(Exception):
+    """Документ не удалось обработать; повтор этапа не поможет."""
+
+
+class PipelineTask(BaseTask):
+    """Этап конвейера: ошибки обработки документа не повторяются."""
+
+    dont_autoretry_for = (PipelineFailed,)
+
+
+def _run_stage(task, stage: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.progress import ProgressReporter, task_sink
+
+    # Каждый этап цепочки — отдельная задача со своим id; прогресс публикуется
+    # под id всей цепочки (его возвращает submit_document), иначе клиент
+    # видит PENDING до последнего этапа
+    task_id = state.get('task_id')
+    task.update_state(
+        task_id=task_id,
+        state='PROCESSING',
+        meta={
+            'stage': stage,
+            'progress': PIPELINE_PROGRESS[stage],
+            'job_id': state['job_id'],
+            'memory': state['result'].get('memory'),
+        }
+    )
+    progress = ProgressReporter(task_sink(task, task_id=task_id, job_id=state['job_id']))
+    return _get_workflow().run_stage(stage, state, progress)
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_ingest')
+def pipeline_ingest(
+    self,
+    file_path: str,
+    original_filename: Optional[str] = None,
+    profile_name: str = 'default',
+    job_id: Optional[str] = None,
+    task_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Этап ingest: копирует файл в хранилище артефактов и создаёт состояние.
+
+    task_id — идентификатор, под которым клиент следит за цепочкой; этапы
+    публикуют прогресс под ним (по умолчанию — каждый под своим).
+    """
+    self.update_state(
+        task_id=task_id,
+        state='PROCESSING',
+        meta={'stage': 'ingest', 'progress': PIPELINE_PROGRESS['ingest']}
+    )
+    state = _get_workflow().start_pipeline(
+        file_path,
+        original_filename or os.path.basename(file_path),
+        profile_name,
+        job_id=job_id or (self.request.id.replace('-', '') if self.request.id else None),
+        deadline=TASK_DEADLINE,
+    )
+    state['started_at'] = time.time()
+    state['task_id'] = task_id
+    return state
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_extract')
+def pipeline_extract(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Этап extract: извлечение данных документа."""
+    return _run_stage(self, 'extract', state)
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_check')
+def pipeline_check(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Этап check: проверка нормоконтроля."""
+    return _run_stage(self, 'check', state)
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_correct')
+def pipeline_correct(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Этап correct: многопроходное автоисправление."""
+    return _run_stage(self, 'correct', state)
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_verify')
+def pipeline_verify(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Этап verify: повторная проверка и выбор лучшей попытки."""
+    return _run_stage(self, 'verify', state)
+
+
+@celery_app.task(bind=True, base=PipelineTask, name='cursa_tasks.pipeline_report')
+def pipeline_report(
+    self,
+    state: Dict[str, Any],
+    user_email: Optional[str] = None
+) -> Dict[str, Any]:
+    """Этап report: регистрация отчета, уведомление и итог обработки."""
+    from app.services.artifact_store import artifact_store
+
+    state = _run_stage(self, 'report', state)
+    workflow = _get_workflow()
+
+    if state['failed']:
+        artifact_store.delete_job(state['job_id'])
+        raise PipelineFailed(f"Workflow failed: {state['result'].get('errors')}")
+
+    result = workflow.build_result(state)
+    processing_time = time.time() - state.get('started_at', time.time())
+    summary = _finish_processing(
+        self, result, state['filename'], state['profile_id'], user_email, processing_time,
+        source_path=state.get('source_path')
+    )
+    artifact_store.delete_job(state['job_id'])
+    return summary
+
+
+def build_document_pipeline(
+    file_path: str,
+    original_filename: Optional[str] = None,
+    profile_name: str = 'default',
+    user_email: Optional[str] = None,
+    job_id: Optional[str] = None,
+    priority: Optional[int] = None,
+    task_id: Optional[str] = None
+):
+    """
+    Собирает цепочку этапов обработки документа.
+
+    Файл должен быть доступен воркерам (общая файловая система). Если файл
+    уже лежит в хранилище артефактов под job_id, он удаляется вместе с
+    артефактами задачи. priority — приоритет брокера для всех этапов
+    (0 — наивысший). task_id — идентификатор цепочки для клиента: его
+    получает последний этап, а остальные публикуют под ним прогресс.
+
+    Returns:
+        celery.canvas.Signature — запуск через .apply_async()
+    """
+    report = pipeline_report.s(user_email=user_email)
+    if task_id is not None:
+        report = report.set(task_id=task_id)
+    return chain(*[_with_priority(sig, priority) for sig in (
+        pipeline_ingest.s(file_path, original_filename, profile_name, job_id, task_id),
+        pipeline_extract.s(),
+        pipeline_check.s(),
+        pipeline_correct.s(),
+        pipeline_verify.s(),
+        report,
+    )])
+
+
 @celery_app.task(bind=True, base=BaseTask, name='cursa_tasks.send_email')
 def send_email(
     self,
@@ -254,11 +534,14 @@ def cleanup_old_files(days: int = 7) -> Dict[str, Any]:
     """
     import shutil
     from datetime import datetime, timedelta
+    from app.services.storage_usage import storage_usage
     
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     directories = [
         os.path.join(base_dir, 'app', 'static', 'corrections'),
         os.path.join(base_dir, 'app', 'static', 'reports'),
+        os.path.join(base_dir, 'app', 'static', 'reports', 'data'),
+        os.path.join(base_dir, 'app', 'static', 'previews'),
     ]
     
     cutoff_time = datetime.now() - timedelta(days=days)
@@ -272,6 +555,8 @@ def cleanup_old_files(days: int = 7) -> Dict[str, Any]:
             
         for filename in os.listdir(directory):
             filepath = os.path.join(directory, filename)
+            if not os.path.isfile(filepath):
+                continue
             
             try:
                 mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
@@ -279,6 +564,7 @@ def cleanup_old_files(days: int = 7) -> Dict[str, Any]:
                 if mtime < cutoff_time:
                     file_size = os.path.getsize(filepath)
                     os.remove(filepath)
+                    storage_usage.record_delete(filepath)
                     deleted_count += 1
                     freed_bytes += file_size
                     logger.info(f"Deleted old file: {filename}")
@@ -287,9 +573,14 @@ def cleanup_old_files(days: int = 7) -> Dict[str, Any]:
                 errors.append({'file': filename, 'error': str(e)})
                 logger.error(f"Error deleting {filename}: {e}")
     
+    # Артефакты незавершённых конвейеров
+    from app.services.artifact_store import artifact_store, ARTIFACT_MAX_AGE_SECONDS
+    artifact_jobs_removed = artifact_store.cleanup_older_than(ARTIFACT_MAX_AGE_SECONDS)
+    
     return {
         'deleted_count': deleted_count,
         'freed_mb': round(freed_bytes / (1024 * 1024), 2),
+        'artifact_jobs_removed': artifact_jobs_removed,
         'errors': errors
     }
 
@@ -343,64 +634,95 @@ def batch_process(
     self,
     file_paths: list,
     profile_name: str = 'default',
-    user_email: Optional[str] = None
+    user_email: Optional[str] = None,
+    concurrency: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Пакетная обработка нескольких документов.
     
+    Документы обрабатываются параллельно (не более concurrency одновременно);
+    задача заменяется chord-ом, поэтому её результат — сводка по пакету.
+    
     Args:
         file_paths: Список путей к файлам
         profile_name: Профиль нормоконтроля
         user_email: Email для отправки сводного отчёта
+        concurrency: Ограничение параллелизма (по умолчанию BATCH_MAX_CONCURRENCY)
     
     Returns:
         Сводный результат обработки
     """
-    results = []
-    total = len(file_paths)
+    from app.services.batch_service import create_batch
     
-    for i, file_path in enumerate(file_paths):
-        self.update_state(
-            state='PROCESSING',
-            meta={
-                'current': i + 1,
-                'total': total,
-                'file': os.path.basename(file_path)
-            }
-        )
-        
-        try:
-            # Синхронный вызов для пакетной обработки
-            result = process_document(
-                file_path=file_path,
-                profile_name=profile_name,
-                options={'generate_report': False}
-            )
-            results.append({
-                'file': os.path.basename(file_path),
-                'status': 'success',
-                'result': result
-            })
-        except Exception as e:
-            results.append({
-                'file': os.path.basename(file_path),
-                'status': 'error',
-                'error': str(e)
-            })
+    concurrency = concurrency or BATCH_MAX_CONCURRENCY
+    batch_id = create_batch(
+        [{'path': path, 'filename': os.path.basename(path)} for path in file_paths],
+        profile_id=profile_name,
+        concurrency=concurrency,
+        batch_id=self.request.id.replace('-', '') if self.request.id else None,
+    )
+    raise self.replace(build_batch_workflow(batch_id, len(file_paths), concurrency, user_email))
+
+
+@celery_app.task(bind=True, name='cursa_tasks.batch_item')
+def batch_item(self, batch_id: str, index: int) -> Dict[str, Any]:
+    """Обработка одного документа пакета."""
+    from app.services.batch_service import process_batch_item
+    
+    return process_batch_item(batch_id, index, _get_workflow(), deadline=TASK_DEADLINE)
+
+
+@celery_app.task(bind=True, base=BaseTask, name='cursa_tasks.batch_finalize')
+def batch_finalize(
+    self,
+    lane_results: list,
+    batch_id: str,
+    user_email: Optional[str] = None
+) -> Dict[str, Any]:
+    """Callback chord-а: сводка по пакету и уведомление."""
+    from app.services.batch_service import finalize_batch
+    
+    summary = finalize_batch(batch_id)
     
     # Отправляем сводный email
     if user_email:
-        successful = sum(1 for r in results if r['status'] == 'success')
         send_email.delay(
             to_email=user_email,
-            subject=f'Пакетная обработка завершена ({successful}/{total})',
-            body=f'Обработано {successful} из {total} документов.',
+            subject=f'Пакетная обработка завершена ({summary["successful"]}/{summary["total"]})',
+            body=f'Обработано {summary["successful"]} из {summary["total"]} документов.',
             template='batch_summary'
         )
     
-    return {
-        'total': total,
-        'successful': sum(1 for r in results if r['status'] == 'success'),
-        'failed': sum(1 for r in results if r['status'] == 'error'),
-        'results': results
-    }
+    return summary
+
+
+def build_batch_workflow(
+    batch_id: str,
+    total: int,
+    concurrency: int,
+    user_email: Optional[str] = None,
+    priority: Optional[int] = None
+):
+    """
+    Собирает chord обработки пакета.
+    
+    Документы раскладываются по дорожкам (не более concurrency), дорожки
+    выполняются параллельно, документы внутри дорожки — последовательно.
+    Результаты собирает batch_finalize.
+    
+    Args:
+        priority: Приоритет брокера для задач пакета (0 — наивысший)
+    
+    Returns:
+        celery.canvas.Signature — запуск через .apply_async()
+    """
+    from app.services.batch_service import plan_lanes
+    
+    lanes = [
+        chain(*[_with_priority(batch_item.si(batch_id, index), priority) for index in lane])
+        for lane in plan_lanes(total, concurrency)
+    ]
+    return chord(
+        group(lanes),
+        _with_priority(batch_finalize.s(batch_id=batch_id, user_email=user_email), priority),
+    )
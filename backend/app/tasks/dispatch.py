@@ -0,0 +1,324 @@
+"""
+Постановка фоновых задач с выбором исполнителя.
+
+TASK_BACKEND:
+    celery — брокер Celery (Redis);
+    local  — локальный пул процессов (app.tasks.local_executor);
+    auto   — Celery, если брокер доступен, иначе локальный пул.
+
+Маршруты используют только функции этого модуля, поэтому выбор исполнителя
+не влияет на API: идентификатор задачи и формат статуса одинаковы. Если
+передан TenantPolicy, задача сначала проходит через FairScheduler
+(app.tasks.scheduling) и получает приоритет брокера по тарифу клиента.
+
+SCHEDULER_LEDGER выбирает учёт планировщика: redis — общая очередь и
+ограничения для всех веб-процессов, local — в памяти процесса, auto — Redis,
+если он доступен. Ёмкость планировщика по умолчанию — ёмкость парка
+исполнителей (fleet_capacity()), а не число CPU веб-сервера.
+
+Состояния заданий локального пула дублируются в result backend Celery, если
+он доступен, поэтому статус задачи можно запросить у любого веб-процесса.
+Без него локальный пул поддерживает только один веб-процесс.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+
+from app.services.artifact_store import artifact_store
+from app.tasks.scheduling import (
+    KIND_BATCH, KIND_INTERACTIVE, Ledger, LocalLedger, RedisLedger, TenantPolicy, get_scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+TASK_BACKENDS = ('celery', 'local', 'auto')
+
+# Как долго кэшируется результат проверки брокера в режиме auto (секунды)
+BROKER_CHECK_TTL = 30
+
+_broker_state = {'available': None, 'checked_at': 0.0}
+_broker_lock = threading.Lock()
+
+
+def _config(name: str, default: Any) -> Any:
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return os.environ.get(name, default)
+
+
+def get_task_backend() -> str:
+    """Возвращает исполнитель ('celery' или 'local') согласно TASK_BACKEND."""
+    backend = str(_config('TASK_BACKEND', 'auto')).lower()
+    if backend not in TASK_BACKENDS:
+        logger.warning(f"Неизвестный TASK_BACKEND={backend}, используется auto")
+        backend = 'auto'
+    if backend != 'auto':
+        return backend
+
+    with _broker_lock:
+        now = time.monotonic()
+        if _broker_state['available'] is None or now - _broker_state['checked_at'] > BROKER_CHECK_TTL:
+            from app.tasks.celery_tasks import broker_available
+            _broker_state['available'] = broker_available()
+            _broker_state['checked_at'] = now
+        return 'celery' if _broker_state['available'] else 'local'
+
+
+def _local_executor():
+    from app.tasks.local_executor import get_local_executor
+    workers = _config('LOCAL_EXECUTOR_WORKERS', 0)
+    return get_local_executor(int(workers) or None, _local_result_backend)
+
+
+def _local_result_backend():
+    """Result backend Celery для статуса локальных заданий (None — недоступен)."""
+    from app.tasks.celery_tasks import celery_app
+
+    url = str(celery_app.conf.result_backend or '')
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            from redis import Redis
+            Redis.from_url(url, socket_connect_timeout=1, socket_timeout=2).ping()
+            return celery_app.backend
+        except Exception as e:
+            logger.info(f"Result backend недоступен ({e}), статус локальных заданий хранится в процессе")
+
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1) or 1)
+    if workers > 1:
+        logger.warning(
+            f"Локальный пул без общего result backend при WEB_CONCURRENCY={workers}: "
+            f"статус задачи доступен только в веб-процессе, который её поставил"
+        )
+    return None
+
+
+def _scheduler_ledger() -> Ledger:
+    """Учёт планировщика согласно SCHEDULER_LEDGER."""
+    mode = str(_config('SCHEDULER_LEDGER', 'auto')).lower()
+    if mode != 'local':
+        try:
+            from redis import Redis
+            client = Redis.from_url(
+                _config('REDIS_URL', 'redis://localhost:6379/0'),
+                socket_connect_timeout=1, socket_timeout=2,
+            )
+            client.ping()
+            return RedisLedger(client)
+        except Exception as e:
+            level = logging.ERROR if mode == 'redis' else logging.INFO
+            logger.log(level, f"Учёт планировщика в Redis недоступен ({e}), используется память процесса")
+
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1) or 1)
+    if workers > 1:
+        logger.warning(
+            f"Планировщик без общего учёта при WEB_CONCURRENCY={workers}: ограничения "
+            f"параллелизма действуют в каждом процессе отдельно, очередь теряется при перезапуске"
+        )
+    return LocalLedger()
+
+
+def fleet_capacity() -> int:
+    """
+    Сколько задач одновременно выполняет парк исполнителей.
+
+    SCHEDULER_MAX_INFLIGHT, если задан. Иначе для Celery —
+    CELERY_WORKER_CONCURRENCY × CELERY_WORKERS (процессы всех воркеров), для
+    локального пула — его размер × WEB_CONCURRENCY (у каждого веб-процесса
+    свой пул).
+    """
+    configured = int(_config('SCHEDULER_MAX_INFLIGHT', 0))
+    if configured:
+        return configured
+    if get_task_backend() == 'celery':
+        concurrency = int(_config('CELERY_WORKER_CONCURRENCY', 2)) or os.cpu_count() or 2
+        return concurrency * max(1, int(_config('CELERY_WORKERS', 1)))
+    pool = int(_config('LOCAL_EXECUTOR_WORKERS', 0)) or os.cpu_count() or 2
+    return pool * max(1, int(os.environ.get('WEB_CONCURRENCY', 1) or 1))
+
+
+def scheduler():
+    """Планировщик веб-процесса (ёмкость — fleet_capacity())."""
+    return get_scheduler(
+        fleet_capacity(), int(_config('SCHEDULER_INTERACTIVE_RESERVED', 2)),
+        _scheduler_ledger, launch_spec,
+    )
+
+
+def launch_spec(spec: Dict[str, Any]):
+    """
+    Запускает задачу по описанию из очереди планировщика.
+
+    Описание сериализуется в JSON, поэтому задачу может запустить любой
+    веб-процесс, а не только принявший её.
+
+    Returns:
+        Объект с методом ready() (AsyncResult Celery или локального пула)
+    """
+    if spec['type'] == 'document':
+        return _launch_document(spec)
+    if spec['type'] == 'batch':
+        return _launch_batch(spec)
+    raise ValueError(f"Неизвестный тип задачи: {spec['type']}")
+
+
+def _launch_document(spec: Dict[str, Any]):
+    from app.tasks.celery_tasks import build_document_pipeline
+
+    try:
+        pipeline = build_document_pipeline(
+            spec['file_path'], spec['filename'], spec['profile'], spec['user_email'],
+            job_id=spec['job_id'],
+            priority=spec['priority'],
+            task_id=spec['task_id'],
+        )
+        if spec['backend'] == 'celery':
+            return pipeline.apply_async(task_id=spec['task_id'])
+        return _local_executor().submit_signature(pipeline, job_id=spec['task_id'])
+    except Exception:
+        artifact_store.delete_job(spec['job_id'])
+        raise
+
+
+def _launch_batch(spec: Dict[str, Any]):
+    if spec['backend'] == 'celery':
+        from app.tasks.celery_tasks import build_batch_workflow
+        return build_batch_workflow(
+            spec['batch_id'], spec['total'], spec['concurrency'], spec['user_email'], spec['priority'],
+        ).apply_async()
+    return _local_executor().submit_batch(
+        spec['batch_id'], spec['total'], spec['concurrency'], spec['user_email'],
+    )
+
+
+def submit_document(
+    file_path: str,
+    original_filename: str,
+    profile_name: Optional[str] = None,
+    user_email: Optional[str] = None,
+    policy: Optional[TenantPolicy] = None,
+) -> str:
+    """
+    Ставит обработку документа в очередь.
+
+    Файл копируется в общее хранилище артефактов, поэтому исходный временный
+    файл можно удалить сразу после вызова.
+
+    Args:
+        policy: Параметры клиента; без них задача запускается сразу
+
+    Returns:
+        str: Идентификатор задачи для get_task_status()
+    """
+    job_id = artifact_store.new_job_id()
+    task_id = str(uuid.UUID(hex=job_id))
+    source_ref = artifact_store.put_file(job_id, 'upload.docx', file_path)
+    spec = {
+        'type': 'document',
+        'backend': get_task_backend(),
+        'task_id': task_id,
+        'job_id': job_id,
+        'file_path': artifact_store.path(source_ref),
+        'filename': original_filename,
+        'profile': profile_name,
+        'user_email': user_email,
+        'priority': policy.broker_priority(KIND_INTERACTIVE) if policy else None,
+    }
+
+    if policy is None:
+        return launch_spec(spec).id
+    return scheduler().submit(task_id, policy, spec, KIND_INTERACTIVE)
+
+
+def batch_concurrency(concurrency: int, policy: Optional[TenantPolicy] = None) -> int:
+    """Параллелизм пакета с учётом ограничений клиента и планировщика."""
+    if policy is None:
+        return concurrency
+    return scheduler().clamp_slots(policy, KIND_BATCH, concurrency)
+
+
+def submit_batch(
+    batch_id: str,
+    total: int,
+    concurrency: int,
+    user_email: Optional[str] = None,
+    policy: Optional[TenantPolicy] = None,
+) -> str:
+    """
+    Запускает обработку зарегистрированного пакета (см. batch_service.create_batch).
+
+    Args:
+        concurrency: Параллелизм (см. batch_concurrency())
+        policy: Параметры клиента; без них пакет запускается сразу
+
+    Returns:
+        str: batch_id
+    """
+    spec = {
+        'type': 'batch',
+        'backend': get_task_backend(),
+        'batch_id': batch_id,
+        'total': total,
+        'concurrency': concurrency,
+        'user_email': user_email,
+        'priority': policy.broker_priority(KIND_BATCH) if policy else None,
+    }
+
+    if policy is None:
+        launch_spec(spec)
+    else:
+        scheduler().submit(batch_id, policy, spec, KIND_BATCH, cost=total, slots=concurrency)
+    return batch_id
+
+
+def get_async_result(task_id: str):
+    """AsyncResult задачи независимо от исполнителя."""
+    local = _local_executor()
+    if local.get_job(task_id) is not None:
+        return local.AsyncResult(task_id)
+
+    from app.tasks.celery_tasks import celery_app
+    return celery_app.AsyncResult(task_id)
+
+
+def get_task_status(task_id: str) -> Dict[str, Any]:
+    """
+    Статус задачи в едином формате.
+
+    Returns:
+        dict: task_id, state, meta (промежуточный прогресс), result, error
+    """
+    status = {'task_id': task_id, 'state': None, 'meta': None, 'result': None, 'error': None}
+
+    # Задача ещё ждёт своей очереди в планировщике
+    queued = scheduler().position(task_id)
+    if queued is not None:
+        status.update(state='QUEUED', meta=queued)
+        return status
+    launch_error = scheduler().launch_error(task_id)
+    if launch_error is not None:
+        status.update(state='FAILURE', error=launch_error)
+        return status
+
+    result = get_async_result(task_id)
+    state = result.state
+    if state == 'PENDING':
+        # Очередь другого веб-процесса или задача, потерянная при его перезапуске
+        shared = scheduler().lookup(task_id)
+        if shared is not None:
+            status.update(shared)
+            return status
+    status['state'] = state
+
+    if state == 'SUCCESS':
+        status['result'] = result.result
+    elif state == 'FAILURE':
+        status['error'] = str(result.info)
+    elif isinstance(result.info, dict):
+        status['meta'] = result.info
+    return status
@@ -0,0 +1,412 @@
+"""
+Локальный исполнитель задач на пуле процессов.
+
+Замена Celery для одноузловых развёртываний и тестов: задачи из
+app.tasks.celery_tasks выполняются в ProcessPoolExecutor с теми же
+сигнатурами, а состояние хранится в таблице заданий родительского процесса.
+LocalAsyncResult повторяет используемую часть интерфейса celery AsyncResult
+(state, info, result, ready(), successful(), get()).
+
+В дочерних процессах Celery переводится в eager-режим, а промежуточные
+состояния задач (self.update_state) передаются родителю через очередь.
+
+Таблица заданий принадлежит процессу, который поставил задачу. Чтобы статус
+был виден другим веб-процессам, исполнителю передаётся общий result backend
+Celery (Redis): каждое изменение состояния дублируется в него, и
+celery AsyncResult в любом процессе видит прогресс и результат. Без общего
+backend статус доступен только в процессе-владельце, то есть исполнитель
+поддерживает лишь один веб-процесс.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from celery import states
+from celery.backends.base import BaseBackend
+
+logger = logging.getLogger(__name__)
+
+# Количество завершённых заданий, которые хранятся в таблице
+MAX_FINISHED_JOBS = 1000
+
+# Очередь состояний в дочернем процессе (задаётся инициализатором пула)
+_progress_queue = None
+
+
+class ProgressBackend(BaseBackend):
+    """Result backend дочернего процесса: пересылает состояния задач родителю."""
+
+    def __init__(self, app=None, url=None, **kwargs):
+        super().__init__(app, **kwargs)
+
+    def _store_result(self, task_id, result, state, traceback=None, request=None, **kwargs):
+        if _progress_queue is not None and task_id:
+            _progress_queue.put((task_id, state, result))
+        return result
+
+    def _get_task_meta_for(self, task_id):
+        return {'task_id': task_id, 'status': states.PENDING, 'result': None}
+
+    def _forget(self, task_id):
+        pass
+
+
+def _init_worker(progress_queue):
+    """Инициализатор дочернего процесса пула."""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    from app.tasks.celery_tasks import celery_app
+    celery_app.conf.update(
+        task_always_eager=True,
+        task_eager_propagates=True,
+        broker_url='memory://',
+        result_backend='app.tasks.local_executor:ProgressBackend',
+    )
+
+
+def _run_task(task_name: str, job_id: str, args: tuple, kwargs: dict) -> Any:
+    """Выполняет задачу Celery в дочернем процессе."""
+    from app.tasks.celery_tasks import celery_app
+
+    _progress_queue.put((job_id, states.STARTED, {}))
+    task = celery_app.tasks[task_name]
+    return task.apply(args=args, kwargs=kwargs, task_id=job_id, throw=True).get(
+        disable_sync_subtasks=False
+    )
+
+
+def _run_signature(signature: dict, job_id: str) -> Any:
+    """Выполняет подпись Celery (задачу или цепочку) в дочернем процессе."""
+    from celery import signature as make_signature
+
+    from app.tasks.celery_tasks import celery_app
+
+    _progress_queue.put((job_id, states.STARTED, {}))
+    sig = make_signature(signature, app=celery_app)
+    # Все задачи цепочки сообщают прогресс под идентификатором задания
+    return sig.apply(task_id=job_id, throw=True).get(disable_sync_subtasks=False)
+
+
+def _run_batch_lane(job_id: str, batch_id: str, indices: List[int]) -> List[Dict[str, Any]]:
+    """Последовательно обрабатывает документы одной дорожки пакета."""
+    from app.services.batch_service import process_batch_item
+    from app.tasks.celery_tasks import TASK_DEADLINE, _get_workflow
+
+    _progress_queue.put((job_id, states.STARTED, {}))
+    return [
+        process_batch_item(batch_id, index, _get_workflow(), deadline=TASK_DEADLINE)
+        for index in indices
+    ]
+
+
+class LocalJob:
+    """Запись таблицы заданий."""
+
+    def __init__(self, job_id: str, name: str):
+        self.id = job_id
+        self.name = name
+        self.state = states.PENDING
+        self.meta: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+
+class LocalAsyncResult:
+    """Аналог celery.result.AsyncResult для локальных заданий."""
+
+    def __init__(self, executor: 'LocalExecutor', job_id: str):
+        self._executor = executor
+        self.id = job_id
+
+    def _job(self) -> Optional[LocalJob]:
+        return self._executor.get_job(self.id)
+
+    @property
+    def state(self) -> str:
+        job = self._job()
+        return job.state if job else states.PENDING
+
+    status = state
+
+    @property
+    def info(self) -> Any:
+        job = self._job()
+        if job is None:
+            return None
+        if job.state == states.SUCCESS:
+            return job.result
+        if job.state == states.FAILURE:
+            return job.error
+        return job.meta
+
+    @property
+    def result(self) -> Any:
+        job = self._job()
+        if job is None or job.state not in states.READY_STATES:
+            return None
+        return self.info
+
+    def ready(self) -> bool:
+        return self.state in states.READY_STATES
+
+    def successful(self) -> bool:
+        return self.state == states.SUCCESS
+
+    def failed(self) -> bool:
+        return self.state == states.FAILURE
+
+    def get(self, timeout: Optional[float] = None, propagate: bool = True) -> Any:
+        job = self._job()
+        if job is None:
+            raise KeyError(self.id)
+        if not job.done.wait(timeout):
+            raise TimeoutError(f'Задание {self.id} не завершилось за {timeout} с')
+        if job.state == states.FAILURE and propagate:
+            raise job.error
+        return self.info
+
+
+class LocalExecutor:
+    """
+    Пул процессов с таблицей заданий.
+
+    Args:
+        max_workers: Размер пула (по умолчанию — число CPU)
+        mp_context: Способ запуска процессов; spawn безопасен для процессов
+            с потоками и eventlet
+        result_backend: Общий result backend Celery, в который дублируются
+            состояния заданий (None — статус виден только в этом процессе)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context: str = 'spawn',
+                 result_backend: Optional[BaseBackend] = None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.result_backend = result_backend
+        self._mp_context = multiprocessing.get_context(mp_context)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._listener: Optional[threading.Thread] = None
+        self._jobs: 'OrderedDict[str, LocalJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Публикации одного задания не должны обгонять друг друга
+        self._publish_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    # === Пул и приём состояний ===
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._progress_queue = self._mp_context.Queue()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._mp_context,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,),
+                )
+                self._stopping.clear()
+                self._listener = threading.Thread(
+                    target=self._listen, name='local-executor-progress', daemon=True
+                )
+                self._listener.start()
+            return self._pool
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job_id, state, meta = self._progress_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.state in states.READY_STATES:
+                    continue
+                if state == states.STARTED and job.started_at is None:
+                    job.started_at = time.time()
+                job.state = state
+                if isinstance(meta, dict):
+                    job.meta = meta
+            self._publish(job)
+
+    def _register(self, job_id: str, name: str) -> LocalJob:
+        job = LocalJob(job_id, name)
+        with self._lock:
+            self._jobs[job_id] = job
+            finished = [key for key, value in self._jobs.items() if value.state in states.READY_STATES]
+            for key in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._jobs[key]
+        return job
+
+    def _finish(self, job: LocalJob, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            job.finished_at = time.time()
+            if error is not None:
+                job.state = states.FAILURE
+                job.error = error
+            else:
+                job.state = states.SUCCESS
+                job.result = result
+        self._publish(job)
+        job.done.set()
+
+    def _publish(self, job: LocalJob) -> None:
+        """Дублирует текущее состояние задания в общий result backend."""
+        if self.result_backend is None:
+            return
+        with self._publish_lock:
+            # Публикуется последнее состояние, поэтому запоздавший прогресс
+            # не перезапишет итог
+            with self._lock:
+                state = job.state
+                payload = job.result if state == states.SUCCESS else (
+                    job.error if state == states.FAILURE else job.meta
+                )
+            try:
+                self.result_backend.store_result(job.id, payload, state)
+            except Exception as e:
+                logger.warning(f"Не удалось опубликовать состояние задания {job.id}: {e}")
+
+    # === Публичный интерфейс ===
+
+    def submit(
+        self,
+        task_name: str,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        job_id: Optional[str] = None,
+    ) -> LocalAsyncResult:
+        """
+        Ставит задачу Celery в локальный пул.
+
+        Args:
+            task_name: Имя задачи (например, 'cursa_tasks.process_document')
+            args, kwargs: Аргументы задачи (те же, что для .delay())
+            job_id: Идентификатор задания
+        """
+        job = self._register(job_id or str(uuid.uuid4()), task_name)
+        future = self._ensure_pool().submit(_run_task, task_name, job.id, tuple(args), kwargs or {})
+        return self._track(job, future)
+
+    def submit_signature(self, signature, job_id: Optional[str] = None) -> LocalAsyncResult:
+        """
+        Ставит в пул подпись Celery, например цепочку build_document_pipeline().
+
+        Результат задания — результат последней задачи цепочки.
+        """
+        job = self._register(job_id or str(uuid.uuid4()), signature.get('task', 'signature'))
+        future = self._ensure_pool().submit(_run_signature, dict(signature), job.id)
+        return self._track(job, future)
+
+    def _track(self, job: LocalJob, future) -> LocalAsyncResult:
+        def _done(fut):
+            error = fut.exception()
+            self._finish(job, None if error else fut.result(), error)
+
+        future.add_done_callback(_done)
+        return LocalAsyncResult(self, job.id)
+
+    def submit_batch(
+        self,
+        batch_id: str,
+        total: int,
+        concurrency: int,
+        user_email: Optional[str] = None,
+    ) -> LocalAsyncResult:
+        """
+        Обрабатывает пакет дорожками (как build_batch_workflow для Celery).
+
+        Результат задания — сводка finalize_batch.
+        """
+        from app.services.batch_service import finalize_batch, plan_lanes
+
+        job = self._register(batch_id, 'cursa_tasks.batch_process')
+        lanes = plan_lanes(total, concurrency)
+        pool = self._ensure_pool()
+        futures = [pool.submit(_run_batch_lane, job.id, batch_id, lane) for lane in lanes]
+        remaining = {'count': len(futures)}
+        remaining_lock = threading.Lock()
+
+        def _lane_done(fut):
+            with remaining_lock:
+                remaining['count'] -= 1
+                if remaining['count']:
+                    return
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            try:
+                summary = finalize_batch(batch_id)
+                if user_email:
+                    self.submit('cursa_tasks.send_email', kwargs={
+                        'to_email': user_email,
+                        'subject': f'Пакетная обработка завершена ({summary["successful"]}/{summary["total"]})',
+                        'body': f'Обработано {summary["successful"]} из {summary["total"]} документов.',
+                        'template': 'batch_summary',
+                    })
+                self._finish(job, summary, errors[0] if errors else None)
+            except Exception as e:
+                self._finish(job, error=e)
+
+        if not futures:
+            self._finish(job, finalize_batch(batch_id))
+        for future in futures:
+            future.add_done_callback(_lane_done)
+        return LocalAsyncResult(self, job.id)
+
+    def get_job(self, job_id: str) -> Optional[LocalJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def AsyncResult(self, job_id: str) -> LocalAsyncResult:
+        return LocalAsyncResult(self, job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+        return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._stopping.set()
+
+
+_executor: Optional[LocalExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_local_executor(
+    max_workers: Optional[int] = None,
+    result_backend_factory: Optional[Callable[[], Optional[BaseBackend]]] = None,
+) -> LocalExecutor:
+    """
+    Возвращает общий для процесса локальный исполнитель.
+
+    Параметры учитываются при создании; result_backend_factory вызывается
+    один раз и возвращает общий result backend (или None).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            backend = result_backend_factory() if result_backend_factory else None
+            _executor = LocalExecutor(max_workers=max_workers, result_backend=backend)
+            atexit.register(_executor.shutdown, False)
+        return _executor
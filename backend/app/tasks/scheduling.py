@@ -0,0 +1,818 @@
+"""
+Приоритеты и справедливое распределение фоновых задач между клиентами.
+
+Задачи из маршрутов не отправляются исполнителю напрямую, а проходят через
+FairScheduler:
+
+- у каждого клиента (API-ключ или IP) своя очередь; между очередями
+  используется взвешенная справедливая очередь (WFQ): задача получает
+  виртуальное время завершения start + cost / weight, и первой запускается
+  задача с наименьшим временем. Вес берётся из тарифа (PLANS.queue_weight),
+  поэтому массовая загрузка одного клиента не задерживает остальных;
+- число одновременно выполняемых задач клиента ограничено
+  PLANS.max_concurrent_jobs, общее — SCHEDULER_MAX_INFLIGHT (по умолчанию
+  ёмкость парка исполнителей), причём SCHEDULER_INTERACTIVE_RESERVED мест
+  пакеты занимать не могут;
+- приоритет брокера (PLANS.queue_priority, 0 — наивысший) передаётся в
+  Celery, пакетные задачи получают приоритет ниже интерактивных.
+
+Время ожидания в очереди планировщика публикуется гистограммой
+cursa_task_queue_wait_seconds.
+
+Очередь WFQ и занятые места ведёт учёт (ledger):
+
+- RedisLedger (SCHEDULER_LEDGER=redis или auto при доступном Redis) — общий
+  для всех процессов gunicorn. Очередь — sorted set задач по виртуальному
+  времени завершения, поэтому порядок WFQ соблюдается на весь кластер, а
+  задачу запускает любой процесс, у которого освободились места. Задача
+  хранится как описание запуска (spec, JSON); запускает её launcher
+  планировщика того процесса, который забрал задачу из очереди. Места
+  берутся арендой в Redis, поэтому PLANS.max_concurrent_jobs и
+  SCHEDULER_MAX_INFLIGHT действуют на весь кластер. Аренда продлевается,
+  пока процесс жив, и истекает сама, если он упал. Если процесс упал между
+  тем, как забрал задачу, и её запуском, статус задачи сообщает об ошибке
+  вместо вечного PENDING;
+- LocalLedger — только память процесса. При нескольких веб-процессах
+  ограничения умножаются на их число, а очередь теряется при перезапуске;
+  подходит для одного процесса (разработка, локальный исполнитель).
+"""
+
+import atexit
+import heapq
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Насколько понижается приоритет брокера для пакетных задач
+BATCH_PRIORITY_PENALTY = 2
+MAX_BROKER_PRIORITY = 9
+
+# Интервал опроса завершения запущенных задач и общей очереди (секунды)
+POLL_INTERVAL = 0.5
+
+# Сколько ошибок запуска хранится для выдачи в статусе задачи
+MAX_LAUNCH_ERRORS = 1000
+
+# Срок аренды мест в RedisLedger (секунды); продлевается каждую треть срока
+LEASE_TTL = 60
+# Сколько хранятся в Redis задача в очереди и ошибка запуска (секунды)
+QUEUED_TTL = 24 * 3600
+
+# Через сколько повторяется попытка взять места клиента, занятые другими процессами
+BLOCKED_RETRY = POLL_INTERVAL
+
+# Сколько задач из головы очереди просматривается за один проход диспетчера
+CANDIDATES_PER_PASS = 32
+
+LOST_TASK_ERROR = (
+    'Задача потеряна: сервер перезапустился до её запуска. Отправьте документ повторно'
+)
+
+KIND_INTERACTIVE = 'interactive'
+KIND_BATCH = 'batch'
+
+# Результат попытки занять места
+ACQUIRED = 'acquired'
+TENANT_FULL = 'tenant_full'
+FLEET_FULL = 'fleet_full'
+
+
+@dataclass(frozen=True)
+class TenantPolicy:
+    """Параметры планирования клиента."""
+
+    tenant: str
+    plan: str
+    priority: int
+    weight: float
+    max_concurrent: int
+
+    def broker_priority(self, kind: str = KIND_INTERACTIVE) -> int:
+        if kind == KIND_BATCH:
+            return min(self.priority + BATCH_PRIORITY_PENALTY, MAX_BROKER_PRIORITY)
+        return self.priority
+
+
+def resolve_policy(api_key=None, remote_addr: Optional[str] = None) -> TenantPolicy:
+    """
+    Определяет клиента и параметры его тарифа.
+
+    Args:
+        api_key: ResolvedAPIKey из authorize_api_key_request (None — анонимный запрос)
+        remote_addr: IP клиента для анонимных запросов
+    """
+    from app.services.payment_service import PLANS, plan_key_for_user
+
+    if api_key is not None:
+        tenant = f'key:{api_key.id}'
+        plan_key = getattr(api_key, 'plan', None) or plan_key_for_user(getattr(api_key, 'user', None))
+    else:
+        tenant = f'ip:{remote_addr or "unknown"}'
+        plan_key = 'FREE'
+
+    if plan_key not in PLANS:
+        plan_key = 'FREE'
+    limits = PLANS[plan_key]['limits']
+    return TenantPolicy(
+        tenant=tenant,
+        plan=plan_key,
+        priority=int(limits.get('queue_priority', MAX_BROKER_PRIORITY)),
+        weight=float(limits.get('queue_weight', 1)),
+        max_concurrent=int(limits.get('max_concurrent_jobs', 1)),
+    )
+
+
+class _Entry:
+    """Задача в очереди; в RedisLedger хранится как record()."""
+
+    __slots__ = ('task_id', 'policy', 'spec', 'kind', 'slots', 'cost', 'finish_tag',
+                 'seq', 'enqueued_at', 'handle')
+
+    def __init__(self, task_id, policy, spec, kind, slots, cost=1,
+                 finish_tag=0.0, seq=0, enqueued_at=None):
+        self.task_id = task_id
+        self.policy = policy
+        self.spec = spec
+        self.kind = kind
+        self.slots = slots
+        self.cost = cost
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+        self.handle = None
+
+    def order(self):
+        return self.finish_tag, self.seq
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            'task_id': self.task_id,
+            'policy': asdict(self.policy),
+            'spec': self.spec,
+            'kind': self.kind,
+            'slots': self.slots,
+            'cost': self.cost,
+            'finish_tag': self.finish_tag,
+            'seq': self.seq,
+            'enqueued_at': self.enqueued_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> '_Entry':
+        return cls(
+            record['task_id'], TenantPolicy(**record['policy']), record['spec'],
+            record['kind'], record['slots'], record['cost'],
+            record['finish_tag'], record['seq'], record['enqueued_at'],
+        )
+
+
+def _queue_meta(entry: _Entry, ahead: int) -> Dict[str, Any]:
+    return {
+        'position': ahead + 1,
+        'plan': entry.policy.plan,
+        'waiting_seconds': round(time.time() - entry.enqueued_at, 2),
+    }
+
+
+class LocalLedger:
+    """
+    Учёт в памяти процесса: очередь, виртуальное время и занятые места
+    видны только этому процессу.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: Dict[str, _Entry] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._tenant_inflight: Dict[str, int] = {}
+
+    # === Очередь ===
+
+    def enqueue(self, entry: _Entry) -> None:
+        """Вычисляет виртуальное время завершения задачи и ставит её в очередь."""
+        with self._lock:
+            tenant = entry.policy.tenant
+            start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+            entry.finish_tag = start + entry.cost / max(entry.policy.weight, 0.001)
+            entry.seq = next(self._seq)
+            self._last_finish[tenant] = entry.finish_tag
+            self._queue[entry.task_id] = entry
+
+    def candidates(self, limit: int) -> List[_Entry]:
+        """Голова очереди в порядке WFQ."""
+        with self._lock:
+            return heapq.nsmallest(limit, self._queue.values(), key=_Entry.order)
+
+    def claim(self, entry: _Entry) -> bool:
+        """Забирает задачу из очереди; False — её уже забрали."""
+        with self._lock:
+            return self._queue.pop(entry.task_id, None) is not None
+
+    def unclaim(self, entry: _Entry) -> None:
+        """Возвращает забранную задачу в очередь на прежнее место."""
+        with self._lock:
+            self._queue[entry.task_id] = entry
+
+    def started(self, entry: _Entry) -> None:
+        """Продвигает виртуальное время до времени запущенной задачи."""
+        with self._lock:
+            self._virtual_time = max(self._virtual_time, entry.finish_tag)
+            # Клиенты без задач, чья доля уже «отработана», больше не нужны
+            for tenant, last_finish in list(self._last_finish.items()):
+                if last_finish <= self._virtual_time and not self._tenant_inflight.get(tenant):
+                    del self._last_finish[tenant]
+
+    def finish(self, entry: _Entry) -> None:
+        """Задача передана исполнителю (или не запустилась) и больше не числится в очереди."""
+
+    def position(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._queue.get(task_id)
+            if entry is None:
+                return None
+            ahead = sum(1 for other in self._queue.values() if other.order() < entry.order())
+            return _queue_meta(entry, ahead)
+
+    def queued(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    # === Места ===
+
+    def acquire(self, entry: _Entry, max_inflight: int, reserved: int) -> str:
+        """Занимает места задачи: ACQUIRED, TENANT_FULL или FLEET_FULL."""
+        with self._lock:
+            tenant = self._tenant_inflight.get(entry.policy.tenant, 0)
+            if tenant + entry.slots > entry.policy.max_concurrent:
+                return TENANT_FULL
+            needed = self._inflight + entry.slots + (reserved if entry.kind == KIND_BATCH else 0)
+            if needed > max_inflight:
+                return FLEET_FULL
+            self._inflight += entry.slots
+            self._tenant_inflight[entry.policy.tenant] = tenant + entry.slots
+            return ACQUIRED
+
+    def release(self, entry: _Entry) -> None:
+        with self._lock:
+            self._inflight -= entry.slots
+            left = self._tenant_inflight.get(entry.policy.tenant, 0) - entry.slots
+            if left > 0:
+                self._tenant_inflight[entry.policy.tenant] = left
+            else:
+                self._tenant_inflight.pop(entry.policy.tenant, None)
+
+    def heartbeat(self, running: Iterable[_Entry]) -> None:
+        pass
+
+    def record_launch_error(self, task_id: str, error: str) -> None:
+        pass
+
+    def lookup(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class RedisLedger:
+    """
+    Общий учёт планировщиков всех процессов в Redis.
+
+    Очередь — sorted set идентификаторов задач с оценкой «виртуальное время
+    завершения», сама задача — запись queued:<task_id>. Виртуальное время
+    кластера и последнее время завершения клиента тоже хранятся в Redis.
+    Их чтение при постановке не транзакционно: одновременные постановки
+    одного клиента из разных процессов могут получить одинаковое время, что
+    лишь немного смещает доли. Забирает задачу из очереди тот процесс, чей
+    ZREM её удалил; до запуска за ней остаётся отметка claimed:<task_id>.
+
+    Занятые места — sorted set аренд (общий и по клиенту): элемент
+    «task_id:slots», оценка — время истечения. Места берутся оптимистично:
+    аренда добавляется, после чего считается занятость с её учётом; при
+    превышении ограничения аренда снимается. Одновременные попытки могут
+    обе отступить, но вместе превысить ограничение не могут.
+
+    Args:
+        redis_client: Клиент Redis
+        prefix: Префикс ключей
+        lease_ttl: Срок аренды (секунды)
+    """
+
+    shared = True
+
+    def __init__(self, redis_client, prefix: str = 'cursa:sched', lease_ttl: float = LEASE_TTL):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.lease_ttl = lease_ttl
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._last_heartbeat = 0.0
+
+    def _key(self, *parts: str) -> str:
+        return ':'.join((self.prefix,) + parts)
+
+    # === Очередь ===
+
+    def enqueue(self, entry: _Entry) -> None:
+        """
+        Ставит задачу в общую очередь.
+
+        Raises:
+            Exception: Redis недоступен (задача в очередь не попала)
+        """
+        tenant_key = self._key('finish', entry.policy.tenant)
+        pipe = self.redis.pipeline()
+        pipe.zscore(self._key('vtime'), 'v')
+        pipe.get(tenant_key)
+        pipe.incr(self._key('seq'))
+        virtual_time, last_finish, seq = pipe.execute()
+
+        start = max(float(virtual_time or 0), float(_text(last_finish)) if last_finish else 0.0)
+        entry.finish_tag = start + entry.cost / max(entry.policy.weight, 0.001)
+        entry.seq = int(seq)
+
+        pipe = self.redis.pipeline()
+        pipe.setex(tenant_key, QUEUED_TTL, repr(entry.finish_tag))
+        pipe.setex(self._key('queued', entry.task_id), QUEUED_TTL, json.dumps(entry.record()))
+        pipe.zadd(self._key('queue'), {entry.task_id: entry.finish_tag})
+        pipe.execute()
+
+    def candidates(self, limit: int) -> List[_Entry]:
+        """Голова общей очереди в порядке WFQ."""
+        try:
+            task_ids = [_text(task_id) for task_id in self.redis.zrange(self._key('queue'), 0, limit - 1)]
+            if not task_ids:
+                return []
+            pipe = self.redis.pipeline()
+            for task_id in task_ids:
+                pipe.get(self._key('queued', task_id))
+            records = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Очередь планировщика в Redis недоступна: {e}")
+            return []
+
+        entries, expired = [], []
+        for task_id, raw in zip(task_ids, records):
+            if raw is None:
+                expired.append(task_id)
+            else:
+                entries.append(_Entry.from_record(json.loads(_text(raw))))
+        if expired:
+            try:
+                self.redis.zrem(self._key('queue'), *expired)
+            except Exception:
+                pass
+        return sorted(entries, key=_Entry.order)
+
+    def claim(self, entry: _Entry) -> bool:
+        """Забирает задачу из общей очереди; False — её забрал другой процесс."""
+        try:
+            if not self.redis.zrem(self._key('queue'), entry.task_id):
+                return False
+            pipe = self.redis.pipeline()
+            pipe.setex(self._key('owner', self.owner), int(self.lease_ttl), '1')
+            pipe.setex(self._key('claimed', entry.task_id), QUEUED_TTL, self.owner)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось забрать задачу {entry.task_id} из очереди Redis: {e}")
+            return False
+
+    def unclaim(self, entry: _Entry) -> None:
+        try:
+            pipe = self.redis.pipeline()
+            pipe.zadd(self._key('queue'), {entry.task_id: entry.finish_tag})
+            pipe.delete(self._key('claimed', entry.task_id))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось вернуть задачу {entry.task_id} в очередь Redis: {e}")
+
+    def started(self, entry: _Entry) -> None:
+        try:
+            self.redis.zadd(self._key('vtime'), {'v': entry.finish_tag}, gt=True)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить виртуальное время планировщика: {e}")
+
+    def finish(self, entry: _Entry) -> None:
+        # Запись снимается после запуска: упавший до него процесс оставит задачу «потерянной»
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(self._key('queued', entry.task_id))
+            pipe.delete(self._key('claimed', entry.task_id))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось снять задачу {entry.task_id} с учёта в Redis: {e}")
+
+    def position(self, task_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            pipe = self.redis.pipeline()
+            pipe.zrank(self._key('queue'), task_id)
+            pipe.get(self._key('queued', task_id))
+            rank, raw = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Очередь планировщика в Redis недоступна: {e}")
+            return None
+        if rank is None or raw is None:
+            return None
+        return _queue_meta(_Entry.from_record(json.loads(_text(raw))), rank)
+
+    def queued(self) -> int:
+        try:
+            return int(self.redis.zcard(self._key('queue')))
+        except Exception:
+            return 0
+
+    # === Места ===
+
+    def _lease_keys(self, entry: _Entry) -> List[str]:
+        return [self._key('inflight'), self._key('tenant', entry.policy.tenant)]
+
+    @staticmethod
+    def _member(entry: _Entry) -> str:
+        return f'{entry.task_id}:{entry.slots}'
+
+    @staticmethod
+    def _used(members) -> int:
+        return sum(int(_text(member).rsplit(':', 1)[1]) for member in members)
+
+    def acquire(self, entry: _Entry, max_inflight: int, reserved: int) -> str:
+        now = time.time()
+        member = self._member(entry)
+        keys = self._lease_keys(entry)
+        try:
+            pipe = self.redis.pipeline()
+            for key in keys:
+                pipe.zremrangebyscore(key, '-inf', now)
+                pipe.zadd(key, {member: now + self.lease_ttl})
+                pipe.zrange(key, 0, -1)
+            results = pipe.execute()
+            total, tenant = self._used(results[2]), self._used(results[5])
+            if tenant > entry.policy.max_concurrent:
+                outcome = TENANT_FULL
+            elif total + (reserved if entry.kind == KIND_BATCH else 0) > max_inflight:
+                outcome = FLEET_FULL
+            else:
+                return ACQUIRED
+            self._remove(member, keys)
+            return outcome
+        except Exception as e:
+            # Без Redis уже забранная задача всё равно запускается
+            logger.warning(f"Учёт планировщика в Redis недоступен: {e}")
+            return ACQUIRED
+
+    def release(self, entry: _Entry) -> None:
+        try:
+            self._remove(self._member(entry), self._lease_keys(entry))
+        except Exception as e:
+            logger.warning(f"Не удалось освободить места задачи {entry.task_id}: {e}")
+
+    def _remove(self, member: str, keys: List[str]) -> None:
+        pipe = self.redis.pipeline()
+        for key in keys:
+            pipe.zrem(key, member)
+        pipe.execute()
+
+    def heartbeat(self, running: Iterable[_Entry]) -> None:
+        """Продлевает аренды запущенных задач и отметку, что процесс жив."""
+        now = time.time()
+        if now - self._last_heartbeat < self.lease_ttl / 3:
+            return
+        self._last_heartbeat = now
+        try:
+            pipe = self.redis.pipeline()
+            pipe.setex(self._key('owner', self.owner), int(self.lease_ttl), '1')
+            for entry in running:
+                for key in self._lease_keys(entry):
+                    pipe.zadd(key, {self._member(entry): now + self.lease_ttl}, xx=True)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось продлить аренды планировщика: {e}")
+
+    def record_launch_error(self, task_id: str, error: str) -> None:
+        try:
+            self.redis.setex(self._key('error', task_id), QUEUED_TTL, error)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить ошибку запуска {task_id}: {e}")
+
+    def lookup(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Состояние задачи, которую забрал из очереди другой процесс.
+
+        Returns:
+            dict: state (QUEUED или FAILURE) и meta/error; None — задача
+            в учёте не числится (запущена или неизвестна)
+        """
+        try:
+            error = self.redis.get(self._key('error', task_id))
+            if error is not None:
+                return {'state': 'FAILURE', 'error': _text(error)}
+            raw = self.redis.get(self._key('queued', task_id))
+            claimer = self.redis.get(self._key('claimed', task_id))
+            if raw is None or claimer is None:
+                return None
+            record = json.loads(_text(raw))
+            if self.redis.exists(self._key('owner', _text(claimer))):
+                return {'state': 'QUEUED', 'meta': {
+                    'plan': record['policy']['plan'],
+                    'waiting_seconds': round(time.time() - record['enqueued_at'], 2),
+                }}
+            # Процесс забрал задачу из очереди и завершился, не запустив её
+            pipe = self.redis.pipeline()
+            pipe.delete(self._key('queued', task_id))
+            pipe.delete(self._key('claimed', task_id))
+            pipe.setex(self._key('error', task_id), QUEUED_TTL, LOST_TASK_ERROR)
+            pipe.execute()
+            return {'state': 'FAILURE', 'error': LOST_TASK_ERROR}
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать учёт планировщика для {task_id}: {e}")
+            return None
+
+    def close(self) -> None:
+        """Снимает отметку процесса: забранные им задачи сразу считаются потерянными."""
+        try:
+            self.redis.delete(self._key('owner', self.owner))
+        except Exception:
+            pass
+
+
+Ledger = Union[LocalLedger, RedisLedger]
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _call(spec: Callable[[], Any]) -> Any:
+    return spec()
+
+
+class FairScheduler:
+    """
+    Диспетчер очереди задач с WFQ между клиентами и ограничением параллелизма.
+
+    Очередь и места ведёт учёт: диспетчер процесса забирает из очереди
+    задачи, для которых есть места, запускает их через launcher и
+    освобождает места завершившихся.
+
+    Args:
+        max_inflight: Сколько задач (слотов) может выполняться одновременно
+            во всём парке исполнителей
+        interactive_reserved: Слоты, недоступные пакетным задачам
+        ledger: Учёт очереди и мест (по умолчанию LocalLedger)
+        launcher: Запускает задачу по её описанию (spec) и возвращает объект
+            с методом ready(); по умолчанию spec — вызываемый объект. Для
+            RedisLedger spec должен сериализоваться в JSON
+    """
+
+    def __init__(self, max_inflight: int = 16, interactive_reserved: int = 2,
+                 ledger: Optional[Ledger] = None,
+                 launcher: Optional[Callable[[Any], Any]] = None):
+        self.max_inflight = max(1, max_inflight)
+        self.interactive_reserved = max(0, min(interactive_reserved, self.max_inflight - 1))
+        self.ledger = ledger or LocalLedger()
+        self.launcher = launcher or _call
+        self._running: Dict[str, _Entry] = {}
+        self._launch_errors: 'OrderedDict[str, str]' = OrderedDict()
+        # Клиенты, чьи места заняты, и до какого момента их задачи не рассматриваются
+        self._blocked: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # === Постановка ===
+
+    def clamp_slots(self, policy: TenantPolicy, kind: str, slots: int) -> int:
+        """Сколько мест параллелизма задача реально получит."""
+        limit = policy.max_concurrent
+        if kind == KIND_BATCH:
+            limit = min(limit, self.max_inflight - self.interactive_reserved)
+        return max(1, min(slots, limit, self.max_inflight))
+
+    def submit(
+        self,
+        task_id: str,
+        policy: TenantPolicy,
+        spec: Any,
+        kind: str = KIND_INTERACTIVE,
+        cost: float = 1,
+        slots: int = 1,
+    ) -> str:
+        """
+        Ставит задачу в очередь клиента.
+
+        Args:
+            task_id: Идентификатор, под которым задача будет запущена
+            policy: Параметры клиента (resolve_policy)
+            spec: Описание запуска для launcher
+            kind: interactive или batch
+            cost: Объём работы (например, число документов пакета)
+            slots: Сколько мест параллелизма занимает задача
+        """
+        slots = self.clamp_slots(policy, kind, slots)
+        entry = _Entry(task_id, policy, spec, kind, slots, cost)
+        try:
+            self.ledger.enqueue(entry)
+        except Exception as e:
+            # Без очереди задача запускается сразу: ограничения не действуют, но задача не теряется
+            logger.warning(f"Не удалось поставить задачу {task_id} в очередь планировщика: {e}")
+            self.launcher(spec)
+            return task_id
+        with self._cond:
+            self._ensure_thread()
+            self._cond.notify()
+        return task_id
+
+    # === Состояние ===
+
+    def position(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Положение задачи в очереди (None — задача уже запущена или неизвестна)."""
+        return self.ledger.position(task_id)
+
+    def launch_error(self, task_id: str) -> Optional[str]:
+        """Ошибка запуска задачи у исполнителя, если она была."""
+        with self._cond:
+            return self._launch_errors.get(task_id)
+
+    def lookup(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Состояние задачи по общему учёту (запуск в другом процессе, потерянная задача)."""
+        return self.ledger.lookup(task_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            running = list(self._running.values())
+        return {
+            'queued': self.ledger.queued(),
+            'running': len(running),
+            'inflight_slots': sum(entry.slots for entry in running),
+            'max_inflight': self.max_inflight,
+            'shared_ledger': self.ledger.shared,
+        }
+
+    def start(self) -> None:
+        """Запускает диспетчер, не дожидаясь первой постановки."""
+        with self._cond:
+            self._ensure_thread()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.ledger.close()
+
+    # === Диспетчер ===
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='fair-scheduler', daemon=True)
+            self._thread.start()
+
+    def _poll(self) -> None:
+        """
+        Освобождает места завершившихся задач. ready() обращается к бэкенду
+        результатов, поэтому опрос идёт без блокировки: submit() и статус
+        задач не ждут сетевых запросов.
+        """
+        with self._cond:
+            running = list(self._running.values())
+
+        finished = []
+        for entry in running:
+            try:
+                done = entry.handle is None or entry.handle.ready()
+            except Exception as e:
+                logger.warning(f"Не удалось проверить задачу {entry.task_id}: {e}")
+                done = True
+            if done:
+                finished.append(entry)
+
+        for entry in finished:
+            self.ledger.release(entry)
+            # Места клиента освободились — его задачи снова можно запускать
+            self._blocked.pop(entry.policy.tenant, None)
+        finished_ids = {entry.task_id for entry in finished}
+        self.ledger.heartbeat([entry for entry in running if entry.task_id not in finished_ids])
+
+        with self._cond:
+            for entry in finished:
+                self._running.pop(entry.task_id, None)
+
+        now = time.monotonic()
+        self._blocked = {tenant: until for tenant, until in self._blocked.items() if until > now}
+
+    def _dispatch(self) -> bool:
+        """
+        Запускает первую по порядку WFQ задачу, для которой есть места.
+
+        Returns:
+            bool: Запущена ли задача
+        """
+        now = time.monotonic()
+        fleet_full = False
+        for entry in self.ledger.candidates(CANDIDATES_PER_PASS):
+            if self._blocked.get(entry.policy.tenant, 0.0) > now:
+                continue
+            # Резерв интерактивных мест: пакеты дальше по очереди его тоже не получат
+            if fleet_full and entry.kind == KIND_BATCH:
+                continue
+            if not self.ledger.claim(entry):
+                continue
+
+            outcome = self.ledger.acquire(entry, self.max_inflight, self.interactive_reserved)
+            if outcome == ACQUIRED:
+                self._launch(entry)
+                return True
+
+            self.ledger.unclaim(entry)
+            if outcome == TENANT_FULL:
+                self._blocked[entry.policy.tenant] = now + BLOCKED_RETRY
+            elif entry.kind == KIND_BATCH:
+                fleet_full = True
+            else:
+                break
+        return False
+
+    def _launch(self, entry: _Entry) -> None:
+        self.ledger.started(entry)
+        _observe_wait(entry)
+        try:
+            entry.handle = self.launcher(entry.spec)
+        except Exception as e:
+            logger.error(f"Не удалось запустить задачу {entry.task_id}: {e}")
+            self.ledger.release(entry)
+            self.ledger.record_launch_error(entry.task_id, str(e))
+            with self._cond:
+                self._launch_errors[entry.task_id] = str(e)
+                while len(self._launch_errors) > MAX_LAUNCH_ERRORS:
+                    self._launch_errors.popitem(last=False)
+        else:
+            with self._cond:
+                self._running[entry.task_id] = entry
+        self.ledger.finish(entry)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+            self._poll()
+            if self._dispatch():
+                continue
+
+            with self._cond:
+                if self._stopping:
+                    return
+                self._cond.wait(POLL_INTERVAL)
+
+
+def _observe_wait(entry: _Entry) -> None:
+    try:
+        from app.metrics import metrics
+        metrics.histogram_observe(
+            'cursa_task_queue_wait_seconds',
+            max(0.0, time.time() - entry.enqueued_at),
+            {'plan': entry.policy.plan, 'kind': entry.kind},
+        )
+    except ImportError:
+        pass
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(max_inflight: int = 16, interactive_reserved: int = 2,
+                  ledger_factory: Optional[Callable[[], Ledger]] = None,
+                  launcher: Optional[Callable[[Any], Any]] = None) -> FairScheduler:
+    """
+    Общий для процесса планировщик (параметры учитываются при первом вызове).
+
+    Args:
+        ledger_factory: Создаёт учёт планировщика (по умолчанию LocalLedger)
+        launcher: Запуск задачи по описанию (см. FairScheduler)
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            ledger = ledger_factory() if ledger_factory else None
+            _scheduler = FairScheduler(max_inflight, interactive_reserved, ledger, launcher)
+            if _scheduler.ledger.shared:
+                # Задачи общей очереди запускает любой процесс, а не только поставивший их
+                _scheduler.start()
+            # При штатной остановке процесса забранные им задачи сразу считаются потерянными
+            atexit.register(_scheduler.shutdown)
+        return _scheduler
@@ -68,7 +68,8 @@ class ProgressEmitter:
     - upload (0-10%): Загрузка файла
     - extract (10-25%): Извлечение данных
     - check (25-50%): Проверка нормоконтроля
-    - correct (50-85%): Автоисправление
+    - correct (50-75%): Автоисправление
+    - verify (75-85%): Повторная проверка исправлений
     - report (85-95%): Генерация отчёта
     - complete (100%): Завершено
     """
@@ -77,7 +78,8 @@ class ProgressEmitter:
         "upload": (0, 10, "Загрузка файла..."),
         "extract": (10, 25, "Извлечение данных..."),
         "check": (25, 50, "Проверка нормоконтроля..."),
-        "correct": (50, 85, "Автоматическое исправление..."),
+        "correct": (50, 75, "Автоматическое исправление..."),
+        "verify": (75, 85, "Проверка исправлений..."),
         "report": (85, 95, "Генерация отчёта..."),
         "complete": (100, 100, "Готово!"),
         "error": (0, 0, "Ошибка"),
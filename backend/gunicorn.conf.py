@@ -0,0 +1,47 @@
+"""
+Настройки gunicorn (файл подхватывается автоматически при запуске из backend).
+
+При GUNICORN_PRELOAD=1 приложение загружается в мастере до fork: воркеры
+наследуют импортированные модули, а с WEB_WARMUP=1 — и прогретые профили,
+проверяющие и парсеры DOCX. Перед порождением воркеров мастер вызывает
+gc.freeze() (WARMUP_GC_FREEZE, по умолчанию да), чтобы эти страницы памяти
+оставались общими (copy-on-write).
+
+Без preload каждый воркер загружает приложение сам, и заморозка не нужна.
+
+С METRICS_MULTIPROC_DIR мастер очищает каталог снимков метрик при старте, а
+снимок завершившегося воркера сводит в общий снимок завершившихся.
+"""
+
+import os
+
+
+def _enabled(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() not in ('0', 'false', 'no', 'off', '')
+
+
+preload_app = _enabled('GUNICORN_PRELOAD', '0')
+
+
+def pre_fork(server, worker):
+    """Заморозка объектов мастера перед порождением воркера (однократно)."""
+    if not server.cfg.preload_app or not _enabled('WARMUP_GC_FREEZE', '1'):
+        return
+
+    from app.services.warmup import freeze_for_fork
+
+    freeze_for_fork()
+
+
+def on_starting(server):
+    """Удаление снимков метрик прошлого запуска."""
+    from app.metrics.prometheus import metrics
+
+    metrics.clear_multiproc_dir()
+
+
+def child_exit(server, worker):
+    """Снимок метрик завершившегося воркера больше не нужен отдельным файлом."""
+    from app.metrics.prometheus import metrics
+
+    metrics.mark_process_dead(worker.pid)
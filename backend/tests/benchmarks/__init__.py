@@ -0,0 +1 @@
+# Бенчмарки конвейера обработки документов (см. run_benchmarks.py)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Бенчмарки конвейера обработки документов на синтетических работах.
+
+Каждый компонент измеряется отдельно на работах из PRESETS (см.
+thesis_generator.py):
+
+- extract — DocumentProcessor.extract_data;
+- check — NormControlChecker.check_document;
+- validate — ValidationEngine.validate_document;
+- correct — многопроходная коррекция без XML-прохода;
+- xml_deep — глубокая XML-коррекция копии документа;
+- preview — конвертация в HTML и разбиение на страницы (без кэша превью).
+
+Результаты (min/median/max по повторам) сохраняются в JSON. С --baseline
+медианы сравниваются с сохранённым ранее результатом: компонент, ставший
+медленнее больше чем на --tolerance (и больше чем на --min-delta секунд),
+считается регрессией, и скрипт завершается с кодом 1.
+
+Примеры (из каталога backend):
+
+    python -m tests.benchmarks.run_benchmarks --sizes 10 50 -o baseline.json
+    python -m tests.benchmarks.run_benchmarks --sizes 10 50 --baseline baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.thesis_generator import PRESETS, generate_thesis  # noqa: E402
+
+COMPONENTS = ('extract', 'check', 'validate', 'correct', 'xml_deep', 'preview')
+
+DEFAULT_TOLERANCE = 0.2
+DEFAULT_MIN_DELTA = 0.01
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ComponentBench:
+    """
+    Замеры компонентов на одном документе. Подготовка (извлечение данных для
+    проверки, копия файла для коррекции) в замер не входит.
+    """
+
+    def __init__(self, document_path: str, work_dir: str):
+        self.document_path = document_path
+        self.work_dir = work_dir
+        self._document_data = None
+
+    @property
+    def document_data(self) -> Dict[str, Any]:
+        if self._document_data is None:
+            from app.services.document_processor import DocumentProcessor
+            self._document_data = DocumentProcessor(self.document_path).extract_data()
+        return self._document_data
+
+    def _copy(self, name: str) -> str:
+        path = os.path.join(self.work_dir, name)
+        shutil.copy(self.document_path, path)
+        return path
+
+    def prepare(self, component: str) -> Callable[[], Any]:
+        """Возвращает функцию, выполняющую один замеряемый запуск компонента."""
+        if component == 'extract':
+            from app.services.document_processor import DocumentProcessor
+            return lambda: DocumentProcessor(self.document_path).extract_data()
+
+        if component == 'check':
+            from app.services.norm_control_checker import NormControlChecker
+            data = self.document_data
+            return lambda: NormControlChecker().check_document(data)
+
+        if component == 'validate':
+            from app.services.validation_engine import ValidationEngine
+            data = self.document_data
+            return lambda: ValidationEngine().validate_document(self.document_path, data)
+
+        if component == 'correct':
+            from app.services.document_corrector import DocumentCorrector
+            corrector = DocumentCorrector()
+            corrector.enable_xml_correction = False
+            out_path = os.path.join(self.work_dir, 'corrected.docx')
+            return lambda: corrector.correct_document_multipass(
+                self.document_path, out_path=out_path, max_passes=3
+            )
+
+        if component == 'xml_deep':
+            from app.services import document_corrector
+            if not document_corrector.XML_EDITOR_AVAILABLE:
+                raise RuntimeError('XML-редактор недоступен')
+            corrector = document_corrector.DocumentCorrector()
+            path = self._copy('xml_deep.docx')
+            # Проход меняет файл на месте: каждый запуск работает с исходной копией
+            return _with_setup(lambda: shutil.copy(self.document_path, path),
+                               lambda: corrector._execute_xml_deep_pass(path))
+
+        if component == 'preview':
+            from app.services.preview_service import PreviewService, split_into_pages
+            service = PreviewService()
+            return lambda: split_into_pages(service._convert(self.document_path))
+
+        raise ValueError(f'Неизвестный компонент: {component}')
+
+
+def _with_setup(setup: Callable[[], Any], run: Callable[[], Any]) -> Callable[[], Any]:
+    run.setup = setup
+    return run
+
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int = 0) -> Dict[str, Any]:
+    """Время запусков func в секундах."""
+    setup = getattr(func, 'setup', None)
+    runs = []
+    for index in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if index >= warmup:
+            runs.append(round(elapsed, 4))
+    return {
+        'min_s': min(runs),
+        'median_s': round(statistics.median(runs), 4),
+        'max_s': max(runs),
+        'runs': runs,
+    }
+
+
+def run_benchmarks(sizes: List[int], components: List[str], repeat: int = 3, warmup: int = 0,
+                   docs_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Генерирует работы и замеряет компоненты; возвращает результат для JSON."""
+    work_dir = tempfile.mkdtemp(prefix='cursa_bench_')
+    docs_dir = docs_dir or os.path.join(work_dir, 'documents')
+    results: Dict[str, Any] = {}
+    try:
+        for pages in sizes:
+            spec = PRESETS[pages]
+            path = generate_thesis(spec, docs_dir)
+            bench = ComponentBench(path, work_dir)
+            entry = {
+                'document': dict(spec.to_dict(), sha256=_file_sha256(path), size_bytes=os.path.getsize(path)),
+                'components': {},
+            }
+            for component in components:
+                try:
+                    entry['components'][component] = measure(bench.prepare(component), repeat, warmup)
+                except Exception as e:
+                    entry['components'][component] = {'error': str(e)}
+                _print_line(spec.name, component, entry['components'][component])
+            results[spec.name] = entry
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE,
+            min_delta: float = DEFAULT_MIN_DELTA) -> List[Dict[str, Any]]:
+    """
+    Сравнивает медианы с baseline.
+
+    Returns:
+        list: Строки сравнения; status — ok, regression, improved, new,
+        error или changed_input (документ не совпадает с baseline)
+    """
+    rows = []
+    for name, entry in current['results'].items():
+        base_entry = baseline.get('results', {}).get(name)
+        for component, stats in entry['components'].items():
+            row = {'document': name, 'component': component, 'median_s': stats.get('median_s')}
+            base = (base_entry or {}).get('components', {}).get(component) or {}
+            if 'error' in stats:
+                row['status'] = 'error'
+            elif 'median_s' not in base:
+                row['status'] = 'new'
+            elif base_entry['document'].get('sha256') != entry['document']['sha256']:
+                row['status'] = 'changed_input'
+            else:
+                row['baseline_s'] = base['median_s']
+                delta = stats['median_s'] - base['median_s']
+                row['change'] = round(delta / base['median_s'], 3) if base['median_s'] else None
+                if delta > min_delta and delta > base['median_s'] * tolerance:
+                    row['status'] = 'regression'
+                elif -delta > min_delta and -delta > base['median_s'] * tolerance:
+                    row['status'] = 'improved'
+                else:
+                    row['status'] = 'ok'
+            rows.append(row)
+    return rows
+
+
+def _print_line(document: str, component: str, stats: Dict[str, Any]) -> None:
+    if 'error' in stats:
+        print(f"{document:<16} {component:<10} ошибка: {stats['error']}")
+    else:
+        print(f"{document:<16} {component:<10} median {stats['median_s']:.4f} с "
+              f"(min {stats['min_s']:.4f}, max {stats['max_s']:.4f})")
+
+
+def _print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print('\nСравнение с baseline:')
+    for row in rows:
+        line = f"{row['document']:<16} {row['component']:<10} {row['status']:<14}"
+        if 'baseline_s' in row:
+            line += f" {row['baseline_s']:.4f} -> {row['median_s']:.4f} с"
+            if row['change'] is not None:
+                line += f" ({row['change']:+.0%})"
+        print(line)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки обработки документов')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50], choices=sorted(PRESETS),
+                        help='Размеры работ в страницах')
+    parser.add_argument('--components', nargs='+', default=list(COMPONENTS), choices=COMPONENTS,
+                        help='Замеряемые компоненты')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Число замеров')
+    parser.add_argument('-w', '--warmup', type=int, default=0, help='Число прогревочных запусков')
+    parser.add_argument('-o', '--output', help='Файл для JSON с результатами')
+    parser.add_argument('-b', '--baseline', help='JSON предыдущего запуска для сравнения')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Допустимое замедление медианы (доля)')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help='Замедление в секундах, которое не считается регрессией')
+    parser.add_argument('--docs-dir', help='Сохранить сгенерированные работы в каталог')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    # Логи сервисов искажают замеры и засоряют вывод
+    logging.disable(logging.WARNING)
+
+    report = run_benchmarks(args.sizes, args.components, args.repeat, args.warmup, args.docs_dir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\nРезультаты сохранены: {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance, args.min_delta)
+        _print_comparison(rows)
+        if any(row['status'] == 'regression' for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
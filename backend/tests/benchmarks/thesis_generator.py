@@ -0,0 +1,305 @@
+"""
+Генератор синтетических выпускных работ для бенчмарков.
+
+Работа собирается по ThesisSpec: титульный лист, содержание, введение,
+главы с подразделами, таблицы, рисунки, формулы, заключение и список
+литературы. Основной текст оформлен по ГОСТ (Times New Roman
+14 пт, полуторный интервал, выравнивание по ширине, абзацный отступ 1,25 см),
+а в errors абзацев намеренно внесены ошибки оформления — их находит проверка
+и исправляет коррекция.
+
+Генерация детерминирована: текст и размещение объектов задаёт seed, а архив
+DOCX пересобирается с фиксированными датами, поэтому одна и та же
+спецификация всегда даёт побайтно одинаковый файл (SHA-256 документа
+сохраняется в результатах бенчмарка и сверяется с baseline).
+
+Объём страницы оценивается в PAGE_CHARS символов основного текста, поэтому
+число страниц приблизительное.
+"""
+
+import datetime
+import io
+import os
+import random
+import zipfile
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Cm, Pt
+from PIL import Image, ImageDraw
+
+# Символов основного текста на странице (14 пт, полуторный интервал)
+PAGE_CHARS = 1800
+# Сколько текста «вытесняет» объект на странице
+TABLE_CHARS = 600
+FIGURE_CHARS = 900
+FORMULA_CHARS = 180
+BIBLIOGRAPHY_CHARS = 150
+PARAGRAPH_CHARS = 600
+
+FIXED_DATE = datetime.datetime(2024, 1, 1)
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+ERROR_KINDS = ('font', 'size', 'line_spacing', 'alignment', 'indent')
+
+WORDS = (
+    'анализ', 'система', 'данные', 'модель', 'метод', 'результат', 'исследование',
+    'процесс', 'структура', 'параметр', 'значение', 'оценка', 'разработка', 'задача',
+    'эксперимент', 'показатель', 'алгоритм', 'требование', 'обработка', 'документ',
+    'качество', 'управление', 'эффективность', 'решение', 'интерфейс', 'сеть',
+    'предприятие', 'проектирование', 'источник', 'характеристика', 'позволяет',
+    'определяет', 'обеспечивает', 'рассмотрен', 'выполнен', 'предложен', 'основной',
+    'современный', 'информационный', 'программный', 'технический', 'различный',
+)
+
+FORMULAS = (
+    'E = m · c²',
+    'S = ∑ xᵢ · wᵢ',
+    'y = a · sin(ω · t + φ)',
+    'σ = √(∑ (xᵢ − μ)² / n)',
+    'F = k · Δx',
+    'P = U · I · cos φ',
+)
+
+
+@dataclass(frozen=True)
+class ThesisSpec:
+    """Параметры синтетической работы."""
+
+    pages: int
+    chapters: int = 3
+    sections: int = 2  # подразделов в главе
+    tables: int = 2
+    figures: int = 2
+    formulas: int = 3
+    bibliography: int = 15
+    errors: int = 5  # абзацев с ошибками оформления
+    seed: int = 2024
+
+    @property
+    def name(self) -> str:
+        return f'thesis_{self.pages}p'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# Типовые размеры: курсовая, ВКР бакалавра, магистерская, диссертация
+PRESETS: Dict[int, ThesisSpec] = {
+    10: ThesisSpec(10),
+    50: ThesisSpec(50, chapters=3, sections=3, tables=8, figures=8, formulas=12, bibliography=40, errors=20),
+    150: ThesisSpec(150, chapters=4, sections=4, tables=25, figures=25, formulas=40, bibliography=80, errors=60),
+    400: ThesisSpec(400, chapters=5, sections=5, tables=60, figures=60, formulas=100, bibliography=150, errors=160),
+}
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _paragraph_text(rng: random.Random, chars: int = PARAGRAPH_CHARS) -> str:
+    sentences = []
+    length = 0
+    while length < chars:
+        sentence = _sentence(rng)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(sentences)
+
+
+def _figure_png(number: int) -> bytes:
+    image = Image.new('RGB', (320, 200), 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(8):
+        height = 20 + (number * 37 + i * 53) % 160
+        draw.rectangle((20 + i * 36, 190 - height, 44 + i * 36, 190), fill=(40, 80, 160))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _format_body(paragraph) -> None:
+    fmt = paragraph.paragraph_format
+    fmt.first_line_indent = Cm(1.25)
+    fmt.line_spacing = 1.5
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+
+def _apply_error(paragraph, kind: str) -> None:
+    if kind == 'font':
+        for run in paragraph.runs:
+            run.font.name = 'Arial'
+    elif kind == 'size':
+        for run in paragraph.runs:
+            run.font.size = Pt(12)
+    elif kind == 'line_spacing':
+        paragraph.paragraph_format.line_spacing = 1.0
+    elif kind == 'alignment':
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    elif kind == 'indent':
+        paragraph.paragraph_format.first_line_indent = Cm(0)
+
+
+def _setup_document() -> Document:
+    doc = Document()
+    section = doc.sections[0]
+    section.page_height, section.page_width = Cm(29.7), Cm(21)
+    section.left_margin, section.right_margin = Cm(3), Cm(1.5)
+    section.top_margin, section.bottom_margin = Cm(2), Cm(2)
+
+    normal = doc.styles['Normal']
+    normal.font.name = 'Times New Roman'
+    normal.font.size = Pt(14)
+    for level in (1, 2):
+        style = doc.styles[f'Heading {level}']
+        style.font.name = 'Times New Roman'
+        style.font.size = Pt(14)
+        style.font.bold = True
+
+    props = doc.core_properties
+    props.author = 'CURSA benchmark'
+    props.title = 'Синтетическая выпускная работа'
+    props.created = props.modified = FIXED_DATE
+    props.last_modified_by = 'CURSA benchmark'
+    props.revision = 1
+    return doc
+
+
+def _distribute(total: int, slots: int, rng: random.Random) -> List[int]:
+    """Раскладывает total объектов по slots разделам (детерминированно)."""
+    counts = [total // slots] * slots
+    for index in rng.sample(range(slots), total % slots):
+        counts[index] += 1
+    return counts
+
+
+def build_thesis(spec: ThesisSpec) -> Document:
+    """Собирает документ по спецификации."""
+    rng = random.Random(spec.seed)
+    doc = _setup_document()
+
+    # Титульный лист
+    for text in ('МИНИСТЕРСТВО НАУКИ И ВЫСШЕГО ОБРАЗОВАНИЯ РОССИЙСКОЙ ФЕДЕРАЦИИ',
+                 'ВЫПУСКНАЯ КВАЛИФИКАЦИОННАЯ РАБОТА',
+                 'Синтетическая работа для бенчмарка', 'Москва 2024'):
+        doc.add_paragraph(text).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_page_break()
+
+    doc.add_paragraph('СОДЕРЖАНИЕ').alignment = WD_ALIGN_PARAGRAPH.CENTER
+    section_titles = []
+    for chapter in range(1, spec.chapters + 1):
+        section_titles.append((1, f'{chapter} {_sentence(rng)[:-1][:60]}'))
+        for section in range(1, spec.sections + 1):
+            section_titles.append((2, f'{chapter}.{section} {_sentence(rng)[:-1][:60]}'))
+    for _, title in section_titles:
+        doc.add_paragraph(title)
+    doc.add_page_break()
+
+    # Объём основного текста за вычетом объектов
+    body_chars = (
+        max(spec.pages - 3, 1) * PAGE_CHARS
+        - spec.tables * TABLE_CHARS
+        - spec.figures * FIGURE_CHARS
+        - spec.formulas * FORMULA_CHARS
+        - spec.bibliography * BIBLIOGRAPHY_CHARS
+    )
+    paragraphs_total = max(body_chars // PARAGRAPH_CHARS, spec.chapters * spec.sections)
+    slots = spec.chapters * spec.sections
+    paragraphs = _distribute(paragraphs_total, slots, rng)
+    tables = _distribute(spec.tables, slots, rng)
+    figures = _distribute(spec.figures, slots, rng)
+    formulas = _distribute(spec.formulas, slots, rng)
+
+    body = []
+    doc.add_heading('ВВЕДЕНИЕ', level=1)
+    body.append(doc.add_paragraph(_paragraph_text(rng)))
+
+    counters = {'table': 0, 'figure': 0, 'formula': 0}
+    slot = 0
+    titles = iter(section_titles)
+    for _ in range(spec.chapters):
+        doc.add_page_break()
+        doc.add_heading(next(titles)[1], level=1)
+        for _ in range(spec.sections):
+            doc.add_heading(next(titles)[1], level=2)
+            objects = (['table'] * tables[slot] + ['figure'] * figures[slot]
+                       + ['formula'] * formulas[slot])
+            rng.shuffle(objects)
+            # Объекты встают после случайных абзацев подраздела
+            positions = sorted(rng.randrange(paragraphs[slot] + 1) for _ in objects)
+            for index in range(paragraphs[slot] + 1):
+                while positions and positions[0] == index:
+                    positions.pop(0)
+                    _add_object(doc, objects.pop(), counters, rng)
+                if index < paragraphs[slot]:
+                    body.append(doc.add_paragraph(_paragraph_text(rng)))
+            slot += 1
+
+    doc.add_page_break()
+    doc.add_heading('ЗАКЛЮЧЕНИЕ', level=1)
+    body.append(doc.add_paragraph(_paragraph_text(rng)))
+
+    doc.add_page_break()
+    doc.add_heading('СПИСОК ЛИТЕРАТУРЫ', level=1)
+    for number in range(1, spec.bibliography + 1):
+        author = rng.choice(WORDS).capitalize()
+        doc.add_paragraph(
+            f'{number}. {author}, А. Б. {_sentence(rng)[:-1]} / А. Б. {author}. — '
+            f'Москва : Наука, {2000 + number % 24}. — {100 + number} с.'
+        )
+
+    for paragraph in body:
+        _format_body(paragraph)
+    for index, paragraph in enumerate(rng.sample(body, min(spec.errors, len(body)))):
+        _apply_error(paragraph, ERROR_KINDS[index % len(ERROR_KINDS)])
+    return doc
+
+
+def _add_object(doc, kind: str, counters: Dict[str, int], rng: random.Random) -> None:
+    counters[kind] += 1
+    number = counters[kind]
+    if kind == 'table':
+        doc.add_paragraph(f'Таблица {number} – {_sentence(rng)[:-1][:50]}')
+        table = doc.add_table(rows=5, cols=4)
+        table.style = 'Table Grid'
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = (f'Показатель {col_index + 1}' if row_index == 0
+                             else str(rng.randint(1, 999)))
+    elif kind == 'figure':
+        doc.add_picture(io.BytesIO(_figure_png(number)), width=Cm(12))
+        doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        caption = doc.add_paragraph(f'Рисунок {number} – {_sentence(rng)[:-1][:50]}')
+        caption.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    else:
+        formula = doc.add_paragraph(f'{FORMULAS[number % len(FORMULAS)]},\t({number})')
+        formula.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        doc.add_paragraph(f'где {rng.choice(WORDS)} — {_sentence(rng)[:-1].lower()}.')
+
+
+def _normalize_zip(path: str) -> None:
+    """Пересобирает DOCX с фиксированными датами файлов архива."""
+    with zipfile.ZipFile(path) as source:
+        entries = [(info.filename, source.read(info)) for info in source.infolist()]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for name, data in entries:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(info, data)
+
+
+def generate_thesis(spec: ThesisSpec, directory: str) -> str:
+    """
+    Сохраняет работу в directory.
+
+    Returns:
+        str: Путь к файлу <spec.name>.docx
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{spec.name}.docx')
+    build_thesis(spec).save(path)
+    _normalize_zip(path)
+    return path
@@ -3,7 +3,9 @@
 """
 
 import os
+import shutil
 import sys
+import tempfile
 import pytest
 from pathlib import Path
 import json
@@ -15,6 +17,16 @@ RESULTS_DIR = TEST_DATA_DIR / "results"
 # Создаем директорию для результатов, если она не существует
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Кэш превью и данные отчетов пишутся во временную директорию, а не в app/;
+# дочерние процессы (LocalExecutor) получают пути через окружение
+RUNTIME_DIR = tempfile.mkdtemp(prefix="cursa-tests-")
+os.environ["PREVIEW_CACHE_DIR"] = os.path.join(RUNTIME_DIR, "previews")
+os.environ["REPORT_DATA_DIR"] = os.path.join(RUNTIME_DIR, "report_data")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(RUNTIME_DIR, ignore_errors=True)
+
 
 def pytest_configure(config):
     """
@@ -51,6 +63,20 @@ from app import create_app
 from app.extensions import db as _db
 
 
+@pytest.fixture(autouse=True)
+def isolated_runtime_dirs(tmp_path, monkeypatch):
+    """Кэш превью и отчеты каждого теста пишутся в его tmp_path, а не в app/."""
+    from app.services import preview_service, report_service
+
+    monkeypatch.setattr(preview_service, "PREVIEW_CACHE_DIR", str(tmp_path / "previews"))
+    monkeypatch.setattr(report_service, "REPORTS_DIR", tmp_path / "reports")
+    monkeypatch.setattr(report_service, "REPORT_DATA_DIR", tmp_path / "reports" / "data")
+    yield
+    # Фоновый прогрев превью должен завершиться до восстановления пути
+    if preview_service._warmup_executor is not None:
+        preview_service._warmup_executor.submit(lambda: None).result()
+
+
 @pytest.fixture
 def app():
     """Создает и настраивает экземпляр приложения Flask для тестирования."""
@@ -743,7 +743,7 @@ class TestBatchOperationsAPI:
 
         response = api_client.post(
             "/api/document/upload-batch",
-            data={"profile_id": "default_gost"},
+            data={"profile_id": "default_gost", "async": "false"},
             files=files_list,
             headers=headers,
         )
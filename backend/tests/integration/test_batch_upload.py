@@ -32,7 +32,8 @@ def test_batch_upload(client):
         'files': [
             (file1, 'test1.docx'),
             (file2, 'test2.docx')
-        ]
+        ],
+        'async': 'false',
     }
 
     response = client.post(
@@ -70,7 +71,8 @@ def test_batch_upload_mixed_files_have_uniform_quality_contract(client):
         'files': [
             (valid_file, 'valid.docx'),
             (invalid_file, 'invalid.txt')
-        ]
+        ],
+        'async': 'false',
     }
 
     response = client.post(
@@ -591,6 +591,170 @@ class TestAPIKeyRoutes:
         assert resp.status_code == 400
         assert "error" in resp.get_json()
 
+    def test_cached_api_key_is_invalidated_on_update_and_revoke(self, client, auth_headers, user):
+        """Cached key snapshots must not outlive scope changes or revocation."""
+        raw_key, api_key = self._create_raw_api_key(user.id, ["document:check", "document:view"])
+        key_id = api_key.id
+
+        response = client.get("/api/document/list-corrections", headers={"X-API-Key": raw_key})
+        assert response.status_code != 403
+
+        response = client.patch(
+            f"/api/api-keys/{key_id}", headers=auth_headers, json={"scopes": ["document:check"]}
+        )
+        assert response.status_code == 200
+        response = client.get("/api/document/list-corrections", headers={"X-API-Key": raw_key})
+        assert response.status_code == 403
+
+        response = client.delete(f"/api/api-keys/{key_id}", headers=auth_headers)
+        assert response.status_code == 200
+        response = client.post("/api/document/analyze", headers={"X-API-Key": raw_key}, data={})
+        assert response.status_code == 401
+
+    def test_repeated_requests_resolve_key_from_cache(self, client, app, user):
+        """Only the first request with a key should look it up in the database."""
+        from app.services.api_key_auth import get_api_key_cache
+
+        raw_key, _ = self._create_raw_api_key(user.id, ["document:check"])
+        for _ in range(3):
+            response = client.post("/api/document/analyze", headers={"X-API-Key": raw_key}, data={})
+            assert response.status_code == 400
+
+        with app.app_context():
+            stats = get_api_key_cache().stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+
+    def test_buffered_usage_events_are_flushed_in_batches(self, app, user):
+        """Usage events are written only on flush, with aggregated usage_count."""
+        from app.services.audit_buffer import AuditBuffer
+
+        _, api_key = self._create_raw_api_key(user.id, ["document:check"])
+        buffer = AuditBuffer(app, flush_interval=60, batch_size=100)
+        for path in ("/a", "/b", "/c"):
+            buffer.record(
+                user_id=user.id, api_key_id=api_key.id, event="api_key_used", details={"path": path}
+            )
+
+        assert buffer.pending() == 3
+        assert APIKeyAudit.query.filter_by(api_key_id=api_key.id).count() == 0
+
+        buffer.shutdown()
+
+        assert buffer.stats() == {
+            "pending": 0, "flushed": 3, "failed_flushes": 0, "spilled": 0, "dropped": 0, "rejected": 0,
+        }
+        db.session.refresh(api_key)
+        assert api_key.usage_count == 3
+        assert api_key.last_used_at is not None
+        paths = {e.details["path"] for e in APIKeyAudit.query.filter_by(api_key_id=api_key.id)}
+        assert paths == {"/a", "/b", "/c"}
+
+    @staticmethod
+    def _fail_audit_inserts(monkeypatch):
+        def unavailable(*args, **kwargs):
+            raise RuntimeError("database unavailable")
+        monkeypatch.setattr(db.session, "bulk_insert_mappings", unavailable)
+
+    def test_failed_audit_flush_spills_to_disk_and_replays(self, app, user, monkeypatch, tmp_path):
+        """A batch the database rejects is kept on disk and written by the next flush."""
+        from app.services.audit_buffer import AuditBuffer
+
+        _, api_key = self._create_raw_api_key(user.id, ["document:check"])
+        buffer = AuditBuffer(app, flush_interval=60, batch_size=100, spool_dir=str(tmp_path))
+        for path in ("/a", "/b"):
+            buffer.record(
+                user_id=user.id, api_key_id=api_key.id, event="api_key_used", details={"path": path}
+            )
+
+        self._fail_audit_inserts(monkeypatch)
+        assert buffer.flush() == 0
+        assert buffer.pending() == 0
+        assert buffer.stats()["spilled"] == 2
+        assert len(list(tmp_path.glob("*.jsonl"))) == 1
+
+        monkeypatch.undo()
+        buffer.record(user_id=user.id, api_key_id=api_key.id, event="api_key_used", details={"path": "/c"})
+        assert buffer.flush() == 3
+        buffer.shutdown()
+
+        assert list(tmp_path.iterdir()) == []
+        db.session.refresh(api_key)
+        assert api_key.usage_count == 3
+        paths = {e.details["path"] for e in APIKeyAudit.query.filter_by(api_key_id=api_key.id)}
+        assert paths == {"/a", "/b", "/c"}
+
+    def test_poison_spool_batch_is_quarantined(self, app, user, monkeypatch, tmp_path):
+        """A spilled batch the database keeps rejecting does not block later ones."""
+        from app.services import audit_buffer
+        from app.services.audit_buffer import MAX_REPLAY_ATTEMPTS, AuditBuffer
+
+        monkeypatch.setattr(audit_buffer.logger, "error", lambda msg, *args: None)
+        _, api_key = self._create_raw_api_key(user.id, ["document:check"])
+        buffer = AuditBuffer(app, flush_interval=60, batch_size=100, spool_dir=str(tmp_path))
+
+        def record(path):
+            buffer.record(user_id=user.id, api_key_id=api_key.id, event="api_key_used", details={"path": path})
+
+        # Two batches are spilled during an outage; the first holds a row the database never accepts
+        self._fail_audit_inserts(monkeypatch)
+        record("/poison")
+        record("/a")
+        buffer.flush()
+        record("/b")
+        buffer.flush()
+        monkeypatch.undo()
+
+        bulk_insert = db.session.bulk_insert_mappings
+
+        def reject_poison(mapper, rows, *args, **kwargs):
+            if any(row["details"].get("path") == "/poison" for row in rows):
+                raise RuntimeError("value rejected")
+            return bulk_insert(mapper, rows, *args, **kwargs)
+
+        monkeypatch.setattr(db.session, "bulk_insert_mappings", reject_poison)
+        for attempt in range(MAX_REPLAY_ATTEMPTS):
+            record(f"/ok{attempt}")
+            buffer.flush()
+            assert [p.name.split(".", 1)[1] for p in tmp_path.iterdir()] == [f"{attempt + 1}.jsonl"]
+
+        record("/last")
+        buffer.flush()
+        buffer.shutdown()
+
+        assert [p.suffix for p in tmp_path.iterdir()] == [".rejected"]
+        assert '"/poison"' in next(tmp_path.iterdir()).read_text(encoding="utf-8")
+        assert buffer.stats()["rejected"] == 1
+        paths = {e.details["path"] for e in APIKeyAudit.query.filter_by(api_key_id=api_key.id)}
+        assert paths == {"/a", "/b", "/ok0", "/ok1", "/ok2", "/last"}
+
+    def test_audit_events_dropped_without_spool_are_logged_and_counted(self, app, user, monkeypatch):
+        """Without a spool the bound still holds, but every dropped event is reported."""
+        from app.metrics import metrics
+        from app.services import audit_buffer
+        from app.services.audit_buffer import AuditBuffer
+
+        # Logging is disabled in tests: record the error calls directly
+        errors = []
+        monkeypatch.setattr(audit_buffer.logger, "error", lambda msg, *args: errors.append(msg % args))
+        _, api_key = self._create_raw_api_key(user.id, ["document:check"])
+        buffer = AuditBuffer(app, flush_interval=60, batch_size=2, max_pending=2)
+        self._fail_audit_inserts(monkeypatch)
+        for path in ("/a", "/b", "/c"):
+            buffer.record(
+                user_id=user.id, api_key_id=api_key.id, event="api_key_used", details={"path": path}
+            )
+
+        assert buffer.stats()["dropped"] == 1
+        assert buffer.pending() == 2
+        assert len(errors) == 1 and '"/a"' in errors[0]
+        assert "cursa_api_key_audit_dropped_total" in "".join(metrics.snapshot()["counters"])
+
+        monkeypatch.undo()
+        buffer.shutdown()
+        paths = {e.details["path"] for e in APIKeyAudit.query.filter_by(api_key_id=api_key.id)}
+        assert paths == {"/b", "/c"}
+
     def test_api_key_rate_limit_enforced(self, client, user):
         """Second request within an hour must fail when key hourly limit is 1."""
         raw_key, _ = self._create_raw_api_key(user.id, ["document:check"], rate_limit=1)
@@ -611,3 +775,69 @@ class TestAPIKeyRoutes:
         payload = second_response.get_json()
         assert payload["error"] == "API key rate limit exceeded"
         assert payload["rate_limit"] == 1
+
+    def test_admin_scope_requires_admin_role(self, client, user, auth_headers):
+        """Ordinary users cannot grant admin:profile to their keys."""
+        response = client.post(
+            "/api/api-keys",
+            json={"name": "Profiler", "scopes": ["document:view", "admin:profile"]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 403
+        assert "admin:profile" in response.get_json()["error"]
+        assert APIKey.query.filter_by(user_id=user.id).count() == 0
+
+        _, api_key = self._create_raw_api_key(user.id, ["document:view"])
+        response = client.patch(
+            f"/api/api-keys/{api_key.id}",
+            json={"scopes": ["admin:profile"]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 403
+        db.session.refresh(api_key)
+        assert api_key.scopes == ["document:view"]
+
+    def test_profile_scope_of_non_admin_key_is_ignored(self, app, client, user, tmp_path):
+        """A key whose owner is not an admin cannot profile even with the scope."""
+        app.extensions["request_profiler"].directory = str(tmp_path)
+        raw_key, _ = self._create_raw_api_key(user.id, ["document:view", "admin:profile"])
+        headers = {"X-API-Key": raw_key, "X-Profile-Request": "1"}
+
+        response = client.get("/api/document/list-corrections", headers=headers)
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+        assert client.get("/api/document/admin/profiles", headers=headers).status_code == 403
+
+    def test_request_profiling_requires_profile_scope(self, app, client, user, tmp_path):
+        """Only admin keys with admin:profile scope can profile requests and read profiles."""
+        app.extensions["request_profiler"].directory = str(tmp_path)
+        user.role = UserRole.ADMIN
+        db.session.commit()
+        raw_key, api_key = self._create_raw_api_key(user.id, ["document:view"])
+        headers = {"X-API-Key": raw_key, "X-Profile-Request": "1"}
+
+        response = client.get("/api/document/list-corrections", headers=headers)
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+        assert client.get("/api/document/admin/profiles", headers=headers).status_code == 403
+
+        from flask_jwt_extended import create_access_token
+        admin_headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+        response = client.patch(
+            f"/api/api-keys/{api_key.id}",
+            json={"scopes": ["document:view", "admin:profile"]},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+
+        response = client.get("/api/document/list-corrections", headers=headers)
+        profile_id = response.headers["X-Profile-Id"]
+
+        response = client.get(
+            f"/api/document/admin/profiles/{profile_id}?format=json", headers={"X-API-Key": raw_key}
+        )
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["mode"] == "cprofile"
+        assert data["path"] == "/api/document/list-corrections"
+        assert (tmp_path / f"{profile_id}.pstats").exists()
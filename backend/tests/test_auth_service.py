@@ -37,6 +37,82 @@ def mock_redis():
     return redis_mock
 
 
+class InMemoryRedis:
+    """Minimal Redis double for the token blacklist, shared by several managers"""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        value = self.values.get(key)
+        return str(value).encode() if value is not None else None
+
+    def setex(self, key, expires, value):
+        self.values[key] = value
+        return True
+
+    def exists(self, key):
+        return 1 if key in self.values else 0
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        entries = self.sorted_sets.get(key, {})
+        for member, score in list(entries.items()):
+            if float(low) <= score <= float(high):
+                del entries[member]
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        entries = self.sorted_sets.get(key, {})
+        return [(m.encode(), score) for m, score in entries.items() if float(low) <= score <= float(high)]
+
+    def scan_iter(self, match=None, count=None):
+        prefix = (match or "").rstrip("*")
+        return [key.encode() for key in self.values if key.startswith(prefix)]
+
+    def ttl(self, key):
+        return 3600
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+@pytest.fixture
+def shared_redis():
+    """One Redis instance seen by several processes"""
+    return InMemoryRedis()
+
+
+def _manager_with_clock(redis_client, app, now, staleness=5):
+    """TokenManager of a separate process whose revocation cache uses a fake clock"""
+    from app.services.token_service import RevocationCache, TokenManager
+
+    manager = TokenManager(redis_client, app.config)
+    manager.revocations = RevocationCache(redis_client, staleness, clock=lambda: now[0])
+    return manager
+
+
 @pytest.fixture
 def mock_redis_with_tracking():
     """Create mock Redis that properly tracks blacklisted tokens"""
@@ -132,7 +208,9 @@ class TestTokenManager:
     def test_revoke_token(self, app, mock_redis):
         """Test revoking a token"""
         from flask_jwt_extended import decode_token
-        from app.services.token_service import TokenManager
+        from app.services.token_service import (
+            BLACKLIST_INDEX_KEY, BLACKLIST_LOG_KEY, BLACKLIST_PREFIX, TokenManager
+        )
 
         with app.app_context():
             manager = TokenManager(mock_redis, app.config)
@@ -146,24 +224,73 @@ class TestTokenManager:
             result = manager.revoke_token(jti)
             assert result is True
 
-            # Verify token is in blacklist
-            assert mock_redis.setex.called
+            # Blacklist key, index and log entries go out in one round trip
+            pipe = mock_redis.pipeline.return_value
+            pipe.setex.assert_called_once_with(f"{BLACKLIST_PREFIX}{jti}", 3600, "revoked")
+            assert [c[0][0] for c in pipe.zadd.call_args_list] == [BLACKLIST_INDEX_KEY, BLACKLIST_LOG_KEY]
+            assert pipe.execute.called
 
-    def test_is_token_revoked(self, app, mock_redis):
+            # Revoked in this process: seen without another Redis read
+            assert manager.is_token_revoked(jti) is True
+
+    def test_is_token_revoked(self, app, shared_redis):
         """Test checking if token is revoked"""
         from app.services.token_service import TokenManager
 
         with app.app_context():
-            manager = TokenManager(mock_redis, app.config)
+            TokenManager(shared_redis, app.config).revoke_token("revoked-jti")
+            manager = TokenManager(shared_redis, app.config)
 
-            # Test non-revoked token
-            mock_redis.exists.return_value = 0
+            # Answered from the blacklist index loaded into the cache
             assert manager.is_token_revoked("non-revoked-jti") is False
-
-            # Test revoked token
-            mock_redis.exists.return_value = 1
             assert manager.is_token_revoked("revoked-jti") is True
 
+            # Without the cache every check reads the blacklist key
+            app.config["JWT_REVOCATION_STALENESS"] = 0
+            uncached = TokenManager(shared_redis, app.config)
+            assert uncached.revocations is None
+            assert uncached.is_token_revoked("non-revoked-jti") is False
+            assert uncached.is_token_revoked("revoked-jti") is True
+
+    def test_revocation_staleness_window(self, app, shared_redis):
+        """A revocation made elsewhere is seen after at most the staleness bound"""
+        with app.app_context():
+            now = [1000.0]
+            web = _manager_with_clock(shared_redis, app, now)
+            assert web.is_token_revoked("jti-1") is False
+
+            other = _manager_with_clock(shared_redis, app, now)
+            assert other.revoke_token("jti-1") is True
+
+            # Inside the window the cached answer is still served
+            now[0] += 4.9
+            assert web.is_token_revoked("jti-1") is False
+            # Once the window has passed the cache resyncs
+            now[0] += 0.1
+            assert web.is_token_revoked("jti-1") is True
+
+    def test_cross_process_invalidation(self, app, shared_redis):
+        """After the first load processes only fetch revocations logged since their last sync"""
+        with app.app_context():
+            now = [1000.0]
+            workers = [_manager_with_clock(shared_redis, app, now) for _ in range(3)]
+            for worker in workers:
+                assert worker.is_token_revoked("jti-2") is False
+
+            # No revocations: resync reads an empty log tail
+            now[0] += 10
+            for worker in workers:
+                assert worker.is_token_revoked("jti-2") is False
+                assert worker.revocation_stats()["fetched"] == 0
+
+            workers[0].revoke_token("jti-2")
+            assert workers[0].is_token_revoked("jti-2") is True
+            now[0] += 10
+            for worker in workers[1:]:
+                assert worker.is_token_revoked("jti-2") is True
+                stats = worker.revocation_stats()
+                assert (stats["reloads"], stats["fetched"]) == (1, 1)
+
     def test_get_token_expiry_times(self, app, mock_redis):
         """Test getting token expiry times"""
         from app.services.token_service import TokenManager
@@ -0,0 +1,60 @@
+"""Unit tests for the API key cache and token bucket limiter."""
+
+import unittest
+
+from app.services.api_key_auth import APIKeyCache, ResolvedAPIKey, TokenBucketLimiter
+
+
+def _snapshot(key_id=1):
+    return ResolvedAPIKey(
+        id=key_id,
+        user_id=1,
+        name="key",
+        scopes=("document:check",),
+        rate_limit=10,
+        is_active=True,
+        expires_at=None,
+        plan="FREE",
+    )
+
+
+class TestAPIKeyCache(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.cache = APIKeyCache(ttl=30, max_size=2, clock=lambda: self.now[0])
+
+    def test_entries_expire_and_are_evicted(self):
+        self.cache.put("a", _snapshot(1))
+        self.cache.put("missing", None)
+        # Unknown keys are cached too
+        self.assertEqual(self.cache.get("missing"), (True, None))
+        self.assertEqual(self.cache.get("a"), (True, _snapshot(1)))
+
+        self.cache.put("b", _snapshot(2))
+        self.assertEqual(self.cache.get("missing"), (False, None))
+
+        self.now[0] = 31
+        self.assertEqual(self.cache.get("a"), (False, None))
+
+    def test_invalidate_by_id(self):
+        self.cache.put("a", _snapshot(1))
+        self.cache.invalidate(key_id=1)
+        self.assertEqual(self.cache.get("a"), (False, None))
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_bucket_refills_over_the_period(self):
+        now = [0.0]
+        limiter = TokenBucketLimiter(clock=lambda: now[0])
+
+        self.assertEqual([limiter.acquire(1, 2, period=60)[0] for _ in range(3)], [True, True, False])
+        # Each key has its own bucket
+        self.assertTrue(limiter.acquire(2, 2, period=60)[0])
+
+        now[0] = 30  # half a period refills one token
+        self.assertTrue(limiter.acquire(1, 2, period=60)[0])
+        self.assertFalse(limiter.acquire(1, 2, period=60)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
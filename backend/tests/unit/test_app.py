@@ -39,3 +39,121 @@ def test_documents_profiles_alias_get(app):
     with app.test_client() as client:
         response = client.get('/api/documents/profiles')
         assert response.status_code == 200
+
+
+def test_analyze_streams_rule_results_as_sse(client):
+    """Проверяет потоковый режим /analyze: событие на каждую норму и итог."""
+    import json
+    import os
+
+    path = os.path.join(os.path.dirname(__file__), '..', 'test_data', 'documents', 'wrong_margins.docx')
+    with open(path, 'rb') as f:
+        response = client.post(
+            '/api/document/analyze',
+            data={'file': (f, 'wrong_margins.docx'), 'stream': 'true'},
+            content_type='multipart/form-data',
+        )
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n', 1)
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+
+    names = [name for name, _ in events]
+    assert names[0] == 'start'
+    assert names[-1] == 'complete'
+    assert names.count('rule') > 1
+    complete = events[-1][1]
+    assert complete['document_token']
+    assert complete['total_issues_count'] == sum(len(data['issues']) for name, data in events if name == 'rule')
+
+
+def test_upload_batch_is_queued_by_default(client):
+    """Без async=false пакет ставится в очередь, а не обрабатывается в запросе."""
+    import io
+
+    response = client.post(
+        '/api/document/upload-batch',
+        data={'files': [(io.BytesIO(b'text'), 'notes.txt')]},
+        content_type='multipart/form-data',
+    )
+
+    # Отказ очереди, а не синхронный ответ 200 со списком results
+    assert response.status_code == 400
+    assert response.get_json()['rejected'][0]['filename'] == 'notes.txt'
+
+
+def test_upload_batch_streams_ndjson(client):
+    """Проверяет потоковый режим /upload-batch: строка NDJSON на каждый файл."""
+    import io
+    import json
+
+    response = client.post(
+        '/api/document/upload-batch',
+        data={'files': [(io.BytesIO(b'text'), 'notes.txt'), (io.BytesIO(b'broken'), 'broken.docx')]},
+        content_type='multipart/form-data',
+        headers={'Accept': 'application/x-ndjson'},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['type'] for line in lines] == ['result', 'result', 'summary']
+    assert [line['result']['success'] for line in lines[:2]] == [False, False]
+    assert lines[-1]['processed'] == 2
+
+
+def test_upload_batch_stream_removes_temp_dir(client, tmp_path, monkeypatch):
+    """Каталог пакета удаляется и при обрыве потока NDJSON."""
+    import io
+    import tempfile
+
+    batch_dir = tmp_path / 'batch'
+
+    def mkdtemp(*args, **kwargs):
+        batch_dir.mkdir()
+        return str(batch_dir)
+
+    monkeypatch.setattr(tempfile, 'mkdtemp', mkdtemp)
+
+    response = client.post(
+        '/api/document/upload-batch',
+        data={'files': [(io.BytesIO(b'text'), 'notes.txt'), (io.BytesIO(b'more'), 'more.txt')]},
+        content_type='multipart/form-data',
+        headers={'Accept': 'application/x-ndjson'},
+        buffered=False,
+    )
+    next(response.response)
+    assert batch_dir.exists()
+
+    response.close()
+    assert not batch_dir.exists()
+
+
+def test_stream_analysis_discards_upload_when_client_disconnects(app, tmp_path, monkeypatch):
+    """Закрытие потока SSE до события complete удаляет загрузку."""
+    from types import SimpleNamespace
+
+    from app.api import document_routes
+
+    upload_dir = tmp_path / 'upload'
+    upload_dir.mkdir()
+    upload_path = upload_dir / 'doc.docx'
+    upload_path.write_bytes(b'docx')
+    upload = SimpleNamespace(path=str(upload_path), temp_dir=str(upload_dir), filename='doc.docx')
+
+    def iter_analyze_document(*args):
+        yield 'start', {}
+        yield 'rule', {}
+
+    monkeypatch.setattr(document_routes.workflow_service, 'iter_analyze_document', iter_analyze_document)
+
+    with app.test_request_context('/api/document/analyze', method='POST'):
+        events = document_routes._stream_analysis(upload, 'default_gost')
+        next(events)
+        events.close()
+
+    assert not upload_dir.exists()
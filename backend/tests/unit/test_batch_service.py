@@ -0,0 +1,88 @@
+"""Модульные тесты пакетной обработки с ограниченным параллелизмом."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app.services import batch_service
+from app.services.artifact_store import ArtifactStore
+from app.services.batch_service import (
+    BatchNotFound,
+    create_batch,
+    finalize_batch,
+    get_batch_status,
+    plan_lanes,
+    process_batch_item,
+)
+
+
+class _StubWorkflow:
+    def process_document(self, file_path, original_filename, profile_id=None, deadline=None):
+        if original_filename == "broken.docx":
+            raise ValueError("broken")
+        return {
+            "success": True,
+            "filename": original_filename,
+            "check_results": {"issues": [1, 2, 3]},
+        }
+
+
+class TestPlanLanes(unittest.TestCase):
+    def test_lanes_are_capped_by_concurrency(self):
+        self.assertEqual(plan_lanes(5, 2), [[0, 2, 4], [1, 3]])
+        self.assertEqual(plan_lanes(2, 8), [[0], [1]])
+        self.assertEqual(plan_lanes(0, 4), [])
+
+
+class TestBatchService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        store_patch = mock.patch.object(
+            batch_service, "artifact_store", ArtifactStore(os.path.join(self.temp_dir, "artifacts"))
+        )
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+        self.files = []
+        for name in ("a.docx", "broken.docx", "c.docx"):
+            path = os.path.join(self.temp_dir, name)
+            with open(path, "wb") as f:
+                f.write(b"data")
+            self.files.append({"path": path, "filename": name})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_status_tracks_items_until_finalized(self):
+        batch_id = create_batch(self.files, concurrency=2)
+
+        status = get_batch_status(batch_id)
+        self.assertEqual((status["status"], status["total"], status["completed"]), ("queued", 3, 0))
+
+        process_batch_item(batch_id, 0, _StubWorkflow())
+        process_batch_item(batch_id, 1, _StubWorkflow())
+        status = get_batch_status(batch_id)
+        self.assertEqual(status["status"], "processing")
+        self.assertEqual((status["successful"], status["failed"]), (1, 1))
+        # Полные результаты проверок не попадают в краткий статус
+        self.assertNotIn("check_results", status["results"][0])
+        self.assertEqual(status["results"][1]["error"], "broken")
+
+        process_batch_item(batch_id, 2, _StubWorkflow())
+        summary = finalize_batch(batch_id)
+        self.assertEqual((summary["successful"], summary["failed"]), (2, 1))
+
+        status = get_batch_status(batch_id, include_details=True)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(status["progress"], 100)
+        self.assertIn("check_results", status["results"][0])
+
+    def test_unknown_batch(self):
+        with self.assertRaises(BatchNotFound):
+            get_batch_status("f" * 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Модульные тесты генератора синтетических работ и сравнения бенчмарков."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.services.document_processor import DocumentProcessor
+from tests.benchmarks.run_benchmarks import compare
+from tests.benchmarks.thesis_generator import ThesisSpec, generate_thesis
+
+SPEC = ThesisSpec(6, chapters=2, sections=2, tables=3, figures=2, formulas=2, bibliography=5, errors=4)
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class TestThesisGenerator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_generation_is_deterministic(self):
+        first = generate_thesis(SPEC, os.path.join(self.temp_dir, "a"))
+        second = generate_thesis(SPEC, os.path.join(self.temp_dir, "b"))
+        other_seed = generate_thesis(ThesisSpec(6, seed=1), os.path.join(self.temp_dir, "c"))
+
+        self.assertEqual(_sha256(first), _sha256(second))
+        self.assertNotEqual(_sha256(first), _sha256(other_seed))
+
+    def test_document_matches_spec(self):
+        data = DocumentProcessor(generate_thesis(SPEC, self.temp_dir)).extract_data()
+
+        levels = [heading["level"] for heading in data["headings"]]
+        # Введение, заключение и список литературы — тоже заголовки первого уровня
+        self.assertEqual(levels.count(1), SPEC.chapters + 3)
+        self.assertEqual(levels.count(2), SPEC.chapters * SPEC.sections)
+        self.assertEqual(len(data["tables"]), SPEC.tables)
+        self.assertEqual(len(data["images"]), SPEC.figures)
+        self.assertEqual(len(data["bibliography"]), SPEC.bibliography)
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+    @staticmethod
+    def _report(sha, **medians):
+        return {
+            "results": {
+                "thesis_10p": {
+                    "document": {"sha256": sha},
+                    "components": {name: {"median_s": value} for name, value in medians.items()},
+                }
+            }
+        }
+
+    def test_statuses(self):
+        baseline = self._report("a", extract=1.0, check=0.005, correct=2.0)
+        current = self._report("a", extract=1.5, check=0.009, correct=1.0, preview=0.3)
+        current["results"]["thesis_10p"]["components"]["validate"] = {"error": "boom"}
+
+        statuses = {row["component"]: row["status"] for row in compare(current, baseline)}
+        self.assertEqual(statuses, {
+            "extract": "regression",
+            # Медленнее на 80%, но на 4 мс — в пределах шума
+            "check": "ok",
+            "correct": "improved",
+            "preview": "new",
+            "validate": "error",
+        })
+
+        changed = compare(self._report("b", extract=5.0), baseline)
+        self.assertEqual(changed[0]["status"], "changed_input")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Модульные тесты бюджета времени обработки."""
+
+import json
+import math
+import unittest
+
+from app.services.deadline import (
+    NO_DEADLINE,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    Deadline,
+    as_deadline,
+)
+
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.deadline = Deadline.after(40, clock=lambda: self.now[0])
+
+    def test_priorities_follow_remaining_budget(self):
+        self.assertTrue(self.deadline.allows(PRIORITY_LOW))
+
+        self.now[0] = 131.0  # осталось меньше четверти бюджета
+        self.assertAlmostEqual(self.deadline.remaining(), 9.0)
+        self.assertFalse(self.deadline.allows(PRIORITY_LOW))
+        self.assertTrue(self.deadline.allows(PRIORITY_HIGH))
+
+        self.now[0] = 141.0
+        self.assertTrue(self.deadline.expired())
+        self.assertFalse(self.deadline.allows(PRIORITY_HIGH))
+        self.assertEqual(self.deadline.remaining(), 0.0)
+
+    def test_state_round_trip(self):
+        restored = Deadline.from_state(json.loads(json.dumps(self.deadline.to_state())))
+        self.assertEqual((restored.expires_at, restored.budget), (140.0, 40.0))
+        self.assertIsNone(NO_DEADLINE.to_state())
+        self.assertTrue(Deadline.from_state(None).unlimited)
+
+    def test_as_deadline(self):
+        self.assertIs(as_deadline(None), NO_DEADLINE)
+        self.assertIs(as_deadline(self.deadline), self.deadline)
+        self.assertEqual(as_deadline(30).budget, 30.0)
+        self.assertTrue(as_deadline(0).unlimited)
+        self.assertEqual(NO_DEADLINE.remaining(), math.inf)
+        self.assertTrue(NO_DEADLINE.allows(PRIORITY_LOW))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Модульные тесты отдачи артефактов с ETag, Range и X-Accel-Redirect."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask
+
+from app.services.file_delivery import forget_path, resolve_path_cached, send_artifact
+
+
+class TestFileDelivery(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = b"0123456789" * 100
+        self.path = os.path.join(self.temp_dir, "report.docx")
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+        self.app = Flask(__name__)
+
+        @self.app.route("/file")
+        def serve():
+            return send_artifact(self.path, "report.docx")
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        forget_path(self.path)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_strong_etag_and_not_modified(self):
+        response = self.client.get("/file")
+        etag = hashlib.sha256(self.data).hexdigest()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], f'"{etag}"')
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+
+        cached = self.client.get("/file", headers={"If-None-Match": f'"{etag}"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get("/file", headers={"Range": "bytes=10-19"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, self.data[10:20])
+        self.assertEqual(response.headers["Content-Range"], f"bytes 10-19/{len(self.data)}")
+
+    def test_x_accel_redirect_offload(self):
+        self.app.config.update(
+            DOWNLOAD_OFFLOAD="x-accel",
+            DOWNLOAD_OFFLOAD_ROOT=self.temp_dir,
+            DOWNLOAD_OFFLOAD_PREFIX="/protected/",
+        )
+
+        response = self.client.get("/file")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Accel-Redirect"], "/protected/report.docx")
+        self.assertEqual(response.data, b"")
+
+    def test_x_accel_falls_back_to_send_file_outside_root(self):
+        root = os.path.join(self.temp_dir, "public")
+        os.mkdir(root)
+        # Относительный путь к файлу начинался бы с ../ и выводил nginx за пределы корня
+        self.app.config.update(DOWNLOAD_OFFLOAD="x-accel", DOWNLOAD_OFFLOAD_ROOT=root)
+
+        response = self.client.get("/file")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Accel-Redirect", response.headers)
+        self.assertEqual(response.data, self.data)
+
+    def test_resolved_path_is_cached_until_file_disappears(self):
+        calls = []
+
+        def resolver():
+            calls.append(1)
+            return self.path if os.path.isfile(self.path) else None
+
+        self.assertEqual(resolve_path_cached("test:report", resolver), self.path)
+        self.assertEqual(resolve_path_cached("test:report", resolver), self.path)
+        self.assertEqual(len(calls), 1)
+
+        os.remove(self.path)
+        self.assertIsNone(resolve_path_cached("test:report", resolver))
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
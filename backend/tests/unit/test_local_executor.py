@@ -0,0 +1,155 @@
+"""Модульные тесты локального исполнителя задач на пуле процессов."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from celery.backends.cache import CacheBackend
+from celery.result import AsyncResult
+
+from app.services import batch_service
+from app.tasks import dispatch
+from app.tasks.celery_tasks import build_document_pipeline, celery_app
+from app.tasks.local_executor import LocalExecutor
+
+TEST_DOCUMENT = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "test_data", "documents", "wrong_margins.docx"
+)
+
+
+class TestLocalExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = LocalExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_task_runs_in_pool_with_celery_like_result(self):
+        result = self.executor.submit("cursa_tasks.health_check")
+
+        info = result.get(timeout=120)
+
+        self.assertTrue(result.successful())
+        self.assertIn("timestamp", info)
+        self.assertTrue(result.ready())
+
+    def test_failure_is_reported(self):
+        result = self.executor.submit("cursa_tasks.no_such_task")
+
+        with self.assertRaises(KeyError):
+            result.get(timeout=120)
+        self.assertEqual(result.state, "FAILURE")
+
+    def test_state_is_shared_through_result_backend(self):
+        backend = CacheBackend(app=celery_app, backend="memory")
+        executor = LocalExecutor(max_workers=1, result_backend=backend)
+        self.addCleanup(executor.shutdown)
+
+        done = executor.submit("cursa_tasks.health_check")
+        failed = executor.submit("cursa_tasks.no_such_task")
+        info = done.get(timeout=120)
+        with self.assertRaises(KeyError):
+            failed.get(timeout=120)
+
+        # Другой веб-процесс не знает этих заданий, но видит их в result backend
+        other = AsyncResult(done.id, backend=backend, app=celery_app)
+        self.assertEqual(other.state, "SUCCESS")
+        self.assertEqual(other.result, info)
+        self.assertEqual(AsyncResult(failed.id, backend=backend, app=celery_app).state, "FAILURE")
+
+    @unittest.skipUnless(os.path.exists(TEST_DOCUMENT), "Нет тестового документа")
+    def test_document_pipeline_chain_runs_under_one_job(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        source = os.path.join(temp_dir, "thesis.docx")
+        shutil.copy(TEST_DOCUMENT, source)
+
+        job_id = uuid.uuid4()
+        result = self.executor.submit_signature(
+            build_document_pipeline(source, "thesis.docx", job_id=job_id.hex), job_id=str(job_id)
+        )
+        summary = result.get(timeout=300)
+
+        self.assertTrue(summary["success"])
+        self.assertTrue(summary["report_id"])
+
+
+class TestDispatch(unittest.TestCase):
+    def test_backend_selection(self):
+        with mock.patch.dict(os.environ, {"TASK_BACKEND": "local"}):
+            self.assertEqual(dispatch.get_task_backend(), "local")
+
+        dispatch._broker_state.update(available=None, checked_at=0.0)
+        with mock.patch.dict(os.environ, {"TASK_BACKEND": "auto"}), \
+                mock.patch("app.tasks.celery_tasks.broker_available", return_value=False) as probe:
+            self.assertEqual(dispatch.get_task_backend(), "local")
+            self.assertEqual(dispatch.get_task_backend(), "local")
+            # Результат проверки брокера кэшируется
+            self.assertEqual(probe.call_count, 1)
+        dispatch._broker_state.update(available=None, checked_at=0.0)
+
+    def test_batch_lanes_are_finalized_in_parent(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+
+        files = []
+        for name in ("a.docx", "b.docx", "c.docx"):
+            path = os.path.join(temp_dir, name)
+            with open(path, "wb") as f:
+                f.write(b"not a docx")
+            files.append({"path": path, "filename": name})
+
+        # Дочерние процессы работают с общим хранилищем артефактов
+        batch_id = batch_service.create_batch(files, concurrency=2)
+        self.addCleanup(batch_service.artifact_store.delete_job, batch_id)
+
+        executor = LocalExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        summary = executor.submit_batch(batch_id, 3, 2).get(timeout=300)
+
+        self.assertEqual((summary["total"], summary["failed"]), (3, 3))
+        status = batch_service.get_batch_status(batch_id)
+        self.assertEqual(status["status"], "completed")
+
+
+@unittest.skipUnless(os.path.exists(TEST_DOCUMENT), "Нет тестового документа")
+class TestCeleryPipelineProgress(unittest.TestCase):
+    def test_stages_publish_progress_under_chain_id(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        source = os.path.join(temp_dir, "thesis.docx")
+        shutil.copy(TEST_DOCUMENT, source)
+
+        job_id = uuid.uuid4()
+        pipeline = build_document_pipeline(source, "thesis.docx", job_id=job_id.hex, task_id=str(job_id))
+        # Идентификаторы этапов — как при chain.apply_async()
+        pipeline.freeze()
+        stage_ids = [sig.id for sig in pipeline.tasks]
+        self.assertEqual(stage_ids[-1], str(job_id))
+        self.assertEqual(len(set(stage_ids)), len(stage_ids))
+
+        published = []
+
+        def store_result(task_id, result, state, *args, **kwargs):
+            published.append((task_id, state, result))
+
+        # Каждый этап выполняется под своим id, как в воркере
+        with mock.patch.object(celery_app.backend, "store_result", side_effect=store_result):
+            state = None
+            for sig in pipeline.tasks:
+                args = (state,) if state is not None else ()
+                state = sig.clone(args).apply(task_id=sig.id, throw=True).get()
+
+        self.assertTrue(state["success"])
+        self.assertEqual({task_id for task_id, _, _ in published}, {str(job_id)})
+        stages = {meta["stage"] for _, _, meta in published}
+        self.assertTrue({"ingest", "extract", "check", "correct", "verify", "report"} <= stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,297 @@
+"""Модульные тесты сборщика метрик."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from app.metrics import memory, timing
+from app.metrics.memory import MemoryBudgetExceeded, check_memory_budget, track_stage_memory
+from app.metrics.prometheus import MetricsCollector, metrics
+from app.metrics.timing import KIND_RULE, collect_timings, current_span, span
+
+
+class TestMetricsCollector(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+
+    def test_threads_write_to_own_shards(self):
+        counter = self.metrics.counter("cursa_test_total", {"kind": "a"})
+        written = threading.Barrier(5)
+        checked = threading.Event()
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+                self.metrics.histogram_observe("cursa_test_seconds", 0.02)
+            written.wait()
+            checked.wait()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        written.wait()
+        self.assertEqual(len(self.metrics._shards), 4)
+        checked.set()
+        for thread in threads:
+            thread.join()
+
+        # Шарды завершившихся потоков слиты, значения сохранились
+        self.assertEqual(len(self.metrics._shards), 0)
+        self.assertEqual(self.metrics.get_counter("cursa_test_total", {"kind": "a"}), 4000)
+        hist = self.metrics.snapshot()["histograms"]["cursa_test_seconds"]
+        self.assertEqual(hist[-1], 4000)
+        # Счётчики бакетов не накопительные
+        self.assertEqual(hist[:4], [0, 0, 4000, 0])
+
+    def test_shards_of_finished_threads_do_not_accumulate(self):
+        gauge = self.metrics.gauge("cursa_test_active")
+        gauge.set(5)
+
+        def work(index):
+            self.metrics.counter_inc("cursa_test_total")
+            self.metrics.histogram_observe("cursa_test_seconds", 0.02, exemplar={"task_id": f"t-{index}"})
+            gauge.inc()
+
+        for start in range(0, 2000, 50):
+            threads = [threading.Thread(target=work, args=(index,)) for index in range(start, start + 50)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertLessEqual(len(self.metrics._shards), 1)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["cursa_test_total"], 2000)
+        self.assertEqual(snapshot["histograms"]["cursa_test_seconds"][-1], 2000)
+        self.assertEqual(snapshot["gauges"]["cursa_test_active"], 2005)
+        self.assertEqual(len(snapshot["exemplars"]["cursa_test_seconds"]), 1)
+
+        # gauge_set после завершения потоков отменяет их изменения
+        gauge.set(1)
+        self.assertEqual(self.metrics.get_gauge("cursa_test_active"), 1)
+
+    def test_custom_buckets_and_exemplars(self):
+        self.metrics.set_buckets("cursa_test_duration_seconds", [60, 1, 10])
+        self.assertEqual(self.metrics.buckets_for("cursa_test_duration_seconds"), (1.0, 10.0, 60.0, float("inf")))
+
+        histogram = self.metrics.histogram("cursa_test_duration_seconds", {"stage": "correct"})
+        for value in (0.5, 1, 30, 45):
+            histogram.observe(value)
+        histogram.observe(90, exemplar={"task_id": "t-1", "document": "ab" * 80})
+
+        hist = self.metrics.snapshot()["histograms"]['cursa_test_duration_seconds{stage="correct"}']
+        self.assertEqual(hist, [2, 0, 2, 1, 166.5, 5])
+
+        text = self.metrics.export_prometheus()
+        self.assertIn('cursa_test_duration_seconds_bucket{stage="correct",le="60.0"} 4', text)
+        self.assertIn('cursa_test_duration_seconds_bucket{stage="correct",le="+Inf"} 5', text)
+        self.assertNotIn("task_id", text)
+
+        openmetrics = self.metrics.export_prometheus(openmetrics=True)
+        # Слишком длинный label экземпляра отбрасывается
+        self.assertIn('le="+Inf"} 5 # {task_id="t-1"} 90 ', openmetrics)
+
+    def test_gauge_set_resets_increments(self):
+        gauge = self.metrics.gauge("cursa_test_active")
+        gauge.inc(3)
+        gauge.dec()
+        self.assertEqual(self.metrics.get_gauge("cursa_test_active"), 2)
+
+        self.metrics.gauge_set("cursa_test_active", 10)
+        gauge.inc()
+        self.assertEqual(self.metrics.get_gauge("cursa_test_active"), 11)
+
+    def test_export_format(self):
+        self.metrics.counter_inc("cursa_test_total", labels={"kind": "a"})
+        self.metrics.histogram_observe("cursa_test_seconds", 0.3, {"stage": "check"})
+
+        text = self.metrics.export_prometheus()
+        self.assertIn('cursa_test_total{kind="a"} 1', text)
+        self.assertIn('cursa_test_seconds_bucket{stage="check",le="0.5"} 1', text)
+        self.assertIn('cursa_test_seconds_bucket{stage="check",le="0.25"} 0', text)
+        self.assertIn('cursa_test_seconds_count{stage="check"} 1', text)
+        self.assertNotIn("cursa_test_total", self.metrics.export_prometheus(exclude=["cursa_test_total"]))
+        self.assertIn("# TYPE cursa_test counter", self.metrics.export_prometheus(openmetrics=True))
+
+
+class TestMultiprocessMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.metrics = MetricsCollector(multiproc_dir=self.temp_dir, flush_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_worker(self, pid, data):
+        with open(os.path.join(self.temp_dir, f"metrics_{pid}.json"), "w") as f:
+            json.dump(data, f)
+
+    def test_scrape_merges_worker_files(self):
+        hist = [0] * 14
+        hist[3], hist[-2], hist[-1] = 2, 0.1, 2
+        self._write_worker(os.getppid(), {
+            "counters": {"cursa_test_total": 5},
+            "gauges": {"cursa_test_active": 2, "cursa_info": 1},
+            "histograms": {"cursa_test_seconds": hist},
+        })
+        # Завершившийся воркер: счётчики остаются, gauges нет
+        self._write_worker(2 ** 22 + 1, {
+            "counters": {"cursa_test_total": 7},
+            "gauges": {"cursa_test_active": 100},
+            "histograms": {},
+        })
+
+        self.metrics.counter_inc("cursa_test_total")
+        self.metrics.gauge_set("cursa_test_active", 1)
+        self.metrics.set_gauge_mode("cursa_info", "max")
+        self.metrics.gauge_set("cursa_info", 1)
+        self.metrics.histogram_observe("cursa_test_seconds", 0.04)
+
+        data = self.metrics.snapshot()
+        self.assertEqual(data["counters"]["cursa_test_total"], 13)
+        self.assertEqual(data["gauges"]["cursa_test_active"], 3)
+        self.assertEqual(data["gauges"]["cursa_info"], 1)
+        self.assertEqual(data["histograms"]["cursa_test_seconds"][3], 3)
+        self.assertEqual(data["histograms"]["cursa_test_seconds"][-1], 3)
+        # Снимок своего процесса сохранён для других воркеров
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, f"metrics_{os.getpid()}.json")))
+
+
+    def test_dead_worker_file_is_folded_and_removed(self):
+        dead_pid = 2 ** 22 + 1
+        for pid, total in ((dead_pid, 7), (dead_pid + 1, 3)):
+            self._write_worker(pid, {
+                "counters": {"cursa_test_total": total},
+                "gauges": {"cursa_test_active": 100},
+                "histograms": {"cursa_test_seconds": [1, 0, 0.5, 1]},
+            })
+            self.metrics.mark_process_dead(pid)
+
+        self.assertEqual(os.listdir(self.temp_dir), ["metrics_retired.json"])
+        data = self.metrics.snapshot()
+        # Сумма счётчиков не уменьшилась, gauges завершившихся воркеров не учитываются
+        self.assertEqual(data["counters"]["cursa_test_total"], 10)
+        self.assertEqual(data["histograms"]["cursa_test_seconds"], [2, 0, 1.0, 2])
+        self.assertNotIn("cursa_test_active", data["gauges"])
+
+    def test_clear_removes_previous_run(self):
+        self._write_worker(2 ** 22 + 1, {"counters": {"cursa_test_total": 7}})
+        self.metrics.mark_process_dead(2 ** 22 + 1)
+        self.metrics.flush()
+
+        self.metrics.clear_multiproc_dir()
+
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+class TestTimingSpans(unittest.TestCase):
+    def test_spans_nest_and_inherit_labels(self):
+        with collect_timings() as root:
+            with span("check", profile="default_gost"):
+                with span("02_check_font", KIND_RULE) as rule:
+                    self.assertIs(current_span(), rule)
+            with span("report"):
+                pass
+        self.assertIsNone(current_span())
+
+        self.assertEqual((rule.stage, rule.profile), ("check", "default_gost"))
+        data = root.to_dict()
+        self.assertEqual([child["name"] for child in data["children"]], ["check", "report"])
+        self.assertEqual(data["children"][0]["children"][0]["kind"], "rule")
+        self.assertNotIn("children", data["children"][1])
+
+        key = (
+            f'{timing.SPAN_METRIC}{{kind="rule",name="02_check_font",'
+            f'profile="default_gost",stage="check"}}'
+        )
+        hist = metrics.snapshot()["histograms"][key]
+        self.assertGreaterEqual(hist[-1], 1)
+        self.assertEqual(len(hist), len(timing.SPAN_BUCKETS) + 2)
+
+    def test_span_without_collector_still_closes(self):
+        with self.assertRaises(RuntimeError):
+            with span("extract"):
+                raise RuntimeError("boom")
+        self.assertIsNone(current_span())
+
+
+class TestStageMemory(unittest.TestCase):
+    def test_tracemalloc_reports_peak_and_top_allocations(self):
+        with track_stage_memory("extract", mode=memory.MODE_TRACEMALLOC, budget_mb=0) as usage:
+            data = [bytes(1024) for _ in range(2000)]
+            check_memory_budget("rule")
+            del data
+
+        report = usage.to_dict()
+        self.assertGreaterEqual(usage.traced_peak, 2000 * 1024)
+        self.assertGreaterEqual(report["rss_peak_mb"], report["rss_start_mb"])
+        self.assertTrue(report["top_allocations"])
+        self.assertIn("location", report["top_allocations"][0])
+        self.assertNotIn("budget_exceeded", report)
+        self.assertGreater(metrics.get_gauge("cursa_stage_memory_traced_peak_bytes", {"stage": "extract"}), 0)
+
+    def test_concurrent_tracemalloc_stages(self):
+        import tracemalloc
+
+        started = threading.Barrier(2)
+        first_done = threading.Event()
+        results, errors = {}, []
+
+        def stage(name, size, wait_for_other):
+            try:
+                with track_stage_memory(name, mode=memory.MODE_TRACEMALLOC, budget_mb=0) as usage:
+                    started.wait()
+                    data = [bytes(1024) for _ in range(size)]
+                    check_memory_budget("rule")
+                    if wait_for_other:
+                        # Второй этап продолжается после завершения первого
+                        first_done.wait(5)
+                        check_memory_budget("after")
+                    del data
+                results[name] = usage
+            except Exception as e:
+                errors.append(e)
+            finally:
+                if not wait_for_other:
+                    first_done.set()
+
+        threads = [
+            threading.Thread(target=stage, args=("short", 500, False)),
+            threading.Thread(target=stage, args=("long", 3000, True)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(results["long"].traced_peak, 3000 * 1024)
+        self.assertTrue(results["long"].top_allocations)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_budget_checkpoint_stops_stage(self):
+        reached = []
+        with track_stage_memory("correct", mode=memory.MODE_RSS, budget_mb=1) as usage:
+            check_memory_budget("pass_1")
+            reached.append(True)
+
+        self.assertFalse(reached)
+        self.assertIn("Превышен бюджет памяти", usage.exceeded)
+        self.assertIn("(этап correct, pass_1)", usage.exceeded)
+        self.assertTrue(usage.to_dict()["budget_exceeded"])
+
+    def test_checkpoint_outside_stage_is_noop(self):
+        with mock.patch.object(memory, "MEMORY_BUDGET_MB", 1):
+            check_memory_budget("rule")
+        with self.assertRaises(MemoryBudgetExceeded):
+            with track_stage_memory("check", budget_mb=1) as usage:
+                pass
+            usage.check_budget()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,7 +10,8 @@ import sys
 # Добавляем путь к корневой директории проекта
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from app.services.norm_control_checker import NormControlChecker
+from app.services.deadline import Deadline
+from app.services.norm_control_checker import NORM_RULES, RULE_PRIORITIES, NormControlChecker
 
 # Путь к тестовым данным
 TEST_DATA_DIR = Path(__file__).parent.parent / "test_data"
@@ -55,6 +56,49 @@ class TestNormControlChecker:
         assert 'rules_results' in result
         assert 'total_issues_count' in result
     
+    def test_iter_check_document_matches_check_document(self):
+        """
+        Поэлементная проверка даёт тот же итог, что и check_document
+        """
+        document_data = {
+            'paragraphs': [],
+            'tables': [],
+            'headings': [],
+            'bibliography': [],
+            'styles': {},
+            'page_setup': {},
+            'images': [],
+            'page_numbers': {'has_page_numbers': False},
+            'document_properties': {}
+        }
+        
+        rules_results = list(self.checker.iter_check_document(document_data))
+        result = self.checker.check_document(document_data)
+        
+        assert [r['rule_id'] for r in rules_results] == [r['rule_id'] for r in result['rules_results']]
+        assert self.checker.build_check_result(rules_results)['total_issues_count'] == result['total_issues_count']
+        assert result['incomplete'] is False
+    
+    def test_deadline_skips_rules(self):
+        """
+        При нехватке времени сначала пропускаются нормы низкого приоритета,
+        при исчерпанном бюджете — все оставшиеся
+        """
+        document_data = {'paragraphs': [], 'tables': [], 'headings': [], 'bibliography': []}
+        now = [0.0]
+        deadline = Deadline(expires_at=10.0, budget=100.0, clock=lambda: now[0])
+        
+        result = self.checker.check_document(document_data, deadline=deadline)
+        assert result['incomplete'] is True
+        assert result['skipped_rules'] == sorted(RULE_PRIORITIES)
+        checked = [r for r in result['rules_results'] if not r.get('skipped')]
+        assert len(checked) == len(NORM_RULES) - len(RULE_PRIORITIES)
+        
+        now[0] = 11.0
+        result = self.checker.check_document(document_data, deadline=deadline)
+        assert result['skipped_rules'] == [rule['id'] for rule in NORM_RULES]
+        assert result['total_issues_count'] == 0
+    
     def test_check_font(self):
         """
         Проверка правила проверки шрифта
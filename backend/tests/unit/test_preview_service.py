@@ -1,8 +1,12 @@
 import unittest
 import os
+import shutil
 import tempfile
+from unittest import mock
+
 import docx
-from app.services.preview_service import PreviewService
+from app.services import preview_service
+from app.services.preview_service import PreviewService, split_into_pages, warm_preview
 
 
 class TestPreviewService(unittest.TestCase):
@@ -32,5 +36,76 @@ class TestPreviewService(unittest.TestCase):
         self.assertIn("<p>", html_content)  # Проверяем наличие параграфов
 
 
+class TestPreviewPagination(unittest.TestCase):
+    def test_split_starts_new_page_at_headings(self):
+        pages = split_into_pages("<h1>A</h1><p>one</p><h1>B</h1><p>two</p>")
+
+        self.assertEqual([page["title"] for page in pages], ["A", "B"])
+        self.assertEqual(pages[1]["html"], "<h1>B</h1><p>two</p>")
+
+    def test_split_limits_page_size(self):
+        pages = split_into_pages("<p>aaaa</p>" * 10, page_chars=30)
+
+        self.assertEqual(len(pages), 5)
+        self.assertEqual("".join(page["html"] for page in pages), "<p>aaaa</p>" * 10)
+
+
+class TestPreviewCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.docx_path = os.path.join(self.temp_dir, "thesis.docx")
+
+        doc = docx.Document()
+        doc.add_heading("Введение", level=1)
+        doc.add_paragraph("Текст введения")
+        doc.add_heading("Глава 1", level=1)
+        doc.add_paragraph("Текст главы")
+        doc.save(self.docx_path)
+
+        cache_dir_patch = mock.patch.object(
+            preview_service, "PREVIEW_CACHE_DIR", os.path.join(self.temp_dir, "previews")
+        )
+        cache_dir_patch.start()
+        self.addCleanup(cache_dir_patch.stop)
+        preview_service._memory_cache.clear()
+        self.addCleanup(preview_service._memory_cache.clear)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_same_file_is_converted_once(self):
+        service = PreviewService()
+        with mock.patch.object(PreviewService, "_convert", wraps=service._convert) as convert:
+            full_html = service.generate_preview(self.docx_path)
+            preview = service.get_preview(self.docx_path)
+
+        self.assertEqual(convert.call_count, 1)
+        self.assertIn("Текст главы", full_html)
+        self.assertEqual(len(preview["pages"]), 2)
+        self.assertEqual(service.get_page(preview["preview_id"], 2)["title"], "Глава 1")
+
+    def test_disk_cache_survives_memory_eviction(self):
+        preview_id = PreviewService().get_preview(self.docx_path)["preview_id"]
+        preview_service._memory_cache.clear()
+
+        page = PreviewService().get_page(preview_id, 1)
+
+        self.assertEqual(page["pages"], 2)
+        self.assertIn("Текст введения", page["html"])
+
+    def test_warm_preview_fills_cache(self):
+        warm_preview(self.docx_path).result(timeout=30)
+
+        self.assertTrue(preview_service._memory_cache)
+
+    def test_unknown_preview_and_page_out_of_range(self):
+        service = PreviewService()
+        self.assertIsNone(service.get_page("0" * 64, 1))
+
+        preview_id = service.get_preview(self.docx_path)["preview_id"]
+        with self.assertRaises(IndexError):
+            service.get_page(preview_id, 5)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,79 @@
+"""Модульные тесты каталога профилей."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.services import profile_loader
+from app.services.profile_catalog import ProfileCatalog
+from app.services.profile_loader import bump_profiles_version
+
+
+class TestProfileCatalog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self._write("default_gost", {
+            "name": "ГОСТ 7.32", "category": "gost", "is_system": True,
+            "rules": {"font": {"name": "Times New Roman"}, "bibliography": {"min_sources": 15}},
+        })
+        self._write("mgu_informatics", {
+            "name": "МГУ ВМК", "description": "Бизнес-информатика", "category": "university",
+            "extends": "default_gost", "university": {"name": "МГУ", "short_name": "MSU"},
+            "rules": {"font": {"name": "Arial"}, "bibliography": {"min_sources": 25}},
+            "updated_at": "2024-05-01T10:00:00",
+        })
+        self._write("custom", {"name": "Свой", "category": "custom", "rules": {}})
+        profile_loader.clear_profile_cache()
+        self.catalog = ProfileCatalog(self.temp_dir)
+
+    def tearDown(self):
+        profile_loader.clear_profile_cache()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, profile_id, data):
+        with open(os.path.join(self.temp_dir, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def _ids(self, **kwargs):
+        return [item["id"] for item in self.catalog.search(**kwargs)]
+
+    def test_search_by_words_and_facets(self):
+        self.assertEqual(self._ids(), ["custom", "default_gost", "mgu_informatics"])
+        self.assertEqual(self._ids(query="информ"), ["mgu_informatics"])
+        self.assertEqual(self._ids(query="msu"), ["mgu_informatics"])
+        self.assertEqual(self._ids(query="гост мгу"), [])
+        self.assertEqual(self._ids(category="gost"), ["default_gost"])
+        self.assertEqual(self._ids(font_name="times"), ["default_gost"])
+        self.assertEqual(self._ids(min_sources=20), ["mgu_informatics"])
+        self.assertEqual(self._ids(query="гост", min_sources=20), [])
+
+    def test_statistics(self):
+        stats = self.catalog.statistics()
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["by_category"], {"gost": 1, "university": 1, "custom": 1})
+        self.assertEqual(stats["system_profiles"], 1)
+        self.assertEqual(stats["with_inheritance"], 1)
+        self.assertEqual(stats["fonts_used"], {"Times New Roman": 1, "Arial": 1, "Unknown": 1})
+        self.assertEqual(stats["avg_min_sources"], 20)
+        self.assertEqual([item["id"] for item in stats["recently_updated"]], ["mgu_informatics"])
+
+    def test_refresh_and_shared_version(self):
+        self.catalog.statistics()
+        self._write("spbgu", {"name": "СПбГУ", "category": "university", "rules": {}})
+        os.remove(os.path.join(self.temp_dir, "custom.json"))
+        self.catalog.refresh(["spbgu", "custom"])
+        self.assertEqual(self._ids(category="university"), ["mgu_informatics", "spbgu"])
+        self.assertEqual(self.catalog.statistics()["total"], 3)
+        self.assertEqual(self.catalog.rebuilds, 1)
+
+        # Изменение в другом процессе: меняется общая метка версии
+        self._write("hse", {"name": "ВШЭ", "category": "university", "rules": {}})
+        bump_profiles_version(self.temp_dir)
+        self.assertIn("hse", self._ids(query="вшэ"))
+        self.assertEqual(self.catalog.rebuilds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
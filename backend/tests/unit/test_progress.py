@@ -0,0 +1,108 @@
+"""Модульные тесты передачи прогресса обработки."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.services.progress import ProgressReporter, overall_progress, scale_progress, task_sink
+from app.services.workflow_service import WorkflowService
+
+TEST_DOCUMENT = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "test_data", "documents", "wrong_margins.docx"
+)
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _FakeTask:
+    def __init__(self):
+        self.states = []
+
+    def update_state(self, task_id=None, state=None, meta=None):
+        self.states.append((state, meta))
+
+
+class TestProgressReporter(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.clock = _FakeClock()
+        self.reporter = ProgressReporter(
+            lambda *event: self.events.append(event), min_interval=1.0, clock=self.clock
+        )
+
+    def test_same_stage_is_throttled(self):
+        for sub in range(0, 100, 10):
+            self.reporter("check", sub)
+        self.reporter("check", 100)
+
+        # Первое событие и завершение этапа
+        self.assertEqual([event[2] for event in self.events], [0, 100])
+        self.assertEqual(self.reporter.suppressed, 9)
+
+        self.clock.now = 2.0
+        self.reporter("check", 50)
+        self.assertEqual(len(self.events), 3)
+
+    def test_stage_change_is_not_throttled(self):
+        self.reporter("extract", 50)
+        self.reporter("check", 10)
+
+        self.assertEqual([event[0] for event in self.events], ["extract", "check"])
+        self.assertEqual(self.events[1][1], overall_progress("check", 10))
+
+    def test_scale_progress_maps_into_range(self):
+        calls = []
+        scaled = scale_progress(lambda *args: calls.append(args), 50, 100, "correct")
+
+        scaled("xml", 50, "Шрифты")
+
+        self.assertEqual(calls, [("correct", 75.0, "Шрифты")])
+
+    def test_task_sink_publishes_celery_meta(self):
+        task = _FakeTask()
+        ProgressReporter(task_sink(task, job_id="abc"))("correct", 40, "Проход 1/3")
+
+        state, meta = task.states[0]
+        self.assertEqual(state, "PROCESSING")
+        self.assertEqual(meta["stage"], "correct")
+        self.assertEqual(meta["job_id"], "abc")
+        self.assertEqual(meta["progress"], overall_progress("correct", 40))
+
+
+@unittest.skipUnless(os.path.exists(TEST_DOCUMENT), "Нет тестового документа")
+class TestWorkflowProgress(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "upload.docx")
+        shutil.copy(TEST_DOCUMENT, self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_process_document_reports_every_stage(self):
+        events = []
+        progress = ProgressReporter(lambda *event: events.append(event), min_interval=0)
+
+        workflow = WorkflowService(os.path.join(self.temp_dir, "corrections"))
+        result = workflow.process_document(self.source, "upload.docx", progress=progress)
+
+        self.assertTrue(result["success"])
+        stages = [event[0] for event in events]
+        for stage in ("extract", "check", "correct", "verify", "report"):
+            self.assertIn(stage, stages)
+        # Правила проверки сообщают прогресс по одному
+        self.assertGreater(stages.count("check"), 10)
+        # Общий прогресс внутри этапа коррекции не убывает
+        correct = [event[1] for event in events if event[0] == "correct"]
+        self.assertEqual(correct, sorted(correct))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Модульные тесты отложенной генерации отчетов."""
+
+import docx
+import pytest
+
+from app.services import report_service
+
+
+CHECK_RESULTS = {
+    "total_issues_count": 3,
+    "statistics": {"severity": {"high": 1, "medium": 0, "low": 2}, "auto_fixable_count": 2},
+    "issues": [
+        {"type": "font", "description": "Неверный шрифт", "severity": "low", "auto_fixable": True, "location": "Абзац 1"},
+        {"type": "font", "description": "Неверный шрифт", "severity": "low", "auto_fixable": True, "location": "Абзац 2"},
+        {"type": "margins", "description": "Поля <страницы>", "severity": "high"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def reports_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_service, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(report_service, "REPORT_DATA_DIR", tmp_path / "data")
+    return tmp_path
+
+
+def test_register_is_cheap_and_idempotent(reports_dir):
+    report_id = report_service.register_report(CHECK_RESULTS, "thesis.docx")
+
+    assert report_service.register_report(CHECK_RESULTS, "thesis.docx") == report_id
+    # До первого запроса сам отчет не строится
+    assert not list(reports_dir.glob("report_*"))
+
+
+def test_json_summary_groups_issues():
+    report_id = report_service.register_report(CHECK_RESULTS, "thesis.docx")
+
+    summary = report_service.render_json(report_service.load_report_data(report_id))["summary"]
+
+    assert summary["total_issues"] == 3
+    assert [group["count"] for group in summary["groups"]] == [2, 1]
+    assert summary["groups"][0]["locations"] == ["Абзац 1", "Абзац 2"]
+
+
+def test_docx_and_html_are_rendered_once_and_cached():
+    report_id = report_service.register_report(CHECK_RESULTS, "thesis.docx")
+
+    docx_path = report_service.get_report_file(report_id, "docx")
+    text = "\n".join(p.text for p in docx.Document(docx_path).paragraphs)
+    assert "thesis.docx" in text
+    assert "Неверный шрифт" in text
+
+    html_path = report_service.get_report_file(report_id, "html")
+    with open(html_path, encoding="utf-8") as f:
+        assert "Поля &lt;страницы&gt;" in f.read()
+
+    assert report_service.get_report_file(report_id, "docx") == docx_path
+
+
+def test_unknown_report_id_is_not_found():
+    with pytest.raises(report_service.ReportNotFound):
+        report_service.get_report_file("0" * 32, "docx")
+    with pytest.raises(report_service.ReportNotFound):
+        report_service.load_report_data("../etc/passwd")
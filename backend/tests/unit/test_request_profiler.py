@@ -0,0 +1,62 @@
+"""Модульные тесты профилирования запросов."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from app.services.request_profiler import MODE_CPROFILE, MODE_SAMPLE, RequestProfiler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class TestRequestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiler = RequestProfiler(self.temp_dir, sample_interval=0.001, max_files=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _profile(self, mode, path="/api/document/upload"):
+        session = self.profiler.start(mode, "admin")
+        _busy(0.05)
+        return self.profiler.finish(session, {"method": "POST", "path": path, "status": 200})
+
+    def test_cprofile_artifact_and_summary(self):
+        record = self._profile(MODE_CPROFILE)
+
+        self.assertTrue(record["artifact"].endswith(".pstats"))
+        self.assertGreaterEqual(record["duration_ms"], 50)
+        self.assertEqual(self.profiler.get_profile(record["id"])["path"], "/api/document/upload")
+        self.assertIn("_busy", self.profiler.summary(record))
+
+    def test_sampler_writes_collapsed_stacks(self):
+        record = self._profile(MODE_SAMPLE)
+
+        with open(self.profiler.artifact_path(record), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("test_request_profiler.py:_busy", stack)
+        self.assertGreater(int(count), 0)
+
+    def test_old_profiles_are_pruned(self):
+        first = self._profile(MODE_SAMPLE)
+        for _ in range(2):
+            time.sleep(0.01)
+            self._profile(MODE_SAMPLE)
+
+        self.assertEqual(len(self.profiler.list_profiles()), 2)
+        self.assertIsNone(self.profiler.get_profile(first["id"]))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, first["artifact"])))
+        self.assertIsNone(self.profiler.get_profile("../secret"))
+
+
+if __name__ == "__main__":
+    unittest.main()
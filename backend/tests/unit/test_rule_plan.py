@@ -0,0 +1,66 @@
+"""Модульные тесты компиляции плана правил профиля."""
+
+import unittest
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Cm, Pt
+
+from app.services.document_corrector import DocumentCorrector
+from app.services.norm_control_checker import NormControlChecker
+from app.services.profile_loader import freeze
+from app.services.rule_plan import DEFAULT_PLAN, compile_rule_plan, rule_plan_for
+from app.services.validators.font_validator import FontValidator
+
+PROFILE = {
+    "name": "Вуз",
+    "rules": {
+        "font": {"name": "Arial", "size": 12},
+        "margins": {"left": 2.5},
+        "headings": {"h1": {"alignment": "left", "font_size": 16}},
+        "tables": {"font_size": 10},
+    },
+    "bibliography": {"patterns": {"gost": "^гост"}},
+    "validation": {"check_fontvalidator": False},
+}
+
+
+class TestRulePlan(unittest.TestCase):
+    def test_units_and_defaults(self):
+        plan = compile_rule_plan(PROFILE)
+
+        self.assertEqual(plan.font.size, Pt(12))
+        self.assertEqual(plan.font.half_points, 24)
+        self.assertEqual(plan.margins.left, Cm(2.5))
+        # Недостающие правила берутся из общих значений по умолчанию
+        self.assertEqual(plan.margins.right_cm, 1.5)
+        self.assertEqual(plan.line_spacing_twips, 360)
+        self.assertEqual(plan.headings["h1"].alignment, WD_PARAGRAPH_ALIGNMENT.LEFT)
+        self.assertTrue(plan.headings["h1"].all_caps)
+        self.assertEqual(plan.get("tables.font_size"), 10)
+        self.assertEqual(plan.get("notes.font_size", 10.0), 10.0)
+        self.assertTrue(plan.bibliography.patterns_ci["gost"].match("ГОСТ 7.32"))
+        self.assertIsNone(plan.bibliography.patterns["gost"].match("ГОСТ 7.32"))
+
+    def test_plan_is_shared_for_resolved_profiles(self):
+        frozen = freeze(PROFILE)
+        self.assertIs(rule_plan_for(frozen), rule_plan_for(frozen))
+        self.assertIs(rule_plan_for(None), DEFAULT_PLAN)
+        with self.assertRaises(TypeError):
+            rule_plan_for(frozen).rules["font"]["size"] = 14
+
+    def test_engines_agree(self):
+        frozen = freeze(PROFILE)
+        checker = NormControlChecker(profile_data=frozen)
+        validator = FontValidator(profile=frozen)
+        corrector = DocumentCorrector(profile_data=frozen)
+
+        self.assertIs(checker.rule_plan, validator.rule_plan)
+        self.assertIs(checker.rule_plan, corrector.rule_plan)
+        self.assertEqual(checker.standard_rules["font"]["size"], 12)
+        self.assertEqual(validator._get_rule_config("font.size"), 12)
+        self.assertEqual(corrector.rules["headings"]["h2"]["font_size"], 14.0)
+        self.assertFalse(validator.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,358 @@
+"""Модульные тесты справедливого планирования фоновых задач."""
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app.metrics import metrics
+from app.models.user import UserRole
+from app.tasks.scheduling import (
+    KIND_BATCH, KIND_INTERACTIVE, LOST_TASK_ERROR, FairScheduler, RedisLedger, TenantPolicy,
+    _Entry, resolve_policy,
+)
+
+
+class _Handle:
+    def __init__(self, done=True):
+        self.done = threading.Event()
+        if done:
+            self.done.set()
+
+    def ready(self):
+        return self.done.is_set()
+
+
+class _FakeRedis:
+    """Минимальный Redis в памяти для RedisLedger (общий для «процессов» теста)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.zsets = {}
+        self.values = {}
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def zremrangebyscore(self, key, low, high):
+        with self.lock:
+            zset = self.zsets.get(key, {})
+            for member in [m for m, score in zset.items() if score <= high]:
+                del zset[member]
+
+    def zadd(self, key, mapping, xx=False, gt=False):
+        with self.lock:
+            zset = self.zsets.setdefault(key, {})
+            for member, score in mapping.items():
+                if xx and member not in zset:
+                    continue
+                if gt and member in zset and score <= zset[member]:
+                    continue
+                zset[member] = score
+
+    def _sorted(self, key):
+        zset = self.zsets.get(key, {})
+        return sorted(zset, key=lambda member: (zset[member], member))
+
+    def zrange(self, key, start, end):
+        with self.lock:
+            members = self._sorted(key)
+            return members[start:] if end == -1 else members[start:end + 1]
+
+    def zrank(self, key, member):
+        with self.lock:
+            members = self._sorted(key)
+            return members.index(member) if member in members else None
+
+    def zscore(self, key, member):
+        with self.lock:
+            return self.zsets.get(key, {}).get(member)
+
+    def zcard(self, key):
+        with self.lock:
+            return len(self.zsets.get(key, {}))
+
+    def zrem(self, key, *members):
+        with self.lock:
+            zset = self.zsets.get(key, {})
+            return sum(zset.pop(member, None) is not None for member in members)
+
+    def incr(self, key):
+        with self.lock:
+            self.values[key] = int(self.values.get(key, 0)) + 1
+            return self.values[key]
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.calls.append((getattr(self.redis, name), args, kwargs))
+        return command
+
+    def execute(self):
+        return [func(*args, **kwargs) for func, args, kwargs in self.calls]
+
+
+def _policy(tenant, weight=1, max_concurrent=4, plan="PRO"):
+    return TenantPolicy(tenant=tenant, plan=plan, priority=4, weight=weight, max_concurrent=max_concurrent)
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestFairScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FairScheduler(max_inflight=1, interactive_reserved=0)
+        self.addCleanup(self.scheduler.shutdown)
+        self.started = []
+
+    def _launcher(self, name, handle=None):
+        def launch():
+            self.started.append(name)
+            return handle or _Handle()
+        return launch
+
+    def test_bulk_tenant_does_not_starve_others(self):
+        blocker = _Handle(done=False)
+        self.scheduler.submit("blocker", _policy("bulk"), self._launcher("blocker", blocker))
+        self.assertTrue(_wait_for(lambda: self.started == ["blocker"]))
+
+        for index in range(5):
+            self.scheduler.submit(f"bulk-{index}", _policy("bulk"), self._launcher(f"bulk-{index}"))
+        self.scheduler.submit("single", _policy("interactive"), self._launcher("single"))
+        self.assertEqual(self.scheduler.position("single")["position"], 2)
+
+        blocker.done.set()
+        self.assertTrue(_wait_for(lambda: len(self.started) == 7))
+        # Задача второго клиента не ждёт весь пакет первого
+        self.assertIn("single", self.started[1:3])
+
+    def test_weight_gives_larger_share(self):
+        blocker = _Handle(done=False)
+        self.scheduler.submit("blocker", _policy("x"), self._launcher("blocker", blocker))
+        self.assertTrue(_wait_for(lambda: self.started == ["blocker"]))
+
+        for index in range(4):
+            self.scheduler.submit(f"free-{index}", _policy("free", weight=1), self._launcher(f"free-{index}"))
+            self.scheduler.submit(f"team-{index}", _policy("team", weight=4), self._launcher(f"team-{index}"))
+
+        blocker.done.set()
+        self.assertTrue(_wait_for(lambda: len(self.started) == 9))
+        first_half = self.started[1:5]
+        self.assertGreaterEqual(sum(name.startswith("team") for name in first_half), 3)
+
+    def test_per_tenant_concurrency_cap(self):
+        scheduler = FairScheduler(max_inflight=4, interactive_reserved=0)
+        self.addCleanup(scheduler.shutdown)
+        running = _Handle(done=False)
+        capped = _policy("capped", max_concurrent=1)
+
+        scheduler.submit("a1", capped, self._launcher("a1", running))
+        scheduler.submit("a2", capped, self._launcher("a2"))
+        scheduler.submit("b1", _policy("other"), self._launcher("b1"))
+
+        self.assertTrue(_wait_for(lambda: "b1" in self.started))
+        self.assertNotIn("a2", self.started)
+        self.assertIsNotNone(scheduler.position("a2"))
+
+        running.done.set()
+        self.assertTrue(_wait_for(lambda: "a2" in self.started))
+
+    def test_batch_slots_leave_interactive_reserve(self):
+        scheduler = FairScheduler(max_inflight=4, interactive_reserved=1)
+        self.addCleanup(scheduler.shutdown)
+
+        self.assertEqual(scheduler.clamp_slots(_policy("t", max_concurrent=8), KIND_BATCH, 8), 3)
+        self.assertEqual(scheduler.clamp_slots(_policy("t", max_concurrent=2), KIND_BATCH, 8), 2)
+
+    def test_launch_error_and_wait_histogram(self):
+        def failing():
+            raise RuntimeError("broker down")
+
+        self.scheduler.submit("broken", _policy("t", plan="TEAM"), failing)
+
+        self.assertTrue(_wait_for(lambda: self.scheduler.launch_error("broken") is not None))
+        self.assertIn(
+            "cursa_task_queue_wait_seconds",
+            "".join(metrics.snapshot()["histograms"]),
+        )
+
+
+    def test_polling_does_not_hold_scheduler_lock(self):
+        scheduler = self.scheduler
+
+        class ProbeHandle:
+            lock_free = None
+
+            def ready(self):
+                # ready() ходит в бэкенд результатов: submit() и статус не должны его ждать
+                if self.lock_free is None:
+                    probe = threading.Thread(target=scheduler.stats)
+                    probe.start()
+                    probe.join(1)
+                    self.lock_free = not probe.is_alive()
+                return True
+
+        handle = ProbeHandle()
+        scheduler.submit("probe", _policy("t"), self._launcher("probe", handle))
+
+        self.assertTrue(_wait_for(lambda: handle.lock_free is not None))
+        self.assertTrue(handle.lock_free)
+
+
+class TestSharedLedger(unittest.TestCase):
+    """Два планировщика с общим Redis — как два процесса gunicorn."""
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        self.started = []
+        self.handles = {}
+
+    def _launch(self, spec):
+        # Описание задачи из Redis — только JSON, поэтому handle ищется по имени
+        if spec.startswith("broken"):
+            raise RuntimeError("broker down")
+        self.started.append(spec)
+        return self.handles.get(spec) or _Handle()
+
+    def _scheduler(self, max_inflight=4, lease_ttl=60):
+        scheduler = FairScheduler(max_inflight=max_inflight, interactive_reserved=0,
+                                  ledger=RedisLedger(self.redis, lease_ttl=lease_ttl),
+                                  launcher=self._launch)
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+    def test_tenant_cap_applies_across_processes(self):
+        first, second = self._scheduler(), self._scheduler()
+        capped = _policy("capped", max_concurrent=1)
+        running = self.handles["a1"] = _Handle(done=False)
+
+        first.submit("a1", capped, "a1")
+        self.assertTrue(_wait_for(lambda: "a1" in self.started))
+        second.submit("a2", capped, "a2")
+        second.submit("b1", _policy("other"), "b1")
+
+        self.assertTrue(_wait_for(lambda: "b1" in self.started))
+        time.sleep(0.2)
+        self.assertNotIn("a2", self.started)
+        self.assertIsNotNone(first.position("a2"))
+
+        running.done.set()
+        self.assertTrue(_wait_for(lambda: "a2" in self.started))
+        self.assertEqual(self.started.count("a2"), 1)
+
+    def test_global_cap_applies_across_processes(self):
+        first, second = self._scheduler(max_inflight=1), self._scheduler(max_inflight=1)
+        running = self.handles["a1"] = _Handle(done=False)
+
+        first.submit("a1", _policy("a"), "a1")
+        self.assertTrue(_wait_for(lambda: "a1" in self.started))
+        second.submit("b1", _policy("b"), "b1")
+        time.sleep(0.2)
+        self.assertNotIn("b1", self.started)
+
+        running.done.set()
+        self.assertTrue(_wait_for(lambda: "b1" in self.started))
+
+    def test_queue_order_is_shared_between_processes(self):
+        first = self._scheduler(max_inflight=1, lease_ttl=1)
+        second = self._scheduler(max_inflight=1)
+        blocker = self.handles["blocker"] = _Handle(done=False)
+        first.submit("blocker", _policy("x"), "blocker")
+        self.assertTrue(_wait_for(lambda: self.started == ["blocker"]))
+
+        # Пакет одного клиента поставлен в одном процессе, одиночная задача — в другом
+        for index in range(4):
+            first.submit(f"bulk-{index}", _policy("bulk"), f"bulk-{index}")
+        second.submit("single", _policy("single"), "single")
+        self.assertEqual(first.position("single")["position"], 2)
+
+        # Процесс остановился, не освободив места: аренда истекает, и его
+        # очередь запускает другой процесс
+        first.shutdown()
+        self.assertTrue(_wait_for(lambda: len(self.started) == 6))
+        self.assertIn("single", self.started[1:3])
+
+    def test_claimed_task_of_stopped_process_is_reported_lost(self):
+        first, second = RedisLedger(self.redis), self._scheduler()
+        entry = _Entry("a1", _policy("a"), "a1", KIND_INTERACTIVE, 1)
+        first.enqueue(entry)
+        self.assertTrue(first.claim(entry))
+
+        # Забранная, но ещё не запущенная задача видна из другого процесса
+        self.assertEqual(second.lookup("a1")["state"], "QUEUED")
+        self.assertFalse(second.ledger.claim(entry))
+
+        first.close()
+        lost = second.lookup("a1")
+        self.assertEqual((lost["state"], lost["error"]), ("FAILURE", LOST_TASK_ERROR))
+
+    def test_launch_error_is_visible_to_other_processes(self):
+        first, second = self._scheduler(), self._scheduler()
+
+        first.submit("broken", _policy("t"), "broken")
+        self.assertTrue(_wait_for(
+            lambda: (first.launch_error("broken") or second.launch_error("broken")) is not None
+        ))
+        self.assertEqual(second.lookup("broken"), {"state": "FAILURE", "error": "broker down"})
+        self.assertEqual(first.lookup("broken"), {"state": "FAILURE", "error": "broker down"})
+
+
+class TestResolvePolicy(unittest.TestCase):
+    def test_anonymous_client_gets_free_plan(self):
+        policy = resolve_policy(None, "10.0.0.1")
+
+        self.assertEqual((policy.tenant, policy.plan), ("ip:10.0.0.1", "FREE"))
+
+    def test_api_key_uses_owner_plan(self):
+        api_key = SimpleNamespace(id=7, user=SimpleNamespace(role=UserRole.PRO))
+        policy = resolve_policy(api_key)
+
+        self.assertEqual((policy.tenant, policy.plan), ("key:7", "PRO"))
+        self.assertLess(policy.priority, resolve_policy(None).priority)
+        self.assertGreater(policy.broker_priority(KIND_BATCH), policy.broker_priority())
+
+    def test_forwarded_for_is_trusted_only_behind_proxy_fix(self):
+        from app.api.document_routes import _tenant_policy
+
+        app = Flask(__name__)
+        app.add_url_rule("/tenant", "tenant", lambda: _tenant_policy(None).tenant)
+        spoofed = {"X-Forwarded-For": "6.6.6.6, 10.0.0.2"}
+        environ = {"REMOTE_ADDR": "10.0.0.1"}
+
+        response = app.test_client().get("/tenant", headers=spoofed, environ_base=environ)
+        self.assertEqual(response.get_data(as_text=True), "ip:10.0.0.1")
+
+        # За одним доверенным прокси берётся адрес, который добавил он сам
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+        response = app.test_client().get("/tenant", headers=spoofed, environ_base=environ)
+        self.assertEqual(response.get_data(as_text=True), "ip:10.0.0.2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Модульные тесты инкрементального учёта места в хранилище."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.services.storage_usage import StorageUsageTracker
+
+
+class TestStorageUsageTracker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.corrections_dir = os.path.join(self.temp_dir, "corrections")
+        os.makedirs(self.corrections_dir)
+        self.tracker = StorageUsageTracker({"corrections": self.corrections_dir})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, size):
+        path = os.path.join(self.corrections_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_initial_reconcile_counts_existing_files(self):
+        self._write("a.docx", 100)
+        self._write("b.txt", 50)
+
+        usage = self.tracker.get_usage("corrections", ".docx")
+
+        self.assertEqual(usage["count"], 1)
+        self.assertEqual(usage["size_bytes"], 150)
+        self.assertIsNotNone(self.tracker.snapshot()["last_reconcile_duration_seconds"])
+
+    def test_write_and_delete_are_tracked_without_rescan(self):
+        self.tracker.reconcile()
+
+        path = self._write("a.docx", 200)
+        self.tracker.record_write(path)
+        self.assertEqual(self.tracker.get_usage("corrections", ".docx"), {"count": 1, "size_bytes": 200})
+
+        # Перезапись не должна удваивать размер
+        self._write("a.docx", 300)
+        self.tracker.record_write(path)
+        self.assertEqual(self.tracker.get_usage("corrections")["size_bytes"], 300)
+
+        os.remove(path)
+        self.tracker.record_delete(path)
+        self.assertEqual(self.tracker.get_usage("corrections"), {"count": 0, "size_bytes": 0})
+
+    def test_untracked_paths_are_ignored(self):
+        self.tracker.reconcile()
+        outside = os.path.join(self.temp_dir, "outside.docx")
+        with open(outside, "wb") as f:
+            f.write(b"data")
+
+        self.tracker.record_write(outside)
+
+        self.assertEqual(self.tracker.get_usage("corrections")["count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
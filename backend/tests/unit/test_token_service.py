@@ -2,8 +2,9 @@
 
 import pytest
 from datetime import datetime, timedelta, timezone
+from unittest import mock
 from redis import Redis
-from app.services.token_service import TokenManager
+from app.services.token_service import RevocationCache, TokenManager
 
 
 class TestTokenManager:
@@ -135,3 +136,106 @@ class TestTokenManagerEdgeCases:
 
         # Token should be expired
         assert redis_client.exists(f"token_blacklist:{jti}") == 0
+
+
+class TestRevocationCache:
+    """Test the in-process blacklist copy without a Redis server"""
+
+    @pytest.fixture
+    def now(self):
+        return [1000.0]
+
+    @pytest.fixture
+    def sorted_sets(self):
+        return {
+            "token_blacklist_index": [(b"revoked-elsewhere", 5000.0)],
+            "token_blacklist_log": [],
+        }
+
+    @pytest.fixture
+    def redis_client(self, sorted_sets):
+        client = mock.Mock()
+        client.zrangebyscore.side_effect = lambda key, low, high, withscores=False: [
+            (member, score) for member, score in sorted_sets[key] if score >= float(low)
+        ]
+        client.scan_iter.return_value = [b"token_blacklist:legacy"]
+        client.ttl.return_value = 60
+        return client
+
+    @pytest.fixture
+    def cache(self, redis_client, now):
+        return RevocationCache(redis_client, staleness=5, clock=lambda: now[0])
+
+    def test_checks_are_answered_locally_between_syncs(self, cache, redis_client, sorted_sets, now):
+        assert cache.is_revoked("revoked-elsewhere") is True
+        assert cache.is_revoked("legacy") is True
+        assert cache.is_revoked("active") is False
+        assert redis_client.zrangebyscore.call_count == 1
+        assert redis_client.exists.call_count == 0
+
+        # Nothing revoked since: one log read, no reload
+        now[0] += 5
+        assert cache.is_revoked("active") is False
+        assert redis_client.zrangebyscore.call_args[0][0] == "token_blacklist_log"
+
+        # Another process revoked a token: seen after the staleness bound
+        sorted_sets["token_blacklist_log"].append((b"active:5000.0", now[0]))
+        assert cache.is_revoked("active") is False
+        now[0] += 5
+        assert cache.is_revoked("active") is True
+        # Only the log tail is read; the index and legacy keys are loaded once
+        assert redis_client.zrangebyscore.call_args[0][1] == 1005.0 - 30
+        assert redis_client.scan_iter.call_count == 1
+
+        stats = cache.stats()
+        assert stats["checks"] == 6
+        assert stats["hit_rate"] == 1.0
+        assert stats["reloads"] == 1
+        assert stats["fetched"] == 1
+
+    def test_redis_is_read_outside_the_lock(self, cache, redis_client, sorted_sets):
+        def zrangebyscore(key, low, high, withscores=False):
+            assert not cache._lock.locked()
+            return sorted_sets[key]
+
+        redis_client.zrangebyscore.side_effect = zrangebyscore
+        assert cache.sync() is True
+
+    def test_stale_cursor_falls_back_to_full_load(self, cache, redis_client, now):
+        assert cache.is_revoked("active") is False
+        now[0] += 2 * 24 * 3600
+        assert cache.is_revoked("revoked-elsewhere") is False
+        assert redis_client.zrangebyscore.call_args[0][0] == "token_blacklist_index"
+        assert cache.stats()["reloads"] == 2
+
+    def test_local_revocation_and_expiry(self, cache, now):
+        cache.add("logged-out", now[0] + 10)
+        assert cache.is_revoked("logged-out") is True
+        now[0] += 11
+        assert cache.is_revoked("logged-out") is False
+
+    def test_fails_closed_when_stale_and_redis_is_down(self, cache, redis_client, now):
+        assert cache.is_revoked("active") is False
+        redis_client.zrangebyscore.side_effect = ConnectionError("down")
+        # Still within the staleness bound
+        now[0] += 1
+        assert cache.is_revoked("active") is False
+        now[0] += 5
+        assert cache.is_revoked("active") is True
+        assert cache.stats()["sync_errors"] == 1
+
+    def test_token_manager_uses_cache(self, redis_client, sorted_sets):
+        sorted_sets["token_blacklist_index"] = []
+        redis_client.scan_iter.return_value = []
+        manager = TokenManager(redis_client, {"JWT_REVOCATION_STALENESS": 5})
+
+        assert manager.revoke_token("jti-1", expires_in=60) is True
+        assert manager.is_token_revoked("jti-1") is True
+        assert manager.is_token_revoked("jti-2") is False
+        redis_client.exists.assert_not_called()
+        assert manager.revocation_stats()["checks"] == 2
+
+        uncached = TokenManager(redis_client, {"JWT_REVOCATION_STALENESS": 0})
+        redis_client.exists.return_value = 1
+        assert uncached.is_token_revoked("jti-3") is True
+        assert uncached.revocation_stats() is None
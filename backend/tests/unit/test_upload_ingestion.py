@@ -0,0 +1,118 @@
+"""Модульные тесты потокового приёма загрузок."""
+
+import hashlib
+import io
+import os
+import zipfile
+
+import docx
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.config.security import MAX_BATCH_UPLOAD_SIZE, MAX_CONTENT_LENGTH, MAX_UPLOAD_SIZE
+from app.services.content_hash import get_file_digest
+from app.services.document_processor import DocumentProcessor
+from app.services.upload_ingestion import UploadRejected, check_request_size, ingest_upload
+
+
+def _docx_bytes():
+    document = docx.Document()
+    document.add_paragraph("Тестовый документ")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _storage(data, filename="test.docx"):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def test_valid_docx_is_saved_with_digest():
+    data = _docx_bytes()
+
+    upload = ingest_upload(_storage(data))
+    try:
+        assert os.path.exists(upload.path)
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        # Хеш доступен кэшам без повторного чтения файла
+        assert get_file_digest(upload.path) == upload.sha256
+    finally:
+        upload.cleanup()
+
+    assert not os.path.exists(upload.temp_dir)
+
+
+def test_oversized_upload_is_rejected_while_streaming():
+    data = _docx_bytes()
+
+    with pytest.raises(UploadRejected) as exc_info:
+        ingest_upload(_storage(data), max_size=len(data) - 1)
+
+    assert exc_info.value.status_code == 413
+
+
+def test_request_size_limits_are_per_file_and_per_batch():
+    # Файл предельного размера проходит вместе с заголовками multipart
+    check_request_size(MAX_UPLOAD_SIZE + 4096)
+    with pytest.raises(UploadRejected) as exc_info:
+        check_request_size(MAX_UPLOAD_SIZE * 2)
+    assert exc_info.value.status_code == 413
+
+    # Пакет ограничен суммарным размером, а не размером файла × число файлов
+    check_request_size(MAX_UPLOAD_SIZE * 2, batch=True)
+    with pytest.raises(UploadRejected):
+        check_request_size(MAX_BATCH_UPLOAD_SIZE * 2, batch=True)
+
+    assert DocumentProcessor.MAX_FILE_SIZE == MAX_UPLOAD_SIZE
+    assert MAX_CONTENT_LENGTH >= MAX_BATCH_UPLOAD_SIZE
+
+
+def test_non_zip_payload_is_rejected():
+    with pytest.raises(UploadRejected):
+        ingest_upload(_storage(b"not-a-docx" * 200))
+
+
+def test_zip_bomb_is_rejected_by_central_directory():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", b"\0" * (8 * 1024 * 1024))
+    data = buffer.getvalue() + b"\0" * 1024
+
+    with pytest.raises(UploadRejected) as exc_info:
+        ingest_upload(_storage(data))
+
+    assert "сжатия" in exc_info.value.message
+
+
+def test_archive_without_document_part_is_rejected():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>" + " " * 2048)
+
+    with pytest.raises(UploadRejected) as exc_info:
+        ingest_upload(_storage(buffer.getvalue()))
+
+    assert "word/document.xml" in exc_info.value.message
+
+
+def test_read_error_removes_temp_dir(tmp_path, monkeypatch):
+    class BrokenStream:
+        def read(self, size):
+            raise OSError("connection reset")
+
+    created = []
+
+    def mkdtemp():
+        path = tmp_path / f"upload-{len(created)}"
+        path.mkdir()
+        created.append(path)
+        return str(path)
+
+    monkeypatch.setattr("app.services.upload_ingestion.tempfile.mkdtemp", mkdtemp)
+
+    with pytest.raises(OSError):
+        ingest_upload(FileStorage(stream=BrokenStream(), filename="test.docx"))
+
+    assert created and not created[0].exists()
@@ -0,0 +1,160 @@
+"""Модульные тесты загрузки профилей и прогрева процесса."""
+
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.services import profile_loader, warmup
+from app.services.profile_loader import (
+    FrozenDict,
+    bump_profiles_version,
+    load_profile_data,
+    load_resolved_profile,
+    preload_profiles,
+    profiles_version,
+    resolve_profile,
+)
+
+
+class TestProfileLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self._write("default_gost", {"name": "ГОСТ", "rules": {"font": {"size": 14}}})
+        self._write("custom", {"name": "Свой", "rules": {}})
+        profile_loader.clear_profile_cache()
+
+    def tearDown(self):
+        profile_loader.clear_profile_cache()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, profile_id, data):
+        with open(os.path.join(self.temp_dir, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def test_fallback_and_copies(self):
+        self.assertEqual(load_profile_data("missing", profiles_dir=self.temp_dir)["name"], "ГОСТ")
+        self.assertIsNone(load_profile_data("missing", fallback=None, profiles_dir=self.temp_dir))
+
+        data = load_profile_data(profiles_dir=self.temp_dir)
+        data["rules"]["font"]["size"] = 12
+        # Изменение копии не затрагивает кэш
+        self.assertEqual(load_profile_data(profiles_dir=self.temp_dir)["rules"]["font"]["size"], 14)
+
+    def test_cache_is_invalidated_by_file_change(self):
+        self.assertEqual(preload_profiles(self.temp_dir), ["custom", "default_gost"])
+        with mock.patch("builtins.open", side_effect=AssertionError("read from disk")):
+            self.assertEqual(load_profile_data("custom", profiles_dir=self.temp_dir)["name"], "Свой")
+
+        self._write("custom", {"name": "Новый свой", "rules": {}, "version": "2.0"})
+        self.assertEqual(load_profile_data("custom", profiles_dir=self.temp_dir)["name"], "Новый свой")
+
+    def test_resolved_profile_is_shared_and_frozen(self):
+        self._write("child", {"name": "Вуз", "extends": "default_gost", "rules": {"margins": {"left": 3}}})
+
+        profile = resolve_profile("child", self.temp_dir)
+        self.assertIsInstance(profile, FrozenDict)
+        self.assertEqual(profile["rules"]["font"]["size"], 14)
+        self.assertEqual(profile["_inheritance_chain"], ("default_gost", "child"))
+        self.assertIs(resolve_profile("child", self.temp_dir), profile)
+        with self.assertRaises(TypeError):
+            profile["rules"]["font"]["size"] = 12
+
+        mutable = profile_loader.thaw(profile)
+        mutable["rules"]["font"]["size"] = 12
+        self.assertEqual(resolve_profile("child", self.temp_dir)["rules"]["font"]["size"], 14)
+
+    def test_resolved_profile_follows_parent_changes(self):
+        self._write("child", {"name": "Вуз", "extends": "default_gost", "rules": {}})
+        resolve_profile("child", self.temp_dir)
+
+        self._write("default_gost", {"name": "ГОСТ", "rules": {"font": {"size": 12}}, "v": 2})
+        self.assertEqual(resolve_profile("child", self.temp_dir)["rules"]["font"]["size"], 12)
+
+    def test_resolve_errors_and_fallback(self):
+        self._write("loop_a", {"extends": "loop_b"})
+        self._write("loop_b", {"extends": "loop_a"})
+        with self.assertRaises(ValueError):
+            resolve_profile("loop_a", self.temp_dir)
+        with self.assertRaises(FileNotFoundError):
+            resolve_profile("missing", self.temp_dir)
+        self.assertEqual(load_resolved_profile("missing", profiles_dir=self.temp_dir)["name"], "ГОСТ")
+        self.assertEqual(load_resolved_profile("loop_a", profiles_dir=self.temp_dir)["name"], "ГОСТ")
+
+    def test_shared_version_stamp(self):
+        self.assertEqual(profiles_version(self.temp_dir), 0)
+        first = bump_profiles_version(self.temp_dir)
+        self.assertEqual(profiles_version(self.temp_dir), first)
+        self.assertGreater(bump_profiles_version(self.temp_dir), first)
+
+
+class TestWarmUp(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(warmup._stats, {"warmed": False}, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_warm_up_is_idempotent(self):
+        with mock.patch.object(warmup, "_process_sample") as process_sample:
+            stats = warmup.warm_up()
+            again = warmup.warm_up()
+
+        process_sample.assert_called_once()
+        self.assertTrue(stats["warmed"])
+        self.assertGreater(stats["profiles"], 0)
+        self.assertIn("docx", stats["modules"])
+        self.assertEqual(stats["errors"], [])
+        self.assertEqual(again["duration_ms"], stats["duration_ms"])
+        self.assertEqual(warmup.get_warmup_stats()["pid"], os.getpid())
+
+    def test_sample_document_is_processed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = warmup.build_sample_document(os.path.join(temp_dir, "sample.docx"))
+            warmup._process_sample(path)
+
+    def test_warmup_enabled(self):
+        self.assertTrue(warmup.warmup_enabled("1"))
+        self.assertFalse(warmup.warmup_enabled("off"))
+        with mock.patch.dict(os.environ, {"WORKER_WARMUP": "0"}):
+            self.assertFalse(warmup.warmup_enabled())
+
+    def test_gc_freeze_runs_once_and_only_on_request(self):
+        with mock.patch.object(warmup, "_frozen", False), \
+                mock.patch.object(warmup, "_process_sample"), \
+                mock.patch.object(warmup.gc, "freeze") as freeze:
+            self.assertFalse(warmup.warm_up()["frozen"])
+            freeze.assert_not_called()
+
+            self.assertTrue(warmup.freeze_for_fork())
+            self.assertTrue(warmup.warm_up(freeze=True)["frozen"])
+        freeze.assert_called_once()
+
+    def test_celery_freezes_only_prefork_pool(self):
+        from celery.concurrency.prefork import TaskPool
+
+        from app.tasks.celery_tasks import _is_prefork_pool
+
+        self.assertTrue(_is_prefork_pool(SimpleNamespace(pool_cls="prefork")))
+        self.assertTrue(_is_prefork_pool(SimpleNamespace(pool_cls=TaskPool)))
+        for pool in ("solo", "threads", "eventlet"):
+            self.assertFalse(_is_prefork_pool(SimpleNamespace(pool_cls=pool)))
+
+    def test_gunicorn_freezes_only_with_preload(self):
+        path = os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py")
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+        conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(conf)
+
+        with mock.patch.object(warmup, "freeze_for_fork") as freeze_for_fork:
+            conf.pre_fork(SimpleNamespace(cfg=SimpleNamespace(preload_app=False)), None)
+            freeze_for_fork.assert_not_called()
+            conf.pre_fork(SimpleNamespace(cfg=SimpleNamespace(preload_app=True)), None)
+            freeze_for_fork.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
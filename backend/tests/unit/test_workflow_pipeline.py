@@ -0,0 +1,148 @@
+"""Модульные тесты поэтапного конвейера обработки документа."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app.metrics import memory
+from app.services import workflow_service
+from app.services.artifact_store import ArtifactNotFound, ArtifactStore
+from app.services.deadline import Deadline
+from app.services.workflow_service import PIPELINE_STAGES, WorkflowService
+
+TEST_DOCUMENT = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "test_data", "documents", "wrong_margins.docx"
+)
+
+
+@unittest.skipUnless(os.path.exists(TEST_DOCUMENT), "Нет тестового документа")
+class TestWorkflowPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ArtifactStore(os.path.join(self.temp_dir, "artifacts"))
+        store_patch = mock.patch.object(workflow_service, "artifact_store", self.store)
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+        self.source = os.path.join(self.temp_dir, "upload.docx")
+        shutil.copy(TEST_DOCUMENT, self.source)
+        self.workflow = WorkflowService(os.path.join(self.temp_dir, "corrections"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stages_pass_serializable_state_with_artifact_refs(self):
+        state = self.workflow.start_pipeline(self.source, "upload.docx")
+        # Исходный временный файл может быть удалён сразу после постановки в очередь
+        os.remove(self.source)
+
+        for stage in PIPELINE_STAGES[1:]:
+            # Имитация передачи состояния через брокер
+            state = json.loads(json.dumps(state))
+            state = getattr(self.workflow, f"run_{stage}_stage")(state)
+            self.assertLess(len(json.dumps(state)), 10000)
+
+        result = self.workflow.build_result(state)
+
+        self.assertTrue(result["success"])
+        self.assertTrue(result["correction_success"])
+        self.assertIn("issues", result["check_results"])
+        self.assertTrue(os.path.exists(result["full_corrected_path"]))
+        self.assertEqual(
+            result["quality_metrics"]["after_total_issues"],
+            result["corrected_check_results"]["total_issues_count"],
+        )
+
+    def test_extract_failure_skips_remaining_stages(self):
+        with open(self.source, "wb") as f:
+            f.write(b"broken")
+
+        state = self.workflow.start_pipeline(self.source, "upload.docx")
+        for stage in PIPELINE_STAGES[1:]:
+            state = getattr(self.workflow, f"run_{stage}_stage")(state)
+
+        self.assertTrue(state["failed"])
+        self.assertFalse(state["result"]["success"])
+        self.assertNotIn("check_results", state["refs"])
+
+    def test_exhausted_deadline_returns_incomplete_result(self):
+        deadline = Deadline(expires_at=1.0, budget=60.0, clock=lambda: 2.0)
+        state = self.workflow.start_pipeline(self.source, "upload.docx", deadline=deadline)
+        state = json.loads(json.dumps(state))
+        with mock.patch("app.services.deadline.time.time", return_value=2.0):
+            for stage in PIPELINE_STAGES[1:]:
+                state = getattr(self.workflow, f"run_{stage}_stage")(state)
+        result = self.workflow.build_result(state)
+
+        self.assertTrue(result["success"])
+        self.assertTrue(result["incomplete"])
+        self.assertEqual(result["skipped_stages"], ["correct"])
+        self.assertEqual(len(result["check_results"]["skipped_rules"]), 30)
+        self.assertFalse(result["correction_success"])
+        self.assertIsNotNone(result["report_id"])
+
+    def test_process_document_keeps_payloads_in_memory(self):
+        with mock.patch.object(self.store, "put_json") as put_json, \
+                mock.patch.object(self.store, "get_json") as get_json:
+            result = self.workflow.process_document(self.source, "upload.docx")
+
+        self.assertTrue(result["success"])
+        self.assertIn("issues", result["check_results"])
+        self.assertIsNotNone(result["corrected_check_results"])
+        put_json.assert_not_called()
+        get_json.assert_not_called()
+        self.assertFalse(os.path.exists(self.store.root))
+
+    def test_artifact_write_error_fails_stage(self):
+        state = self.workflow.start_pipeline(self.source, "upload.docx")
+        with mock.patch.object(self.store, "put_json", side_effect=OSError("диск заполнен")):
+            state = self.workflow.run_extract_stage(state)
+
+        self.assertTrue(state["failed"])
+        self.assertNotIn("document_data", state["refs"])
+        self.assertIn("Критическая ошибка обработки: диск заполнен", state["result"]["errors"])
+
+    def test_memory_budget_aborts_job(self):
+        # Этап correct «раздувает» процесс сверх бюджета
+        def fake_rss():
+            usage = memory._current.get()
+            return (500 if usage and usage.stage == "correct" else 50) * memory.MB
+
+        with mock.patch.object(memory, "MEMORY_BUDGET_MB", 100), \
+                mock.patch.object(memory, "rss_bytes", fake_rss):
+            result = self.workflow.process_document(self.source, "upload.docx")
+
+        self.assertFalse(result["success"])
+        self.assertIn("Превышен бюджет памяти: 500 МБ при лимите 100 МБ (этап correct", result["errors"][-1])
+        self.assertEqual([entry["stage"] for entry in result["memory"]], ["extract", "check", "correct"])
+        self.assertTrue(result["memory"][-1]["budget_exceeded"])
+        self.assertIsNone(result["report_id"])
+        self.assertFalse(os.listdir(self.workflow.corrections_dir))
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ArtifactStore(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_json_round_trip_and_invalid_refs(self):
+        job_id = self.store.new_job_id()
+        ref = self.store.put_json(job_id, "data", {"a": [1, 2]})
+
+        self.assertEqual(self.store.get_json(ref), {"a": [1, 2]})
+        with self.assertRaises(ArtifactNotFound):
+            self.store.get_json("../../etc/passwd")
+
+        self.store.delete_job(job_id)
+        with self.assertRaises(ArtifactNotFound):
+            self.store.get_json(ref)
+
+
+if __name__ == "__main__":
+    unittest.main()
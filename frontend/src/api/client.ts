@@ -690,6 +690,14 @@ export const documentsApi = {
     });
   },
 
+  /**
+   * Get batch status and the results processed so far
+   */
+  getBatch: (batchId: string, accessToken?: string): Promise<unknown> =>
+    apiFetch<unknown>(`/api/document/batch/${encodeURIComponent(batchId)}?details=true`, {
+      headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined,
+    }),
+
   /**
    * Upload and validate a document
    */
@@ -21,6 +21,7 @@ import {
   Description,
   CheckCircle,
   Build,
+  FactCheck,
   Assessment,
   Done,
   Error as ErrorIcon
@@ -34,6 +35,7 @@ const STAGES = [
   { id: 'extract', label: 'Извлечение данных', icon: Description },
   { id: 'check', label: 'Проверка', icon: CheckCircle },
   { id: 'correct', label: 'Исправление', icon: Build },
+  { id: 'verify', label: 'Проверка исправлений', icon: FactCheck },
   { id: 'report', label: 'Отчёт', icon: Assessment },
   { id: 'complete', label: 'Готово', icon: Done },
 ];
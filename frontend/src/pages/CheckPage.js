@@ -68,7 +68,7 @@ const CheckPage = () => {
       if (rejection.errors.some((e) => e.code === "file-invalid-type")) {
         setError("Пожалуйста, загрузите файл в формате DOCX (Word Document)");
       } else if (rejection.errors.some((e) => e.code === "file-too-large")) {
-        setError("Файл слишком большой. Максимальный размер - 10 МБ");
+        setError("Файл слишком большой. Максимальный размер - 20 МБ");
       } else {
         setError("Невозможно загрузить файл. Проверьте формат и размер файла.");
       }
@@ -80,7 +80,7 @@ const CheckPage = () => {
       "application/vnd.openxmlformats-officedocument.wordprocessingml.document": [".docx"],
     },
     maxFiles: 1,
-    maxSize: 10485760, // 10 MB
+    maxSize: 20971520, // 20 MB
     onDrop,
     onDropRejected,
   });
@@ -341,7 +341,7 @@ const CheckPage = () => {
                               color="text.secondary"
                               sx={{ display: "block", mb: 0.5 }}
                             >
-                              Максимальный размер файла: 10 МБ
+                              Максимальный размер файла: 20 МБ
                             </Typography>
                             <Typography
                               variant="caption"
@@ -2,6 +2,8 @@ import logger from "./logger";
 
 import { documentsApi } from "../api/client";
 
+const BATCH_POLL_INTERVAL_MS = 1000;
+
 const api = {
   /**
    * Upload a single document for processing
@@ -26,7 +28,19 @@ const api = {
    */
   uploadBatch: async (files, profileId = "default_gost") => {
     try {
-      return await documentsApi.uploadBatch(files, profileId);
+      const submitted = await documentsApi.uploadBatch(files, profileId);
+      if (!submitted.batch_id) {
+        return submitted;
+      }
+
+      // The batch is queued on the server: poll its status until every file is processed
+      let status = await documentsApi.getBatch(submitted.batch_id);
+      while (status.status !== "completed") {
+        await new Promise((resolve) => setTimeout(resolve, BATCH_POLL_INTERVAL_MS));
+        status = await documentsApi.getBatch(submitted.batch_id);
+      }
+      const rejected = (submitted.rejected || []).map((item) => ({ ...item, success: false }));
+      return { success: true, results: [...status.results, ...rejected] };
     } catch (error) {
       logger.error("Error uploading batch:", error);
       throw error;